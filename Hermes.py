@@ -13,6 +13,26 @@ Código limpiado y optimizado.
 
 import subprocess
 import time
+
+# --- Desglose del arranque: cada bloque de imports se mide y se muestra en el log ---
+_STARTUP_T0 = time.perf_counter()
+IMPORT_TIMES_MS = {}  # nombre -> ms (los diferidos se agregan al importarse por primera vez)
+
+
+class _ImportTimer:
+    """Mide un bloque de imports y lo registra en IMPORT_TIMES_MS."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        IMPORT_TIMES_MS[self.name] = (time.perf_counter() - self.start) * 1000
+        return False
+
+
 import random
 import math
 import ctypes
@@ -32,38 +52,90 @@ except Exception:
             ctypes.windll.user32.SetProcessDPIAware()
         except Exception:
             pass
-import customtkinter as ctk
+with _ImportTimer("customtkinter"):
+    import customtkinter as ctk
 import tkinter.font as tkfont
 import tkinter.ttk as ttk
 from tkinter import filedialog, messagebox
 import os
 import threading
+import queue
+import collections
+import json
 import concurrent.futures
 from datetime import datetime, timedelta
 import sys
-import csv
 import io
 import urllib.parse
 import shlex # Import shlex for better command splitting
 import tempfile
 import shutil
-import adbutils
-import uiautomator2 as u2
-import pytesseract
+import importlib.util
+import hashlib
 try:
     import pywinstyles
 except ImportError:
     pywinstyles = None
-from PIL import Image, ImageDraw, ImageFilter
+with _ImportTimer("PIL"):
+    from PIL import Image
+# NumPy solo anima el fondo del menú de inicio: sin él, el fondo queda fijo
+with _ImportTimer("numpy"):
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
 import re
 import xml.etree.ElementTree as ET
 
-# --- Importar módulo de Asistente de IA ---
-try:
-    from ai_assistant import AIAssistant, GEMINI_AVAILABLE
-except ImportError:
-    AIAssistant = None
-    GEMINI_AVAILABLE = False
+# --- Motor de envío (sin interfaz) ---
+with _ImportTimer("hermes_engine"):
+    from hermes_engine import (
+        EngineConfig, EngineObserver, SendingEngine,
+        AdbDeviceTracker,
+    )
+from excel_io import CampaignLinks, MessageTemplate, build_message_links, export_rows, read_csv_rows, read_excel_rows
+
+# --- Importaciones diferidas ---
+# openpyxl, uiautomator2 (dentro de hermes_engine) y el asistente de IA (que carga los SDK
+# de OpenAI/Gemini) no hacen falta para mostrar el menú: se importan en el primer uso.
+# Los imports quedan escritos de forma literal para que PyInstaller los siga detectando.
+LAZY_MODULES = ('openpyxl', 'uiautomator2', 'ai_assistant', 'openai', 'google.generativeai')
+
+
+def _timed_first_import(name, loader):
+    """Ejecuta 'loader' y, si el módulo no estaba cargado, registra su tiempo de import."""
+    if name in sys.modules:
+        return loader()
+    with _ImportTimer(name):
+        return loader()
+
+
+def _openpyxl():
+    """Módulo openpyxl (import diferido)."""
+    def load():
+        import openpyxl
+        return openpyxl
+    return _timed_first_import('openpyxl', load)
+
+
+def _ai_assistant_class():
+    """Clase AIAssistant, o None si el módulo o sus dependencias no están instalados."""
+    def load():
+        from ai_assistant import AIAssistant
+        return AIAssistant
+    try:
+        return _timed_first_import('ai_assistant', load)
+    except ImportError:
+        return None
+
+
+def _warm_lazy_imports():
+    """Importa en segundo plano lo diferido, una vez que la ventana ya está visible."""
+    for loader in (_openpyxl, _ai_assistant_class):
+        try:
+            loader()
+        except Exception:
+            pass
 
 
 # --- Clase auxiliar para evitar errores de Tkinter con campos numéricos vacíos ---
@@ -88,6 +160,138 @@ def resource_path(relative_path):
 # --- Constante para el directorio base ---
 BASE_DIR = resource_path(".")
 
+
+# --- Caché de imágenes pre-escaladas (menú, encabezado y diálogos) ---
+class AssetCache:
+    """
+    Entrega las imágenes de la interfaz ya escaladas al tamaño en píxeles en que se
+    dibujan. Cada variante se guarda como PNG en una carpeta de caché del usuario, con
+    nombre por hash del original, tamaño y tema; así los PNG de 1.4 MB se decodifican y
+    se reescalan con LANCZOS una sola vez y no en cada inicio. En memoria se comparten
+    entre ventanas (menú, encabezado, diálogo de fin).
+
+    Para un tema se usa '<nombre>_<tema>.png' si existe (p. ej. 'logo_left_light.png');
+    si no, el original.
+    """
+
+    def __init__(self, source_dir=BASE_DIR, cache_dir=None):
+        self.source_dir = source_dir
+        if cache_dir is None:
+            root_dir = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+            cache_dir = os.path.join(root_dir, 'Hermes', 'asset_cache')
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.index = None       # archivo -> {'mtime_ns', 'size', 'sha1'} (evita re-hashear)
+        self.images = {}        # (archivo, ancho, alto) -> PIL.Image
+        self.tk_images = {}     # (tipo, archivo, ancho, alto, tema) -> PhotoImage/CTkImage
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'rendered': 0, 'load_ms': 0.0, 'render_ms': 0.0}
+
+    def _source(self, name, theme=None):
+        if theme:
+            stem, ext = os.path.splitext(name)
+            themed = os.path.join(self.source_dir, f"{stem}_{theme}{ext}")
+            if os.path.exists(themed):
+                return themed
+        return os.path.join(self.source_dir, name)
+
+    def _load_index(self):
+        if self.index is None:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                self.index = {}
+        return self.index
+
+    def _source_hash(self, path):
+        """Hash del original; se recalcula solo si cambió su tamaño o fecha."""
+        st = os.stat(path)
+        entry = self._load_index().get(path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return entry['sha1']
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        self.index[path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha1': digest}
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+        except OSError:
+            pass
+        return digest
+
+    def image(self, name, size, theme=None):
+        """PIL.Image RGBA de 'name' escalada a 'size' (ancho, alto) en píxeles."""
+        path = self._source(name, theme)
+        size = (max(1, int(round(size[0]))), max(1, int(round(size[1]))))
+        key = (path, size[0], size[1])
+        with self.lock:
+            cached = self.images.get(key)
+            if cached is not None:
+                self.stats['memory_hits'] += 1
+                return cached
+            start = time.perf_counter()
+            stem = os.path.splitext(os.path.basename(path))[0].replace(' ', '_')
+            variant = os.path.join(self.cache_dir, f"{stem}_{self._source_hash(path)[:12]}_{size[0]}x{size[1]}.png")
+            img = None
+            if os.path.exists(variant):
+                try:
+                    with Image.open(variant) as f:
+                        img = f.convert('RGBA')
+                    self.stats['disk_hits'] += 1
+                    self.stats['load_ms'] += (time.perf_counter() - start) * 1000
+                except OSError:
+                    img = None  # Variante corrupta: se regenera
+            if img is None:
+                with Image.open(path) as f:
+                    img = f.convert('RGBA').resize(size, Image.Resampling.LANCZOS)
+                self.stats['rendered'] += 1
+                self.stats['render_ms'] += (time.perf_counter() - start) * 1000
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp = variant + '.tmp'
+                    img.save(tmp, format='PNG')
+                    os.replace(tmp, variant)
+                except OSError:
+                    pass  # Sin caché en disco: se sigue usando la variante en memoria
+            self.images[key] = img
+            return img
+
+    def photo(self, name, size, theme=None):
+        """ImageTk.PhotoImage para Canvas (sin escalado de CustomTkinter)."""
+        key = ('photo', name, size[0], size[1], theme)
+        if key not in self.tk_images:
+            self.tk_images[key] = ImageTk.PhotoImage(self.image(name, size, theme))
+        return self.tk_images[key]
+
+    def ctk_image(self, name, size, widget=None):
+        """
+        CTkImage con variantes claro/oscuro ya escaladas al factor de CustomTkinter del
+        widget (DPI), para que CTkImage no tenga que volver a reescalar el original.
+        """
+        scaling = 1.0
+        tracker = getattr(ctk, 'ScalingTracker', None)
+        if widget is not None and tracker is not None:
+            try:
+                scaling = tracker.get_widget_scaling(widget)
+            except Exception:
+                scaling = 1.0
+        key = ('ctk', name, size[0], size[1], scaling)
+        if key not in self.tk_images:
+            px = (size[0] * scaling, size[1] * scaling)
+            self.tk_images[key] = ctk.CTkImage(light_image=self.image(name, px, 'light'),
+                                               dark_image=self.image(name, px, 'dark'), size=size)
+        return self.tk_images[key]
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['disk_hits'] + s['rendered']} imágenes en {s['load_ms'] + s['render_ms']:.0f} ms "
+                f"({s['disk_hits']} desde caché, {s['rendered']} escaladas)")
+
+
+ASSETS = AssetCache()
+
 # --- INICIO: Mapeo de caracteres a keycodes ADB ---
 # (Simplificado, solo incluye caracteres comunes. Se puede expandir)
 # Definición de sets GSM para cálculo de SMS
@@ -122,16 +326,13 @@ KEYCODE_MAP = {
 NEEDS_SHIFT = "!@#$%^&*()_+?:\"" + "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 # --- FIN: Mapeo ---
 
-# Verificar dependencias
-try:
-    import openpyxl
-    from openpyxl import load_workbook
-except ImportError:
+# Verificar dependencias (openpyxl solo se busca: se importa al cargar o guardar un Excel)
+if importlib.util.find_spec('openpyxl') is None:
     print("\n"+"="*50+"\nERROR: Falta 'openpyxl'. Ejecuta INSTALAR.bat.\n"+"="*50)
     input("\nEnter para salir...")
     sys.exit(1)
 try:
-    from PIL import Image, ImageTk
+    from PIL import ImageTk
 except ImportError:
     print("\n"+"="*50+"\nERROR: Falta 'Pillow'. Ejecuta INSTALAR.bat.\n"+"="*50)
     input("\nEnter para salir...")
@@ -180,43 +381,6 @@ def darken_color(color, factor=0.1):
     b = _clamp(b * (1 - factor))
     return f"#{int(r):02x}{int(g):02x}{int(b):02x}"
 
-def format_currency_value(value):
-    """Formatea un valor numérico como moneda en formato argentino ($###.###,##)."""
-    if value is None:
-        return ''
-
-    try:
-        text = str(value).strip()
-        if not text:
-            return ''
-
-        text = (text
-                .replace('$', '')
-                .replace(' ', '')
-                .replace('\u202f', '')
-                .replace('\u00a0', '')
-                .replace('−', '-')
-                )
-
-        if ',' in text and '.' in text:
-            if text.rfind(',') > text.rfind('.'):
-                text = text.replace('.', '').replace(',', '.')
-            else:
-                text = text.replace(',', '')
-        elif ',' in text:
-            text = text.replace('.', '').replace(',', '.')
-        elif text.count('.') > 1:
-            parts = text.split('.')
-            text = ''.join(parts[:-1]) + '.' + parts[-1]
-
-        amount = float(text)
-        sign = '-' if amount < 0 else ''
-        formatted = f"{abs(amount):,.2f}"
-        formatted = formatted.replace(',', '¤').replace('.', ',').replace('¤', '.')
-        return f"{sign}${formatted}"
-    except Exception:
-        return str(value)
-
 # --- INICIO MODIFICACIÓN: Clase para Tooltips (CORREGIDA) ---
 class Tooltip:
     """
@@ -275,60 +439,264 @@ class Tooltip:
             self.tooltip_window = None
 
 # --- Clase principal de la aplicación ---
-# --- Clase auxiliar para las estrellas ---
-class Star:
-    def __init__(self, w, h):
+# --- Campo de estrellas del menú de inicio (NumPy, una imagen por frame) ---
+class Starfield:
+    """
+    Estrellas en coordenadas polares alrededor del centro, guardadas en arrays de NumPy.
+    Cada frame se actualizan todas juntas y se dibujan en un solo buffer de píxeles que la
+    interfaz vuelca a un PhotoImage (una llamada a Tk por frame en vez de una por estrella).
+
+    Las velocidades están expresadas por 'tick' de 20 ms (el ritmo original de la animación);
+    step() recibe cuántos ticks pasaron, así el movimiento no cambia si baja el FPS.
+    """
+
+    ATTRACT_RADIUS = 200   # Radio de influencia del mouse (píxeles)
+    ATTRACT_FACTOR = 0.05  # Fracción de la distancia al mouse que se acerca por tick
+
+    def __init__(self, count, w, h, seed=None):
+        self.rng = np.random.default_rng(seed)
         self.w = w
         self.h = h
-        # Inicializa una estrella en una posición aleatoria (coordenadas polares)
-        self.r = random.uniform(0, w/2)  # Radio (distancia al centro)
-        self.a = random.uniform(0, 2*math.pi)  # Ángulo
-        # Tasa de cambio de radio (velocidad) - Ajustado para pixels/frame visibles (0.5x speed)
-        self.rs = random.uniform(0.1, 0.5)
-        # Tasa de cambio de ángulo (rotación) (0.5x speed)
-        self.ar = random.uniform(0.001, 0.003)
-        self.sz = random.randint(1, 2)  # Tamaño
-
-    def move(self, mx=None, my=None):
-        # Mueve la estrella, aumentando su radio y ángulo
-        self.r += self.rs
-        self.a += self.ar
-
-        # Obtener coordenadas cartesianas actuales
-        cx = self.w/2 + math.cos(self.a) * self.r
-        cy = self.h/2 + math.sin(self.a) * self.r
-
-        # Lógica de atracción del mouse (si está cerca)
+        self.r = self.rng.uniform(0, w / 2, count)             # Radio (distancia al centro)
+        self.a = self.rng.uniform(0, 2 * math.pi, count)        # Ángulo
+        self.rs = self.rng.uniform(0.1, 0.5, count)             # Velocidad radial
+        self.ar = self.rng.uniform(0.001, 0.003, count)         # Velocidad angular
+        self.sz = self.rng.integers(1, 3, count)                # Tamaño (1 o 2)
+
+    def step(self, ticks=1.0, mx=None, my=None):
+        """Avanza 'ticks' frames de 20 ms; con (mx, my) atrae las estrellas cercanas."""
+        self.r += self.rs * ticks
+        self.a += self.ar * ticks
         if mx is not None and my is not None:
+            half_w, half_h = self.w / 2, self.h / 2
+            cx = half_w + np.cos(self.a) * self.r
+            cy = half_h + np.sin(self.a) * self.r
             dx = mx - cx
             dy = my - cy
-            dist = math.hypot(dx, dy)
-            threshold = 200  # Radio de influencia en píxeles
-
-            if dist < threshold:
-                # Factor de atracción (ajustar para "de a poco")
-                factor = 0.05
-                cx += dx * factor
-                cy += dy * factor
-
-                # Recalcular coordenadas polares basadas en la nueva posición atraída
-                # Esto hace que la animación fluya desde el nuevo punto
-                self.r = math.hypot(cx - self.w/2, cy - self.h/2)
-                self.a = math.atan2(cy - self.h/2, cx - self.w/2)
-
-        # Si la estrella sale del límite, la reinicia al centro
-        if self.r > self.w/2:
-            self.r = 0
-            self.a = random.uniform(0, 2*math.pi)
-
-    def get_coords(self):
-        # Convierte coordenadas polares (r, a) a cartesianas (x, y)
-        x = self.w/2 + math.cos(self.a) * self.r
-        y = self.h/2 + math.sin(self.a) * self.r
-        return x, y, self.sz
+            near = np.hypot(dx, dy) < self.ATTRACT_RADIUS
+            if near.any():
+                # Equivalente a aplicar el factor 'ticks' veces seguidas
+                factor = 1.0 - (1.0 - self.ATTRACT_FACTOR) ** ticks
+                cx = cx[near] + dx[near] * factor
+                cy = cy[near] + dy[near] * factor
+                # Recalcular las polares desde el punto atraído para que la animación siga fluyendo
+                self.r[near] = np.hypot(cx - half_w, cy - half_h)
+                self.a[near] = np.arctan2(cy - half_h, cx - half_w)
+        # Las que salen del límite vuelven al centro con un ángulo nuevo
+        out = self.r > self.w / 2
+        if out.any():
+            self.r[out] = 0
+            self.a[out] = self.rng.uniform(0, 2 * math.pi, int(out.sum()))
+
+    def render(self, frame, fg):
+        """Dibuja las estrellas sobre 'frame' (array HxW o HxWx3 ya con el fondo)."""
+        h, w = frame.shape[:2]
+        x = (w / 2 + np.cos(self.a) * self.r).astype(np.int32)
+        y = (h / 2 + np.sin(self.a) * self.r).astype(np.int32)
+        inside = (x >= 0) & (y >= 0) & (x < w) & (y < h)
+        x, y, sz = x[inside], y[inside], self.sz[inside]
+        # Como los óvalos originales (x, y, x+sz, y+sz): cuadrados de sz+1 píxeles de lado
+        for off_x in range(3):
+            for off_y in range(3):
+                sel = (sz >= max(off_x, off_y)) & (x + off_x < w) & (y + off_y < h)
+                frame[y[sel] + off_y, x[sel] + off_x] = fg
+        return frame
+
+# --- Historial de log acotado en memoria con desborde a disco ---
+class LogRingBuffer:
+    """
+    Historial de log de tamaño acotado. Guarda en memoria las últimas 'capacity' líneas
+    y vuelca las más viejas, en bloques de PAGE, a un archivo de segmento en disco.
+    Cada registro tiene un índice absoluto (0 = primera línea de la sesión) y se puede
+    leer por rango sin importar si está en memoria o en disco. Guarda también si la línea
+    lleva un renglón en blanco antes (spacer), para redibujarla igual.
+    """
+
+    PAGE = 256
+
+    def __init__(self, capacity=5000, spill_path=None):
+        self.capacity = capacity
+        self.records = collections.deque()
+        self.spill_path = spill_path or os.path.join(tempfile.gettempdir(), f"hermes_log_{os.getpid()}.seg")
+        self.spilled = 0         # Cantidad de registros ya volcados a disco
+        self.page_offsets = []   # Offset en bytes del registro k*PAGE dentro del segmento
+        self.lock = threading.Lock()
+        self._fp = None
+
+    def __len__(self):
+        return self.spilled + len(self.records)
+
+    def append(self, line, tag, spacer=False):
+        with self.lock:
+            self.records.append((line, tag, spacer))
+            if len(self.records) >= self.capacity + self.PAGE:
+                self._spill(self.PAGE)
+
+    def _spill(self, count):
+        try:
+            if self._fp is None:
+                self._fp = open(self.spill_path, 'wb')
+            for _ in range(count):
+                line, tag, spacer = self.records.popleft()
+                if self.spilled % self.PAGE == 0:
+                    self.page_offsets.append(self._fp.tell())
+                self._fp.write(json.dumps([tag, line, spacer], ensure_ascii=False).encode('utf-8') + b"\n")
+                self.spilled += 1
+            self._fp.flush()
+        except OSError:
+            # Sin disco disponible: se descartan los registros más viejos
+            while len(self.records) > self.capacity:
+                self.records.popleft()
+                self.spilled += 1
+
+    def get_range(self, start, end):
+        """Devuelve [(línea, tag, spacer), ...] de los registros con índice en [start, end)."""
+        with self.lock:
+            start = max(0, start)
+            end = min(end, self.spilled + len(self.records))
+            result = []
+            if start >= end:
+                return result
+            if start < self.spilled and self.page_offsets:
+                result.extend(self._read_spilled(start, min(end, self.spilled)))
+            for idx in range(max(start, self.spilled), end):
+                result.append(self.records[idx - self.spilled])
+            return result
+
+    def _read_spilled(self, start, end):
+        page = start // self.PAGE
+        if page >= len(self.page_offsets):
+            return []
+        result = []
+        try:
+            with open(self.spill_path, 'rb') as fp:
+                fp.seek(self.page_offsets[page])
+                idx = page * self.PAGE
+                for raw in fp:
+                    if idx >= end:
+                        break
+                    if idx >= start:
+                        tag, line, spacer = json.loads(raw.decode('utf-8'))
+                        result.append((line, tag, spacer))
+                    idx += 1
+        except (OSError, ValueError):
+            pass
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.spilled = 0
+            self.page_offsets = []
+            if self._fp is not None:
+                try:
+                    self._fp.close()
+                except OSError:
+                    pass
+                self._fp = None
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+
+# --- Clasificador compilado de mensajes de log ---
+class LogMessageClassifier:
+    """
+    Evalúa en una sola pasada una tabla ordenada de reglas de palabras clave.
+
+    Cada regla es un dict con 'all' (todas deben aparecer), 'none' (ninguna debe aparecer)
+    y 'any' (al menos una). Gana la primera regla que se cumple, igual que una cadena de
+    if/elif. Las palabras presentes se buscan con una sola regex de alternancia (con
+    lookahead, para no perder coincidencias solapadas) y el resultado se memoiza por
+    plantilla: el mensaje con los dígitos reemplazados por '#'.
+    """
+
+    _DIGITS = re.compile(r'\d+')
+
+    def __init__(self, rules, cache_size=4096):
+        self.rules = rules
+        self.cache_size = cache_size
+        self.cache = {}
+        keywords = set()
+        for rule in rules:
+            for key in ('all', 'none', 'any'):
+                keywords.update(self._template(k) for k in rule.get(key, ()))
+        # Más largas primero: en cada posición se toma la palabra más larga que empieza ahí
+        ordered = sorted(keywords, key=len, reverse=True)
+        self.pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in ordered) + "))") if ordered else None
+        # Si una palabra contiene a otra, encontrar la larga implica la corta
+        self.implied = {k: {o for o in keywords if o != k and o in k} for k in keywords}
+        self.compiled_rules = [
+            (frozenset(self._template(k) for k in rule.get('all', ())),
+             frozenset(self._template(k) for k in rule.get('none', ())),
+             frozenset(self._template(k) for k in rule.get('any', ())))
+            for rule in rules
+        ]
+
+    @classmethod
+    def _template(cls, text):
+        return cls._DIGITS.sub('#', text)
+
+    def classify(self, msg):
+        """Devuelve el índice de la primera regla que aplica al mensaje, o None."""
+        key = self._template(msg)
+        cached = self.cache.get(key, -1)
+        if cached != -1:
+            return cached
+
+        present = set()
+        if self.pattern is not None:
+            for match in self.pattern.finditer(key):
+                word = match.group(1)
+                present.add(word)
+                present.update(self.implied[word])
+
+        result = None
+        if present:
+            for idx, (all_of, none_of, any_of) in enumerate(self.compiled_rules):
+                if all_of <= present and not (none_of & present) and (not any_of or any_of & present):
+                    result = idx
+                    break
+
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[key] = result
+        return result
+
+    def classify_naive(self, msg):
+        """
+        La misma tabla evaluada regla por regla, como una cadena de if/elif. Sirve para
+        verificar y medir la versión compilada; no controla que la tabla esté completa.
+        """
+        for idx, rule in enumerate(self.rules):
+            if all(k in msg for k in rule.get('all', ())) \
+                    and not any(k in msg for k in rule.get('none', ())) \
+                    and (not rule.get('any') or any(k in msg for k in rule['any'])):
+                return idx
+        return None
+
+    def benchmark(self, messages, iterations=20):
+        """Compara ms por mensaje del clasificador compilado contra la cadena de if/elif."""
+        total = max(1, len(messages) * iterations)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for msg in messages:
+                self.classify_naive(msg)
+        naive_ms = (time.perf_counter() - start) * 1000
+
+        self.cache.clear()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for msg in messages:
+                self.classify(msg)
+        compiled_ms = (time.perf_counter() - start) * 1000
+
+        mismatches = sum(1 for msg in messages if self.classify(msg) != self.classify_naive(msg))
+        return {'naive_us': naive_ms * 1000 / total, 'compiled_us': compiled_ms * 1000 / total,
+                'mismatches': mismatches}
 
 # --- Clase principal de la aplicación ---
-class Hermes:
+class Hermes(SendingEngine, EngineObserver):
     def __init__(self, root):
         self.root = root
         self.root.title("HΞЯMΞS V1")
@@ -350,7 +718,8 @@ class Hermes:
         self.root.bind('<Configure>', self._on_window_configure)
 
         # Variables para la animación de estrellas
-        self.stars = []
+        self.stars = None
+        self.starfield_suspended = False
         self.starfield_running = False
         self.starfield_canvas = None
         self.starfield_after_id = None
@@ -395,22 +764,18 @@ class Hermes:
         self.traditional_simultaneous_mode = tk.BooleanVar(value=False)
 
         self.excel_file = ""
-        self.links = []
-        self.link_retry_map = {}
-        self.devices = []
-
-        self.is_running = False
-        self.is_paused = False
-        self.should_stop = False
+        # Estado y lógica de envío (hermes_engine); esta ventana es su observador
+        self._init_engine(observer=self)
+        self.adb_path.trace_add('write', lambda *_: setattr(self, 'adb_exe', self.adb_path.get()))
+        self.adb_exe = self.adb_path.get()
+        # Conexión/desconexión en vivo desde el servidor ADB (se inicia tras la primera detección)
+        self.device_tracker = None
+        self.tracked_online = set()
+        # Trazas por fase de cada tarea (se activan desde las opciones avanzadas de tiempo)
+        self.trace_enabled = tk.BooleanVar(value=False)
         self.pause_lock = threading.Lock()
-
-        self.total_messages = 0
-        self.sent_count = 0
-        self.failed_count = 0
-        self.current_index = 0
         self.start_time = None
         self.task_times = []  # Lista de tiempos de cada tarea para promediado
-        self.last_task_time = None  # Tiempo de inicio de la última tarea
 
         # --- INICIO MODIFICACIÓN: Variables de Fidelizado (Modo Bucles Blast V2) ---
         self.manual_inputs_numbers = [] # Almacena números
@@ -455,7 +820,15 @@ class Hermes:
 
         # Variables para la vista del log
         self.log_detailed_view = False # False = simple, True = detallado
-        self.log_history = [] # Almacena tuplas de (full_message, tag)
+        self.log_history = LogRingBuffer() # Historial acotado de (full_message, tag); lo viejo va a disco
+        self.log_rendered = collections.deque() # (índice en log_history, líneas en el widget) de lo que está dibujado
+        self.log_rendered_lines = 0
+        self.log_queue = queue.Queue() # Mensajes pendientes de dibujar (se llenan desde cualquier hilo)
+        self.engine_events = queue.Queue() # Avance, diálogos y fin del motor; los atiende _drain_log_queue
+        self.completion_dialog_on_finish = False # El envío en curso termina con el diálogo de finalización
+        self.log_classifier = LogMessageClassifier(self._build_log_rules())
+        self.log_drain_stats = {'frames': 0, 'lines': 0, 'ui_ms': 0.0, 'max_frame_ms': 0.0}
+        self.root.after(self.LOG_DRAIN_INTERVAL_MS, self._drain_log_queue)
 
         # Variables de tiempo para Modo Grupos Dual
         self.report_data = []
@@ -608,9 +981,7 @@ class Hermes:
 
         # Logo Izquierdo
         try:
-            l_img_path = os.path.join(BASE_DIR, 'logo_left.png')
-            l_img = Image.open(l_img_path).resize((150, 150), Image.Resampling.LANCZOS)
-            l_pho = ctk.CTkImage(light_image=l_img, dark_image=l_img, size=(150, 150))
+            l_pho = ASSETS.ctk_image('logo_left.png', (150, 150), widget=hc)
             self.header_logo_left = ctk.CTkLabel(hc, image=l_pho, text="")
             self.header_logo_left.pack(side=tk.LEFT, padx=(0, 20))
         except Exception as e:
@@ -620,9 +991,7 @@ class Hermes:
 
         # Logo Derecho
         try:
-            r_img_path = os.path.join(BASE_DIR, 'logo_right.png')
-            r_img = Image.open(r_img_path).resize((150, 150), Image.Resampling.LANCZOS)
-            r_pho = ctk.CTkImage(light_image=r_img, dark_image=r_img, size=(150, 150))
+            r_pho = ASSETS.ctk_image('logo_right.png', (150, 150), widget=hc)
             self.header_logo_right = ctk.CTkLabel(hc, image=r_pho, text="")
             self.header_logo_right.pack(side=tk.RIGHT, padx=(20, 0))
         except Exception as e:
@@ -679,24 +1048,49 @@ class Hermes:
         # INICIAR EN EL MENÚ DE INICIO
         self.setup_start_menu()
 
+    # Tope de FPS del fondo de estrellas: el intervalo se ajusta a lo que cuesta cada frame
+    STARFIELD_MAX_FPS = 50      # Ritmo original (un frame cada 20 ms)
+    STARFIELD_MIN_FPS = 15
+    STARFIELD_CPU_SHARE = 0.25  # Fracción máxima del tiempo que puede ocupar el dibujo
+
     def init_starfield(self, width, height, color="white"):
-        """Inicializa las estrellas para la animación y crea sus items en el canvas."""
-        self.stars = []
+        """Inicializa las estrellas y la imagen única sobre la que se dibujan."""
+        self.stars = None
+        self.starfield_photo = None
+        self.starfield_buffer = None
+        self.starfield_last_frame = None
+        self.starfield_suspended = False
+        self.starfield_interval_ms = 1000 / self.STARFIELD_MAX_FPS
+        if np is None or not (hasattr(self, 'starfield_canvas') and self.starfield_canvas.winfo_exists()):
+            return
         # Limpiar canvas solo de estrellas, por si acaso se llama de nuevo
-        if hasattr(self, 'starfield_canvas') and self.starfield_canvas.winfo_exists():
-            self.starfield_canvas.delete("star")
-
-            for _ in range(500):
-                star = Star(width, height)
-                x, y, sz = star.get_coords()
-                # Crear item en canvas y guardar ID en el objeto Star
-                star.item_id = self.starfield_canvas.create_oval(x, y, x+sz, y+sz, fill=color, outline=color, tags="star")
-                self.stars.append(star)
+        self.starfield_canvas.delete("star")
+
+        self.stars = Starfield(500, width, height)
+        bg = tuple(c // 257 for c in self.starfield_canvas.winfo_rgb(self.starfield_canvas.cget('bg')))
+        fg = tuple(c // 257 for c in self.starfield_canvas.winfo_rgb(color))
+        # Blanco/negro (o grises): un canal basta y el volcado a Tk es 3 veces más liviano
+        if len(set(bg)) == 1 and len(set(fg)) == 1:
+            self.starfield_mode, self.starfield_colors = 'L', (bg[0], fg[0])
+        else:
+            self.starfield_mode, self.starfield_colors = 'RGB', (bg, fg)
+        self.starfield_item = self.starfield_canvas.create_image(0, 0, anchor='nw', tags="star")
+        self.starfield_canvas.tag_lower("star")
 
     def animate_starfield(self):
-        """Actualiza y dibuja el campo de estrellas moviendo los items existentes."""
+        """Avanza las estrellas y las dibuja en un solo PhotoImage por frame."""
+        self.starfield_after_id = None
         if not self.starfield_running or not self.starfield_canvas or not self.starfield_canvas.winfo_exists():
             return
+        if self.stars is None:
+            return
+        if not self.starfield_canvas.winfo_viewable():
+            # Ventana minimizada u oculta: no dibujar; <Map> la retoma
+            self.starfield_suspended = True
+            self.starfield_last_frame = None
+            return
+
+        frame_start = time.perf_counter()
 
         # Obtener dimensiones actuales (por si redimensionan la ventana)
         w = self.starfield_canvas.winfo_width()
@@ -706,28 +1100,45 @@ class Hermes:
         if w < 10 or h < 10:
             w, h = 1500, 900
 
-        # Mover estrellas existentes (Optimizado: sin delete/create)
-        for star in self.stars:
-            star.w = w  # Actualizar límites por si cambia el tamaño
-            star.h = h
-
-            # Solo aplicar atracción si el mouse está presionado
-            if self.mouse_pressed:
-                star.move(self.mouse_x, self.mouse_y)
-            else:
-                star.move(None, None)
-
-            x, y, sz = star.get_coords()
-
-            if hasattr(star, 'item_id'):
-                self.starfield_canvas.coords(star.item_id, x, y, x+sz, y+sz)
+        # Ticks de 20 ms transcurridos (acotado para no saltar tras un bloqueo de la UI)
+        last = self.starfield_last_frame
+        ticks = 1.0 if last is None else min((frame_start - last) * 50.0, 5.0)
+        self.starfield_last_frame = frame_start
 
-        # Programar siguiente frame (aprox 60 FPS -> 16ms)
-        self.starfield_after_id = self.root.after(20, self.animate_starfield)
+        self.stars.w, self.stars.h = w, h
+        # Solo aplicar atracción si el mouse está presionado
+        if self.mouse_pressed:
+            self.stars.step(ticks, self.mouse_x, self.mouse_y)
+        else:
+            self.stars.step(ticks)
+
+        bg, fg = self.starfield_colors
+        buf = self.starfield_buffer
+        if buf is None or buf.shape[:2] != (h, w):
+            buf = np.empty((h, w) if self.starfield_mode == 'L' else (h, w, 3), dtype=np.uint8)
+            self.starfield_buffer = buf
+            self.starfield_photo = ImageTk.PhotoImage(self.starfield_mode, (w, h))
+            self.starfield_canvas.itemconfig(self.starfield_item, image=self.starfield_photo)
+        buf[...] = bg
+        self.stars.render(buf, fg)
+        self.starfield_photo.paste(Image.fromarray(buf, self.starfield_mode))
+
+        # Tope automático: si el frame es caro, se espacian los frames (entre 15 y 50 FPS)
+        cost_ms = (time.perf_counter() - frame_start) * 1000
+        target = min(1000 / self.STARFIELD_MIN_FPS, max(1000 / self.STARFIELD_MAX_FPS, cost_ms / self.STARFIELD_CPU_SHARE))
+        self.starfield_interval_ms = 0.8 * self.starfield_interval_ms + 0.2 * target
+        self.starfield_after_id = self.root.after(int(self.starfield_interval_ms), self.animate_starfield)
+
+    def _resume_starfield(self, event=None):
+        """Retoma la animación cuando la ventana vuelve a mostrarse."""
+        if self.starfield_suspended and self.starfield_running and self.starfield_after_id is None:
+            self.starfield_suspended = False
+            self.animate_starfield()
 
     def stop_starfield(self):
         """Detiene la animación de estrellas."""
         self.starfield_running = False
+        self.starfield_suspended = False
         if self.starfield_after_id:
             self.root.after_cancel(self.starfield_after_id)
             self.starfield_after_id = None
@@ -737,7 +1148,8 @@ class Hermes:
         if hasattr(self, 'start_menu_frame') and self.start_menu_frame.winfo_exists():
             self.start_menu_frame.pack(fill=tk.BOTH, expand=True)
             self.starfield_running = True
-            self.animate_starfield()
+            if self.starfield_after_id is None:
+                self.animate_starfield()
             return
 
         # Determinar colores según el modo
@@ -789,26 +1201,21 @@ class Hermes:
 
         # --- LOGOS EN CANVAS (Transparencia Real) ---
 
-        # Cargar Imágenes
+        # Cargar Imágenes (variantes pre-escaladas; la de hover se carga al primer hover)
         try:
             img_size_normal = (300, 300)
             img_size_hover = (330, 330)
+            theme = "dark" if is_dark else "light"
 
             # WSP Images
-            wsp_path = os.path.join(BASE_DIR, "WSP alas.png")
-            if os.path.exists(wsp_path):
-                pil_wsp = Image.open(wsp_path)
-                self.img_wsp_normal = ImageTk.PhotoImage(pil_wsp.resize(img_size_normal, Image.Resampling.LANCZOS))
-                self.img_wsp_hover = ImageTk.PhotoImage(pil_wsp.resize(img_size_hover, Image.Resampling.LANCZOS))
+            if os.path.exists(os.path.join(BASE_DIR, "WSP alas.png")):
+                self.img_wsp_normal = ASSETS.photo("WSP alas.png", img_size_normal, theme)
             else:
                 self.img_wsp_normal = None
 
             # SMS Images
-            sms_path = os.path.join(BASE_DIR, "SMS alas.png")
-            if os.path.exists(sms_path):
-                pil_sms = Image.open(sms_path)
-                self.img_sms_normal = ImageTk.PhotoImage(pil_sms.resize(img_size_normal, Image.Resampling.LANCZOS))
-                self.img_sms_hover = ImageTk.PhotoImage(pil_sms.resize(img_size_hover, Image.Resampling.LANCZOS))
+            if os.path.exists(os.path.join(BASE_DIR, "SMS alas.png")):
+                self.img_sms_normal = ASSETS.photo("SMS alas.png", img_size_normal, theme)
             else:
                 self.img_sms_normal = None
 
@@ -825,14 +1232,14 @@ class Hermes:
             self.canvas_item_wsp = self.starfield_canvas.create_image(0, 0, image=self.img_wsp_normal, anchor='center')
             # Bindings WSP
             self.starfield_canvas.tag_bind(self.canvas_item_wsp, '<Button-1>', lambda e: self.enter_app_mode("whatsapp"))
-            self.starfield_canvas.tag_bind(self.canvas_item_wsp, '<Enter>', lambda e: self._on_hover_start_logo(self.canvas_item_wsp, self.img_wsp_hover))
+            self.starfield_canvas.tag_bind(self.canvas_item_wsp, '<Enter>', lambda e: self._on_hover_start_logo(self.canvas_item_wsp, ASSETS.photo("WSP alas.png", img_size_hover, theme)))
             self.starfield_canvas.tag_bind(self.canvas_item_wsp, '<Leave>', lambda e: self._on_leave_start_logo(self.canvas_item_wsp, self.img_wsp_normal))
 
         if self.img_sms_normal:
             self.canvas_item_sms = self.starfield_canvas.create_image(0, 0, image=self.img_sms_normal, anchor='center')
             # Bindings SMS
             self.starfield_canvas.tag_bind(self.canvas_item_sms, '<Button-1>', lambda e: self.enter_app_mode("sms"))
-            self.starfield_canvas.tag_bind(self.canvas_item_sms, '<Enter>', lambda e: self._on_hover_start_logo(self.canvas_item_sms, self.img_sms_hover))
+            self.starfield_canvas.tag_bind(self.canvas_item_sms, '<Enter>', lambda e: self._on_hover_start_logo(self.canvas_item_sms, ASSETS.photo("SMS alas.png", img_size_hover, theme)))
             self.starfield_canvas.tag_bind(self.canvas_item_sms, '<Leave>', lambda e: self._on_leave_start_logo(self.canvas_item_sms, self.img_sms_normal))
 
         # Copyright Text
@@ -850,6 +1257,8 @@ class Hermes:
         self.starfield_canvas.bind('<Motion>', self._on_mouse_move)
         self.starfield_canvas.bind('<Button-1>', self._on_mouse_down)
         self.starfield_canvas.bind('<ButtonRelease-1>', self._on_mouse_up)
+        # Pausar al minimizar/ocultar y retomar al volver a mostrar la ventana
+        self.root.bind('<Map>', self._resume_starfield, add='+')
 
     def _on_mouse_move(self, event):
         """Actualiza las coordenadas del mouse para la animación de estrellas."""
@@ -1164,7 +1573,11 @@ class Hermes:
         self.manual_mode = False
         self.fidelizado_mode = None
 
-        if self.links and not all(link.lower().startswith("sms:") for link in self.links):
+        if isinstance(self.links, CampaignLinks):
+            links_are_sms = self.links.sms # Sin armar cada link
+        else:
+            links_are_sms = all(link.lower().startswith("sms:") for link in self.links)
+        if self.links and not links_are_sms:
             self.links = []
             self.link_retry_map = {}
             self.total_messages = 0
@@ -1464,6 +1877,18 @@ class Hermes:
         )
         self.traditional_simultaneous_switch.grid(row=1, column=0, columnspan=2, sticky="w", pady=(5, 5), padx=(0, 0))
 
+        # Traza de rendimiento por fase (JSON para chrome://tracing / Perfetto)
+        self.trace_switch = ctk.CTkSwitch(
+            self.time_advanced_frame,
+            text="Guardar traza de rendimiento",
+            variable=self.trace_enabled,
+            font=self.fonts['setting_label'],
+            text_color=self.colors['text'],
+            button_color=self.colors['action_mode'],
+            progress_color=self.colors['action_mode']
+        )
+        self.trace_switch.grid(row=3, column=0, columnspan=2, sticky="w", pady=(5, 5), padx=(0, 0))
+
         # Pausa programada en una línea
         ctk.CTkLabel(self.time_advanced_frame, text="Tiempo entre mensaje:", font=self.fonts['setting_label'], fg_color="transparent", text_color=self.colors['text_light']).grid(row=2, column=0, sticky='w', pady=10)
 
@@ -2114,6 +2539,11 @@ class Hermes:
         self.log_text.tag_config('error', foreground=self.colors['log_error'])
         self.log_text.tag_config('warning', foreground=self.colors['log_warning'])
         self.log_text.tag_config('info', foreground=self.colors['log_info'])
+        self.log_rendered = collections.deque()
+        self.log_rendered_lines = 0
+        # Cargar páginas viejas del historial al subir con la rueda del mouse
+        for sequence in ('<MouseWheel>', '<Button-4>'):
+            getattr(self.log_text, '_textbox', self.log_text).bind(sequence, self._on_log_scroll, add='+')
 
         self.log_table_container = ctk.CTkFrame(lco, fg_color=self.colors['bg_log'], corner_radius=10)
         self.log_table_container.grid(row=0, column=0, sticky="nsew")
@@ -2169,35 +2599,115 @@ class Hermes:
         self.log_verbosity_btn.configure(text=new_icon)
         self._redraw_log()
 
-    def _redraw_log(self):
-        """Limpia y vuelve a dibujar el contenido del log desde el historial."""
-        try:
-            self.log_text.configure(state=tk.NORMAL)
-            self.log_text.delete("1.0", tk.END)
+    # Máximo de líneas dibujadas en el widget de log y tamaño de página al subir con el scroll
+    LOG_RENDER_MAX_LINES = 1500
+    LOG_PAGE_LINES = 300
 
-            is_first_line = True
-            for i, (full_msg, tag) in enumerate(self.log_history):
+    def _collect_log_page(self, end_index, max_lines, scan_limit=20000):
+        """
+        Recorre el historial hacia atrás desde 'end_index' (exclusivo) y devuelve, en orden,
+        [(índice, texto_a_mostrar, tag, spacer), ...] hasta juntar 'max_lines' líneas visibles.
+        """
+        page = []
+        lines = 0
+        idx = end_index
+        lowest = max(0, end_index - scan_limit)
+        while idx > lowest and lines < max_lines:
+            chunk_start = max(lowest, idx - 500)
+            records = self.log_history.get_range(chunk_start, idx)
+            for offset in range(len(records) - 1, -1, -1):
+                full_msg, tag, spacer = records[offset]
                 display_msg = self._format_log_message(full_msg, tag)
                 if display_msg is None:
                     continue
+                page.append((chunk_start + offset, display_msg, tag, spacer))
+                lines += display_msg.count("\n") + 1
+                if lines >= max_lines:
+                    break
+            idx = chunk_start
+        page.reverse()
+        return page
+
+    def _build_log_segments(self, page, first_in_widget):
+        """Arma los segmentos (texto, tag) para un solo insert y la lista de (índice, líneas) dibujadas."""
+        segments = []
+        rendered = []
+        is_first_line = first_in_widget
+        for idx, display_msg, tag, spacer in page:
+            # Espacio antes de los mensajes importantes (lo decide la regla del clasificador)
+            spacer = spacer and not is_first_line
+            if spacer:
+                segments.extend(("\n", ()))
+            segments.extend((display_msg + "\n", tag))
+            rendered.append((idx, display_msg.count("\n") + 1 + (1 if spacer else 0)))
+            is_first_line = False
+        return segments, rendered
+
+    def _trim_rendered_log(self, text_widget):
+        """Quita del widget las líneas más viejas que excedan LOG_RENDER_MAX_LINES."""
+        remove = 0
+        while self.log_rendered and self.log_rendered_lines > self.LOG_RENDER_MAX_LINES:
+            _, count = self.log_rendered.popleft()
+            self.log_rendered_lines -= count
+            remove += count
+        if remove:
+            text_widget.delete("1.0", f"{remove + 1}.0")
 
-                # Heurística para añadir espacio antes de mensajes importantes
-                add_space_before = False
-                keywords_for_space = ["INICIANDO ENVÍO", "ENVÍO FINALIZADO", "--- BUCLE", "Procesando...", "Cancelado", "Resumen:"]
-                if any(keyword in display_msg for keyword in keywords_for_space):
-                    add_space_before = True
-
-                if not is_first_line and add_space_before:
-                    self.log_text.insert(tk.END, "\n")
+    def _redraw_log(self):
+        """Limpia y vuelve a dibujar solo la parte final del historial (lo visible)."""
+        try:
+            text_widget = getattr(self.log_text, '_textbox', self.log_text)
+            self.log_text.configure(state=tk.NORMAL)
+            self.log_text.delete("1.0", tk.END)
 
-                self.log_text.insert(tk.END, display_msg + "\n", tag)
-                is_first_line = False
+            page = self._collect_log_page(len(self.log_history), self.LOG_RENDER_MAX_LINES)
+            segments, rendered = self._build_log_segments(page, first_in_widget=True)
+            self.log_rendered = collections.deque(rendered)
+            self.log_rendered_lines = sum(count for _, count in rendered)
+            if segments:
+                text_widget.insert(tk.END, *segments)
 
             self.log_text.configure(state=tk.DISABLED)
             self.log_text.see(tk.END)
         except tk.TclError:
             pass
 
+    def _on_log_scroll(self, event=None):
+        """Al llegar arriba del todo con el scroll, carga la página anterior del historial."""
+        self.root.after_idle(self._load_older_log_page)
+
+    def _load_older_log_page(self):
+        try:
+            text_widget = getattr(self.log_text, '_textbox', self.log_text)
+            if text_widget.yview()[0] > 0.0:
+                return
+            first_index = self.log_rendered[0][0] if self.log_rendered else len(self.log_history)
+            if first_index <= 0:
+                return
+            page = self._collect_log_page(first_index, self.LOG_PAGE_LINES)
+            if not page:
+                return
+            segments, rendered = self._build_log_segments(page, first_in_widget=True)
+            self.log_text.configure(state=tk.NORMAL)
+            text_widget.insert("1.0", *segments)
+            self.log_text.configure(state=tk.DISABLED)
+            self.log_rendered.extendleft(reversed(rendered))
+            added = sum(count for _, count in rendered)
+            self.log_rendered_lines += added
+            # Mantener a la vista la línea que el usuario estaba leyendo
+            text_widget.yview(f"{added + 1}.0")
+        except (tk.TclError, IndexError):
+            pass
+
+    # Palabras clave que se muestran en la vista simple (una sola regex, sin distinguir mayúsculas)
+    _LOG_KEEP_KEYWORDS = re.compile("|".join(re.escape(keyword) for keyword in [
+        "HΞЯMΞS V1", "Sigue los pasos", "ADB detectado", "dispositivo(s) encontrado(s)",
+        "No se encontraron dispositivos", "Selecciona el archivo", "filas leídas",
+        "mensajes generados y listos", "Archivo procesado guardado", "INICIANDO ENVÍO",
+        "ENVÍO FINALIZADO", "Cancelado", "Pausado", "Reanudado", "Resumen:", "Bucle",
+        "Ciclo", "Repetición", "Error", "Pausa de"
+    ]), re.IGNORECASE)
+
     def _format_log_message(self, full_msg, tag):
         """Formatea un mensaje de log para la vista simple o detallada."""
         if self.log_detailed_view:
@@ -2225,14 +2735,7 @@ class Hermes:
             if msg_part.strip().startswith("└─"):
                 return None
 
-            keywords_to_keep = [
-                "HΞЯMΞS V1", "Sigue los pasos", "ADB detectado", "dispositivo(s) encontrado(s)",
-                "No se encontraron dispositivos", "Selecciona el archivo", "filas leídas",
-                "mensajes generados y listos", "Archivo procesado guardado", "INICIANDO ENVÍO",
-                "ENVÍO FINALIZADO", "Cancelado", "Pausado", "Reanudado", "Resumen:", "Bucle",
-                "Ciclo", "Repetición", "Error", "Pausa de"
-            ]
-            if any(keyword.lower() in msg_part.lower() for keyword in keywords_to_keep):
+            if self._LOG_KEEP_KEYWORDS.search(msg_part):
                 return full_msg
 
             return None
@@ -2314,8 +2817,7 @@ class Hermes:
         record = (sender_number, receiver_number, timestamp)
         self.fidelizado_activity_records.append(record)
 
-        if self.log_view_mode == "table":
-            self.root.after(0, lambda: self._insert_activity_record(record))
+        self.engine_events.put(('activity', record))
 
     def _insert_activity_record(self, record):
         """Inserta un registro individual en la tabla de actividad."""
@@ -2468,99 +2970,110 @@ class Hermes:
 
         return badge_frame
 
+    # Intervalo de refresco del log en la UI y máximo de líneas por frame
+    LOG_DRAIN_INTERVAL_MS = 50
+    LOG_MAX_LINES_PER_FRAME = 2000
+
     def log(self, msg, tag='info'):
-        """Añade un mensaje al registro de actividad con formato."""
-        if threading.current_thread() is not threading.main_thread():
-            self.root.after(0, lambda: self.log(msg, tag))
-            return
+        """Añade un mensaje al registro de actividad. Se puede llamar desde cualquier hilo:
+        el mensaje se encola y la UI lo dibuja en el siguiente frame (_drain_log_queue)."""
+        self.log_queue.put((datetime.now().strftime("[%H:%M:%S]"), msg, tag))
 
-        ts = datetime.now().strftime("[%H:%M:%S]")
-        icon = "✓"
-        add_space_before = False
-
-        # Asignación de iconos y espaciado
-        if tag == 'error':
-            icon = "✗"
-            add_space_before = True
-        elif tag == 'warning':
-            icon = "⚠"
-        elif tag == 'info':
-            icon = "ℹ"
-        elif tag == 'success':
-            add_space_before = True # Hacer que todos los 'success' tengan espacio antes
+    def _build_log_rules(self):
+        """
+        Tabla ordenada de traducciones de mensajes técnicos a mensajes amigables (MOD 26/27).
+        'fn' da el texto a mostrar y 'spacer' deja un renglón en blanco antes de la línea.
+        """
+        def disp(msg):
+            count = msg.split()[1]
+            devices_list = msg.split(': ')[1]
+            return f"{count} dispositivo(s) encontrado(s): {devices_list}"
+
+        def urls(msg):
+            count = msg.split()[1]
+            msg_type = "generados" if "generados" in msg else "cargados"
+            return f"{count} mensajes {msg_type} y listos para enviar"
+
+        def waiting(msg):
+            delay_float = float(msg.split()[1])
+            return f"⏳ Pausa de {delay_float:.1f}s... {msg.split(')')[1] if ')' in msg else ''}" # Mantener post-tarea
+
+        def arrow(msg):
+            parts = msg.split('→')
+            count_part = parts[0].strip() # FIX: Tomar todo antes de '→'
+            num_part = parts[1].strip()
+            # MOD: Distinguir log de grupo
+            if "Grupo (" in num_part:
+                return f"{count_part} → {num_part} (Grupo)"
+            return f"{count_part} → {num_part} (Número)"
+
+        return [
+            dict(all=("HΞЯMΞS V1",), fn=lambda m: "HΞЯMΞS V1 (Modern) iniciado"),
+            dict(all=("Sigue los pasos",), fn=lambda m: "Sigue los pasos 1, 2, 3 en orden"),
+            dict(all=("ADB detectado",), fn=lambda m: "ADB detectado correctamente"),
+            dict(all=("ADB no detectado",), fn=lambda m: "ADB no detectado. Revisa la conexión o ejecuta INSTALAR.bat"),
+            dict(all=("Detectando dispositivos...",)),
+            dict(all=("disp:",), fn=disp),
+            dict(all=("No encontrados.",), fn=lambda m: "No se encontraron dispositivos conectados o autorizados"),
+            dict(all=("Timeout ADB.",), fn=lambda m: "Tiempo de espera agotado al comunicar con ADB"),
+            dict(all=("Seleccionando...",), fn=lambda m: "Selecciona el archivo Excel/CSV"),
+            dict(all=("Leyendo...",), fn=lambda m: "Leyendo archivo..."),
+            dict(all=("Archivo sin datos",), fn=lambda m: "El archivo seleccionado está vacío o no tiene datos válidos"),
+            dict(all=("Sin col Teléfono/Celular",), fn=lambda m: "No se encontró una columna llamada 'Telefono' o 'Celular'"),
+            dict(all=("filas.",), none=("Cols Tel:",), fn=lambda m: f"{m.split()[1]} filas leídas del archivo"),
+            dict(all=("Cols Tel:",), fn=lambda m: f"Columnas de teléfono encontradas: {m.split(': ')[1]}"),
+            dict(all=("Procesando...",), fn=lambda m: "Procesando datos y generando mensajes..."),
+            dict(any=("URLs generados", "URLs cargados"), fn=urls),
+            dict(all=("Excel guardado:",), fn=lambda m: f"Archivo procesado guardado: {os.path.basename(m.split(': ')[1])}"),
+            dict(all=("Fidelizado:", "generados")),
+            dict(all=("Fidelizado (Bucles Blast) cargado",)),
+            dict(all=("Modo Bucles Blast:",)),
+            dict(all=("--- Iniciando REPETICIÓN",)),
+            dict(all=("Repetición", "Etapa")),
+            dict(all=("--- Fin REPETICIÓN",)),
+            dict(all=("--- BUCLE",), spacer=True),
+            dict(all=("INICIANDO ENVÍO",), fn=lambda m: "🚀 INICIANDO ENVÍO DE MENSAJES", spacer=True),
+            dict(all=("Esperando", "s..."), fn=waiting),
+            dict(all=("→",), none=("Usando",), fn=arrow),
+            dict(all=("Abriendo link",), fn=lambda m: f"Abriendo WhatsApp en {m.split(' en ')[1]}..."),
+            dict(all=("Escribiendo mensaje...",), fn=lambda m: "Escribiendo mensaje en grupo (con keyevents)..."),
+            dict(all=("Mensaje enviado",)), # Mantener mensaje simple
+            dict(all=("Cerrando apps",), fn=lambda m: f"🧹 Limpiando aplicaciones en {m.split(' en ')[1].split('...')[0]}"),
+            dict(all=("ENVÍO FINALIZADO",), fn=lambda m: "✅ ENVÍO FINALIZADO", spacer=True),
+            dict(all=("Resumen:",), fn=lambda m: f"Resumen: {m.split('Resumen: ')[1]}", spacer=True),
+            dict(all=("Reanudado",), fn=lambda m: "▶ Envío reanudado"),
+            dict(all=("Pausado",), fn=lambda m: "⏸ Envío pausado"),
+            dict(all=("Cancelando...",), fn=lambda m: "⏹ Cancelando envío..."),
+            dict(all=("Cancelado",), fn=lambda m: "⚠ Envío cancelado por el usuario"),
+        ]
+
+    # Mensajes de bajo nivel que no se muestran tal cual
+    _LOG_LOW_LEVEL = re.compile(r"Traceback|ADB stderr:|ADB stdout:")
+
+    def _prepare_log_line(self, ts, msg, tag):
+        """
+        Traduce un mensaje técnico a su línea de log final con una sola clasificación.
+        Devuelve (línea, spacer), o None si debe ocultarse.
+        """
+        # Asignación de iconos
+        icon = {'error': "✗", 'warning': "⚠", 'info': "ℹ"}.get(tag, "✓")
 
         original_msg_key = msg
 
-        # Traducción de mensajes técnicos a mensajes amigables (MOD 26/27)
-        if "HΞЯMΞS V1" in msg: msg = "HΞЯMΞS V1 (Modern) iniciado"; add_space_before = False
-        elif "Sigue los pasos" in msg: msg = "Sigue los pasos 1, 2, 3 en orden"
-        elif "ADB detectado" in msg: msg = "ADB detectado correctamente"
-        elif "ADB no detectado" in msg: msg = "ADB no detectado. Revisa la conexión o ejecuta INSTALAR.bat"
-        elif "Detectando dispositivos..." in msg: add_space_before = True
-        elif "disp:" in msg:
-            try:
-                count = msg.split()[1]
-                devices_list = msg.split(': ')[1]
-                msg = f"{count} dispositivo(s) encontrado(s): {devices_list}"
-            except: pass
-        elif "No encontrados." in msg: msg = "No se encontraron dispositivos conectados o autorizados"
-        elif "Timeout ADB." in msg: msg = "Tiempo de espera agotado al comunicar con ADB"; add_space_before = True
-        elif "Seleccionando..." in msg: msg = "Selecciona el archivo Excel/CSV"
-        elif "Leyendo..." in msg: msg = "Leyendo archivo..."
-        elif "Archivo sin datos" in msg: msg = "El archivo seleccionado está vacío o no tiene datos válidos"; add_space_before = True
-        elif "Sin col Teléfono/Celular" in msg: msg = "No se encontró una columna llamada 'Telefono' o 'Celular'"; add_space_before = True
-        elif "filas." in msg and "Cols Tel:" not in msg:
-            try: count = msg.split()[1]; msg = f"{count} filas leídas del archivo"
-            except: pass
-        elif "Cols Tel:" in msg: msg = f"Columnas de teléfono encontradas: {msg.split(': ')[1]}"
-        elif "Procesando..." in msg: msg = "Procesando datos y generando mensajes..."; add_space_before = True
-        elif "URLs generados" in msg or "URLs cargados" in msg:
-             try:
-                 count = msg.split()[1]
-                 msg_type = "generados" if "generados" in original_msg_key else "cargados"
-                 msg = f"{count} mensajes {msg_type} y listos para enviar"
-                 add_space_before = True
-             except: pass
-        elif "Excel guardado:" in msg: msg = f"Archivo procesado guardado: {os.path.basename(msg.split(': ')[1])}"; add_space_before = True
-        
-        elif "Fidelizado:" in msg and "generados" in msg: add_space_before = True
-        elif "Fidelizado (Bucles Blast) cargado" in msg: add_space_before = True
-        elif "Modo Bucles Blast:" in msg: add_space_before = True
-        elif "--- Iniciando REPETICIÓN" in msg: add_space_before = True
-        elif "Repetición" in msg and "Etapa" in msg: add_space_before = True
-        elif "--- Fin REPETICIÓN" in msg: add_space_before = True
-
-        elif "INICIANDO ENVÍO" in msg: msg = "🚀 INICIANDO ENVÍO DE MENSAJES"; add_space_before = True
-        elif "Esperando" in msg and "s..." in msg:
-            try:
-                delay_str = msg.split()[1]
-                delay_float = float(delay_str)
-                msg = f"⏳ Pausa de {delay_float:.1f}s... {msg.split(')')[1] if ')' in msg else ''}" # Mantener post-tarea
-            except: pass
-        elif "→" in msg and "Usando" not in msg:
-             try:
-                 parts = msg.split('→')
-                 count_part = parts[0].strip() # FIX: Tomar todo antes de '→'
-                 num_part = parts[1].strip()
-                 # MOD: Distinguir log de grupo
-                 if "Grupo (" in num_part:
-                     msg = f"{count_part} → {num_part} (Grupo)"
-                 else:
-                     msg = f"{count_part} → {num_part} (Número)"
-             except: pass
-        elif "Abriendo link" in msg: msg = f"Abriendo WhatsApp en {msg.split(' en ')[1]}..."
-        elif "Escribiendo mensaje..." in msg: msg = "Escribiendo mensaje en grupo (con keyevents)..."
-        elif "Mensaje enviado" in msg: pass # Mantener mensaje simple
-        elif "Cerrando apps" in msg: msg = f"🧹 Limpiando aplicaciones en {msg.split(' en ')[1].split('...')[0]}"
-        elif "ENVÍO FINALIZADO" in msg: msg = "✅ ENVÍO FINALIZADO"; add_space_before = True
-        elif "Resumen:" in msg: msg = f"Resumen: {msg.split('Resumen: ')[1]}"; add_space_before = True
-        elif "Reanudado" in msg: msg = "▶ Envío reanudado"
-        elif "Pausado" in msg: msg = "⏸ Envío pausado"
-        elif "Cancelando..." in msg: msg = "⏹ Cancelando envío..."
-        elif "Cancelado" in msg: msg = "⚠ Envío cancelado por el usuario"; add_space_before = True
+        # Traducción de mensajes técnicos a mensajes amigables: una sola pasada sobre la tabla compilada
+        rule_idx = self.log_classifier.classify(msg)
+        spacer = False
+        if rule_idx is not None:
+            spacer = self.log_classifier.rules[rule_idx].get('spacer', False)
+            transform = self.log_classifier.rules[rule_idx].get('fn')
+            if transform:
+                try:
+                    msg = transform(msg)
+                except Exception:
+                    pass
         
         # Filtrar mensajes de bajo nivel
-        if "Traceback" in msg or "ADB stderr:" in msg or "ADB stdout:" in msg:
+        if self._LOG_LOW_LEVEL.search(msg):
             if ("ADB stderr:" in original_msg_key or "Error ADB" in original_msg_key) and tag == 'error':
                  # Mostrar el error de ADB si ya está pre-procesado
                  if "Error ADB" in original_msg_key:
@@ -2568,42 +3081,140 @@ class Hermes:
                  else:
                      # Mostrar errores genéricos de ADB pero con icono de error
                      msg = "Error de comunicación con el dispositivo (ADB)"
-                 add_space_before = True
                  icon = "✗"
             else:
                 return # Ocultar stdout y tracebacks genéricos
 
+        return f"{ts} {icon} {msg}", spacer
+
+    def _drain_log_queue(self):
+        """Vacía la cola de log en un solo insert por frame (sin update_idletasks)."""
+        frame_start = time.perf_counter()
         try:
-            full_line = f"{ts} {icon} {msg}"
-            self.log_history.append((full_line, tag))
+            if hasattr(self, 'log_text') and not self.log_queue.empty():
+                segments = []
+                lines = 0
+                text_widget = getattr(self.log_text, '_textbox', self.log_text)
+                # No añadir espacio si es la primera línea del log
+                is_empty = self.log_text.index("end-1c") == "1.0"
+                while lines < self.LOG_MAX_LINES_PER_FRAME:
+                    try:
+                        ts, msg, tag = self.log_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    lines += 1
+                    prepared = self._prepare_log_line(ts, msg, tag)
+                    if prepared is None:
+                        continue
+                    full_line, spacer = prepared
+                    record_index = len(self.log_history)
+                    self.log_history.append(full_line, tag, spacer)
+
+                    # Formatear solo el mensaje nuevo
+                    display_msg = self._format_log_message(full_line, tag)
+                    if display_msg is None:
+                        # El mensaje debe ocultarse en la vista simple, no hacer nada
+                        continue
 
-            # Formatear solo el mensaje nuevo
-            display_msg = self._format_log_message(full_line, tag)
-            if display_msg is None:
-                # El mensaje debe ocultarse en la vista simple, no hacer nada
-                return
+                    # Espacio antes de los mensajes importantes (lo decide la regla del clasificador)
+                    spacer = spacer and not is_empty
+                    if spacer:
+                        segments.extend(("\n", ()))
+                    segments.extend((display_msg + "\n", tag))
+                    is_empty = False
+                    rendered_lines = display_msg.count("\n") + 1 + (1 if spacer else 0)
+                    self.log_rendered.append((record_index, rendered_lines))
+                    self.log_rendered_lines += rendered_lines
+
+                if segments:
+                    # Solo se recorta si el usuario está mirando el final (no mientras lee páginas viejas)
+                    at_bottom = text_widget.yview()[1] >= 0.999
+                    self.log_text.configure(state=tk.NORMAL)
+                    text_widget.insert(tk.END, *segments)
+                    if at_bottom:
+                        self._trim_rendered_log(text_widget)
+                    self.log_text.configure(state=tk.DISABLED)
+                    if at_bottom:
+                        self.log_text.see(tk.END)
+
+                stats = self.log_drain_stats
+                frame_ms = (time.perf_counter() - frame_start) * 1000
+                stats['frames'] += 1
+                stats['lines'] += lines
+                stats['ui_ms'] += frame_ms
+                stats['max_frame_ms'] = max(stats['max_frame_ms'], frame_ms)
+            self._drain_engine_events()
+        except tk.TclError:
+            # Evita crash si la ventana se está cerrando
+            pass
+        finally:
+            try:
+                self.root.after(self.LOG_DRAIN_INTERVAL_MS, self._drain_log_queue)
+            except (tk.TclError, RuntimeError):
+                pass
 
-            self.log_text.configure(state=tk.NORMAL)
+    def _drain_engine_events(self):
+        """Atiende en el hilo de Tk los eventos que el motor encoló desde sus hilos."""
+        progress = False
+        while True:
+            try:
+                event = self.engine_events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == 'progress':
+                progress = True # Varios avances en un frame: un solo update_stats
+            elif kind == 'activity':
+                if self.log_view_mode == "table":
+                    self._insert_activity_record(event[1])
+            elif kind == 'error':
+                # Los diálogos son modales: se abren fuera de este frame para no frenar el log
+                self.root.after_idle(lambda t=event[1], m=event[2]: messagebox.showerror(t, m, parent=self.root))
+            elif kind == 'info':
+                self.root.after_idle(lambda t=event[1], m=event[2]: messagebox.showinfo(t, m, parent=self.root))
+            elif kind == 'finished':
+                progress = True
+                self._on_run_finished(event[1], event[2])
+        if progress:
+            self.update_stats()
 
-            # Heurística para añadir espacio antes de mensajes importantes
-            add_space_before = False
-            keywords_for_space = ["INICIANDO ENVÍO", "ENVÍO FINALIZADO", "--- BUCLE", "Procesando...", "Cancelado", "Resumen:"]
-            if any(keyword in display_msg for keyword in keywords_for_space):
-                add_space_before = True
+    def _on_run_finished(self, cancelled, error):
+        """Reestablece la UI y, si corresponde, muestra el diálogo de finalización (MOD 28)."""
+        self._finalize_sending()
+        if not self.completion_dialog_on_finish:
+            return
+        self.completion_dialog_on_finish = False
+        if error is not None:
+            return # Ya se mostró el error crítico
+        if cancelled:
+            self.root.after(100, lambda: self._show_completion_dialog(
+                title="Envío Cancelado",
+                message="El envío fue cancelado. Puedes generar un reporte de los mensajes procesados."))
+        else:
+            self.root.after(100, self._show_completion_dialog)
 
-            # No añadir espacio si es la primera línea del log
-            is_empty = self.log_text.index("end-1c") == "1.0"
-            if not is_empty and add_space_before:
-                self.log_text.insert(tk.END, "\n")
+    def _stress_test_log(self, lines=100000):
+        """Prueba de carga del log: encola 'lines' líneas desde un hilo y reporta el tiempo usado en el hilo de UI."""
+        self.log_drain_stats = {'frames': 0, 'lines': 0, 'ui_ms': 0.0, 'max_frame_ms': 0.0}
+        start = time.perf_counter()
 
-            self.log_text.insert(tk.END, display_msg + "\n", tag)
-            self.log_text.configure(state=tk.DISABLED)
-            self.log_text.see(tk.END)
+        def producer():
+            for i in range(lines):
+                self.log(f"Error de prueba {i + 1}/{lines}", 'error')
 
-            self.root.update_idletasks()
-        except tk.TclError:
-            # Evita crash si la ventana se está cerrando
-            pass
+        def wait_done():
+            if self.log_drain_stats['lines'] < lines:
+                self.root.after(200, wait_done)
+                return
+            stats = self.log_drain_stats
+            self.log(
+                f"Prueba de log: {lines} líneas en {time.perf_counter() - start:.1f}s, "
+                f"{stats['ui_ms']:.0f} ms en el hilo de UI ({stats['frames']} frames, {stats['max_frame_ms']:.1f} ms máx/frame)",
+                'success'
+            )
+
+        threading.Thread(target=producer, daemon=True).start()
+        self.root.after(200, wait_done)
 
     def update_stats(self):
         """Actualiza todos los contadores y barras de progreso en la UI."""
@@ -3015,7 +3626,6 @@ class Hermes:
         except Exception as e:
             self.log(f"❌ {device}: {e}", "error")
 
-
     def _select_mirror_master_dialog(self):
         """Muestra un diálogo para elegir el dispositivo que será el espejo maestro."""
         dialog = ctk.CTkToplevel(self.root)
@@ -3157,6 +3767,8 @@ class Hermes:
             self.mirror_screen_width = screen_width
             self.mirror_screen_height = screen_height
             self.mirror_devices = all_devices
+            # Conexiones uiautomator2 listas para replicar taps/swipes sin lanzar 'input'
+            self.u2_registry.warm(all_devices, self.log)
 
         except Exception as e:
             self.log(f"Error en espejo: {e}", "error")
@@ -3341,7 +3953,11 @@ class Hermes:
         """Envía un tap a todos los dispositivos en paralelo."""
         def send_tap(device):
             try:
-                res = self._run_adb_command(['-s', device, 'shell', 'input', 'tap', str(x), str(y)], timeout=3)
+                try:
+                    self.u2_registry.get(device).click(x, y)
+                    res = True
+                except Exception:
+                    res = self._run_adb_command(['-s', device, 'shell', 'input', 'tap', str(x), str(y)], timeout=3)
                 if not res:
                      self.log(f"❌ Fallo tap en {device}", "error")
                 else:
@@ -3363,11 +3979,15 @@ class Hermes:
         """Envía un swipe a todos los dispositivos en paralelo."""
         def send_swipe(device):
             try:
-                # Comand: input swipe <x1> <y1> <x2> <y2> [duration]
-                res = self._run_adb_command(
-                    ['-s', device, 'shell', 'input', 'swipe', str(x1), str(y1), str(x2), str(y2), str(duration)],
-                    timeout=5
-                )
+                try:
+                    self.u2_registry.get(device).swipe(x1, y1, x2, y2, duration / 1000.0)
+                    res = True
+                except Exception:
+                    # Comand: input swipe <x1> <y1> <x2> <y2> [duration]
+                    res = self._run_adb_command(
+                        ['-s', device, 'shell', 'input', 'swipe', str(x1), str(y1), str(x2), str(y2), str(duration)],
+                        timeout=5
+                    )
                 if not res:
                     self.log(f"❌ Fallo swipe en {device}", "error")
                 else:
@@ -3571,14 +4191,39 @@ class Hermes:
             # Actualizar las etiquetas de la UI
             self._update_detection_labels()
 
-            # Despertar pantallas (silencioso)
-            if self.devices:
-                for device in self.devices:
+            # Cerrar sesiones ADB de dispositivos desconectados
+            self.adb_pool.retain(self.devices)
+            self.u2_registry.retain(self.devices)
+            # Un dispositivo reconectado pudo cambiar de apps instaladas; la detección manual refresca todo
+            if not silent:
+                self.invalidate_package_inventory()
+            for serial in list(self.package_inventory.keys()):
+                if serial not in self.devices:
+                    self.invalidate_package_inventory(serial)
+
+            # Despertar pantallas (silencioso). Se hace a través del pool en segundo plano,
+            # así la sesión persistente de cada dispositivo queda abierta para el envío.
+            def wake_device(device):
+                try:
+                    self.adb_pool.run(device, 'input keyevent KEYCODE_WAKEUP', timeout=5)
+                except OSError:
                     try:
                         subprocess.Popen([adb, '-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_WAKEUP'],
                                          startupinfo=si, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
                     except Exception:
                         pass
+                except Exception:
+                    pass
+
+            for device in self.devices:
+                threading.Thread(target=wake_device, args=(device,), daemon=True).start()
+
+            # Abrir en paralelo las conexiones uiautomator2 para que el primer envío no espere el handshake
+            self.u2_registry.warm(self.devices, self.log)
+
+            # A partir de aquí los cambios llegan solos por el stream del servidor ADB
+            self.offline_devices.difference_update(self.devices)
+            self._start_device_tracker()
 
             if self.devices:
                 self.log(f"✓ {len(self.devices)} disp: {', '.join(self.devices)}", 'success')
@@ -3601,68 +4246,221 @@ class Hermes:
             if not silent:
                 self.root.focus_set()
 
+    def _start_device_tracker(self):
+        """Inicia (una sola vez) el seguimiento de dispositivos por 'host:track-devices'."""
+        self.tracked_online = set(self.devices)
+        if self.device_tracker is None:
+            self.device_tracker = AdbDeviceTracker(self._on_tracked_devices)
+        self.device_tracker.start()
+
+    def _on_tracked_devices(self, entries):
+        """Callback del AdbDeviceTracker (corre en su hilo): marca conexiones y desconexiones."""
+        online = [serial for serial, state in entries if state == 'device']
+        online_set = set(online)
+        lost = self.tracked_online - online_set
+        gained = online_set - self.tracked_online
+        self.tracked_online = online_set
+        if not lost and not gained:
+            return
+
+        for serial in lost:
+            # Se marca de inmediato: los hilos de envío consultan este conjunto antes de cada tarea
+            self.offline_devices.add(serial)
+            self.u2_registry.invalidate(serial)
+            self.log(f"📵 {serial} desconectado.", 'warning')
+        self.adb_pool.retain(online)
+
+        for serial in gained:
+            self.offline_devices.discard(serial)
+            self.log(f"🔌 {serial} conectado.", 'success')
+        if gained:
+            self.u2_registry.warm(sorted(gained), self.log)
+
+        self.root.after(0, self._apply_tracked_devices, online)
+
+    def _apply_tracked_devices(self, online):
+        """Aplica en el hilo de la UI la lista de dispositivos reportada por el tracker."""
+        if self.is_running:
+            # Durante un envío los modos rotan por índice sobre self.devices: no se quitan
+            # elementos (los desconectados quedan en offline_devices) y solo se agregan al final.
+            for serial in online:
+                if serial not in self.devices:
+                    self.devices.append(serial)
+        else:
+            self.devices = [d for d in self.devices if d in online] + [d for d in online if d not in self.devices]
+            self.offline_devices.intersection_update(self.devices)
+        self._update_detection_labels()
+
+    def _prune_offline_devices(self):
+        """Quita de la lista los dispositivos que se desconectaron durante el envío."""
+        if self.offline_devices:
+            self.devices = [d for d in self.devices if d not in self.offline_devices]
+            self.offline_devices.clear()
+            self._update_detection_labels()
+
+
     # --- Lógica de archivos ---
-    def read_csv_file(self, fp):
-        """Lee un archivo CSV intentando con múltiples codificaciones y delimitadores."""
+    def read_csv_file(self, fp, on_progress=None, should_stop=None):
+        """
+        Lee un CSV en una sola pasada: codificación (BOM o muestra) y separador detectados
+        una vez, luego un único lector fila por fila. Devuelve (filas, cabeceras).
+        """
         try:
-            encs = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-16']
-            for enc in encs:
-                try:
-                    with open(fp, 'r', encoding=enc, errors='ignore') as f:
-                        s = f.read(2048) # Leer una muestra para detectar delimitador
-                        f.seek(0)
-                        dls = [';', ',', '\t', '|']
-                        d = ',' # Default
-                        for dl in dls:
-                            if dl in s:
-                                d = dl
-                                break
-                        r = csv.DictReader(f, delimiter=d)
-                        data = [{k.strip(): (v if v is not None else '') for k, v in rw.items() if k is not None} for rw in r]
-                        fn = [n.strip() for n in r.fieldnames if n is not None] if r.fieldnames else []
-                        return data, fn
-                except Exception:
-                    continue
-            raise Exception("No se pudo leer el CSV con las codificaciones probadas.")
+            table = read_csv_rows(fp, on_progress=on_progress, should_stop=should_stop)
+            return table, table.columns
         except Exception as e:
             raise Exception(f"Error al leer CSV: {e}")
 
-    def read_excel_file(self, fp):
-        """Lee un archivo Excel (xlsx/xls) y lo convierte en una lista de diccionarios."""
+    def read_excel_file(self, fp, on_progress=None, should_stop=None):
+        """
+        Lee un Excel (xlsx) en modo streaming y devuelve (filas, cabeceras). Las filas son una
+        SheetRows (tuplas compactas) que se recorre y ordena como la lista de diccionarios.
+        """
         try:
-            wb = load_workbook(fp, data_only=True) # data_only=True para obtener valores de fórmulas
-            sh = wb.active
-            hdrs = [str(c.value).strip() if c.value is not None else '' for c in sh[1]] # Fila 1 = cabeceras
-
-            # Mapeo de cabeceras válidas (índice, nombre)
-            vh = [(i, h) for i, h in enumerate(hdrs) if h]
-            if not vh:
-                raise ValueError("No se encontraron cabeceras válidas en la fila 1.")
-
-            data = []
-            for r_idx, r in enumerate(sh.iter_rows(min_row=2, values_only=True), start=2):
-                rd = {}
-                for c_idx, hn in vh:
-                    v = r[c_idx]
-                    pv = ''
-                    if v is None:
-                        pv = ''
-                    elif isinstance(v, (int, float)):
-                        pv = str(v)
-                    elif isinstance(v, datetime):
-                        pv = v.strftime('%Y-%m-%d %H:%M:%S')
-                    else:
-                        pv = str(v)
-                    rd[hn] = pv
-
-                if any(rd.values()): # Solo añadir fila si tiene algún dato
-                    data.append(rd)
-
-            vhn = [h for i, h in vh] # Nombres de cabeceras válidas
-            return data, vhn
+            table = read_excel_rows(fp, on_progress=on_progress, should_stop=should_stop)
+            return table, table.columns
         except Exception as e:
             raise Exception(f"Error al leer Excel: {e}")
 
+    def _read_table_async(self, fp, on_loaded):
+        """
+        Lee el Excel/CSV en un hilo mostrando el avance; 'Detener' se queda con las filas
+        leídas hasta ese momento. Al terminar llama on_loaded(filas, cabeceras) en la UI.
+        """
+        is_csv = fp.lower().endswith('.csv')
+        stop_event = threading.Event()
+        progress = {'read': 0, 'total': None}
+        result = {}
+
+        dialog = ctk.CTkToplevel(self.root)
+        dialog.title("Leyendo archivo")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        dialog.configure(fg_color=self.colors['bg'])
+        self._center_toplevel(dialog, 420, 170)
+        dialog.after(50, dialog.grab_set)  # Evita iniciar otra carga mientras se lee
+        label = ctk.CTkLabel(dialog, text=f"Leyendo {os.path.basename(fp)}...", font=('Inter', 12), text_color=self.colors['text'])
+        label.pack(padx=20, pady=(20, 10))
+        bar = ctk.CTkProgressBar(dialog, width=360, mode='determinate')
+        bar.pack(padx=20, pady=5)
+        bar.set(0)
+        stop_btn = ctk.CTkButton(dialog, text="Detener (usar lo leído)", command=stop_event.set,
+                                 fg_color=self.colors['action_cancel'], hover_color=self.hover_colors['action_cancel'],
+                                 font=('Inter', 12, 'bold'), corner_radius=10, height=32)
+        stop_btn.pack(pady=(10, 15))
+        dialog.protocol("WM_DELETE_WINDOW", stop_event.set)
+
+        def on_progress(read, total):
+            progress['read'], progress['total'] = read, total
+
+        def worker():
+            started = time.perf_counter()
+            try:
+                reader = self.read_csv_file if is_csv else self.read_excel_file
+                result['data'] = reader(fp, on_progress=on_progress, should_stop=stop_event.is_set)
+            except Exception as e:
+                result['error'] = e
+            result['seconds'] = time.perf_counter() - started
+
+        def poll():
+            if 'seconds' not in result:
+                read, total = progress['read'], progress['total']
+                if read:
+                    label.configure(text=f"Leyendo {os.path.basename(fp)}... {read:,} filas".replace(',', '.'))
+                    if total:
+                        bar.set(min(1.0, read / total))
+                self.root.after(100, poll)
+                return
+            try:
+                dialog.destroy()
+            except tk.TclError:
+                pass
+            if 'error' in result:
+                e = result['error']
+                self.log(f"Error al leer archivo: {e}", 'error'); messagebox.showerror("Error", f"Error al leer el archivo:\n{e}")
+                return
+            data, columns = result['data']
+            rate = len(data) / result['seconds'] if result['seconds'] else 0
+            self.log(f"Lectura: {len(data)} filas en {result['seconds']:.1f} s ({rate:,.0f} filas/s)".replace(',', '.'), 'info')
+            if getattr(data, 'truncated', False):
+                self.log(f"Lectura detenida: se usarán las primeras {len(data)} filas.", 'warning')
+            on_loaded(data, columns)
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(100, poll)
+
+    def _export_rows_async(self, path, headers, rows, total, sheet_title, parent, on_done):
+        """
+        Exporta filas a .xlsx (write-only) o .csv en un hilo mostrando el avance, sin congelar
+        la interfaz. 'Cancelar' borra el archivo a medio escribir. Al terminar llama
+        on_done(filas_escritas, ventana) en la UI, con 'parent' o la principal si ya se cerró.
+        """
+        stop_event = threading.Event()
+        progress = {'written': 0}
+        result = {}
+
+        # Colgado de la ventana principal: 'parent' puede cerrarse mientras se escribe
+        # (p. ej. el diálogo de envío completado)
+        dialog = ctk.CTkToplevel(self.root)
+        dialog.title("Guardando archivo")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        dialog.configure(fg_color=self.colors['bg'])
+        self._center_toplevel(dialog, 420, 170)
+        dialog.after(50, dialog.grab_set)  # Evita lanzar otra exportación mientras se escribe
+        label = ctk.CTkLabel(dialog, text=f"Guardando {os.path.basename(path)}...", font=('Inter', 12), text_color=self.colors['text'])
+        label.pack(padx=20, pady=(20, 10))
+        bar = ctk.CTkProgressBar(dialog, width=360, mode='determinate')
+        bar.pack(padx=20, pady=5)
+        bar.set(0)
+        cancel_btn = ctk.CTkButton(dialog, text="Cancelar", command=stop_event.set,
+                                   fg_color=self.colors['action_cancel'], hover_color=self.hover_colors['action_cancel'],
+                                   font=('Inter', 12, 'bold'), corner_radius=10, height=32)
+        cancel_btn.pack(pady=(10, 15))
+        dialog.protocol("WM_DELETE_WINDOW", stop_event.set)
+
+        def on_progress(written, _total):
+            progress['written'] = written
+
+        def worker():
+            started = time.perf_counter()
+            try:
+                result['written'] = export_rows(path, headers, rows, total, sheet_title,
+                                                on_progress=on_progress, should_stop=stop_event.is_set)
+            except Exception as e:
+                result['error'] = e
+            result['seconds'] = time.perf_counter() - started
+
+        def poll():
+            if 'seconds' not in result:
+                written = progress['written']
+                if written:
+                    label.configure(text=f"Guardando {os.path.basename(path)}... {written:,} / {total:,} filas".replace(',', '.'))
+                    if total:
+                        bar.set(min(1.0, written / total))
+                self.root.after(100, poll)
+                return
+            try:
+                dialog.destroy()
+            except tk.TclError:
+                pass
+            owner = parent if parent.winfo_exists() else self.root
+            if 'error' in result:
+                e = result['error']
+                self.log(f"Error al guardar {os.path.basename(path)}: {e}", 'error')
+                messagebox.showerror("Error", f"Error al guardar el archivo:\n{e}", parent=owner)
+                return
+            written = result['written']
+            if written is None:
+                self.log(f"Guardado de {os.path.basename(path)} cancelado.", 'warning')
+                return
+            rate = written / result['seconds'] if result['seconds'] else 0
+            self.log(f"Exportación: {written} filas en {result['seconds']:.1f} s ({rate:,.0f} filas/s)".replace(',', '.'), 'info')
+            on_done(written, owner)
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(100, poll)
+
     def load_and_process_excel(self):
         """Abre el diálogo para cargar Excel/CSV e inicia el procesamiento."""
         self.log("Seleccionando...", 'info')
@@ -3677,10 +4475,13 @@ class Hermes:
         if not fp:
             return
 
+        self.log("Leyendo...", 'info')
+        self._read_table_async(fp, lambda data, columns: self._process_loaded_table(fp, data, columns))
+
+    def _process_loaded_table(self, fp, data, columns):
+        """Continúa la carga (orden, URLs directas o ventana de procesamiento) con las filas leídas."""
         try:
-            self.log("Leyendo...", 'info')
-            is_csv = fp.lower().endswith('.csv')
-            self.raw_data, self.columns = self.read_csv_file(fp) if is_csv else self.read_excel_file(fp)
+            self.raw_data, self.columns = data, columns
 
             if not self.raw_data:
                 self.log("Archivo sin datos.", 'warning'); messagebox.showwarning("Vacío", "El archivo seleccionado está vacío o no tiene datos válidos."); return
@@ -3771,10 +4572,13 @@ class Hermes:
         if not fp:
             return
 
+        self.log("Leyendo...", 'info')
+        self._read_table_async(fp, self._process_loaded_calls_table)
+
+    def _process_loaded_calls_table(self, data, columns):
+        """Continúa la carga del modo Llamadas (orden y selector de columnas) con las filas leídas."""
         try:
-            self.log("Leyendo...", 'info')
-            is_csv = fp.lower().endswith('.csv')
-            self.raw_data, self.columns = self.read_csv_file(fp) if is_csv else self.read_excel_file(fp)
+            self.raw_data, self.columns = data, columns
 
             if not self.raw_data:
                 self.log("Archivo sin datos.", 'warning')
@@ -4510,7 +5314,7 @@ class Hermes:
         self._enter_task_mode()
         self.update_stats()
 
-        threading.Thread(target=self.send_thread, daemon=True).start()
+        self._start_run_thread()
 
     def start_unirse_grupos(self):
         """Envoltorio para unirse a grupos con opción de programar."""
@@ -4532,7 +5336,8 @@ class Hermes:
                 return
 
         # Iniciar el proceso en un hilo para no bloquear la UI
-        threading.Thread(target=self.run_unirse_grupos, args=(grupos,), daemon=True).start()
+        self._enter_task_mode()
+        self._start_run_thread(self.run_unirse_grupos, (grupos,), prepare=False)
 
     def validate_numbers(self, inputs_raw, parent_window):
         """Valida una lista de números. Devuelve lista limpia o None si hay error."""
@@ -4815,16 +5620,8 @@ class Hermes:
                 # Calcular preview (incluso si no es visible, para el contador)
                 pm = cm
                 if cm and self.raw_data:
-                    er = self.raw_data[0] # Primera fila de datos
-                    for c in self.columns:
-                        pl = f"{{{c}}}"
-                        if pl in pm:
-                             v = er.get(c, '')
-                             v = '' if v is None else str(v)
-                             # Formato especial para valores monetarios
-                             if '$ Hist.' in c or '$ Asig.' in c:
-                                 v = format_currency_value(v)
-                             pm = pm.replace(pl, v)
+                    # Primera fila de datos (misma plantilla compilada que al procesar)
+                    pm = MessageTemplate(cm, self.columns).render(self.raw_data[0])
 
                 # Actualizar estadísticas siempre (si hay texto procesado o plantilla)
                 # Si hay raw_data, pm es el procesado. Si no, pm es la plantilla (cm).
@@ -4918,58 +5715,21 @@ class Hermes:
 
     def process_excel_data(self, selected_columns, message_template, selected_phones):
         """Genera la lista de URLs de WhatsApp a partir de los datos y la plantilla."""
-        processed_rows = []
-        retry_map = {}
-        for row in self.raw_data:
-            # Obtener todos los números de las columnas de teléfono seleccionadas
-            phone_nums = []
-            for ph_col in selected_phones:
-                ph_val = str(row.get(ph_col, '')) if row.get(ph_col) else ''
-                # Soportar números separados por guión (ej. "111-222")
-                phone_nums.extend([n.strip() for n in ph_val.split('-') if n.strip()])
-
-            if not phone_nums:
-                continue # Sin número en esta fila
-
-            links_for_row = []
-            msg = message_template
-            # Rellenar plantilla una sola vez por fila
-            for col in selected_columns:
-                pl = f"{{{col}}}"
-                if pl in msg:
-                    val = row.get(col, '')
-                    val = '' if val is None else str(val)
-                    # Formato especial para valores monetarios
-                    if '$ Hist.' in col or '$ Asig.' in col:
-                        val = format_currency_value(val)
-                    msg = msg.replace(pl, val)
-
-            for phone in phone_nums:
-                if not phone or not phone.strip():
-                    continue
-
-                ph_digits = re.sub(r'\D', '', phone)
-                if not ph_digits:
-                    continue
-
-                enc_msg = urllib.parse.quote(msg, safe='')
-                if self.sms_mode_active:
-                    link = f"sms:{ph_digits}?body={enc_msg}"
-                else:
-                    link = f"https://wa.me/549{ph_digits}?text={enc_msg}"
-                links_for_row.append(link)
-
-            if not links_for_row:
-                continue
-
-            # Agregar todos los números encontrados como tareas independientes
-            processed_rows.extend(links_for_row)
-
-        self.links = processed_rows
+        # Plantilla compilada una vez; el mensaje se codifica una vez por fila
+        template = MessageTemplate(message_template, selected_columns)
+        started = time.perf_counter()
+        processed_rows = build_message_links(self.raw_data, template, selected_phones, sms=self.sms_mode_active)
+        elapsed = time.perf_counter() - started
+        if elapsed > 0.5:
+            self.log(f"Plantilla: {len(self.raw_data)} filas en {elapsed:.1f} s ({len(self.raw_data) / elapsed:.0f} filas/s)", 'info')
+
+        self.links = processed_rows # Los links se arman al enviarlos (ver CampaignLinks)
         self.link_retry_map = {} # Ya no se usan reintentos para múltiples números, son tareas individuales
         self.total_messages = len(self.links)
         self.update_stats()
         self.log(f"{len(self.links)} URLs generados", 'success')
+        if self.links:
+            self.log(f"Memoria de la campaña: {self.links.memory_bytes() / 1048576:.1f} MB (URLs completas: ~{self.links.estimated_url_bytes() / 1048576:.0f} MB)", 'info')
         self.update_per_whatsapp_stat()
 
         if not self.manual_mode:
@@ -4982,39 +5742,25 @@ class Hermes:
             out_path = filedialog.asksaveasfilename(
                 parent=self.root,
                 defaultextension=".xlsx",
-                filetypes=[("Excel", "*.xlsx")],
+                filetypes=[("Excel", "*.xlsx"), ("CSV (más rápido)", "*.csv")],
                 title="Guardar Excel Procesado con URLs"
             )
             self.root.attributes('-topmost', False); self.root.focus_force() # Devolver foco
 
             if out_path:
-                wb = openpyxl.Workbook()
-                ws = wb.active
-                ws.title = "URLs"
-                ws['A1'] = 'URL'
-                for i, url in enumerate(self.links, 2):
-                    ws[f'A{i}'] = url
-                wb.save(out_path)
-                self.log(f"Excel guardado: {os.path.basename(out_path)}", 'success')
-                messagebox.showinfo("Éxito", f"Archivo Excel guardado con éxito.\nSe generaron {len(self.links)} URLs listos para enviar.", parent=self.root)
+                links = self.links # La campaña arma cada URL al escribirla, en el hilo de exportación
+
+                def on_saved(written, owner):
+                    self.log(f"Excel guardado: {os.path.basename(out_path)}", 'success')
+                    messagebox.showinfo("Éxito", f"Archivo guardado con éxito.\nSe generaron {written} URLs listos para enviar.", parent=owner)
+
+                self._export_rows_async(out_path, ("URL",), ((url,) for url in links), len(links),
+                                        "URLs", self.root, on_saved)
         except Exception as e:
             self.log(f"Error al guardar Excel: {e}", 'error')
             messagebox.showerror("Error", f"Error al guardar el archivo:\n{e}", parent=self.root)
             self.root.attributes('-topmost', False); self.root.focus_force()
 
-    def _get_phone_from_link(self, link):
-        """Extrae un número de teléfono de un link wa.me o sms:."""
-        if not isinstance(link, str):
-            return None
-        try:
-            clean_link = link.strip()
-            if "wa.me/" in clean_link:
-                return clean_link.split("wa.me/")[1].split("?")[0]
-            elif clean_link.lower().startswith("sms:"):
-                return clean_link.split(":")[1].split("?")[0]
-        except (IndexError, AttributeError):
-            pass
-        return None
 
     # --- Lógica de Envío (Threading y ADB) ---
 
@@ -5216,7 +5962,7 @@ class Hermes:
         # self.audio_known_combinations.clear() # Removed as per user request to remove audio logic
 
         # Iniciar hilo
-        threading.Thread(target=self.send_thread, daemon=True).start()
+        self._start_run_thread()
 
     def pause_sending(self):
         """Pausa o reanuda el envío."""
@@ -5261,8 +6007,11 @@ class Hermes:
             processed_numbers = {d['number'] for d in self.report_data}
 
             if not self.manual_mode and self.links:
-                for link in self.links:
-                    phone_number = self._get_phone_from_link(link)
+                if isinstance(self.links, CampaignLinks):
+                    phones = self.links.iter_phones() # Sin armar ni parsear cada URL
+                else:
+                    phones = (self._get_phone_from_link(link) for link in self.links)
+                for phone_number in phones:
                     if phone_number and phone_number not in processed_numbers:
                         self.report_data.append({'number': phone_number, 'status': 'No procesado'})
 
@@ -5278,7 +6027,7 @@ class Hermes:
             filepath = filedialog.asksaveasfilename(
                 title="Guardar Reporte de Envío",
                 defaultextension=".xlsx",
-                filetypes=[("Excel Files", "*.xlsx")],
+                filetypes=[("Excel Files", "*.xlsx"), ("CSV (más rápido)", "*.csv")],
                 initialfile=default_filename,
                 parent=parent
             )
@@ -5287,37 +6036,16 @@ class Hermes:
                 self.log("Guardado de reporte cancelado por el usuario.", 'info')
                 return
 
-            # Crear el libro de trabajo y la hoja
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Resultados de Envío"
-
-            # Escribir encabezados
-            ws['A1'] = "Numeros"
-            ws['B1'] = "Estado"
-
-            # Escribir datos
-            for index, record in enumerate(self.report_data, start=2):
-                ws[f'A{index}'] = record.get('number', 'N/A')
-                ws[f'B{index}'] = record.get('status', 'Desconocido')
-
-            # Auto-ajustar ancho de columnas
-            for col in ws.columns:
-                max_length = 0
-                column = col[0].column_letter
-                for cell in col:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                ws.column_dimensions[column].width = adjusted_width
+            # Copia de la lista: el hilo de exportación no ve altas posteriores
+            records = list(self.report_data)
+            rows = ((record.get('number', 'N/A'), record.get('status', 'Desconocido')) for record in records)
+
+            def on_saved(written, owner):
+                self.log(f"Reporte de envío guardado exitosamente en: {filepath}", 'success')
+                messagebox.showinfo("Éxito", "El reporte se ha guardado correctamente.", parent=owner)
 
-            # Guardar el archivo
-            wb.save(filepath)
-            self.log(f"Reporte de envío guardado exitosamente en: {filepath}", 'success')
-            messagebox.showinfo("Éxito", "El reporte se ha guardado correctamente.", parent=parent)
+            self._export_rows_async(filepath, ("Numeros", "Estado"), rows, len(records),
+                                    "Resultados de Envío", parent, on_saved)
 
         except Exception as e:
             self.log(f"Error al generar el reporte: {e}", 'error')
@@ -5348,9 +6076,7 @@ class Hermes:
         content_frame.grid(row=0, column=0, pady=(10, 20))
 
         try:
-            logo_p = os.path.join(BASE_DIR, 'logo_left.png')
-            logo_i = Image.open(logo_p).resize((60, 60), Image.Resampling.LANCZOS)
-            logo_img = ctk.CTkImage(light_image=logo_i, dark_image=logo_i, size=(60, 60))
+            logo_img = ASSETS.ctk_image('logo_left.png', (60, 60), widget=content_frame)
             ctk.CTkLabel(content_frame, image=logo_img, text="").pack(pady=(0, 10))
         except Exception as e:
             print(f"Error cargando logo para diálogo: {e}")
@@ -5396,2312 +6122,51 @@ class Hermes:
         dialog.protocol("WM_DELETE_WINDOW", close_dialog)
         self.root.wait_window(dialog)
 
-    # --- INICIO MODIFICACIÓN: send_thread (Refactorizado) ---
-    def send_thread(self):
-        """Hilo de trabajo que envía los mensajes uno por uno."""
-        try:
-            self.log("INICIANDO ENVÍO", 'success')
-
-            # Limpieza inicial en paralelo para ahorrar tiempo
-            self.log("Preparando dispositivos (limpieza)...", 'info')
-            cleanup_threads = []
-            for dev in self.devices:
-                if self.should_stop: break
-                t = threading.Thread(target=self.close_all_apps, args=(dev,), daemon=True)
-                cleanup_threads.append(t)
-                t.start()
-            
-            for t in cleanup_threads:
-                t.join(timeout=10)
-
-            if self.should_stop: self.log("Cancelado", 'warning'); return
-            self.log("Pausa inicial de 3s...", 'info'); time.sleep(3)
-            if self.should_stop: self.log("Cancelado", 'warning'); return
-
-            # --- Lógica de envío (depende del modo) ---
-            # La variable `self.sms_mode_active` es la que determina si se usa la
-            # lógica de SMS o la de WhatsApp.
-            # Los modos Fidelizado (GRUPOS, NUMEROS, etc.) son sub-modos de WhatsApp.
-            if self.fidelizado_mode == "GRUPOS":
-                if self.simultaneous_mode.get():
-                    self.run_grupos_simultaneous_thread()
-                else:
-                    self.run_grupos_dual_whatsapp_thread() # <-- WHATSAPP
-            elif self.fidelizado_mode == "NUMEROS_MANUAL":
-                if self.simultaneous_mode.get():
-                    self.run_numeros_manual_simultaneous_thread() # <-- SIMULTÁNEO
-                else:
-                    self.run_numeros_manual_thread() # <-- WHATSAPP
-            elif self.fidelizado_mode == "NUMEROS":
-                if self.fidelizado_numeros_mode.get() == "Uno a uno":
-                    self.run_uno_a_uno_thread() # <-- WHATSAPP
-                else: # Uno a muchos
-                    if self.simultaneous_mode.get():
-                        self.run_uno_a_muchos_simultaneous_thread() # <-- SIMULTÁNEO
-                    else:
-                        self.run_uno_a_muchos_thread() # <-- WHATSAPP
-            elif self.fidelizado_mode == "MIXTO":
-                self.run_mixto_dual_whatsapp_thread() # <-- WHATSAPP
-            elif self.sms_mode_active:
-                if self.sms_simultaneous_mode.get():
-                    self.run_sms_parallel_thread() # <-- SMS SIMULTÁNEO
-                else:
-                    self.run_sms_thread() # <-- SMS
-            else:
-                # <-- WHATSAPP (Tradicional)
-                if self.traditional_simultaneous_mode.get():
-                    self.run_traditional_simultaneous_thread()
-                else:
-                    self.run_default_thread()
-            # --- Fin Lógica de envío ---
-
-            # Finalización
-            if self.should_stop:
-                self.log("Cancelado. Mostrando diálogo de finalización.", 'info')
-                title = "Envío Cancelado"
-                message = "El envío fue cancelado. Puedes generar un reporte de los mensajes procesados."
-                self.root.after(100, lambda: self._show_completion_dialog(title=title, message=message))
-            else:
-                self.log("ENVÍO FINALIZADO", 'success')
-                self.log(f"Resumen: Enviados: {self.sent_count} | Fallidos: {self.failed_count}", 'info')
-                self.root.after(100, self._show_completion_dialog)
-
-        except Exception as e:
-            self.log(f"Error CRÍTICO en el hilo de envío: {e}", 'error')
-            import traceback
-            traceback_str = traceback.format_exc()
-            print(f"ERROR THREAD ENVIO:\n{traceback_str}")
-            self.root.after(100, lambda: messagebox.showerror("Error Crítico", f"Ocurrió un error inesperado durante el envío:\n{e}\n\nRevise el log para más detalles.", parent=self.root))
-        finally:
-            # Siempre reestablecer la UI
-            self.root.after(100, self._finalize_sending)
-    
-    def _maybe_pause_sending(self, task_index):
-        """Checks if a pause is needed based on the task index and configured settings."""
-        pause_count = self.pause_sends_count.get()
-        if pause_count <= 0:
-            return
-
-        # Check if the current task index is a multiple of the pause count
-        if task_index > 0 and task_index % pause_count == 0:
-            delay_min = self.pause_sends_delay_min.get()
-            delay_max = self.pause_sends_delay_max.get()
-            pause_duration = random.uniform(delay_min, delay_max)
-
-            self.log(f"Pausa programada alcanzada. Esperando {pause_duration:.1f} segundos...", 'info')
-            self._controlled_sleep(pause_duration)
-
-    def run_single_task(self, device, link, message_to_send, task_index, whatsapp_package="com.whatsapp.w4b", link_index=None, activity_info=None, skip_delay=False):
-        """
-        Ejecuta una única tarea de envío (abrir link, enviar, esperar), gestionando la conexión de uiautomator2.
-        Args:
-            skip_delay (bool): Si es True, omite el retardo posterior al envío (útil para modo simultáneo).
-        """
-        ui_device = None
-        # --- MODIFICACIÓN: Siempre intentar conectar uiautomator2 (EXCEPTO EN SMS) ---
-        if not self.sms_mode_active:
-            try:
-                ui_device = u2.connect(device)
-                ui_device.unlock()
-            except Exception as e:
-                self.log(f"No se pudo conectar uiautomator2 a {device}: {e}", "warning")
-                # En este nuevo enfoque, un fallo aquí debería ser crítico.
-                return False
-
-        # Bucle de pausa
-        while self.is_paused and not self.should_stop:
-            time.sleep(0.1)
-        if self.should_stop: return False
-
-        self.current_index = task_index
-        self.root.after(0, self.update_stats)
-
-        # En modo fidelizado ya se realiza una limpieza general antes de arrancar el hilo.
-        # Evitamos cerrar las apps en cada mensaje para reducir el tiempo extra entre envíos
-        # y que el intervalo se acerque más al configurado por el usuario.
-        if not self.manual_mode:
-            self.close_all_apps(device)
-
-        if self.should_stop:
-            return False
-
-        send_start = time.time()
-        # Enviar mensaje, pasando el objeto ui_device
-        success = self.send_msg(
-            device,
-            link,
-            task_index,
-            self.total_messages,
-            message_to_send,
-            whatsapp_package,
-            ui_device,
-            primary_index=link_index,
-        )
-        
-        # --- Importante: Actualizar contadores y reporte DESPUÉS de send_msg ---
-        phone_number = self._get_phone_from_link(link)
-        if phone_number:
-            status = "Enviado" if success else "Fallo"
-            self.report_data.append({'number': phone_number, 'status': status})
-
-        if success:
-            self.sent_count += 1
-
-            # --- Lógica de Llamada (Solo Modo SMS) ---
-            if self.sms_mode_active and self.sms_enable_call.get():
-                try:
-                    # Extraer número de sms:NUMBER?body=...
-                    number_part = link.split(':')[1]
-                    if '?' in number_part:
-                        number = number_part.split('?')[0]
-                    else:
-                        number = number_part
-
-                    if number:
-                        self.log(f"[{device}] SMS enviado. Esperando 3s antes de llamar...", 'info')
-                        self._controlled_sleep(3.0) # Espera controlada para respetar pausas
-                        
-                        if self.should_stop: return False
-                        
-                        self.log(f"[{device}] Iniciando llamada a {number}...", 'info')
-                        self._perform_call(device, number, self.sms_call_duration.get())
-                except Exception as e:
-                    self.log(f"[{device}] Error al intentar realizar llamada: {e}", 'error')
-
-            if activity_info and self.fidelizado_mode == "NUMEROS":
-                sender = activity_info.get('from')
-                receiver = activity_info.get('to')
-                self.record_fidelizado_activity(sender, receiver)
-        else:
-            self.failed_count += 1
-
-        # Actualizar UI (contadores y barra de progreso)
-        self.root.after(0, self.update_stats)
-        # --- Fin actualización contadores ---
-
-        # Espera entre mensajes (solo si no es la última tarea y no se omite)
-        if task_index < self.total_messages and not self.should_stop and not skip_delay:
-            send_elapsed = time.time() - send_start
-            if self.manual_mode:
-                # FIX: Usar las nuevas variables de retardo de envío
-                target_delay = random.uniform(self.fidelizado_send_delay_min.get(), self.fidelizado_send_delay_max.get())
-            elif self.sms_mode_active:
-                target_delay = random.uniform(self.sms_delay_min.get(), self.sms_delay_max.get())
-            else:
-                target_delay = random.uniform(self.delay_min.get(), self.delay_max.get())
-
-            if not skip_delay:
-                remaining_delay = max(0, target_delay - send_elapsed)
-                self.log(
-                    f"Esperando {remaining_delay:.1f}s (objetivo {target_delay:.1f}s, envío tomó {send_elapsed:.1f}s)"
-                    f"... (Post-tarea {task_index})",
-                    'info'
-                )
-                elapsed = 0
-                while elapsed < remaining_delay and not self.should_stop:
-                    while self.is_paused and not self.should_stop: time.sleep(0.1)
-                    if self.should_stop: break
-                    time.sleep(0.1); elapsed += 0.1
-        
-        return success
-
-    def run_default_thread(self):
-        """
-        Lógica de envío tradicional (Excel/CSV) con soporte para Simple/Doble/Triple.
-        """
-        if not self.links:
-            self.log("Error: No hay links para enviar (modo tradicional)", 'error')
-            return
-        
-        mode = self.traditional_send_mode.get()
-        self.log(f"Modo de envío: {mode}", 'info')
-        
-        if mode == "Business":
-            self._run_simple_mode()
-        elif mode == "Normal":
-            # Reutiliza _run_simple_mode pero cambiando el paquete de WA
-            self._run_simple_mode(whatsapp_package="com.whatsapp")
-        elif mode == "Business/Normal":
-            self._run_doble_mode()
-        elif mode == "Business/Normal 1/Normal 2":
-            self._run_triple_mode()
-
-    def run_traditional_simultaneous_thread(self):
-        """
-        Lógica de envío SIMULTÁNEO para el modo Tradicional (Excel).
-        Ejecuta envíos en 'tandas' paralelas según los dispositivos disponibles
-        y el modo seleccionado (Business, Normal, Business/Normal).
-        """
-        if not self.links:
-            self.log("Error: No hay links para enviar.", 'error')
-            return
-
-        mode = self.traditional_send_mode.get()
-        self.log(f"Modo Tradicional Simultáneo iniciado ({mode})", 'info')
-
-        # Definir fases según el modo
-        phases = []
-        if mode == "Business":
-            phases = [("Business", "com.whatsapp.w4b")]
-        elif mode == "Normal":
-            phases = [("Normal", "com.whatsapp")]
-        elif mode == "Business/Normal":
-            phases = [("Business", "com.whatsapp.w4b"), ("Normal", "com.whatsapp")]
-        else: # Business/Normal 1/Normal 2 u otros fallbacks
-            self.log(f"Advertencia: Modo '{mode}' simplificado a Business/Normal en simultáneo.", 'warning')
-            phases = [("Business", "com.whatsapp.w4b"), ("Normal", "com.whatsapp")]
-
-        total_links = len(self.links)
-        num_devices = len(self.devices)
-        if num_devices == 0:
-            self.log("Error: No hay dispositivos para enviar.", 'error')
-            return
-
-        link_idx = 0
-        phase_idx = 0
-
-        while link_idx < total_links:
-            if self.should_stop: break
-
-            # Determinar fase actual
-            phase_name, phase_pkg = phases[phase_idx % len(phases)]
-            phase_idx += 1
-
-            # Seleccionar lote de links
-            batch_links = self.links[link_idx : link_idx + num_devices]
-            batch_size = len(batch_links)
-
-            # Seleccionar dispositivos (si hay menos links que dispositivos, usar solo los necesarios)
-            active_devices = self.devices[:batch_size]
-
-            self.log(f"\n>>> Iniciando Tanda {phase_name} ({batch_size} envíos) <<<", 'info')
-
-            threads = []
-            for i, device in enumerate(active_devices):
-                link = batch_links[i]
-                # Lanzar hilo individual saltando el delay interno para controlar el delay global de tanda
-                t = threading.Thread(
-                    target=self.run_single_task,
-                    args=(device, link, None, link_idx + i + 1),
-                    kwargs={
-                        'whatsapp_package': phase_pkg,
-                        'link_index': link_idx + i,
-                        'skip_delay': True
-                    }
-                )
-                threads.append(t)
-                t.start()
-
-            # Esperar a que terminen todos los hilos de esta tanda
-            for t in threads:
-                t.join()
-
-            if self.should_stop: break
-
-            link_idx += batch_size
-            self.log(f">>> Tanda {phase_name} finalizada", 'success')
-
-            # Delay entre tandas (si no hemos terminado)
-            if link_idx < total_links:
-                delay = random.uniform(self.delay_min.get(), self.delay_max.get())
-                self.log(f"⏳ Esperando {delay:.1f}s antes de la siguiente tanda...", 'info')
-                self._controlled_sleep(delay)
-
-        self.log(f"\nModo Tradicional Simultáneo finalizado", 'success')
-    
-    def _run_simple_mode(self, whatsapp_package="com.whatsapp.w4b"):
-        """Modo Simple: 1 URL por teléfono, usando el paquete de WhatsApp especificado."""
-        log_msg = "Ejecutando Modo Business..." if whatsapp_package == "com.whatsapp.w4b" else "Ejecutando Modo Normal..."
-        self.log(log_msg, 'info')
-        idx = 0  # Índice del dispositivo a usar
-        
-        for i, link in enumerate(self.links):
-            if self.should_stop:
-                self.log("Cancelado en bucle", 'warning')
-                break
-
-            device = self.devices[idx]
-            idx = (idx + 1) % len(self.devices)
-
-            # Check for pause before running the task
-            self._maybe_pause_sending(i)
-
-            # Ejecutar tarea con el paquete de WA especificado
-            self.run_single_task(device, link, None, i + 1, whatsapp_package=whatsapp_package, link_index=i)
-
-    def _run_doble_mode(self):
-        """Modo Doble: Rota secuencialmente entre dispositivos y cuentas Business/Normal."""
-        self.log("Ejecutando Modo Doble (Rotación Correcta)...", 'info')
-
-        # 1. Crear la lista de todas las combinaciones de envío
-        envio_combinations = []
-        for device in self.devices:
-            envio_combinations.append({"device": device, "wa_name": "Business", "wa_package": "com.whatsapp.w4b"})
-            envio_combinations.append({"device": device, "wa_name": "Normal", "wa_package": "com.whatsapp"})
-
-        num_combinations = len(envio_combinations)
-        if num_combinations == 0:
-            self.log("Error: No hay dispositivos para el modo Doble.", "error")
-            return
-
-        # 2. Iterar una vez sobre los links, rotando las combinaciones
-        for i, link in enumerate(self.links):
-            if self.should_stop:
-                self.log("Cancelado en bucle", 'warning')
-                break
-            
-            self.last_task_time = time.time()
-
-            # Check for pause before running the task
-            self._maybe_pause_sending(i)
-
-            # Seleccionar la combinación de envío (dispositivo + cuenta)
-            combination = envio_combinations[i % num_combinations]
-            device = combination["device"]
-            wa_name = combination["wa_name"]
-            wa_package = combination["wa_package"]
-
-            self.log(f"[{device}] Enviando con {wa_name}", 'info')
-            self.run_single_task(device, link, None, i + 1, whatsapp_package=wa_package, link_index=i)
-
-    def _run_triple_mode(self):
-        """Modo Triple: Rota secuencialmente entre dispositivos y las 3 cuentas."""
-        self.log("Ejecutando Modo Triple (Rotación Correcta)...", 'info')
-        is_normal_account_2 = {dev_id: False for dev_id in self.devices}
-
-        # 1. Crear la lista de todas las combinaciones de envío
-        envio_combinations = []
-        for device in self.devices:
-            envio_combinations.append({"device": device, "wa_name": "Business", "wa_package": "com.whatsapp.w4b", "needs_switch": False})
-            envio_combinations.append({"device": device, "wa_name": "Normal (Cuenta 1)", "wa_package": "com.whatsapp", "needs_switch": False})
-            envio_combinations.append({"device": device, "wa_name": "Normal (Cuenta 2)", "wa_package": "com.whatsapp", "needs_switch": True})
-
-        num_combinations = len(envio_combinations)
-        if num_combinations == 0:
-            self.log("Error: No hay dispositivos para el modo Triple.", "error")
-            return
-
-        # 2. Iterar una vez sobre los links, rotando las combinaciones
-        for i, link in enumerate(self.links):
-            if self.should_stop:
-                self.log("Cancelado en bucle", 'warning')
-                break
-
-            self.last_task_time = time.time()
-
-            # Check for pause before running the task
-            self._maybe_pause_sending(i)
-
-            # Seleccionar la combinación de envío (dispositivo + cuenta)
-            combination = envio_combinations[i % num_combinations]
-            device = combination["device"]
-            wa_name = combination["wa_name"]
-            wa_package = combination["wa_package"]
-            needs_switch_to_acc2 = combination["needs_switch"]
-            
-            # Gestionar cambio de cuenta si es necesario
-            if "Normal" in wa_name:
-                currently_is_acc2 = is_normal_account_2.get(device, False)
-                if needs_switch_to_acc2 and not currently_is_acc2:
-                    self.log(f"Cambiando a Cuenta 2 en {device}...", 'info')
-                    self._switch_whatsapp_account(device)
-                    time.sleep(4)
-                    is_normal_account_2[device] = True
-                elif not needs_switch_to_acc2 and currently_is_acc2:
-                    self.log(f"Restaurando a Cuenta 1 en {device}...", 'info')
-                    self._switch_whatsapp_account(device)
-                    time.sleep(4)
-                    is_normal_account_2[device] = False
-
-            if self.should_stop: break
-
-            self.log(f"[{device}] Enviando con {wa_name}", 'info')
-            self.run_single_task(device, link, None, i + 1, whatsapp_package=wa_package, link_index=i)
-
-        # Dejar todas las cuentas Normal en el estado inicial (Cuenta 1)
-        self.log("Finalizando y restaurando cuentas a estado inicial...", 'info')
-        for dev, is_acc2 in is_normal_account_2.items():
-            if is_acc2:
-                self.log(f"Restaurando a Cuenta 1 en {dev}...", 'info')
-                self._switch_whatsapp_account(dev)
-                time.sleep(4)
-
-    def run_sms_thread(self):
-        """Lógica de envío para el SMS."""
-        if not self.links:
-            self.log("Error: No hay enlaces SMS para enviar.", 'error')
-            return
-
-        self.log("Ejecutando SMS...", 'info')
-        idx = 0
-
-        for i, link in enumerate(self.links):
-            if self.should_stop:
-                self.log("Cancelado en SMS", 'warning')
-                break
-
-            device = self.devices[idx]
-            idx = (idx + 1) % len(self.devices)
+    # --- Ciclo de envío: SendingEngine.run_campaign en un hilo; el final llega por engine_events ---
+    def _start_run_thread(self, target=None, args=(), prepare=True):
+        """Arranca run_campaign en un hilo. Los envíos (prepare) terminan con el diálogo de finalización."""
+        self.completion_dialog_on_finish = prepare
+        threading.Thread(target=self.run_campaign, args=(target, args),
+                         kwargs={'prepare': prepare, 'initial_pause': 3 if prepare else 0}, daemon=True).start()
 
-            self.run_single_task(device, link, None, i + 1, whatsapp_package=None, link_index=i)
+    def _trace_export_path(self):
+        """La traza se guarda junto al Excel cargado (o en la carpeta actual)."""
+        folder = os.path.dirname(self.excel_file) if self.excel_file else os.getcwd()
+        return os.path.join(folder, f"traza_hermes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
 
     def start_calling(self):
-        """Envoltorio para iniciar llamadas con opción de programar."""
-        self._open_schedule_dialog(lambda confirm: self._start_calling_impl(confirm=confirm))
-
-    def _start_calling_impl(self, confirm=True):
-        """Inicia el proceso de llamadas masivas (Lógica Interna)."""
-        if not self.raw_data:
-            messagebox.showwarning("Sin datos", "Carga un archivo Excel primero.")
-            return
-
-        # Validar selección de columnas
-        # self.calls_selected_columns ya fue seteado por el popup _on_calls_columns_confirmed
-        if not self.calls_selected_columns:
-            messagebox.showwarning("Sin columnas", "Selecciona al menos una columna de teléfono (Carga el Excel y usa el popup).")
-            return
-
-        if not self.devices:
-            self.detect_devices()
-            if not self.devices:
-                return
-
-        if confirm:
-            if not messagebox.askyesno("Confirmar", "¿Iniciar proceso de llamadas masivas?", parent=self.root):
-                return
-
-        self._enter_task_mode()
-        threading.Thread(target=self.run_calls_thread, daemon=True).start()
-
-    def run_calls_thread(self):
-        """Hilo principal para la lógica de llamadas."""
-        try:
-            self.log("🚀 INICIANDO LLAMADAS MASIVAS", 'info')
-
-            # Generar lista de tareas
-            tasks = []
-            for row in self.raw_data:
-                for col in self.calls_selected_columns:
-                    val = str(row.get(col, '')).strip()
-                    if val:
-                        # Usar regex para dividir por guiones (todos los tipos), comas, punto y coma, saltos de línea
-                        nums = [n.strip() for n in re.split(r'[-–—,\n;]', val) if n.strip()]
-                        for n in nums:
-                            # Clean number
-                            clean_n = ''.join(filter(str.isdigit, n))
-                            if clean_n:
-                                tasks.append(clean_n)
-
-            self.total_messages = len(tasks)
-            self.root.after(0, self.update_stats)
-            self.log(f"Total números a llamar: {len(tasks)}", 'info')
-
-            wa_mode = self.calls_whatsapp_mode.get() # Business, Normal, Ambos
-            simultaneous = self.calls_simultaneous_mode.get()
-            delay_min = self.calls_delay_min.get()
-            delay_max = self.calls_delay_max.get()
-            duration = self.calls_duration.get()
-
-            # Definir estrategia de apps
-            # Si es "Ambos", alternamos. Si no, fijo.
-            # Alternancia: Business -> Normal -> Business ...
-
-            def get_app_sequence():
-                if wa_mode == "Business": return [("com.whatsapp.w4b", "Business")]
-                if wa_mode == "Normal": return [("com.whatsapp", "Normal")]
-                if wa_mode == "Ambos": return [("com.whatsapp.w4b", "Business"), ("com.whatsapp", "Normal")]
-                return [("com.whatsapp.w4b", "Business")]
-
-            app_seq = get_app_sequence()
-
-            # Estado de rotación por dispositivo
-            device_app_idx = {d: 0 for d in self.devices}
-
-            def process_call(device_id, phone_number, task_idx):
-                if self.should_stop: return False
-
-                # 0. Cerrar ambos WhatsApps para asegurar estado limpio
-                # El usuario solicitó: "cada vez que se envie y al empezar el primer, que cierres ambos whatsapp"
-                self.log(f"[{device_id}] Cerrando WhatsApps antes de la tarea...", 'info')
-                self._run_adb_command(['-s', device_id, 'shell', 'am', 'force-stop', 'com.whatsapp'])
-                self._run_adb_command(['-s', device_id, 'shell', 'am', 'force-stop', 'com.whatsapp.w4b'])
-                time.sleep(1)
-
-                # Seleccionar App
-                seq_idx = device_app_idx[device_id]
-                pkg, app_name = app_seq[seq_idx % len(app_seq)]
-                device_app_idx[device_id] += 1 # Rotar para la próxima
-
-                self.current_index = task_idx
-                self.root.after(0, self.update_stats)
-
-                log_prefix = f"({task_idx}/{len(tasks)}) 📞 {phone_number} [{device_id}] ({app_name})"
-                self.log(f"Llamando a {phone_number}...", 'info')
-
-                # 1. Abrir Home de WhatsApp (No abrir chat directo con link, sino la app)
-                # Usamos el launch normal
-                open_args = ['-s', device_id, 'shell', 'monkey', '-p', pkg, '-c', 'android.intent.category.LAUNCHER', '1']
-                if not self._run_adb_command(open_args, timeout=10):
-                    self.log(f"{log_prefix} ✗ Fallo al abrir WhatsApp", 'error')
-                    self.failed_count += 1
-                    return
-
-                # 2. Esperar Home
-                time.sleep(3)
-
-                # 3. Ejecutar flujo de llamada (Nuevo)
-                if self._perform_whatsapp_call_action(device_id, duration, phone_number=phone_number, package_name=pkg):
-                    self.log(f"{log_prefix} ✓ Llamada finalizada", 'success')
-                    self.sent_count += 1
-                else:
-                    self.log(f"{log_prefix} ✗ No se pudo realizar la llamada (¿Sin WhatsApp?)", 'error')
-                    self.failed_count += 1
-
-                # 4. Delay entre llamadas
-                wait = random.uniform(delay_min, delay_max)
-                self.log(f"Pausa de {wait:.1f}s...", 'info')
-                self._controlled_sleep(wait)
-
-            if simultaneous and len(self.devices) > 1:
-                # Modo paralelo
-                import concurrent.futures
-
-                # Dividir tareas para round-robin
-                num_devs = len(self.devices)
-
-                # Ejecutar en lotes del tamaño de devices
-                for i in range(0, len(tasks), num_devs):
-                    if self.should_stop: break
-                    while self.is_paused and not self.should_stop: time.sleep(0.1)
-
-                    batch = tasks[i : i + num_devs]
-
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=num_devs) as executor:
-                        futures = []
-                        for b_idx, phone in enumerate(batch):
-                            dev = self.devices[b_idx % num_devs]
-                            t_idx = i + b_idx + 1
-                            futures.append(executor.submit(process_call, dev, phone, t_idx))
-
-                        # Esperar lote
-                        concurrent.futures.wait(futures)
-            else:
-                # Modo secuencial (1 dispositivo o 1 por 1)
-                dev_idx = 0
-                for i, phone in enumerate(tasks):
-                    if self.should_stop: break
-                    while self.is_paused and not self.should_stop: time.sleep(0.1)
-
-                    dev = self.devices[dev_idx]
-                    dev_idx = (dev_idx + 1) % len(self.devices) # Round robin simple
-
-                    process_call(dev, phone, i + 1)
-
-        except Exception as e:
-            self.log(f"Error en hilo de llamadas: {e}", 'error')
-        finally:
-            self.log("Finalizando proceso de llamadas...", 'info')
-            self._finalize_sending()
-
-    def _perform_whatsapp_call_action(self, device, duration, phone_number=None, package_name="com.whatsapp"):
-        """
-        NUEVA LÓGICA DE LLAMADA:
-        1. Click en el 1er chat (fijado).
-        2. Escribir número y enviar.
-        3. Click en el mensaje enviado.
-        4. Esperar popup 'Llamar en Whatsapp'.
-        5. Click en esa opción.
-        6. Esperar y colgar.
-        """
-        try:
-            d = u2.connect(device)
-
-            # 1. Click en el primer chat de la lista (asumimos que ya estamos en la Home de WA)
-            # Intentar encontrar el primer item de la lista de conversaciones
-            self.log(f"[{device}] Buscando primer chat (fijado)...", 'info')
-
-            # Estrategia 1: Por ID de la fila de conversación
-            row_selector = d(resourceId=f"{package_name}:id/conversations_row_contact_name")
-
-            chat_clicked = False
-            if row_selector.exists:
-                # Click en el primero (índice 0)
-                try:
-                    row_selector[0].click()
-                    chat_clicked = True
-                except:
-                    pass
-
-            if not chat_clicked:
-                # Estrategia 2: Click por coordenadas relativas (arriba de la lista)
-                # Asumiendo una resolución estándar, el primer chat suele estar en el top 20-30%
-                self.log(f"[{device}] Usando click relativo para primer chat...", 'warning')
-                w, h = d.window_size()
-                d.click(w // 2, int(h * 0.25)) # Click en el cuarto superior central
-                chat_clicked = True
-
-            time.sleep(2) # Esperar a que abra el chat
-
-            # 2. Escribir número y enviar
-            self.log(f"[{device}] Enviando número {phone_number}...", 'info')
-
-            # Buscar campo de texto (usando helper existente)
-            chat_field = self._locate_chat_field(d, wait_timeout=5)
-
-            if not chat_field:
-                self.log(f"[{device}] No se encontró campo de texto.", 'error')
-                return False
-
-            try:
-                # 1. Escribir primero para que aparezca el botón de enviar
-                chat_field.click()
-                time.sleep(0.5)
-                chat_field.set_text(phone_number)
-                time.sleep(1.0) # Esperar a que el UI actualice y muestre el botón enviar
-
-                # 2. Buscar botón de enviar AHORA (estrictamente el avión, evitando 'Reenviar')
-                send_selectors = [
-                    dict(resourceId=f"{package_name}:id/send"),
-                    dict(contentDescription="Enviar"),
-                    dict(description="Enviar"),
-                    dict(resourceId=f"{package_name}:id/send_button")
-                ]
-
-                send_btn = None
-                for sel in send_selectors:
-                    btn = d(**sel)
-                    if btn.exists:
-                        send_btn = btn
-                        break
-
-                if send_btn:
-                    send_btn.click()
-                else:
-                    self.log(f"[{device}] Botón enviar no encontrado, intentando Enter...", 'warning')
-                    self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENTER'])
-
-                time.sleep(1.5) # Esperar a que se envíe y aparezca la burbuja
-            except Exception as e:
-                self.log(f"[{device}] Error al enviar número: {e}", 'error')
-                return False
-
-            # 3. Click en el mensaje enviado (el último)
-            self.log(f"[{device}] Buscando mensaje enviado...", 'info')
-
-            # Buscar el último mensaje que contenga el número
-            # Los mensajes suelen tener id 'message_text'
-            msg_selector = d(resourceId=f"{package_name}:id/message_text", text=phone_number)
-
-            if not msg_selector.exists:
-                # Intentar buscar por texto contiene (por si hay formato)
-                msg_selector = d(resourceId=f"{package_name}:id/message_text", textContains=phone_number[-4:]) # Últimos 4 dígitos
-
-            if msg_selector.exists:
-                # Hacer click en la última instancia encontrada (la más reciente)
-                try:
-                    count = msg_selector.count
-                    if count > 0:
-                        msg_selector[count - 1].click()
-                    else:
-                        msg_selector.click()
-                except Exception as e:
-                    self.log(f"[{device}] Error al clickear mensaje: {e}", 'error')
-                    return False
-            else:
-                self.log(f"[{device}] No se encontró la burbuja del mensaje con el número.", 'error')
-                return False
-
-            time.sleep(1.5) # Esperar al popup
-
-            # 4. Esperar popup 'Llamar en Whatsapp' y 5. Clickear
-            self.log(f"[{device}] Buscando opción 'Llamar en Whatsapp'...", 'info')
-
-            popup_options = [
-                "Llamar en WhatsApp",
-                "Llamar en Whatsapp",
-                "Call on WhatsApp",
-                "Llamada de voz"
-            ]
-
-            call_option_clicked = False
-            for opt in popup_options:
-                btn = d(text=opt)
-                if btn.exists:
-                    btn.click()
-                    call_option_clicked = True
-                    self.log(f"[{device}] Opción '{opt}' encontrada y clickeada.", 'success')
-                    break
-
-            if not call_option_clicked:
-                # Intentar búsqueda laxa
-                btn = d(textContains="Llamar")
-                if btn.exists:
-                     # Verificar que no sea "Llamar" de llamada normal (GSM) si se distingue
-                     # Pero el usuario dijo "Llamar en Whatsapp", así que priorizamos eso.
-                     # Si sale solo "Llamar", podría ser GSM.
-                     # Busquemos especificamente el texto que dijo el usuario.
-                     pass
-
-                self.log(f"[{device}] No se encontró la opción de llamada de WhatsApp. ¿Tiene WhatsApp este número?", 'warning')
-                # Cerrar el popup (click fuera o back)
-                d.press("back")
-                return False
-
-            # 6. Esperar y colgar
-            self.log(f"[{device}] Llamada iniciada. Esperando {duration}s...", 'info')
-
-            # Esperar duración
-            elapsed = 0
-            while elapsed < duration:
-                if self.should_stop: break
-                time.sleep(1)
-                elapsed += 1
-
-            # Colgar (Botón rojo)
-            self.log(f"[{device}] Colgando...", 'info')
-
-            # Buscar botón de colgar (rojo)
-            # IDs comunes: footer_end_call_btn, end_call_btn
-            end_btn_selectors = [
-                dict(resourceId=f"{package_name}:id/footer_end_call_btn"),
-                dict(resourceId="com.whatsapp:id/footer_end_call_btn"),
-                dict(resourceId="com.whatsapp.w4b:id/footer_end_call_btn"),
-                dict(descriptionMatches="(?i)fin.*llamada|cortar|end call|colgar"),
-                dict(resourceIdMatches="(?i).*end_call.*")
-            ]
-
-            end_clicked = False
-            for sel in end_btn_selectors:
-                btn = d(**sel)
-                if btn.exists:
-                    btn.click()
-                    end_clicked = True
-                    break
-
-            if not end_clicked:
-                # Fallback: ADB keycode endcall
-                self.log(f"[{device}] Usando KEYCODE_ENDCALL para colgar...", 'info')
-                self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENDCALL'])
-
-            # Volver al inicio (Home de la app)
-            time.sleep(1)
-            # Presionar back un par de veces para salir del chat y volver a la lista
-            d.press("back")
-            time.sleep(0.5)
-            d.press("back")
-
-            return True
-
-        except Exception as e:
-            self.log(f"[{device}] Error en _perform_whatsapp_call_action: {e}", 'error')
-            return False
-
-
-    def run_sms_parallel_thread(self):
-        """Lógica de envío SIMULTÁNEO para el SMS."""
-        if not self.links:
-            self.log("Error: No hay enlaces SMS para enviar.", 'error')
-            return
-
-        num_devices = len(self.devices)
-        total_links = len(self.links)
-        self.log(f"Ejecutando SMS en modo SIMULTÁNEO ({num_devices} dispositivos)...", 'info')
-
-        # Process in batches
-        for i in range(0, total_links, num_devices):
-            # Check for pause
-            while self.is_paused and not self.should_stop:
-                time.sleep(0.1)
-
-            if self.should_stop:
-                self.log("Cancelado en SMS Simultáneo", 'warning')
-                break
-
-            batch_links = self.links[i : i + num_devices]
-            threads = []
-
-            self.log(f"--- [BATCH SIMULTÁNEO] Iniciando {len(batch_links)} envíos en paralelo ---", 'success')
-
-            for j, link in enumerate(batch_links):
-                # Ensure we have enough devices (cycle if fewer devices than batch size - unlikely here as batch size is len(devices))
-                device = self.devices[j % num_devices]
-                # Task index logic: global index
-                task_idx = i + j + 1
-
-                # Create thread
-                t = threading.Thread(
-                    target=self.run_single_task,
-                    args=(device, link, None, task_idx),
-                    kwargs={
-                        'whatsapp_package': None,
-                        'link_index': i+j,
-                        'skip_delay': True # NEW ARGUMENT: Skip individual delay
-                    }
-                )
-                threads.append(t)
-                t.start()
-
-            # Wait for all threads in this batch to finish
-            for t in threads:
-                t.join()
-
-            if self.should_stop: break
-
-            # Global delay between batches (if not finished)
-            if i + num_devices < total_links:
-                delay = random.uniform(self.sms_delay_min.get(), self.sms_delay_max.get())
-                self.log(f"⏳ Esperando {delay:.1f}s antes del siguiente lote simultáneo...", 'info')
-                self._controlled_sleep(delay)
-
-    def run_numeros_manual_thread(self):
-        """Lógica de envío para MODO NÚMEROS - MANUAL."""
-        self.log("Iniciando MODO NÚMEROS (Manual)...", 'info')
-
-        active_devices = self._get_filtered_devices()
-        if not active_devices:
-            self.log("No hay dispositivos que cumplan con el filtro.", "error")
-            return
-
-        num_devices = len(active_devices)
-        num_bucles = self.manual_loops_var.get()
-        task_counter = 0
-        mensaje_index = self.mensaje_start_index
-        total_mensajes_lib = len(self.manual_messages_numbers)
-        whatsapp_apps = self._get_whatsapp_apps_to_use()
-
-        for bucle_num in range(num_bucles):
-            if self.should_stop: break
-            self.log(f"\n--- BUCLE {bucle_num + 1}/{num_bucles} ---", 'info')
-
-            for num_idx, numero in enumerate(self.manual_inputs_numbers):
-                if self.should_stop: break
-
-                device = active_devices[num_idx % num_devices]
-
-                for wa_idx, (wa_name, wa_package) in enumerate(whatsapp_apps):
-                    if self.should_stop: break
-                    task_counter += 1
-                    mensaje = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
-                    link = f"https://wa.me/549{numero}?text={urllib.parse.quote(mensaje, safe='')}"
-
-                    self.run_single_task(device, link, None, task_counter, whatsapp_package=wa_package)
-
-    def run_numeros_manual_simultaneous_thread(self):
-        """
-        Lógica de envío SIMULTÁNEO para MODO NÚMEROS - MANUAL.
-        Para cada número destino:
-          1. Todos los Business envían a ese número SIMULTÁNEAMENTE
-          2. Todos los Normal envían a ese número SIMULTÁNEAMENTE
-        Luego se pasa al siguiente número.
-        """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        
-        self.log("Iniciando MODO NÚMEROS MANUAL - SIMULTÁNEO...", 'info')
-
-        active_devices = self._get_filtered_devices()
-        if not active_devices:
-            self.log("No hay dispositivos que cumplan con el filtro.", "error")
-            return
-
-        num_devices = len(active_devices)
-        num_bucles = self.manual_loops_var.get()
-        total_numeros = len(self.manual_inputs_numbers)
-        
-        self.log(f"Dispositivos: {num_devices}, Números: {total_numeros}", 'info')
-
-        task_counter = [0]
-        mensaje_index = [self.mensaje_start_index]
-        total_mensajes_lib = len(self.manual_messages_numbers)
-        whatsapp_apps = self._get_whatsapp_apps_to_use()
-
-        def execute_send(device, wa_package, numero, task_idx):
-            """Ejecuta un envío SIMPLIFICADO en un thread del pool."""
-            mensaje = self.manual_messages_numbers[mensaje_index[0] % total_mensajes_lib]
-            mensaje_index[0] += 1
-            link = f"https://wa.me/549{numero}?text={urllib.parse.quote(mensaje, safe='')}"
-            
-            # Usar la función simplificada: solo abre el link y hace clic en enviar
-            success = self._send_simple_whatsapp(device, link, wa_package)
-            
-            # Actualizar contadores
-            if success:
-                self.sent_count += 1
-            else:
-                self.failed_count += 1
-            self.current_index = task_idx
-            self.root.after(0, self.update_stats)
-            
-            return success
-
-        for bucle_num in range(num_bucles):
-            if self.should_stop: break
-            self.log(f"\n--- BUCLE {bucle_num + 1}/{num_bucles} (SIMULTÁNEO) ---", 'success')
-
-            for num_idx, numero in enumerate(self.manual_inputs_numbers):
-                while self.is_paused and not self.should_stop:
-                    time.sleep(0.1)
-                
-                if self.should_stop: break
-                
-                self.log(f"\n>>> Número {num_idx + 1}/{total_numeros}: {numero} <<<", 'info')
-
-                # Para cada tipo de WhatsApp (primero Business, luego Normal según config)
-                for wa_name, wa_package in whatsapp_apps:
-                    if self.should_stop: break
-                    
-                    self.log(f"[{wa_name}] Enviando desde {num_devices} dispositivos SIMULTÁNEAMENTE...", 'info')
-                    
-                    # Usar ThreadPoolExecutor para enviar desde TODOS los dispositivos a la vez
-                    with ThreadPoolExecutor(max_workers=num_devices) as executor:
-                        futures = []
-                        for device in active_devices:
-                            task_counter[0] += 1
-                            future = executor.submit(
-                                execute_send,
-                                device,
-                                wa_package,
-                                numero,
-                                task_counter[0]
-                            )
-                            futures.append(future)
-                        
-                        # Esperar a que todos terminen
-                        for future in as_completed(futures):
-                            try:
-                                future.result()
-                            except Exception as e:
-                                self.log(f"Error en thread: {e}", 'error')
-                    
-                    if self.should_stop: break
-                    self.log(f"[{wa_name}] Lote completado", 'success')
-                    
-                    # Delay entre tipos de WhatsApp (Business -> Normal)
-                    if wa_package != whatsapp_apps[-1][1]:  # Si no es el último tipo
-                        delay = random.uniform(2, 4)
-                        self.log(f"⏳ Esperando {delay:.1f}s...", 'info')
-                        self._controlled_sleep(delay)
-                
-                if self.should_stop: break
-                
-                # Delay entre números
-                if num_idx < total_numeros - 1:
-                    delay = random.uniform(self.fidelizado_send_delay_min.get(), self.fidelizado_send_delay_max.get())
-                    self.log(f"⏳ Esperando {delay:.1f}s antes del siguiente número...", 'info')
-                    self._controlled_sleep(delay)
-            
-            if self.should_stop: break
-            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-
-        self.log(f"\nModo Números Manual SIMULTÁNEO finalizado", 'success')
-    
-    def _get_filtered_devices(self, silent=False):
-        """
-        Filtra self.devices según el tipo de WhatsApp seleccionado.
-        Devuelve una lista de series de dispositivos a utilizar.
-        """
-        whatsapp_mode = self.whatsapp_mode.get()
-
-        if whatsapp_mode == "Ambas":
-            if not silent:
-                self.log("Modo 'Ambas' seleccionado, usando todos los dispositivos.", 'info')
-            return self.devices
-
-        def _log(msg, level='info'):
-            if not silent:
-                self.log(msg, level)
-
-        if not self.detected_phone_lines:
-            inferred_lines = self._infer_lines_from_installed_apps(log_errors=not silent)
-            if inferred_lines:
-                allowed_serials = {line['device'] for line in inferred_lines if line['type'] == ("WhatsApp" if whatsapp_mode == "Normal" else "WhatsApp Business")}
-                filtered_devices = [device for device in self.devices if device in allowed_serials]
-                if filtered_devices:
-                    _log("No se detectaron números, se usarán las apps instaladas para filtrar dispositivos.", 'info')
-                    return filtered_devices
-
-            _log("No se han detectado líneas de WhatsApp. No se puede filtrar. Usando todos los dispositivos.", 'warning')
-            return self.devices
-
-        target_type = "WhatsApp" if whatsapp_mode == "Normal" else "WhatsApp Business"
-
-        allowed_serials = {line['device'] for line in self.detected_phone_lines if line['type'] == target_type}
-
-        filtered_devices = [device for device in self.devices if device in allowed_serials]
-
-        _log(f"Filtrando por '{whatsapp_mode}'. Dispositivos a usar: {len(filtered_devices)} de {len(self.devices)}", 'info')
-
-        return filtered_devices
-
-    def _get_whatsapp_apps_to_use(self):
-        """
-        Retorna una lista de tuplas (nombre, package) según la selección del usuario.
-        Opciones: Business, Normal, Ambas (Business + Normal), Todas (Business + Normal + Normal con cambio de cuenta)
-        """
-        wa_mode = self.whatsapp_mode.get()
-        
-        if wa_mode == "Normal":
-            return [("Normal", "com.whatsapp")]
-        elif wa_mode == "Business":
-            return [("Business", "com.whatsapp.w4b")]
-        elif wa_mode == "Ambas":
-            return [("Business", "com.whatsapp.w4b"), ("Normal", "com.whatsapp")]
-        else:  # "Todas"
-            # Business + Normal (cuenta 1) + Normal (cuenta 2 después de cambio automático)
-            return [("Business", "com.whatsapp.w4b"), ("Normal", "com.whatsapp"), ("Normal", "com.whatsapp")]
-    
-    
-    def _send_to_target_with_whatsapp(self, device, target_link, wa_name, wa_package, mensaje, task_counter):
-        """
-        Envía un mensaje a un target, gestionando la conexión de uiautomator2 y usando el método de envío unificado.
-        """
-        # Conectar con uiautomator2 al inicio de la tarea
-        ui_device = None
-        try:
-            ui_device = u2.connect(device)
-            ui_device.unlock()
-        except Exception as e:
-            self.log(f"No se pudo conectar uiautomator2 a {device}: {e}", "warning")
-            ui_device = None
-
-        # Llamar a send_msg, que ahora contiene toda la lógica de envío y fallback
-        success = self.send_msg(device, target_link, task_counter, self.total_messages, message_to_send=mensaje, whatsapp_package=wa_package, ui_device=ui_device)
-        
-        if success:
-            self.sent_count += 1
-        else:
-            self.failed_count += 1
-        self.root.after(0, self.update_stats)
-        
-        # Si es Normal y el modo es "Todas", ejecutar el cambio de cuenta DESPUÉS de enviar
-        # IMPORTANTE: Si se envió audio, restablecer el contador para que la siguiente cuenta no lo envíe
-        # a menos que le toque aleatoriamente.
-        if wa_name == "Normal" and self.whatsapp_mode.get() == "Todas":
-            self.log(f"[{device}] Cerrando WhatsApp Normal después de enviar...", 'info')
-            close_cmd = ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp']
-            self._run_adb_command(close_cmd, timeout=5)
-            time.sleep(1)
-            
-            self.log(f"[{device}] Reabriendo WhatsApp Normal...", 'info')
-            open_cmd = ['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main']
-            self._run_adb_command(open_cmd, timeout=5)
-            time.sleep(3)  # Esperar 3 segundos para que WhatsApp se abra completamente
-            
-            self.log(f"[{device}] Cambiando de cuenta...", 'info')
-            self._switch_account_for_device(device, delay=0.2)
-            time.sleep(4)
-            
-            self.log(f"[{device}] Cerrando WhatsApp Normal después de cambiar cuenta...", 'info')
-            close_cmd = ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp']
-            self._run_adb_command(close_cmd, timeout=5)
-            time.sleep(1)
-            
-            self.log(f"[{device}] Reabriendo WhatsApp Normal con nueva cuenta...", 'info')
-            open_cmd = ['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main']
-            self._run_adb_command(open_cmd, timeout=5)
-            time.sleep(2)
-
-            # Resetear pending audio para la nueva cuenta si no está habilitado globalmente
-            # o si la lógica de 'una cuenta a la vez' estaba causando repeticiones
-        
-        return True
-    
-    def run_mixto_dual_whatsapp_thread(self):
-        """
-        Lógica de envío para MODO MIXTO con 3 variantes.
-        Variante 1: G1→N1→G2→N2 (alternar 1 a 1)
-        Variante 2: G1→G2→N1→G3→G4→N2 (2 grupos por número)
-        Variante 3: G1→G2→G3→N1→G4→G5→G6→N2 (3 grupos por número)
-        
-        Los grupos y números se repiten en bucle si hay menos de los necesarios.
-        Todas las líneas (dispositivos) siguen la misma secuencia.
-        """
-        # --- FILTRADO DE DISPOSITIVOS ---
-        active_devices = self._get_filtered_devices()
-        if not active_devices:
-            self.log("No hay dispositivos que cumplan con el filtro seleccionado.", "error")
-            self.root.after(0, lambda: messagebox.showerror("Error", "No se encontraron dispositivos que cumplan con el filtro de WhatsApp seleccionado.", parent=self.root))
-            return
-        # --- FIN FILTRADO ---
-
-        num_devices = len(active_devices)
-        num_grupos = len(self.manual_inputs_groups)
-        num_numeros = len(self.manual_inputs_numbers)
-        num_bucles = self.manual_loops
-        variant = self.mixto_variant.get()
-        
-        if len(self.manual_messages_numbers) < 1:
-            self.log("Error: Modo Mixto requiere al menos 1 mensaje cargado.", "error")
-            messagebox.showerror("Error", "Debes cargar al menos 1 archivo de mensajes para el modo mixto.", parent=self.root)
-            return
-        
-        # Usar índice de inicio aleatorio
-        mensaje_index = self.mensaje_start_index
-        total_mensajes = len(self.manual_messages_numbers)
-        task_counter = 0
-        whatsapp_apps = self._get_whatsapp_apps_to_use()
-        
-        variant_names = {1: "1:1", 2: "2:1", 3: "3:1"}
-        self.log(f"Modo Mixto (Variante {variant} - {variant_names[variant]}): {num_bucles} ciclo(s), {num_grupos} grupo(s), {num_numeros} número(s), {num_devices} dispositivo(s)", 'info')
-        self.log(f"WhatsApp: {self.whatsapp_mode.get()}", 'info')
-        self.log(f"Total de envíos: {self.total_messages}", 'info')
-        
-        for ciclo in range(num_bucles):
-            if self.should_stop: break
-            self.log(f"\n--- CICLO {ciclo + 1}/{num_bucles} ---", 'info')
-            
-            # Crear lista de targets según la variante
-            targets = []
-            
-            if variant == 1:
-                # Variante 1: G1→N1→G2→N2 (alternar 1 a 1)
-                max_len = max(num_grupos, num_numeros)
-                for i in range(max_len):
-                    grupo_idx = i % num_grupos
-                    numero_idx = i % num_numeros
-                    targets.append(('grupo', grupo_idx, self.manual_inputs_groups[grupo_idx]))
-                    targets.append(('numero', numero_idx, self.manual_inputs_numbers[numero_idx]))
-                    
-            elif variant == 2:
-                # Variante 2: G1→G2→N1→G3→G4→N2 (2 grupos por número)
-                grupo_idx = 0
-                for num_idx in range(num_numeros):
-                    # Añadir 2 grupos
-                    for _ in range(2):
-                        targets.append(('grupo', grupo_idx % num_grupos, self.manual_inputs_groups[grupo_idx % num_grupos]))
-                        grupo_idx += 1
-                    # Añadir 1 número
-                    targets.append(('numero', num_idx, self.manual_inputs_numbers[num_idx]))
-                # Si sobran grupos, continuar añadiendo en bucle
-                if grupo_idx < num_grupos:
-                    remaining = num_grupos - grupo_idx
-                    for _ in range(remaining):
-                        targets.append(('grupo', grupo_idx % num_grupos, self.manual_inputs_groups[grupo_idx % num_grupos]))
-                        grupo_idx += 1
-                        
-            elif variant == 3:
-                # Variante 3: G1→G2→G3→N1→G4→G5→G6→N2 (3 grupos por número)
-                grupo_idx = 0
-                for num_idx in range(num_numeros):
-                    # Añadir 3 grupos
-                    for _ in range(3):
-                        targets.append(('grupo', grupo_idx % num_grupos, self.manual_inputs_groups[grupo_idx % num_grupos]))
-                        grupo_idx += 1
-                    # Añadir 1 número
-                    targets.append(('numero', num_idx, self.manual_inputs_numbers[num_idx]))
-                # Si sobran grupos, continuar añadiendo en bucle
-                if grupo_idx < num_grupos:
-                    remaining = num_grupos - grupo_idx
-                    for _ in range(remaining):
-                        targets.append(('grupo', grupo_idx % num_grupos, self.manual_inputs_groups[grupo_idx % num_grupos]))
-                        grupo_idx += 1
-            
-            # Procesar cada target en la secuencia
-            for target_type, target_idx, target_value in targets:
-                if self.should_stop: break
-                
-                tipo_str = "Grupo" if target_type == 'grupo' else "Número"
-                if target_type == 'grupo':
-                    self.log(f"\n=== GRUPO {target_idx + 1}/{num_grupos}: {target_value[:50]}... ===", 'info')
-                else:
-                    self.log(f"\n=== NÚMERO {target_idx + 1}/{num_numeros}: +549{target_value} ===", 'info')
-                
-                # Por cada dispositivo (todas las líneas procesan la misma secuencia)
-                for device in self.devices:
-                    if self.should_stop: break
-                    
-                    # Por cada WhatsApp (Normal, Business, o Ambos)
-                    for wa_idx, (wa_name, wa_package) in enumerate(whatsapp_apps):
-                        if self.should_stop: break
-                        
-                        task_counter += 1
-                        self.current_index = task_counter
-                        self.root.after(0, self.update_stats)
-                        
-                        # Obtener mensaje rotativo
-                        mensaje = self.manual_messages_numbers[mensaje_index % total_mensajes]
-                        mensaje_index += 1
-                        
-                        # Construir link según tipo
-                        if target_type == 'grupo':
-                            target_link = target_value
-                        else:
-                            target_link = f"https://wa.me/549{target_value}"
-                        
-                        # Enviar usando la función auxiliar
-                        success = self._send_to_target_with_whatsapp(
-                            device, target_link, wa_name, wa_package, mensaje, task_counter
-                        )
-                        
-                        # Pausa entre WhatsApps si hay más de uno y es Business (primero)
-                        if success and len(whatsapp_apps) > 1 and wa_idx == 0:
-                            wait_between = self.wait_between_messages.get()
-                            if wait_between > 0:
-                                self.log(f"Esperando {wait_between}s antes del siguiente WhatsApp...", 'info')
-                                elapsed = 0
-                                while elapsed < wait_between and not self.should_stop:
-                                    while self.is_paused and not self.should_stop: time.sleep(0.1)
-                                    if self.should_stop: break
-                                    time.sleep(0.1)
-                                    elapsed += 0.1
-                        
-                        time.sleep(0.5)  # Pequeña pausa entre envíos
-                
-                if self.should_stop: break
-                self.log(f"\n=== {tipo_str} {target_idx + 1} completado ===", 'success')
-            
-            if self.should_stop: break
-            self.log(f"\n--- CICLO {ciclo + 1} completado ---", 'success')
-        
-        self.log(f"\nModo Mixto (Variante {variant}) finalizado", 'success')
-
-    def run_uno_a_uno_thread(self):
-        """
-        Lógica de envío para MODO NÚMEROS - UNO A UNO.
-        Las líneas detectadas se emparejan aleatoriamente y conversan entre sí.
-        Se repite según la configuración de Bucles y Ciclos.
-        """
-        self.log("Iniciando MODO NÚMEROS (Uno a uno)...", 'info')
-        if len(self.detected_phone_lines) < 2:
-            self.log("Se necesitan al menos 2 líneas de WhatsApp para este modo.", 'error')
-            messagebox.showerror("Error", "Se necesitan al menos 2 líneas de WhatsApp detectadas para el modo 'Uno a uno'.", parent=self.root)
-            return
-
-        lines = self.detected_phone_lines.copy()
-        num_lines = len(lines)
-        num_bucles = self.manual_loops_var.get()
-        num_ciclos = self.manual_cycles_var.get() # NUEVO
-        
-        task_counter = 0
-        mensaje_index = self.mensaje_start_index
-        total_mensajes_lib = len(self.manual_messages_numbers)
-
-        # Bucle externo para los Bucles
-        for bucle_num in range(num_bucles):
-            if self.should_stop: break
-            self.log(f"\n--- INICIANDO BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-
-            # Bucle interno para los Ciclos
-            for ciclo_num in range(num_ciclos):
-                if self.should_stop: break
-                self.log(f"\n--- Ciclo {ciclo_num + 1}/{num_ciclos} (dentro del Bucle {bucle_num + 1}) ---", 'info')
-
-                random.shuffle(lines)
-
-                # Manejar número impar de líneas
-                excluded = None
-                current_lines = lines.copy()
-                if num_lines % 2 != 0:
-                    excluded = current_lines.pop()
-                    self.log(f"Número impar de líneas. {excluded['number']} quedará fuera de este ciclo.", 'warning')
-
-                # Crear parejas
-                pairs = []
-                for i in range(0, len(current_lines), 2):
-                    pairs.append((current_lines[i], current_lines[i+1]))
-
-                self.log(f"Se formaron {len(pairs)} parejas para este ciclo.", 'info')
-
-                for i, (line_a, line_b) in enumerate(pairs):
-                    if self.should_stop: break
-                    self.log(f"\n=== Pareja {i+1}/{len(pairs)}: {line_a['number']} <-> {line_b['number']} ===", 'info')
-
-                    # Conversación de ida y vuelta
-                    # A -> B
-                    task_counter += 1
-                    mensaje_ida = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
-                    link_ida = f"https://wa.me/{line_b['number'].replace('+', '')}?text={urllib.parse.quote(mensaje_ida, safe='')}"
-                    self.run_single_task(
-                        line_a['device'],
-                        link_ida,
-                        None,
-                        task_counter,
-                        whatsapp_package=line_a['package'],
-                        activity_info={'from': line_a['number'], 'to': line_b['number']}
-                    )
-                    if self.should_stop: break
-
-                    # B -> A
-                    task_counter += 1
-                    mensaje_vuelta = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
-                    link_vuelta = f"https://wa.me/{line_a['number'].replace('+', '')}?text={urllib.parse.quote(mensaje_vuelta, safe='')}"
-                    self.run_single_task(
-                        line_b['device'],
-                        link_vuelta,
-                        None,
-                        task_counter,
-                        whatsapp_package=line_b['package'],
-                        activity_info={'from': line_b['number'], 'to': line_a['number']}
-                    )
-
-            if self.should_stop: break
-            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-
-    def run_uno_a_muchos_thread(self):
-        """
-        Lógica de envío para MODO NÚMEROS - UNO A MUCHOS.
-        Cada línea detectada conversa con todas las demás, una sola vez por par.
-        """
-        self.log("Iniciando MODO NÚMEROS (Uno a muchos)...", 'info')
-        if len(self.detected_phone_lines) < 2:
-            self.log("Se necesitan al menos 2 líneas de WhatsApp para este modo.", 'error')
-            messagebox.showerror("Error", "Se necesitan al menos 2 líneas de WhatsApp detectadas para el modo 'Uno a muchos'.", parent=self.root)
-            return
-
-        lines = self.detected_phone_lines.copy()
-        num_lines = len(lines)
-        num_bucles = self.manual_loops_var.get()
-
-        task_counter = 0
-        mensaje_index = self.mensaje_start_index
-        total_mensajes_lib = len(self.manual_messages_numbers)
-
-        for bucle_num in range(num_bucles):
-            if self.should_stop: break
-            self.log(f"\n--- BUCLE {bucle_num + 1}/{num_bucles} ---", 'info')
-
-            # Crear todas las parejas únicas
-            pairs = []
-            for i in range(num_lines):
-                for j in range(i + 1, num_lines):
-                    pairs.append((lines[i], lines[j]))
-
-            self.log(f"Se formaron {len(pairs)} parejas únicas para este bucle.", 'info')
-
-            for i, (line_a, line_b) in enumerate(pairs):
-                if self.should_stop: break
-                self.log(f"\n=== Conversación {i+1}/{len(pairs)}: {line_a['number']} <-> {line_b['number']} ===", 'info')
-
-                # Conversación de ida y vuelta
-                # A -> B
-                task_counter += 1
-                mensaje_ida = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
-                link_ida = f"https://wa.me/{line_b['number'].replace('+', '')}?text={urllib.parse.quote(mensaje_ida, safe='')}"
-                self.run_single_task(
-                    line_a['device'],
-                    link_ida,
-                    None,
-                    task_counter,
-                    whatsapp_package=line_a['package'],
-                    activity_info={'from': line_a['number'], 'to': line_b['number']}
-                )
-                if self.should_stop: break
-
-                # B -> A
-                task_counter += 1
-                mensaje_vuelta = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
-                link_vuelta = f"https://wa.me/{line_a['number'].replace('+', '')}?text={urllib.parse.quote(mensaje_vuelta, safe='')}"
-                self.run_single_task(
-                    line_b['device'],
-                    link_vuelta,
-                    None,
-                    task_counter,
-                    whatsapp_package=line_b['package'],
-                    activity_info={'from': line_b['number'], 'to': line_a['number']}
-                )
-    
-    def run_uno_a_muchos_simultaneous_thread(self):
-        """
-        Lógica de envío SIMULTÁNEO para MODO NÚMEROS - UNO A MUCHOS.
-        Usa ThreadPoolExecutor para garantizar ejecución paralela real.
-        """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        
-        self.log("Iniciando MODO NÚMEROS (Uno a muchos) - SIMULTÁNEO...", 'info')
-        if len(self.detected_phone_lines) < 2:
-            self.log("Se necesitan al menos 2 líneas de WhatsApp para este modo.", 'error')
-            messagebox.showerror("Error", "Se necesitan al menos 2 líneas de WhatsApp detectadas.", parent=self.root)
-            return
-
-        lines = self.detected_phone_lines.copy()
-        num_lines = len(lines)
-        num_bucles = self.manual_loops_var.get()
-        
-        # Obtener la cantidad de dispositivos físicos únicos
-        unique_devices = list(set(line['device'] for line in lines))
-        num_devices_phys = len(unique_devices)
-        self.log(f"Dispositivos físicos únicos: {num_devices_phys}", 'info')
-
-        # Separar líneas por tipo de WhatsApp
-        business_lines = [line for line in lines if line.get('type') == 'WhatsApp Business']
-        normal_lines = [line for line in lines if line.get('type') == 'WhatsApp']
-        
-        self.log(f"Líneas detectadas: {len(business_lines)} Business, {len(normal_lines)} Normal", 'info')
-
-        task_counter = [0]  # Usar lista para mutabilidad en closure
-        mensaje_index = [self.mensaje_start_index]
-        total_mensajes_lib = len(self.manual_messages_numbers)
-
-        def execute_send(sender_device, sender_package, sender_number, target_number, task_idx):
-            """Función que ejecuta un envío. Corre en un thread del pool."""
-            mensaje = self.manual_messages_numbers[mensaje_index[0] % total_mensajes_lib]
-            mensaje_index[0] += 1
-            
-            link = f"https://wa.me/{target_number.replace('+', '')}?text={urllib.parse.quote(mensaje, safe='')}"
-            activity_info = {'from': sender_number, 'to': target_number}
-            
-            self.run_single_task(
-                sender_device, 
-                link, 
-                None, 
-                task_idx, 
-                whatsapp_package=sender_package, 
-                activity_info=activity_info, 
-                skip_delay=True
-            )
-            return True
-
-        for bucle_num in range(num_bucles):
-            if self.should_stop: break
-            self.log(f"\n--- BUCLE {bucle_num + 1}/{num_bucles} (SIMULTÁNEO) ---", 'success')
-
-            for target_idx, target_line in enumerate(lines):
-                while self.is_paused and not self.should_stop:
-                    time.sleep(0.1)
-                
-                if self.should_stop: break
-                
-                self.log(f"\n>>> Destino {target_idx + 1}/{num_lines}: {target_line['number']} <<<", 'info')
-                
-                # --- PASO 1: Todos los Business envían a este destino ---
-                business_senders = [line for line in business_lines if line['number'] != target_line['number']]
-                if business_senders:
-                    self.log(f"[BUSINESS] Enviando {len(business_senders)} mensajes SIMULTÁNEAMENTE...", 'info')
-                    
-                    # Usar ThreadPoolExecutor para ejecución paralela real
-                    with ThreadPoolExecutor(max_workers=len(business_senders)) as executor:
-                        futures = []
-                        for sender in business_senders:
-                            task_counter[0] += 1
-                            future = executor.submit(
-                                execute_send,
-                                sender['device'],
-                                sender['package'],
-                                sender['number'],
-                                target_line['number'],
-                                task_counter[0]
-                            )
-                            futures.append(future)
-                        
-                        # Esperar a que todos terminen
-                        for future in as_completed(futures):
-                            try:
-                                future.result()
-                            except Exception as e:
-                                self.log(f"Error en thread: {e}", 'error')
-                    
-                    if self.should_stop: break
-                    self.log(f"[BUSINESS] Completado", 'success')
-                    
-                    # Pequeño delay entre Business y Normal
-                    normal_senders = [line for line in normal_lines if line['number'] != target_line['number']]
-                    if normal_senders:
-                        delay = random.uniform(2, 4)
-                        self.log(f"⏳ Esperando {delay:.1f}s antes de Normal...", 'info')
-                        self._controlled_sleep(delay)
-                
-                if self.should_stop: break
-                
-                # --- PASO 2: Todos los Normal envían a este destino ---
-                normal_senders = [line for line in normal_lines if line['number'] != target_line['number']]
-                if normal_senders:
-                    self.log(f"[NORMAL] Enviando {len(normal_senders)} mensajes SIMULTÁNEAMENTE...", 'info')
-                    
-                    # Usar ThreadPoolExecutor para ejecución paralela real
-                    with ThreadPoolExecutor(max_workers=len(normal_senders)) as executor:
-                        futures = []
-                        for sender in normal_senders:
-                            task_counter[0] += 1
-                            future = executor.submit(
-                                execute_send,
-                                sender['device'],
-                                sender['package'],
-                                sender['number'],
-                                target_line['number'],
-                                task_counter[0]
-                            )
-                            futures.append(future)
-                        
-                        # Esperar a que todos terminen
-                        for future in as_completed(futures):
-                            try:
-                                future.result()
-                            except Exception as e:
-                                self.log(f"Error en thread: {e}", 'error')
-                    
-                    if self.should_stop: break
-                    self.log(f"[NORMAL] Completado", 'success')
-                
-                if self.should_stop: break
-                self.log(f">>> Destino {target_idx + 1}/{num_lines} finalizado", 'success')
-                
-                # Delay entre destinos
-                if target_idx < num_lines - 1:
-                    delay = random.uniform(self.fidelizado_send_delay_min.get(), self.fidelizado_send_delay_max.get())
-                    self.log(f"⏳ Esperando {delay:.1f}s antes del siguiente destino...", 'info')
-                    self._controlled_sleep(delay)
-            
-            if self.should_stop: break
-            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-
-        self.log(f"\nModo Números (Uno a muchos) SIMULTÁNEO finalizado", 'success')
-
-    def run_numeros_manual_thread(self):
-        """
-        Lógica de envío para MODO NÚMEROS MANUAL.
-        Envía mensajes a los números cargados manualmente en la caja de texto.
-        Todos los teléfonos (primero Business, luego Normal) hablan al primer número,
-        luego hacen la pausa correspondiente y siguen con el número 2.
-        
-        LÓGICA SIMPLIFICADA:
-        1. Abrir link wa.me con mensaje incluido
-        2. Esperar que cargue el chat
-        3. Hacer clic en botón enviar
-        """
-        self.log("Iniciando MODO NÚMEROS MANUAL...", 'info')
-        
-        numeros = self.manual_inputs_numbers
-        if not numeros:
-            self.log("Error: No hay números cargados.", 'error')
-            messagebox.showerror("Error", "No hay números cargados.", parent=self.root)
-            return
-        
-        if not self.manual_messages_numbers:
-            self.log("Error: No hay mensajes cargados.", 'error')
-            messagebox.showerror("Error", "No hay mensajes cargados.", parent=self.root)
-            return
-        
-        # Obtener dispositivos filtrados
-        active_devices = self._get_filtered_devices()
-        if not active_devices:
-            self.log("No hay dispositivos que cumplan con el filtro seleccionado.", "error")
-            self.root.after(0, lambda: messagebox.showerror("Error", "No se encontraron dispositivos que cumplan con el filtro de WhatsApp seleccionado.", parent=self.root))
-            return
-        
-        num_numeros = len(numeros)
-        num_bucles = self.manual_loops_var.get()
-        mensaje_index = self.mensaje_start_index
-        total_mensajes_lib = len(self.manual_messages_numbers)
-        task_counter = 0
-        
-        # Construir lista de workers en el orden correcto (Business primero, luego Normal)
-        workers = self._get_ordered_workers(active_devices)
-        num_workers = len(workers)
-        
-        self.log(f"Modo Números Manual: {num_bucles} bucle(s), {num_numeros} números, {num_workers} workers", 'info')
-        
-        # --- Bucle principal ---
-        for bucle_num in range(num_bucles):
-            if self.should_stop: break
-            self.log(f"\n--- INICIANDO BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-            
-            # Por cada número
-            for idx_numero, numero in enumerate(numeros):
-                if self.should_stop: break
-                
-                # Normalizar el número
-                clean_numero = ''.join(filter(str.isdigit, numero))
-                if not clean_numero:
-                    self.log(f"Número inválido ignorado: {numero}", 'warning')
-                    continue
-                
-                self.log(f"\n=== NÚMERO {idx_numero + 1}/{num_numeros}: {clean_numero} ===", 'info')
-                
-                # Por cada worker (todos los teléfonos, Business primero luego Normal)
-                for worker_idx, (device, wa_name, wa_package) in enumerate(workers):
-                    if self.should_stop: break
-                    
-                    # Verificar pausa
-                    while self.is_paused and not self.should_stop:
-                        time.sleep(0.1)
-                    if self.should_stop: break
-                    
-                    task_counter += 1
-                    self.current_index = task_counter
-                    self.root.after(0, self.update_stats)
-                    
-                    # Obtener mensaje rotativo
-                    mensaje = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]
-                    mensaje_index += 1
-                    
-                    # Construir link de WhatsApp (el mensaje va incluido en el link)
-                    if len(clean_numero) == 10:  # Número local argentino
-                        wa_link = f"https://wa.me/549{clean_numero}?text={urllib.parse.quote(mensaje, safe='')}"
-                    else:
-                        wa_link = f"https://wa.me/{clean_numero}?text={urllib.parse.quote(mensaje, safe='')}"
-                    
-                    self.log(f"[{device}] ({wa_name}) -> {clean_numero}", 'info')
-                    
-                    # === ENVÍO SIMPLIFICADO ===
-                    success = self._send_simple_whatsapp(device, wa_link, wa_package)
-                    
-                    if success:
-                        self.sent_count += 1
-                        self.log(f"[{device}] ({wa_name}) -> {clean_numero} ✓", 'success')
-                    else:
-                        self.failed_count += 1
-                        self.log(f"[{device}] ({wa_name}) -> {clean_numero} ✗", 'error')
-                    
-                    self.root.after(0, self.update_stats)
-                
-                # Pausa entre números (solo si no es el último número)
-                if idx_numero < num_numeros - 1 and not self.should_stop:
-                    delay = random.uniform(self.fidelizado_send_delay_min.get(), self.fidelizado_send_delay_max.get())
-                    self.log(f"⏳ Esperando {delay:.1f}s antes del siguiente número...", 'info')
-                    self._controlled_sleep(delay)
-            
-            if self.should_stop: break
-            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-        
-        self.log(f"\nModo Números Manual finalizado", 'success')
-
-    def _send_simple_whatsapp(self, device, wa_link, wa_package):
-        """
-        Envío simplificado de WhatsApp:
-        1. Abrir el link (ya tiene el mensaje incluido)
-        2. Esperar que cargue el chat
-        3. Hacer clic en el botón enviar
-        
-        SIN verificación de texto, SIN reintentos complejos, SIN toques extra.
-        """
-        try:
-            # 1. Conectar uiautomator2
-            try:
-                ui_device = u2.connect(device)
-                ui_device.unlock()
-            except Exception as e:
-                self.log(f"[{device}] No se pudo conectar: {e}", 'error')
-                return False
-            
-            # 2. Abrir el link de WhatsApp
-            open_args = ['-s', device, 'shell', 'am', 'start', '-a', 'android.intent.action.VIEW', 
-                        '-d', f'"{wa_link}"', '-p', wa_package]
-            
-            if not self._run_adb_command(open_args, timeout=15):
-                self.log(f"[{device}] No se pudo abrir el chat", 'error')
-                return False
-            
-            # 3. Esperar que cargue el chat (tiempo configurable)
-            wait_time = max(3, int(self.wait_after_open.get()))
-            self._controlled_sleep(wait_time)
-            
-            if self.should_stop:
-                return False
-            
-            # 4. Buscar el botón de enviar (el mensaje ya está pre-cargado en el link)
-            send_button = self._locate_message_send_button(ui_device, is_sms=False, wait_timeout=3)
-            
-            if not send_button:
-                self.log(f"[{device}] No se encontró el botón de enviar", 'error')
-                return False
-            
-            # 5. Hacer clic en enviar
-            try:
-                send_button.click()
-                self._controlled_sleep(1.0)  # Pequeña pausa para que se envíe
-                return True
-            except Exception as e:
-                self.log(f"[{device}] Error al hacer clic en enviar: {e}", 'error')
-                return False
-            
-        except Exception as e:
-            self.log(f"[{device}] Error en envío: {e}", 'error')
-            return False
-
-    
-    def _get_ordered_workers(self, active_devices):
-        """
-        Genera la lista de 'workers' (Device, Name, Package) en el orden solicitado:
-        1. Todos los dispositivos en Business (si aplica)
-        2. Todos los dispositivos en Normal (si aplica)
-        """
-        workers = []
-        mode = self.whatsapp_mode.get()
-
-        # Primero Business
-        if mode in ["Business", "Ambas", "Todas"]:
-            for device in active_devices:
-                workers.append((device, "WhatsApp Business", "com.whatsapp.w4b"))
-
-        # Luego Normal
-        if mode in ["Normal", "Ambas", "Todas"]:
-            for device in active_devices:
-                workers.append((device, "WhatsApp Normal", "com.whatsapp"))
-
-        return workers
-
-    def run_grupos_simultaneous_thread(self):
-        """
-        Lógica de envío SIMULTÁNEO para MODO GRUPOS.
-        Asigna grupos a workers y ejecuta en tandas paralelas respetando los dispositivos físicos.
-        """
-        # --- FILTRADO DE DISPOSITIVOS ---
-        active_devices = self._get_filtered_devices()
-        if not active_devices:
-            self.log("No hay dispositivos que cumplan con el filtro seleccionado.", "error")
-            self.root.after(0, lambda: messagebox.showerror("Error", "No se encontraron dispositivos que cumplan con el filtro de WhatsApp seleccionado.", parent=self.root))
-            return
-
-        num_devices_phys = len(active_devices)
-        grupos = self.manual_inputs_groups
-        num_grupos = len(grupos)
-        num_bucles = self.manual_loops_var.get()
-
-        if len(self.manual_messages_groups) < 1:
-            self.log("Error: Modo Grupos requiere al menos 1 mensaje cargado.", "error")
-            messagebox.showerror("Error", "Debes cargar al menos 1 archivo de mensajes.", parent=self.root)
-            return
-
-        # Construir lista de workers
-        workers = self._get_ordered_workers(active_devices)
-        num_workers = len(workers)
-
-        self.log(f"Modo Grupos Simultáneo: {num_bucles} bucle(s), {num_grupos} grupos, {num_workers} workers", 'info')
-
-        # Indices
-        mensaje_index = self.mensaje_start_index
-        total_mensajes_lib = len(self.manual_messages_groups)
-        task_counter = 0
-
-        # --- Bucle principal ---
-        for bucle_num in range(num_bucles):
-            if self.should_stop: break
-            self.log(f"\n--- INICIANDO BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-
-            # Crear lista de tareas (Grupo, Worker)
-            tasks = []
-            for i, grupo in enumerate(grupos):
-                # Aplicar rotación basada en el número de bucle para evitar repetición
-                worker_idx = (i + bucle_num) % num_workers
-                worker = workers[worker_idx]
-                tasks.append((grupo, worker))
-
-            # Procesar en tandas de tamaño = num_devices_phys
-            # Como workers alterna dispositivos, tomar N tareas debería usar N dispositivos distintos (idealmente)
-            batch_size = num_devices_phys
-
-            for i in range(0, len(tasks), batch_size):
-                if self.should_stop: break
-
-                batch_tasks = tasks[i : i + batch_size]
-                self.log(f"\n>>> Iniciando Tanda {i // batch_size + 1} ({len(batch_tasks)} tareas) <<<", 'info')
-
-                threads = []
-                for grupo_link, (device, wa_name, wa_package) in batch_tasks:
-                    if self.should_stop: break
-                    task_counter += 1
-
-                    # Mensaje rotativo
-                    mensaje = self.manual_messages_groups[mensaje_index % total_mensajes_lib]
-                    mensaje_index += 1
-
-                    def worker_func(dev, link, msg, t_idx, pkg, w_name):
-                        self.log(f"[{dev}] -> Grupo {link.split('/')[-1][:10]} ({w_name})", 'info')
-                        self.run_single_task(dev, link, msg, t_idx, whatsapp_package=pkg, skip_delay=True)
-
-                        # Forzar cierre (Ctrl+8 style) tras el envío en este modo
-                        self.log(f"[{dev}] Cerrando apps (Ctrl+8)...", 'info')
-                        self.close_all_apps(dev)
-
-                        # Lógica cambio cuenta "Todas"
-                        if w_name == "WhatsApp Normal" and self.whatsapp_mode.get() == "Todas":
-                             self._switch_account_for_device(dev, delay=0.2)
-
-                    t = threading.Thread(target=worker_func, args=(device, grupo_link, mensaje, task_counter, wa_package, wa_name))
-                    threads.append(t)
-                    t.start()
-
-                for t in threads:
-                    t.join()
-
-                if self.should_stop: break
-                self.log(f">>> Tanda finalizada", 'success')
-
-                # Delay entre tandas
-                if i + batch_size < len(tasks):
-                    delay = random.uniform(self.fidelizado_send_delay_min.get(), self.fidelizado_send_delay_max.get())
-                    self.log(f"⏳ Esperando {delay:.1f}s...", 'info')
-                    self._controlled_sleep(delay)
-
-            if self.should_stop: break
-            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-
-        self.log(f"\nModo Grupos Simultáneo finalizado", 'success')
-
-    def run_grupos_dual_whatsapp_thread(self):
-        """
-        Lógica de envío para MODO GRUPOS (Secuencial).
-        Asigna grupos 1-a-1 a workers (Dispositivo + App) en orden round-robin.
-        """
-        # --- FILTRADO DE DISPOSITIVOS ---
-        active_devices = self._get_filtered_devices()
-        if not active_devices:
-            self.log("No hay dispositivos que cumplan con el filtro seleccionado.", "error")
-            self.root.after(0, lambda: messagebox.showerror("Error", "No se encontraron dispositivos que cumplan con el filtro de WhatsApp seleccionado.", parent=self.root))
-            return
-        # --- FIN FILTRADO ---
-
-        num_devices = len(active_devices)
-        grupos = self.manual_inputs_groups
-        num_grupos = len(grupos)
-        num_bucles = self.manual_loops_var.get()
-
-        if len(self.manual_messages_groups) < 1:
-            self.log("Error: Modo Grupos requiere al menos 1 mensaje cargado.", "error")
-            messagebox.showerror("Error", "Debes cargar al menos 1 archivo de mensajes.", parent=self.root)
-            return
-
-        # Construir lista de workers
-        workers = self._get_ordered_workers(active_devices)
-        num_workers = len(workers)
-
-        self.log(f"Modo Grupos Secuencial: {num_bucles} bucle(s), {num_grupos} grupos, {num_workers} workers ({num_devices} dispositivos)", 'info')
-        self.log(f"Orden de asignación: {[f'{d}-{n}' for d,n,p in workers]}", 'info')
-
-        # Indices
-        mensaje_index = self.mensaje_start_index
-        total_mensajes_lib = len(self.manual_messages_groups)
-        task_counter = 0
-
-        # --- Bucle principal ---
-        for bucle_num in range(num_bucles):
-            if self.should_stop: break
-            self.log(f"\n--- INICIANDO BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-
-            # Iterar grupos y asignar round-robin
-            for idx_grupo, grupo_link in enumerate(grupos):
-                if self.should_stop: break
-
-                # Determinar worker con rotación basada en bucle
-                worker_idx = (idx_grupo + bucle_num) % num_workers
-                worker = workers[worker_idx]
-                device, wa_name, wa_package = worker
-
-                grupo_display = grupo_link.split('chat.whatsapp.com/')[-1][:10] if 'chat.whatsapp.com' in grupo_link else str(idx_grupo+1)
-                self.log(f"\n=== GRUPO {idx_grupo + 1}/{num_grupos} -> {device} ({wa_name}) ===", 'info')
-
-                task_counter += 1
-
-                # Obtener mensaje rotativo
-                mensaje = self.manual_messages_groups[mensaje_index % total_mensajes_lib]
-                mensaje_index += 1
-
-                # Ejecutar envío
-                success = self.run_single_task(
-                    device, grupo_link, mensaje, task_counter, whatsapp_package=wa_package
-                )
-
-                # Lógica de cambio de cuenta para el modo "TODAS" (Solo si es Normal)
-                if wa_name == "WhatsApp Normal" and self.whatsapp_mode.get() == "Todas":
-                    self.log(f"[{device}] Cerrando WhatsApp Normal después de enviar...", 'info')
-                    self._run_adb_command(['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp'], timeout=5)
-                    time.sleep(1)
-
-                    self.log(f"[{device}] Reabriendo WhatsApp Normal...", 'info')
-                    self._run_adb_command(['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main'], timeout=5)
-                    time.sleep(3)
-
-                    self.log(f"[{device}] Cambiando de cuenta...", 'info')
-                    self._switch_account_for_device(device, delay=0.2)
-                    time.sleep(4)
-
-                    self.log(f"[{device}] Cerrando WhatsApp Normal después de cambiar cuenta...", 'info')
-                    self._run_adb_command(['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp'], timeout=5)
-                    time.sleep(1)
-
-                    self.log(f"[{device}] Reabriendo WhatsApp Normal con nueva cuenta...", 'info')
-                    self._run_adb_command(['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main'], timeout=5)
-                    time.sleep(2)
-
-            if self.should_stop: break
-            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
-
-        self.log(f"\nModo Grupos finalizado", 'success')
-
-    def run_unirse_grupos(self, grupos):
-        """
-        Función para unirse automáticamente a grupos.
-        NUEVA LÓGICA CON THREADING (EJECUCIÓN PARALELA):
-        Por cada grupo:
-          - TODOS los dispositivos se unen SIMULTÁNEAMENTE según la selección de WhatsApp
-        Proceso:
-          - Presiona DPAD_DOWN 3 veces (con pausas de 2s)
-          - Presiona ENTER
-          - Presiona BACK para salir
-        """
-        try:
-            self._enter_task_mode()
-            num_devices = len(self.devices)
-            num_grupos = len(grupos)
-
-            # Obtener qué WhatsApp usar
-            wa_mode = self.whatsapp_mode.get()
-
-            # Determinar cuántas uniones totales habrá
-            if wa_mode == "Todas":
-                total_uniones = num_grupos * num_devices * 3
-            elif wa_mode == "Ambas":
-                total_uniones = num_grupos * num_devices * 2
-            else:
-                total_uniones = num_grupos * num_devices
-
-            self.log(f"\n=== UNIRSE A GRUPOS (MODO PARALELO) ===", 'info')
-            self.log(f"Grupos: {num_grupos}", 'info')
-            self.log(f"Dispositivos: {num_devices}", 'info')
-            self.log(f"WhatsApp: {wa_mode}", 'info')
-            self.log(f"Total de uniones: {total_uniones}", 'info')
-
-            total = num_grupos * num_devices * 2
-
-            # Función auxiliar para unirse a un grupo en un dispositivo
-            def unirse_a_grupo_device(device, grupo_link, whatsapp_package, whatsapp_name):
-                """Ejecuta el proceso completo de unión para un dispositivo."""
-                try:
-                    if self.should_stop:
-                        return False
-
-                    # Verificar pausa
-                    while self.is_paused and not self.should_stop:
-                        time.sleep(0.1)
-                    if self.should_stop:
-                        return False
-
-                    self.log(f"[{device}] Uniéndose por {whatsapp_name}...", 'info')
-
-                    # Abrir grupo
-                    open_args = ['-s', device, 'shell', 'am', 'start', '-a', 'android.intent.action.VIEW',
-                                '-d', grupo_link, '-p', whatsapp_package]
-
-                    if not self._run_adb_command(open_args, timeout=20):
-                        self.log(f"[{device}] Fallo al abrir grupo en {whatsapp_name}", "error")
-                        return False
-
-                    # Esperar 1 segundo (reducido de 2 para acelerar)
-                    time.sleep(1)
-
-                    if self.should_stop:
-                        return False
-
-                    # Presionar DPAD_DOWN 3 veces
-                    for i in range(3):
-                        if self.should_stop:
-                            return False
-                        down_args = ['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_DPAD_DOWN']
-                        self._run_adb_command(down_args, timeout=5)
-                        time.sleep(1) # Reducido de 2s
-
-                    if self.should_stop:
-                        return False
-
-                    # Presionar ENTER
-                    enter_args = ['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENTER']
-                    self._run_adb_command(enter_args, timeout=10)
-
-                    # Esperar 1 segundo (reducido de 2s)
-                    time.sleep(1)
-
-                    # Presionar BACK para salir del grupo
-                    back_args = ['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_BACK']
-                    self._run_adb_command(back_args, timeout=10)
-                    self.log(f"[{device}] Presionando BACK para salir...", 'info')
-
-                    # Esperar 0.5 segundos final (reducido de 1s)
-                    time.sleep(0.5)
-
-                    self.log(f"[{device}] Unido a grupo por {whatsapp_name}", 'success')
-                    return True
-
-                except Exception as e:
-                    self.log(f"[{device}] Error en unión: {e}", 'error')
-                    return False
-            
-            # Por cada grupo
-            for idx_grupo, grupo_link in enumerate(grupos):
-                if self.should_stop:
-                    break
-                
-                grupo_display = grupo_link[:50] + "..." if len(grupo_link) > 50 else grupo_link
-                self.log(f"\n--- GRUPO {idx_grupo + 1}/{num_grupos}: {grupo_display} ---", 'info')
-                
-                # ===== FASE 1: WHATSAPP BUSINESS (si corresponde) =====
-                if wa_mode == "Business" or wa_mode == "Ambas" or wa_mode == "Todas":
-                    fase_num = 1 if (wa_mode == "Ambas" or wa_mode == "Todas") else 0
-                    if fase_num == 1:
-                        self.log(f"\n>>> FASE 1: Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Business...", 'info')
-                    else:
-                        self.log(f"\n>>> Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Business...", 'info')
-                    
-                    threads_business = []
-                    for device in self.devices:
-                        if self.should_stop:
-                            break
-                        thread = threading.Thread(
-                            target=unirse_a_grupo_device,
-                            args=(device, grupo_link, 'com.whatsapp.w4b', 'WhatsApp Business'),
-                            daemon=True
-                        )
-                        threads_business.append(thread)
-                        thread.start()
-
-                    # Esperar a que TODOS los threads de Business terminen
-                    for thread in threads_business:
-                        thread.join()
-
-                    if fase_num == 1:
-                        self.log(f"\n>>> FASE 1 completada: Todos unidos por WhatsApp Business", 'success')
-                    else:
-                        self.log(f"\n>>> Completado: Todos unidos por WhatsApp Business", 'success')
-                    
-                    if self.should_stop:
-                        break
-                
-                # ===== FASE 2: WHATSAPP NORMAL (si corresponde) =====
-                if wa_mode == "Normal" or wa_mode == "Ambas" or wa_mode == "Todas":
-                    fase_num = 2 if (wa_mode == "Ambas" or wa_mode == "Todas") else 0
-                    if fase_num == 2:
-                        self.log(f"\n>>> FASE 2: Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Normal...", 'info')
-                    else:
-                        self.log(f"\n>>> Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Normal...", 'info')
-
-                    threads_normal = []
-                    for device in self.devices:
-                        if self.should_stop:
-                            break
-                        thread = threading.Thread(
-                            target=unirse_a_grupo_device,
-                            args=(device, grupo_link, 'com.whatsapp', 'WhatsApp Normal'),
-                            daemon=True
-                        )
-                        threads_normal.append(thread)
-                        thread.start()
-
-                    # Esperar a que TODOS los threads de Normal terminen
-                    for thread in threads_normal:
-                        thread.join()
-
-                    if fase_num == 2:
-                        self.log(f"\n>>> FASE 2 completada: Todos unidos por WhatsApp Normal", 'success')
-                    else:
-                        self.log(f"\n>>> Completado: Todos unidos por WhatsApp Normal", 'success')
-
-                    # Si el modo es "Todas", cambiar de cuenta DESPUÉS de unirse con Normal
-                    if wa_mode == "Todas":
-                        self.log(f"\n>>> Cambiando de cuenta en todos los dispositivos...", 'info')
-
-                        for device in self.devices:
-                            if self.should_stop:
-                                break
-
-                            self.log(f"[{device}] Cerrando WhatsApp Normal...", 'info')
-                            close_cmd = ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp']
-                            self._run_adb_command(close_cmd, timeout=5)
-                            time.sleep(1)
-
-                            self.log(f"[{device}] Reabriendo WhatsApp Normal...", 'info')
-                            open_cmd = ['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main']
-                            self._run_adb_command(open_cmd, timeout=5)
-                            time.sleep(3)  # Esperar 3 segundos para que WhatsApp se abra completamente
-
-                            self.log(f"[{device}] Cambiando de cuenta...", 'info')
-                            self._switch_account_for_device(device)
-                            time.sleep(1)
-
-                            self.log(f"[{device}] Cerrando WhatsApp Normal después de cambiar cuenta...", 'info')
-                            close_cmd = ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp']
-                            self._run_adb_command(close_cmd, timeout=5)
-                            time.sleep(1)
-
-                            self.log(f"[{device}] Reabriendo WhatsApp Normal con nueva cuenta...", 'info')
-                            open_cmd = ['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main']
-                            self._run_adb_command(open_cmd, timeout=5)
-                            time.sleep(2)
-
-                        if self.should_stop:
-                            break
-                
-                # ===== FASE 3: WHATSAPP NORMAL 2 (si corresponde) =====
-                if wa_mode == "Todas":
-                    self.log(f"\n>>> FASE 3: Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Normal (cuenta 2)...", 'info')
-
-                    threads_normal2 = []
-                    for device in self.devices:
-                        if self.should_stop:
-                            break
-                        thread = threading.Thread(
-                            target=unirse_a_grupo_device,
-                            args=(device, grupo_link, 'com.whatsapp', 'WhatsApp Normal (cuenta 2)'),
-                            daemon=True
-                        )
-                        threads_normal2.append(thread)
-                        thread.start()
-
-                    # Esperar a que TODOS los threads de Normal 2 terminen
-                    for thread in threads_normal2:
-                        thread.join()
-
-                    self.log(f"\n>>> FASE 3 completada: Todos unidos por WhatsApp Normal (cuenta 2)", 'success')
-                
-                self.log(f"\n=== GRUPO {idx_grupo + 1} completado ===", 'success')
-            
-            self.log(f"\n=== PROCESO DE UNIÓN A GRUPOS FINALIZADO ===", 'success')
-            messagebox.showinfo("Éxito", f"Proceso completado.\n\nSe unieron a {num_grupos} grupo(s) con {num_devices} dispositivo(s).", parent=self.root)
-        finally:
-            self._finalize_sending()
-    
-    def _write_message_with_keyevents(self, device, message):
-        """
-        Escribe un mensaje carácter por carácter usando input text de ADB.
-        Retorna True si tuvo éxito, False si falló.
-        """
-        try:
-            if self.should_stop:
-                return False
-            
-            while self.is_paused and not self.should_stop:
-                time.sleep(0.1)
-            if self.should_stop:
-                return False
-
-            # Escribir carácter por carácter
-            for char in message:
-                if self.should_stop:
-                    return False
-                
-                while self.is_paused and not self.should_stop:
-                    time.sleep(0.1)
-                if self.should_stop:
-                    return False
-                
-                # Escapar el carácter individual
-                if char == ' ':
-                    char_escaped = '%s'
-                elif char in ['\\', '"', "'", '$', '`', '!', '&', '|', ';', '<', '>', 
-                             '(', ')', '[', ']', '{', '}', '*', '?', '#', '~']:
-                    char_escaped = f'\\{char}'
-                else:
-                    char_escaped = char
-                
-                # Enviar el carácter
-                text_args = ['-s', device, 'shell', 'input', 'text', char_escaped]
-
-                if not self._run_adb_command(text_args, timeout=5):
-                    # Si falla un carácter, intentar continuar
-                    self.log(f"Advertencia: fallo al escribir '{char}'", "warning")
-
-            return True
-
-        except Exception as e:
-            self.log(f"Error al escribir mensaje: {e}", 'error')
-            return False
-    
-    def _perform_call(self, device, number, duration):
-        """Realiza una llamada telefónica normal, espera y cuelga."""
-        if self.should_stop: return
-
-        try:
-            # 1. Iniciar llamada
-            cmd_call = ['-s', device, 'shell', 'am', 'start', '-a', 'android.intent.action.CALL', '-d', f'tel:{number}']
-            self._run_adb_command(cmd_call, timeout=10)
-
-            # 2. Esperar duración configurada
-            self.log(f"[{device}] Llamada en curso ({duration}s)...", 'info')
-            self._controlled_sleep(duration)
-
-            if self.should_stop: return
-
-            # 3. Colgar
-            self.log(f"[{device}] Colgando...", 'info')
-            self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENDCALL'], timeout=5)
-
-        except Exception as e:
-            self.log(f"[{device}] Excepción en _perform_call: {e}", 'error')
-
-    def run_bucle_blast_thread_V2(self):
-        """
-        Lógica de envío NUEVA (Modo Bucles G/N Blast V2).
-        Definición de 1 Bucle: Recorrer TODA la lista de G y N.
-        Repetir esto N veces.
-        """
-        num_devices = len(self.devices)
-        num_bucles = self.manual_loops
-        
-        # Crear copias de las listas de tareas
-        group_targets = list(self.manual_inputs_groups)
-        number_targets = list(self.manual_inputs_numbers)
-        group_messages = list(self.manual_messages_groups)
-        number_messages = list(self.manual_messages_numbers)
+        """Envoltorio para iniciar llamadas con opción de programar."""
+        self._open_schedule_dialog(lambda confirm: self._start_calling_impl(confirm=confirm))
 
-        # Índices para rotación de mensajes
-        g_msg_idx = 0
-        n_msg_idx = 0
-        
-        # Contador global de tareas (1-based)
-        task_counter = 0
+    def _start_calling_impl(self, confirm=True):
+        """Inicia el proceso de llamadas masivas (Lógica Interna)."""
+        if not self.raw_data:
+            messagebox.showwarning("Sin datos", "Carga un archivo Excel primero.")
+            return
 
-        if not group_targets or not number_targets or not group_messages or not number_messages:
-            self.log("Error: Modo Bucles Blast requiere Grupos, Números y sus respectivos Mensajes.", "error")
+        # Validar selección de columnas
+        # self.calls_selected_columns ya fue seteado por el popup _on_calls_columns_confirmed
+        if not self.calls_selected_columns:
+            messagebox.showwarning("Sin columnas", "Selecciona al menos una columna de teléfono (Carga el Excel y usa el popup).")
             return
-            
-        # Longitud del "sub-bucle" (la lista de targets más larga)
-        max_len = max(len(group_targets), len(number_targets))
-
-        # --- Funciones helper para rotar mensajes ---
-        def get_next_g_msg():
-            nonlocal g_msg_idx
-            msg = group_messages[g_msg_idx % len(group_messages)]
-            g_msg_idx += 1
-            return msg
-
-        def get_next_n_msg():
-            nonlocal n_msg_idx
-            msg = number_messages[n_msg_idx % len(number_messages)]
-            n_msg_idx += 1
-            return msg
-        # --- Fin helpers ---
-
-        # --- Bucle Principal (N Repeticiones) ---
-        for b in range(num_bucles):
-            if self.should_stop: break
-            rep_num = b + 1
-            self.log(f"--- Iniciando REPETICIÓN {rep_num} / {num_bucles} ---", 'info')
-
-            # --- Bucle Interno (Recorrer todos los targets) ---
-            for i in range(max_len):
-                if self.should_stop: break
-                
-                # --- Etapa 1: Blast de Grupo ---
-                # Target rotativo
-                current_group_target = group_targets[i % len(group_targets)]
-                self.log(f"Repetición {rep_num}, Etapa {i+1}.1: Todos a GRUPO {current_group_target[:40]}...", 'info')
-                
-                for device in self.devices:
-                    if self.should_stop: break
-                    task_counter += 1
-                    msg_g = get_next_g_msg() # Mensaje rotativo
-                    self.run_single_task(device, current_group_target, msg_g, task_counter)
-                
-                if self.should_stop: break # Check entre etapas
 
-                # --- Etapa 2: Blast de Número ---
-                # Target rotativo
-                current_number_target = number_targets[i % len(number_targets)]
-                self.log(f"Repetición {rep_num}, Etapa {i+1}.2: Todos a NÚMERO {current_number_target}", 'info')
-                
-                for device in self.devices:
-                    if self.should_stop: break
-                    task_counter += 1
-                    msg_n = get_next_n_msg() # Mensaje rotativo
-                    wa_link = f"https://wa.me/549{current_number_target}?text={urllib.parse.quote(msg_n, safe='')}"
-                    self.run_single_task(device, wa_link, None, task_counter) # None pork el msg va en el link
-            
-            if self.should_stop: break # Check al final del bucle interno
+        if not self.devices:
+            self.detect_devices()
+            if not self.devices:
+                return
 
-            self.log(f"--- Fin REPETICIÓN {rep_num} ---", 'info')
-    
+        if confirm:
+            if not messagebox.askyesno("Confirmar", "¿Iniciar proceso de llamadas masivas?", parent=self.root):
+                return
+
+        self._enter_task_mode()
+        self._start_run_thread(self.run_calls_thread, prepare=False)
 
     def _finalize_sending(self):
         """Reestablece la UI al finalizar o cancelar el envío."""
         self._unblock_ui_from_task()  # Desbloquear UI
         self.is_running = False
+        self._prune_offline_devices()
 
         if self.sms_mode_active:
             # -- Vista SMS --
@@ -7752,14 +6217,70 @@ class Hermes:
                 if hasattr(self, 'back_to_traditional_btn'):
                     self.back_to_traditional_btn.configure(state=tk.NORMAL)
 
+    def _snapshot_engine_config(self):
+        """Copia las variables Tk a un EngineConfig inmutable (llamar desde el hilo de la UI)."""
+        loops = getattr(self, 'manual_loops_var', None)
+        cycles = getattr(self, 'manual_cycles_var', None)
+        return EngineConfig(
+            adb_path=self.adb_path.get(),
+            delay_min=self.delay_min.get(),
+            delay_max=self.delay_max.get(),
+            wait_after_open=self.wait_after_open.get(),
+            wait_after_first_enter=self.wait_after_first_enter.get(),
+            wait_between_messages=self.wait_between_messages.get(),
+            pause_sends_count=self.pause_sends_count.get(),
+            pause_sends_delay_min=self.pause_sends_delay_min.get(),
+            pause_sends_delay_max=self.pause_sends_delay_max.get(),
+            traditional_send_mode=self.traditional_send_mode.get(),
+            traditional_simultaneous_mode=self.traditional_simultaneous_mode.get(),
+            sms_delay_min=self.sms_delay_min.get(),
+            sms_delay_max=self.sms_delay_max.get(),
+            sms_simultaneous_mode=self.sms_simultaneous_mode.get(),
+            sms_enable_call=self.sms_enable_call.get(),
+            sms_call_duration=self.sms_call_duration.get(),
+            auto_join_groups=self.auto_join_groups.get(),
+            fidelizado_send_delay_min=self.fidelizado_send_delay_min.get(),
+            fidelizado_send_delay_max=self.fidelizado_send_delay_max.get(),
+            fidelizado_numeros_mode=self.fidelizado_numeros_mode.get(),
+            simultaneous_mode=self.simultaneous_mode.get(),
+            whatsapp_mode=self.whatsapp_mode.get(),
+            mixto_variant=self.mixto_variant.get(),
+            manual_loops=loops.get() if loops is not None else 1,
+            manual_cycles=cycles.get() if cycles is not None else 1,
+            calls_delay_min=self.calls_delay_min.get(),
+            calls_delay_max=self.calls_delay_max.get(),
+            calls_duration=self.calls_duration.get(),
+            calls_whatsapp_mode=self.calls_whatsapp_mode.get(),
+            calls_simultaneous_mode=self.calls_simultaneous_mode.get(),
+            trace_enabled=self.trace_enabled.get(),
+        )
+
+    # --- EngineObserver: eventos del motor (llegan desde los hilos de envío) ---
+    # Ninguno toca Tk: se encolan y los atiende _drain_engine_events en el hilo de la UI
+    def on_log(self, message, level='info'):
+        self.log(message, level)
+
+    def on_error(self, title, message):
+        self.engine_events.put(('error', title, message))
+
+    def on_info(self, title, message):
+        self.engine_events.put(('info', title, message))
+
+    def on_finished(self, cancelled):
+        self.engine_events.put(('finished', cancelled, self.run_error))
+
+    def _current_whatsapp_mode(self):
+        # Durante un envío se usa la instantánea; desde la UI, la selección actual
+        return self.run_config.whatsapp_mode if self.is_running else self.whatsapp_mode.get()
+
+    def on_progress(self, current, total, sent, failed):
+        self.engine_events.put(('progress',))
+
     def _enter_task_mode(self):
         """Configura la UI para un estado de 'tarea en ejecución'."""
-        self.is_running = True
-        self.is_paused = False
-        self.should_stop = False
-        self.sent_count = 0
-        self.failed_count = 0
-        self.current_index = 0
+        # Los hilos de envío leen esta instantánea, no las variables Tk
+        self.run_config = self._snapshot_engine_config()
+        self._reset_run_stats()
         self.start_time = datetime.now()
 
         # Actualizar UI
@@ -8111,9 +6632,20 @@ class Hermes:
         """Ejecuta la tarea: Detectar dispositivos -> callback(confirm=False)."""
         self.log("⏰ Hora programada alcanzada. Iniciando...", 'info')
 
-        # 1. Detectar Dispositivos (Force Wakeup)
+        # 1. Detectar Dispositivos (Force Wakeup). Si el tracker está activo la lista ya está
+        # al día y solo hace falta despertar las pantallas.
         self.log("Detectando y despertando dispositivos...", 'info')
-        self.detect_devices(silent=True) # Modificado para aceptar silent
+        if self.device_tracker is not None and self.device_tracker.is_alive():
+            def wake_device(device):
+                try:
+                    self.adb_pool.run(device, 'input keyevent KEYCODE_WAKEUP', timeout=5)
+                except Exception:
+                    pass
+
+            for device in self.devices:
+                threading.Thread(target=wake_device, args=(device,), daemon=True).start()
+        else:
+            self.detect_devices(silent=True) # Modificado para aceptar silent
 
         if not self.devices:
             self.log("Error: No se detectaron dispositivos al momento de iniciar.", 'error')
@@ -8127,702 +6659,9 @@ class Hermes:
     # --- send_msg (MODIFICADO para loguear device)
     # --- ################################################################## ---
     
-    def _switch_whatsapp_account(self, device):
-        """
-        Cambia de cuenta en WhatsApp Normal.
-        
-        Args:
-            device: ID del dispositivo
-        """
-        self.log(f"[{device}] Cambiando de cuenta en WhatsApp Normal...", 'info')
-        
-        # 1) Cerrar todo
-        close_commands = [
-            ['-s', device, 'shell', 'am', 'force-stop', 'com.android.settings'],
-            ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp'],
-            ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp.w4b']
-        ]
-        for cmd in close_commands:
-            self._run_adb_command(cmd, timeout=3)
-        
-        # 2) Abrir WhatsApp y cambiar de cuenta
-        self._run_adb_command(['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main'], timeout=10)
-        time.sleep(3)  # Esperar a que abra
-        
-        # Navegar al menú de cambio de cuenta
-        for _ in range(2):
-            self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_DPAD_UP'], timeout=3)
-            time.sleep(0.2)
-        
-        self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_DPAD_RIGHT'], timeout=3)
-        time.sleep(0.2)
-        self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENTER'], timeout=3)
-        time.sleep(0.2)
-        
-        for _ in range(7):
-            self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_TAB'], timeout=3)
-            time.sleep(0.05)  # Más rápido: 0.05s entre TABs
-        
-        self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENTER'], timeout=3)
-        
-        # Esperar 3 segundos con WhatsApp abierto para que carguen los mensajes
-        self.log(f"[{device}] Esperando 3s para que carguen los mensajes...", 'info')
-        time.sleep(3)
-        
-        # 3) Cerrar todo nuevamente
-        for cmd in close_commands:
-            self._run_adb_command(cmd, timeout=3)
-        
-        self.log(f"[{device}] Cambio de cuenta completado", 'success')
     
-    def _run_adb_command(self, args, timeout=10):
-        """Ejecuta un comando ADB y maneja errores comunes."""
-        # --- FIX: Añadir bucle de pausa ---
-        while self.is_paused and not self.should_stop:
-            time.sleep(0.1)
-        if self.should_stop:
-            return False # Indicar que la tarea fue cancelada
-        # --- FIN FIX ---
-
-        adb = self.adb_path.get()
-        full_args = [adb] + args # Construye la lista completa de argumentos
-
-        # Ocultar ventana de consola de ADB
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        startupinfo.wShowWindow = subprocess.SW_HIDE
-
-        try:
-            # Ejecutar SIEMPRE como lista, NUNCA con shell=True si hay rutas
-            result = subprocess.run(full_args, capture_output=True, text=True, timeout=timeout, startupinfo=startupinfo, check=False, encoding='utf-8', errors='ignore')
-            if result.returncode != 0 and result.stderr:
-                # Limpiar errores comunes
-                stderr_clean = result.stderr.strip()
-                if "Usage: input" in stderr_clean:
-                    stderr_clean = "Error Uso Input (argumentos inválidos)"
-                elif "NullPointerException" in stderr_clean:
-                    stderr_clean = "NullPointerException (procesando texto)"
-                elif "Killed" in stderr_clean:
-                    stderr_clean = "Proceso Killed (mensaje largo?)"
-                elif "unknown command" in stderr_clean:
-                     stderr_clean = "Comando ADB desconocido"
-                elif "device unauthorized" in stderr_clean:
-                     stderr_clean = "Dispositivo no autorizado (revisa el teléfono)"
-                elif "device not found" in stderr_clean:
-                     stderr_clean = "Dispositivo no encontrado (desconectado?)"
-
-                self.log(f"Error ADB: {stderr_clean}", 'error')
-                return False # Indicar fallo
-            elif result.returncode != 0:
-                 self.log(f"Error ADB (código {result.returncode}, sin stderr)", 'error')
-                 return False # Indicar fallo
-            return True # Indicar éxito
-        except subprocess.TimeoutExpired:
-            self.log("Timeout en comando ADB", 'error')
-            return False
-        except Exception as e:
-            self.log(f"Error inesperado ejecutando ADB: {e}", 'error')
-            return False
-
-    def _get_current_focus(self, device):
-        """Obtiene la salida de mCurrentFocus para verificar si la app abrió."""
-        try:
-            adb = self.adb_path.get()
-            # Ejecutamos directamente, adb shell concatena los argumentos
-            cmd = [adb, '-s', device, 'shell', 'dumpsys window | grep mCurrentFocus']
-
-            si = subprocess.STARTUPINFO()
-            si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            si.wShowWindow = subprocess.SW_HIDE
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=4,
-                startupinfo=si,
-                encoding='utf-8',
-                errors='ignore'
-            )
-            return result.stdout.strip()
-        except Exception:
-            return ""
-
-    def _controlled_sleep(self, duration):
-        """Realiza una espera respetando pausas y cancelaciones."""
-        try:
-            duration = max(0.0, float(duration))
-        except (TypeError, ValueError):
-            duration = 0.0
-        elapsed = 0.0
-        while elapsed < duration and not self.should_stop:
-            while self.is_paused and not self.should_stop:
-                time.sleep(0.1)
-            if self.should_stop:
-                break
-            time.sleep(0.1)
-            elapsed += 0.1
-
-    def _locate_chat_field(self, ui_device, wait_timeout=0.1):
-        """Busca el campo de texto de la conversación actual de forma eficiente."""
-        if ui_device is None:
-            return None
-
-        selectors = [
-            # 1. Por resourceId (el más fiable)
-            dict(resourceId="com.whatsapp:id/entry"),
-            dict(resourceId="com.whatsapp.w4b:id/entry"),
-            # 2. Por className (debe ser un EditText)
-            dict(className="android.widget.EditText"),
-            # 3. Por descripción de accesibilidad (fallback)
-            dict(description="Mensaje"),
-            dict(description="Message"),
-            dict(descriptionMatches="(?i).*mensaje.*"),
-            dict(descriptionMatches="(?i).*message.*"),
-        ]
-
-        for selector in selectors:
-            try:
-                candidate = ui_device(**selector)
-                if candidate.wait(timeout=wait_timeout):
-                    info = candidate.info or {}
-                    bounds = info.get('bounds') or {}
-                    if not bounds or bounds.get('left') == bounds.get('right'):
-                        continue
-
-                    self.log(f"✓ Campo de texto encontrado con selector: {selector}", "info")
-                    return candidate
-            except Exception:
-                continue
-
-        return None
-
-    def _locate_message_send_button(self, ui_device, is_sms=False, wait_timeout=2):
-        """Busca el botón de enviar dentro de la conversación actual."""
-        if ui_device is None:
-            return None
-
-        if is_sms:
-            selectors = [
-                # Google Messages
-                dict(resourceId="com.google.android.apps.messaging:id/send_message_button"),
-                dict(resourceId="com.google.android.apps.messaging:id/send_message_button_icon"),
-                # Samsung Messages
-                dict(resourceId="com.samsung.android.messaging:id/send_button"),
-                # Selectores AMPLIOS (RCS, SMS, Enviar)
-                # Confiamos en el filtro de posición de send_msg para evitar botones de arriba
-                dict(textMatches="(?i).*(sms|enviar|send|rcs).*"),
-                dict(descriptionMatches="(?i).*(sms|enviar|send|rcs).*"),
-                dict(contentDescriptionMatches="(?i).*(sms|enviar|send|rcs).*"),
-                # Selectores específicos de iconos de Google Messages (candado, avión, etc)
-                dict(resourceIdMatches="(?i).*send_message_button.*"),
-                dict(resourceIdMatches="(?i).*send_button.*"),
-            ]
-        else:
-            selectors = [
-                dict(description="Enviar"),
-                dict(description="Enviar mensaje"),
-                dict(description="Send"),
-                dict(text="Enviar"),
-                dict(text="Enviar mensaje"),
-                dict(text="Send"),
-                dict(resourceId="com.whatsapp:id/send"),
-                dict(resourceId="com.whatsapp.w4b:id/send"),
-                dict(resourceId="com.whatsapp:id/send_button"),
-                dict(resourceId="com.whatsapp.w4b:id/send_button"),
-            ]
- 
-        for attempt in range(2):
-            for selector in selectors:
-                # Verificar cancelación/pausa entre cada intento de selector 
-
-                if self.should_stop:
-                    return None
-
-                while self.is_paused and not self.should_stop:
-                    time.sleep(0.1)
-
-                try:
-                    candidate = ui_device(**selector)
-                    if candidate.exists:
-                        info = candidate.info
-                        bounds = info.get('bounds')
-                        if bounds:
-                            # Filtro estricto de posición (evita botones de arriba)
-                            w_size = ui_device.window_size()
-                            h = w_size[1]
-                            top = bounds.get('top', 0)
-                            if top < (h * 0.3): # Ignorar 30% superior
-                                continue
-                        return candidate
-                except:
-                    continue
-
-        # --- FALLBACK GEOMÉTRICO (DESACTIVADO PARA SMS) ---
-        # El usuario solicitó explícitamente no hacer clicks en falso ni adivinar posiciones.
-        # Si no se encuentra el botón por selector específico, se asume fallo.
-        return None
-
-    def _locate_join_group_button(self, ui_device, wait_timeout=0.2):
-        """Busca el botón de unirse/aceptar en pantallas de invitación a grupos."""
-        if ui_device is None:
-            return None
-
-        selectors = [
-            dict(textMatches="(?i)unirme"),
-            dict(textMatches="(?i)unirse"),
-            dict(textMatches="(?i)unir(me)?(\\s+al)?\\s+grupo"),
-            dict(textMatches="(?i)join\\s*(group)?"),
-            dict(textMatches="(?i)acept(ar|ar\\s+invitaci[oó]n)?"),
-            dict(textMatches="(?i)accept"),
-            dict(descriptionMatches="(?i)unirme"),
-            dict(descriptionMatches="(?i)unirse"),
-            dict(descriptionMatches="(?i)join\\s*(group)?"),
-            dict(descriptionMatches="(?i)acept(ar|ar\\s+invitaci[oó]n)?"),
-            dict(descriptionMatches="(?i)accept"),
-        ]
-
-        for selector in selectors:
-            try:
-                candidate = ui_device(**selector)
-                if candidate.wait(timeout=wait_timeout):
-                    info = candidate.info or {}
-                    bounds = info.get('bounds') or {}
-                    if bounds and bounds.get('left') != bounds.get('right'):
-                        return candidate
-            except Exception:
-                continue
-
-        return None
-
-    def _wait_for_chat_ready(self, ui_device, wait_time, expected_package=None, is_sms=False, allow_group_join_check=False, require_send_button=True):
-        """
-        Espera a que WhatsApp/SMS esté listo para escribir y devuelve los objetos de la UI.
-        Retorna (chat_field, send_button) si tiene éxito, o (None, None) si falla.
-
-        Args:
-            require_send_button: Si es False, permite retornar éxito si se encuentra el chat_field
-                                 aunque no se encuentre el botón de envío (útil para grupos con micrófono).
-        """
-        if ui_device is None:
-            return None, None
-
-        deadline = time.time() + max(0, wait_time)
-        poll_interval = 0.2  # Intervalo de sondeo rápido
-        chat_field = None
-        send_button = None
-        deadline_extended = False  # Flag para asegurar que solo extendemos el tiempo una vez
-        join_attempted = False
-        join_required_detected = False
-
-        while not self.should_stop:
-            # Check for pause
-            while self.is_paused and not self.should_stop:
-                time.sleep(0.1)
-
-            if self.should_stop:
-                return None, None
-
-            # Si ya encontramos ambos elementos, el trabajo está hecho.
-            if chat_field and send_button:
-                break
-
-            # Si no requerimos botón de envío y ya tenemos el campo, también terminamos
-            if not require_send_button and chat_field:
-                break
-
-            # Detectar pantallas de invitación a grupos antes de buscar el chat listo
-            if allow_group_join_check and not is_sms:
-                join_button = self._locate_join_group_button(ui_device, wait_timeout=poll_interval)
-                if join_button:
-                    join_required_detected = True
-                    if not self.auto_join_groups.get():
-                        self.log("✗ Se detectó pantalla de unión a grupo. Auto-unirse desactivado.", 'error')
-                        return None, None
-
-                    if not join_attempted:
-                        try:
-                            join_button.click()
-                            join_attempted = True
-                            self.log("✓ Pantalla de unión detectada. Haciendo clic para unirse...", 'info')
-                            deadline += 6  # Dar tiempo extra tras unirse
-                            self._controlled_sleep(0.6)
-                            continue
-                        except Exception as e:
-                            self.log(f"✗ No se pudo hacer clic en 'Unirme/Aceptar': {e}", 'error')
-                            return None, None
-
-            # Buscar el campo de texto si aún no lo tenemos
-            if not chat_field:
-                chat_field = self._locate_chat_field(ui_device, wait_timeout=poll_interval)
-
-            # Buscar el botón de envío si aún no lo tenemos (solo si se requiere o si queremos intentarlo igual)
-            if not send_button:
-                button = self._locate_message_send_button(
-                    ui_device, is_sms=is_sms, wait_timeout=poll_interval
-                )
-                if button:
-                    send_button = button
-
-            # Comprobar si hemos superado el tiempo de espera
-            if time.time() > deadline:
-                # LÓGICA DE ESPERA INTELIGENTE:
-                # Si hemos encontrado solo uno de los dos elementos y aún no hemos extendido
-                # el tiempo, lo extendemos unos segundos más para darle una oportunidad.
-                if (chat_field or send_button) and not deadline_extended:
-                    self.log("✓ Se encontró un elemento del chat, extendiendo la espera 4s...", 'info')
-                    deadline += 4  # Extender por 4 segundos
-                    deadline_extended = True
-                    continue  # Saltar al siguiente ciclo con el nuevo tiempo límite
-
-                # Si no se encontró nada o si ya extendimos el tiempo, nos rendimos.
-                break
 
-            # Si aún no hemos encontrado lo necesario, esperamos un poco
-            if not (chat_field and (send_button or not require_send_button)):
-                self._controlled_sleep(poll_interval)
 
-        # Evaluar el resultado final
-        success_condition = (chat_field and send_button) or (not require_send_button and chat_field)
-
-        if success_condition:
-            msg_extra = " (sin botón envío)" if not send_button else ""
-            self.log(f"✓ Conversación lista{msg_extra}.", 'success')
-            return chat_field, send_button
-
-        # Si falla, registrar el motivo específico
-        if not chat_field and not send_button:
-            if join_required_detected:
-                self.log("✗ Chat no listo: Se detectó pantalla de unión a grupo pero no se completó.", 'error')
-            else:
-                self.log("✗ Chat no listo: No se encontró ni el campo de texto ni el botón de envío.", 'error')
-        elif not chat_field:
-            self.log("✗ Chat no listo: Se encontró el botón de envío, pero no el campo de texto.", 'error')
-        elif require_send_button and not send_button:
-            self.log("✗ Chat no listo: Se encontró el campo de texto, pero no el botón de envío.", 'error')
-
-        return None, None
-
-
-    def send_msg(
-        self,
-        device,
-        link,
-        i,
-        total,
-        message_to_send=None,
-        whatsapp_package="com.whatsapp.w4b",
-        ui_device=None,
-        primary_index=None,
-    ):
-        """Ejecuta los comandos para enviar un único mensaje."""
-        is_group = bool(message_to_send)
-        try:
-            # Asegurar pantalla encendida (Wakeup no apaga si ya está encendido)
-            self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_WAKEUP'], timeout=5)
-            self._controlled_sleep(1.0)
-
-            if not ui_device and not self.sms_mode_active:
-                self.log("✗ Error crítico: la conexión de uiautomator2 no está disponible.", "error")
-                return False
-
-            attempt_links = [link]
-            if primary_index is not None:
-                alternates = self.link_retry_map.get(primary_index, [])
-                if alternates:
-                    attempt_links.extend(alternates)
-
-            total_attempts = len(attempt_links)
-
-            def describe_link(current_link, is_group_flag):
-                lower_link = current_link.lower()
-                if is_group_flag and not lower_link.startswith("https://wa.me/"):
-                    return f"Grupo ({current_link[:40]}...)"
-                if lower_link.startswith("sms:"):
-                    return current_link.split("sms:", 1)[1].split('?')[0]
-                if 'wa.me/' in current_link:
-                    return current_link.split('wa.me/')[1].split('?')[0]
-                return current_link[:50]
-
-            def attempt_send(current_link, attempt_idx, is_group_flag):
-                local_is_sms = current_link.lower().startswith("sms:")
-                num_display = describe_link(current_link, is_group_flag)
-                intento = "Principal" if attempt_idx == 0 else f"Alternativo {attempt_idx}"
-                log_prefix = f"({i}/{total}) → {num_display} [en {device}] ({intento})"
-
-                # --- MODO SMS OPTIMIZADO ---
-                if local_is_sms:
-                    # 1. (Se omite KEYCODE_WAKEUP para evitar interacciones extra en el menú)
-                    # El dispositivo ya fue limpiado por close_all_apps().
-
-                    # 2. Inyectar URL con RETRY (Fix "Pantalla en blanco/Launcher")
-                    open_args_generic = [
-                        '-s', device, 'shell', 'am', 'start',
-                        '-a', 'android.intent.action.VIEW',
-                        '-f', '0x14000000', # FLAG_ACTIVITY_NEW_TASK | FLAG_ACTIVITY_CLEAR_TOP
-                        '-d', f'"{current_link}"'
-                    ]
-
-                    sms_injection_success = False
-                    for retry_idx in range(3):
-                        if self.should_stop: return False, False
-
-                        if retry_idx > 0:
-                            self.log(f"Reintentando inyección SMS ({retry_idx+1}/3)...", 'warning')
-                            # En reintentos, probamos despertar pantalla
-                            self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_WAKEUP'], timeout=2)
-
-                        if not self._run_adb_command(open_args_generic, timeout=15):
-                            self.log(f"{log_prefix} ✗ Error al ejecutar comando de apertura SMS.", 'error')
-
-                        # Esperar un poco para verificar foco
-                        self._controlled_sleep(2.0)
-
-                        # Verificar foco
-                        focus = self._get_current_focus(device).lower()
-                        # Si contiene "launcher", "home" o está vacía, asumimos fallo
-                        if not focus or "launcher" in focus or "home" in focus or "recents" in focus:
-                            self.log(f"Detectado foco en Launcher/Home ({focus[:50]}...). La app no abrió.", 'warning')
-                            continue # Reintentar loop
-
-                        # Si llegamos aquí, NO estamos en el launcher (asumimos éxito)
-                        sms_injection_success = True
-                        break
-                    
-                    if not sms_injection_success:
-                        self.log(f"{log_prefix} ✗ Fallo: El dispositivo se quedó en el Launcher tras 3 intentos.", 'error')
-                        return False, False
-
-                    # 3. Esperar tiempo de estabilización (configurado por usuario)
-                    try:
-                        user_wait = max(1.0, float(self.wait_after_first_enter.get()))
-                    except:
-                        user_wait = 2.0
-
-                    # Restamos los 2s que ya esperamos, si queda algo
-                    remaining_wait = max(0.0, user_wait - 2.0)
-
-                    if remaining_wait > 0:
-                         self.log(f"Esperando {remaining_wait:.1f}s extra...", 'info')
-                         self._controlled_sleep(remaining_wait)
-
-                    if self.should_stop: return False, False
-
-                    # 4. Enviar vía ENTER (KEYCODE_66) - UNA VEZ
-                    self.log(f"Enviando vía ENTER (KEYCODE_66)...", 'info')
-
-                    try:
-                        cmd_enter = ['-s', device, 'shell', 'input', 'keyevent', '66']
-                        self._run_adb_command(cmd_enter, timeout=5)
-                        # Sin segundo enter, sin esperas adicionales innecesarias
-
-                        self.log(f"✓ {log_prefix} :: SMS Enviado (Enter)", 'success')
-                        return True, False
-                    except Exception as e:
-                        self.log(f"Fallo al enviar con Enter: {e}", 'error')
-                        return False, False
-
-                # --- MODO WHATSAPP (Lógica original) ---
-                open_args = ['-s', device, 'shell', 'am', 'start', '-a', 'android.intent.action.VIEW', '-d', f'"{current_link}"']
-                if whatsapp_package:
-                    open_args.extend(['-p', whatsapp_package])
-                if not self._run_adb_command(open_args, timeout=20):
-                    self.log(log_prefix, 'error')
-                    self.log(f"  └─ Motivo: No se pudo abrir el chat.", 'error')
-                    return False, False
-
-                active_package = whatsapp_package
-
-                wait_time = max(0, int(self.wait_after_open.get()))
-                if is_group_flag and "chat.whatsapp.com" in current_link.lower():
-                    wait_time += 5
-
-                # Para grupos (o cuando vamos a escribir texto), el botón de envío puede ser un micrófono al inicio.
-                # No requerimos estrictamente el botón de envío (avión) hasta después de escribir.
-                require_send_btn = not is_group_flag
-
-                chat_field, send_button = self._wait_for_chat_ready(
-                    ui_device,
-                    wait_time,
-                    expected_package=active_package,
-                    is_sms=False,
-                    allow_group_join_check=is_group,
-                    require_send_button=require_send_btn
-                )
-
-                if not chat_field or (require_send_btn and not send_button):
-                    self.log(log_prefix, 'error')
-                    self.log(f"  └─ Motivo: El chat no estuvo listo para enviar (timeout).", 'error')
-                    return False, False
-                if self.should_stop:
-                    return False, False
-
-                msg_to_send = message_to_send
-                if not msg_to_send and not is_group_flag:
-                    try:
-                        if 'text=' in current_link:
-                            msg_to_send = urllib.parse.unquote(current_link.split('text=')[1])
-                    except Exception:
-                        msg_to_send = None
-
-                try:
-                    needs_text_input = is_group_flag
-                    if needs_text_input and msg_to_send is not None:
-                        # --- Lógica robusta anti-audio (Modo Grupo) ---
-
-                        # 1. Descartar el botón encontrado anteriormente (Microfono)
-                        send_button = None
-
-                        # 2. Asegurar el foco
-                        try:
-                            chat_field.click()
-                            self._controlled_sleep(0.3)
-                        except Exception as e:
-                            self.log(f"Advertencia: no se pudo hacer clic en el campo: {e}", "warning")
-
-                        # 3. Ciclo de intento de escritura y verificación
-                        text_verified = False
-
-                        # Intento 1: set_text
-                        try:
-                            chat_field.set_text(msg_to_send)
-                            self._controlled_sleep(0.8) # Esperar a que la UI reaccione
-
-                            # Verificación
-                            curr_text = chat_field.get_text()
-                            if curr_text and len(curr_text.strip()) > 0:
-                                text_verified = True
-                        except Exception:
-                            pass
-
-                        # Intento 2: keyevents (si falló el 1)
-                        if not text_verified:
-                            self.log("Texto no detectado tras set_text. Reintentando con pulsaciones...", "warning")
-                            # Asegurar foco nuevamente
-                            try: chat_field.click()
-                            except: pass
-
-                            self._write_message_with_keyevents(device, msg_to_send)
-                            self._controlled_sleep(1.0)
-
-                            # Verificación final
-                            try:
-                                curr_text = chat_field.get_text()
-                                if curr_text and len(curr_text.strip()) > 0:
-                                    text_verified = True
-                            except:
-                                pass
-
-                        # 4. PUNTO CRÍTICO: Si no hay texto, ABORTAR
-                        if not text_verified:
-                            self.log(log_prefix, 'error')
-                            self.log(f"  └─ Motivo: No se pudo escribir el mensaje en el campo. Se aborta para evitar enviar audio.", 'error')
-                            return False, False
-
-                        # 5. Buscar el botón de enviar (Avión)
-                        # Reintentar varias veces porque el cambio de icono puede tardar
-                        found_send = False
-                        for _ in range(3):
-                            new_send_btn = self._locate_message_send_button(ui_device, is_sms=False, wait_timeout=1)
-                            if new_send_btn:
-                                # Validación extra: Chequear descripción si es posible para evitar micrófono
-                                try:
-                                    desc = (new_send_btn.info.get('contentDescription') or "").lower()
-                                    # Si dice "grabar" o "voice", es peligroso.
-                                    if "grabar" in desc or "voice" in desc or "voz" in desc:
-                                        self.log("Botón detectado como Micrófono. Esperando...", "warning")
-                                        self._controlled_sleep(0.5)
-                                        continue
-                                except:
-                                    pass
-
-                                send_button = new_send_btn
-                                found_send = True
-                                break
-                            self._controlled_sleep(0.5)
-
-                        if not found_send:
-                            self.log(log_prefix, 'error')
-                            self.log("  └─ Motivo: No se encontró el botón de enviar (Avión) tras escribir.", 'error')
-                            return False, False
-
-                    # Usar el send_button (ya sea el original o el re-localizado)
-                    if send_button:
-                        send_button.click()
-                    else:
-                        self.log(log_prefix, 'error')
-                        self.log(f"  └─ Motivo: No se pudo hacer clic (botón de enviar perdido).", 'error')
-                        return False, False
-
-                    self._controlled_sleep(1.0)
-
-                    if self._detect_send_failure(ui_device):
-                        self.log(log_prefix, 'error')
-                        self.log(f"  └─ Motivo: WhatsApp reportó un fallo de envío (mensaje 'No se envió').", 'error')
-                        return False, True
-
-                    self.log(log_prefix, 'success')
-                    self._controlled_sleep(0.6)
-                    return True, False
-
-                except Exception as e:
-                    self.log(log_prefix, 'error')
-                    self.log(f"  └─ Motivo: Error inesperado ({e}).", 'error')
-                    return False, False
-
-            for attempt_idx, current_link in enumerate(attempt_links):
-                if self.should_stop:
-                    return False
-
-                if attempt_idx > 0:
-                    self.log("Intentando con un número alternativo...", 'warning')
-                    self.close_all_apps(device)
-                    if self.should_stop:
-                        return False
-
-                success, should_retry = attempt_send(current_link, attempt_idx, is_group)
-                if success:
-                    return True
-
-                if should_retry and attempt_idx < total_attempts - 1:
-                    continue
-
-                if should_retry and attempt_idx == total_attempts - 1:
-                    self.log("✗ No se pudo enviar el mensaje tras agotar los números disponibles.", 'error')
-                return False
-
-            return False
-
-        except Exception as e:
-            self.log(f"✗ Error crítico en la lógica de envío: {e}", 'error')
-            import traceback
-            traceback.print_exc()
-            return False
-
-    def _detect_send_failure(self, ui_device, timeout=1.0):
-        """Verifica si aparece el mensaje de error de WhatsApp/SMS indicando que no se envió."""
-        failure_selectors = [
-            dict(textMatches="(?i)no se envi[óo]"),
-            dict(descriptionMatches="(?i)no se envi[óo]"),
-            dict(textMatches="(?i)mensaje no enviado"),
-            dict(descriptionMatches="(?i)mensaje no enviado"),
-            dict(textMatches="(?i)reintentar"),
-            dict(descriptionMatches="(?i)reintentar"),
-            dict(resourceIdMatches="(?i).*retry.*"),
-            dict(resourceIdMatches="(?i).*resend.*"),
-        ]
-
-        for selector in failure_selectors:
-            try:
-                node = ui_device(**selector)
-                if timeout:
-                    if node.wait(timeout=timeout):
-                        return True
-                elif node.exists:
-                    return True
-            except Exception:
-                continue
-        return False
     # --- ################################################################## ---
     # --- FIN
     # --- ################################################################## ---
@@ -8977,55 +6816,11 @@ class Hermes:
         self.log("✓ Cambio de cuenta completado en todos los dispositivos", 'success')
         messagebox.showinfo("Completado", f"Cambio de cuenta ejecutado en {len(self.devices)} dispositivo(s).", parent=self.root)
     
-    def _switch_account_for_device(self, device, delay=0.1):
-        """Cambia de cuenta en WhatsApp Normal para un dispositivo específico.
-        
-        Args:
-            device: ID del dispositivo
-            delay: Tiempo de espera entre comandos (default 0.1s para cambio automático rápido)
-        """
-        adb_exe = self.adb_path.get()
-        if not adb_exe or not os.path.exists(adb_exe):
-            self.log(f"Error: No se encontró ADB para cambiar cuenta en {device}", 'error')
-            return False
-        
-        try:
-            commands = [
-                "shell am start -n com.whatsapp/.Main",
-                "shell input keyevent KEYCODE_DPAD_UP",
-                "shell input keyevent KEYCODE_DPAD_UP",
-                "shell input keyevent KEYCODE_DPAD_RIGHT",
-                "shell input keyevent KEYCODE_ENTER",
-                "shell input keyevent KEYCODE_TAB",
-                "shell input keyevent KEYCODE_TAB",
-                "shell input keyevent KEYCODE_TAB",
-                "shell input keyevent KEYCODE_TAB",
-                "shell input keyevent KEYCODE_TAB",
-                "shell input keyevent KEYCODE_TAB",
-                "shell input keyevent KEYCODE_TAB",
-                "shell input keyevent KEYCODE_ENTER"
-            ]
-            
-            for cmd in commands:
-                full_cmd = f'"{adb_exe}" -s {device} {cmd}'
-                subprocess.run(full_cmd, shell=True, capture_output=True, text=True, timeout=5)
-                time.sleep(delay)  # Tiempo configurable según el contexto
-            
-            self.log(f"✓ Cuenta cambiada en {device}", 'success')
-            return True
-            
-        except subprocess.TimeoutExpired:
-            self.log(f"✗ Timeout al cambiar cuenta en {device}", 'error')
-            return False
-        except Exception as e:
-            self.log(f"✗ Error al cambiar cuenta en {device}: {str(e)}", 'error')
-            return False
-
     def _smart_switch_account_on_device(self, device_serial):
         """Lógica inteligente para cambiar de cuenta usando UI Automator."""
         try:
             self.log(f"[{device_serial}] Conectando para cambio inteligente (Usuario: Teléfono ya abierto en WhatsApp)...", 'info')
-            d = u2.connect(device_serial)
+            d = self.u2_registry.get(device_serial)
 
             # NOTA: Se eliminó d.unlock() y d.app_start() por petición del usuario que dejará el teléfono listo.
             # Solo buscamos los 3 puntitos y actuamos.
@@ -9076,7 +6871,6 @@ class Hermes:
         except Exception as e:
             self.log(f"[{device_serial}] Error en smart switch: {e}", 'error')
 
-
     def detect_phone_numbers_thread(self):
         """Inicia la detección de números de teléfono en un hilo separado."""
         if not self.devices:
@@ -9084,42 +6878,6 @@ class Hermes:
             return
         threading.Thread(target=self._detect_and_prepare_phone_lines, args=(True,), daemon=True).start()
 
-    def _infer_lines_from_installed_apps(self, log_errors=True):
-        """Inferir líneas disponibles solo revisando paquetes instalados cuando no hay números detectados."""
-        inferred = []
-        adb_binary = self.adb_path.get() if hasattr(self, 'adb_path') else None
-
-        if not adb_binary or not os.path.exists(adb_binary):
-            return inferred
-
-        for device_serial in self.devices:
-            try:
-                result = subprocess.run(
-                    [adb_binary, '-s', device_serial, 'shell', 'pm', 'list', 'packages'],
-                    capture_output=True,
-                    text=True,
-                    timeout=8,
-                    encoding='utf-8',
-                    errors='ignore'
-                )
-                if result.returncode != 0:
-                    if log_errors:
-                        self.log(f"No se pudo listar paquetes en {device_serial}.", 'warning')
-                    continue
-
-                packages = {line.split(':', 1)[1] for line in result.stdout.splitlines() if line.startswith('package:')}
-
-                if 'com.whatsapp' in packages:
-                    inferred.append({"device": device_serial, "type": "WhatsApp", "number": "(sin detectar)", "package": "com.whatsapp"})
-                if 'com.whatsapp.w4b' in packages:
-                    inferred.append({"device": device_serial, "type": "WhatsApp Business", "number": "(sin detectar)", "package": "com.whatsapp.w4b"})
-
-            except Exception as e:
-                if log_errors:
-                    self.log(f"Error al inferir apps instaladas en {device_serial}: {e}", 'warning')
-
-        return inferred
-
     def _detect_and_prepare_phone_lines(self, show_results_popup=False, auto_confirm=False):
         """
         Detecta todos los números de WA y WA Business en los dispositivos conectados
@@ -9479,9 +7237,8 @@ class Hermes:
         """Usa uiautomator2 para encontrar los números de teléfono en un dispositivo."""
         device_numbers = {"WhatsApp": "No encontrado", "WhatsApp Business": "No encontrado"}
         try:
-            d = u2.connect(device_serial)
             # Desbloquear si es necesario (mejor si el usuario lo hace)
-            d.unlock()
+            d = self.u2_registry.get(device_serial, unlock=True)
 
             # 1. Listar paquetes de WhatsApp según la selección del usuario
             wa_mode = self.whatsapp_mode.get()
@@ -9766,64 +7523,6 @@ class Hermes:
 
         return device_numbers
 
-    def close_all_apps(self, device):
-        """Intenta cerrar todas las aplicaciones de terceros y las apps clave en el dispositivo."""
-        self.log(f"Cerrando todas las apps en {device}...", 'info')
-        
-        try:
-            adb = self.adb_path.get()
-            si = subprocess.STARTUPINFO()
-            si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            si.wShowWindow = subprocess.SW_HIDE
-            
-            # 1. Obtener lista de apps de terceros (-3)
-            # Esto captura cualquier app instalada por el usuario o fabricante que no sea del sistema "core"
-            res = subprocess.run([adb, '-s', device, 'shell', 'pm', 'list', 'packages', '-3'], 
-                               capture_output=True, text=True, startupinfo=si, timeout=5)
-            
-            third_party_packages = []
-            if res.returncode == 0:
-                for line in res.stdout.strip().split('\n'):
-                    if line.startswith('package:'):
-                        pkg = line.replace('package:', '').strip()
-                        # Evitar cerrar el servidor de scrcpy si está corriendo (aunque suele reiniciarse solo)
-                        if "scrcpy" not in pkg.lower():
-                            third_party_packages.append(pkg)
-            
-            # 2. Lista explícita de objetivos comunes (mensajería, ajustes, etc.)
-            targets = [
-                "com.whatsapp.w4b",
-                "com.whatsapp",
-                "com.google.android.googlequicksearchbox",
-                "com.google.android.apps.messaging",
-                "com.samsung.android.messaging",
-                "com.android.mms",
-                "com.google.android.contacts",
-                "com.android.settings",
-                "com.android.chrome",
-                "com.google.android.youtube",
-                "com.facebook.katana",
-                "com.instagram.android"
-            ]
-            
-            # Combinar y eliminar duplicados
-            all_to_close = list(set(third_party_packages + targets))
-            
-            # 3. Ejecutar force-stop para cada una
-            for package in all_to_close:
-                # Usamos shell am force-stop directamente para más velocidad aquí
-                subprocess.Popen([adb, '-s', device, 'shell', 'am', 'force-stop', package],
-                                 startupinfo=si, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-            # 4. Volver a la pantalla de inicio (Home)
-            time.sleep(0.2)
-            subprocess.run([adb, '-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_HOME'],
-                          startupinfo=si, capture_output=True, timeout=3)
-            
-            self.log(f"✓ {device}: Apps cerradas.", 'success')
-            
-        except Exception as e:
-            self.log(f"Error al cerrar apps en {device}: {e}", 'error')
 
     # ==================================================================================
     #                           ASISTENTE DE IA - TALARIA
@@ -9831,8 +7530,9 @@ class Hermes:
     # ==================================================================================
     
     def _init_ai_assistant(self):
-        """Inicializa el asistente de IA y crea la burbuja flotante."""
-        if AIAssistant is None:
+        """Crea las burbujas flotantes; el asistente se construye al usarlo por primera vez."""
+        # Solo se verifica que el módulo exista: importarlo carga los SDK de OpenAI/Gemini
+        if importlib.util.find_spec('ai_assistant') is None:
             self.log("Módulo de IA no disponible", "warning")
             return
         
@@ -9845,6 +7545,21 @@ class Hermes:
             except:
                 pass
         
+        # Crear la burbuja flotante de IA
+        self._setup_ai_bubble()
+        
+        # Crear la burbuja flotante de atajos
+        self._setup_shortcuts_bubble()
+    
+    def _get_ai_assistant(self):
+        """Devuelve el asistente de IA, importándolo y creándolo en el primer uso."""
+        if self.ai_assistant is not None:
+            return self.ai_assistant
+        AIAssistant = _ai_assistant_class()
+        if AIAssistant is None:
+            self.log("Módulo de IA no disponible", "warning")
+            return None
+
         # Inicializar asistente
         adb_path = self.adb_path.get()
 
@@ -9855,15 +7570,11 @@ class Hermes:
         self.ai_assistant = AIAssistant(
             api_key=self.ai_api_key if self.ai_api_key else None,
             adb_path=adb_path,
-            log_callback=thread_safe_log
+            log_callback=thread_safe_log,
+            u2_provider=self.u2_registry.get
         )
-        
-        # Crear la burbuja flotante de IA
-        self._setup_ai_bubble()
-        
-        # Crear la burbuja flotante de atajos
-        self._setup_shortcuts_bubble()
-    
+        return self.ai_assistant
+
     def _setup_ai_bubble(self):
         """Crea el botón flotante (burbuja) en la esquina inferior derecha."""
         # Frame contenedor para la burbuja (siempre visible, sobre todo)
@@ -10282,7 +7993,8 @@ class Hermes:
         self._add_ai_message(user_text, is_user=True)
         
         # Verificar si la IA está configurada
-        if not self.ai_assistant or not self.ai_assistant.is_configured:
+        assistant = self._get_ai_assistant()
+        if not assistant or not assistant.is_configured:
             self._add_ai_message(
                 "⚠️ La IA no está configurada.\n\n"
                 "Por favor, haz clic en ⚙️ para agregar tu API key de OpenAI.\n\n"
@@ -10529,7 +8241,8 @@ class Hermes:
         link_label.bind("<Button-1>", lambda e: os.startfile("https://platform.openai.com/api-keys"))
         
         # Estado actual
-        status_text = "✅ Configurada" if (self.ai_assistant and self.ai_assistant.is_configured) else "❌ No configurada"
+        assistant = self._get_ai_assistant()
+        status_text = "✅ Configurada" if (assistant and assistant.is_configured) else "❌ No configurada"
         status_label = ctk.CTkLabel(
             main_frame,
             text=f"Estado: {status_text}",
@@ -10589,8 +8302,28 @@ class Hermes:
         save_btn.pack(pady=10) # Reduced padding
 
 # --- Main ---
+STARTUP_BUDGET_MS = 1500  # Máximo hasta la primera ventana para 'python Hermes.py --startup-check'
+
+
+def _startup_breakdown(window_ms):
+    """Texto con el tiempo hasta la ventana y los imports ordenados por costo."""
+    parts = ", ".join(f"{name} {ms:.0f} ms" for name, ms in sorted(IMPORT_TIMES_MS.items(), key=lambda kv: -kv[1]))
+    return f"Inicio: ventana en {window_ms:.0f} ms (imports: {parts}; imágenes: {ASSETS.summary()})"
+
+
 def main():
     """Función principal: Configura CTk y abre la app principal."""
+    # '--startup-check [ms]': abre la ventana, mide el arranque y sale con código 1 si se
+    # pasa del presupuesto o si algún módulo diferido se importó antes de tiempo.
+    budget_ms = None
+    if '--startup-check' in sys.argv:
+        pos = sys.argv.index('--startup-check')
+        try:
+            budget_ms = float(sys.argv[pos + 1])
+        except (IndexError, ValueError):
+            budget_ms = float(os.environ.get('HERMES_STARTUP_BUDGET_MS', STARTUP_BUDGET_MS))
+    exit_code = 0
+
     # Configurar apariencia
     ctk.set_appearance_mode("Dark")
     ctk.set_default_color_theme("blue")
@@ -10620,7 +8353,35 @@ def main():
     # Maximizar después de un pequeño delay para evitar problemas de layout
     root.after(100, lambda: root.state('zoomed'))
 
+    def on_first_window():
+        nonlocal exit_code
+        root.update_idletasks()
+        window_ms = (time.perf_counter() - _STARTUP_T0) * 1000
+        summary = _startup_breakdown(window_ms)
+        if budget_ms is None:
+            app.log(summary, 'info')
+            threading.Thread(target=_warm_lazy_imports, daemon=True).start()
+            return
+        eager = [name for name in LAZY_MODULES if name in sys.modules]
+        print(summary)
+        if window_ms > budget_ms:
+            print(f"FALLO: el arranque superó el presupuesto de {budget_ms:.0f} ms")
+            exit_code = 1
+        if eager:
+            print(f"FALLO: módulos diferidos importados al iniciar: {', '.join(eager)}")
+            exit_code = 1
+        root.destroy()
+
+    root.after(0, on_first_window)
     root.mainloop()
 
+    # Cerrar el stream de dispositivos y las sesiones 'adb shell' persistentes
+    if app.device_tracker is not None:
+        app.device_tracker.stop()
+    app.adb_pool.close_all()
+    # Borrar el segmento de log volcado a disco
+    app.log_history.clear()
+    return exit_code
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
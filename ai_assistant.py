@@ -124,11 +124,12 @@ Esta acción permite al agente ver la pantalla, entender qué hay, y actuar paso
 class SmartDeviceController:
     """Controlador INTELIGENTE de dispositivos Android - AGENTE CON IA"""
     
-    def __init__(self, adb_path, log_callback=None, ai_client=None):
+    def __init__(self, adb_path, log_callback=None, ai_client=None, u2_provider=None):
         self.adb_path = adb_path
         self.log = log_callback or print
         self.feedback_callback = None
         self.u2_devices = {}  # Cache de conexiones u2
+        self.u2_provider = u2_provider  # Registro compartido de conexiones u2 (de Hermes), si existe
         self.ai_client = ai_client  # Cliente OpenAI para toma de decisiones
         self.stop_requested = False  # Flag para detener ejecución
         
@@ -165,6 +166,13 @@ class SmartDeviceController:
         if not U2_AVAILABLE:
             return None
         
+        if self.u2_provider:
+            try:
+                return self.u2_provider(device_serial)
+            except Exception as e:
+                self._feedback(f"⚠️ No se pudo conectar u2: {e}", "warning")
+                return None
+        
         if device_serial in self.u2_devices:
             return self.u2_devices[device_serial]
         
@@ -1287,13 +1295,14 @@ Responde SOLO JSON:
 class AIAssistant:
     """Asistente de IA - AGENTE AUTÓNOMO con OpenAI"""
     
-    def __init__(self, api_key=None, adb_path=None, log_callback=None):
+    def __init__(self, api_key=None, adb_path=None, log_callback=None, u2_provider=None):
         self.api_key = api_key
         self.log = log_callback or print
         self.client = None  # Cliente de OpenAI
         self.chat_history = []  # Historial de conversación
         self.is_configured = False
-        self.device_controller = SmartDeviceController(adb_path, log_callback, None) if adb_path else None
+        self.u2_provider = u2_provider
+        self.device_controller = SmartDeviceController(adb_path, log_callback, None, u2_provider) if adb_path else None
         
         if api_key:
             self._init_model()
@@ -1337,14 +1346,14 @@ class AIAssistant:
         """Configura el asistente"""
         self.api_key = api_key
         if adb_path:
-            self.device_controller = SmartDeviceController(adb_path, self.log, None)
+            self.device_controller = SmartDeviceController(adb_path, self.log, None, self.u2_provider)
         self._init_model()
         if self.device_controller and self.client:
             self.device_controller.ai_client = self.client
     
     def update_adb_path(self, adb_path):
         """Actualiza la ruta de ADB"""
-        self.device_controller = SmartDeviceController(adb_path, self.log, None)
+        self.device_controller = SmartDeviceController(adb_path, self.log, None, self.u2_provider)
         if self.client:
             self.device_controller.ai_client = self.client
     
@@ -0,0 +1,704 @@
+# -*- coding: utf-8 -*-
+"""
+Simulador de dispositivos para HERMES (sin teléfonos).
+
+Reemplaza las sesiones ADB y las conexiones uiautomator2 del motor de envío por
+dispositivos simulados con latencias y tasas de fallo configurables. Las pantallas de
+WhatsApp (chat, botón de enviar/micrófono, unirse a grupo, aviso "No se envió") y de
+Mensajes se generan como jerarquías XML como las de dump_hierarchy(), así el motor las
+recorre con los mismos selectores que usa en un teléfono real.
+
+También incluye un servidor ADB falso que habla 'host:track-devices' (para probar el
+seguimiento de conexiones) y un banco de pruebas que corre cada modo de envío con
+HeadlessRunner (sin tkinter) contra N dispositivos simulados y reporta mensajes/minuto,
+percentiles por fase y el tiempo de CPU de cada dispositivo.
+
+Uso:
+    python device_simulator.py --mode traditional_simultaneous --devices 20 --messages 200
+"""
+
+import argparse
+import random
+import socket
+import threading
+import time
+import urllib.parse
+from xml.sax.saxutils import quoteattr
+
+from hermes_engine import AdbDeviceTracker, EngineConfig, EngineObserver, HeadlessRunner, UiHierarchySnapshot
+
+
+LAUNCHER_PACKAGE = "com.sec.android.app.launcher"
+SMS_PACKAGE = "com.google.android.apps.messaging"
+INSTALLED_PACKAGES = ["com.whatsapp", "com.whatsapp.w4b", "com.github.uiautomator", "com.example.notes"]
+
+
+class SimConfig:
+    """
+    Parámetros del simulador. Las latencias son rangos (mín, máx) en milisegundos y se
+    multiplican por 'time_scale' (0.1 = diez veces más rápido que un teléfono real).
+    """
+
+    def __init__(self, adb_latency_ms=(8, 25), rpc_latency_ms=(15, 40), launch_ms=(350, 900),
+                 adb_fail_rate=0.0, open_fail_rate=0.0, send_failure_rate=0.02, time_scale=1.0, seed=None):
+        self.adb_latency_ms = adb_latency_ms
+        self.rpc_latency_ms = rpc_latency_ms
+        self.launch_ms = launch_ms
+        self.adb_fail_rate = adb_fail_rate
+        self.open_fail_rate = open_fail_rate
+        self.send_failure_rate = send_failure_rate
+        self.time_scale = time_scale
+        self.random = random.Random(seed)
+
+    def delay(self, span_ms):
+        """Duerme una latencia al azar del rango dado y devuelve los ms simulados (sin escalar)."""
+        ms = self.random.uniform(*span_ms)
+        time.sleep(ms * self.time_scale / 1000)
+        return ms
+
+    def chance(self, rate):
+        return rate > 0 and self.random.random() < rate
+
+
+# --- Dispositivo simulado: estado de pantalla y comandos de shell ---
+class SimulatedDevice:
+    """Un teléfono simulado: interpreta comandos 'adb shell' y genera su jerarquía de UI."""
+
+    def __init__(self, serial, config):
+        self.serial = serial
+        self.config = config
+        self.lock = threading.RLock()
+        self.online = True
+        self.screen = 'home'
+        self.package = LAUNCHER_PACKAGE
+        self.activity = ".Launcher"
+        self.entry_text = ""
+        self.failure_banner = False
+        self.running = {LAUNCHER_PACKAGE, "com.github.uiautomator"}
+        self.numbers = {
+            "com.whatsapp": f"+54911{random.randint(1000000, 9999999)}",
+            "com.whatsapp.w4b": f"+54911{random.randint(1000000, 9999999)}",
+        }
+        self.stats = {'commands': 0, 'rpcs': 0, 'launches': 0, 'sent': 0, 'send_failures': 0}
+
+    # --- Shell ---
+    def shell(self, command):
+        """Ejecuta una línea de shell (con ';' y '||' simples). Devuelve (código, salida)."""
+        if not self.online:
+            raise OSError(f"device '{self.serial}' not found")
+        self.config.delay(self.config.adb_latency_ms)
+        with self.lock:
+            self.stats['commands'] += 1
+        if self.config.chance(self.config.adb_fail_rate):
+            return 1, "error: closed"
+
+        outputs = []
+        code = 0
+        for part in command.split(';'):
+            part = part.split('||')[0].replace('2>/dev/null', '').strip()
+            if part.startswith('(') and part.endswith(')'):
+                part = part[1:-1].strip()
+            if not part:
+                continue
+            code, out = self._run_one(part)
+            if out:
+                outputs.append(out)
+        return code, "\n".join(outputs)
+
+    def _run_one(self, cmd):
+        args = cmd.split()
+        head = " ".join(args[:2])
+        with self.lock:
+            if head == "am start":
+                return self._am_start(args[2:])
+            if head == "am force-stop" and len(args) > 2:
+                pkg = args[2]
+                self.running.discard(pkg)
+                if self.package == pkg:
+                    self._go_home()
+                return 0, ""
+            if head == "input keyevent":
+                key = args[2] if len(args) > 2 else ""
+                if key in ("66", "KEYCODE_ENTER") and self.screen == 'sms':
+                    self._deliver()
+                elif key in ("3", "KEYCODE_HOME"):
+                    self._go_home()
+                return 0, ""
+            if head == "input text":
+                text = cmd.split("input text", 1)[1].strip()
+                if len(text) >= 2 and text[0] == text[-1] == "'":
+                    text = text[1:-1].replace("'\\''", "'")
+                if self.screen in ('wa_chat', 'sms'):
+                    self.entry_text += text.replace('%s', ' ')
+                return 0, ""
+            if args[:1] == ["input"]:
+                return 0, ""
+            if args[:1] == ["ps"]:
+                return 0, "NAME\n" + "\n".join(sorted(self.running))
+            if head == "pm list":
+                return 0, "\n".join(f"package:{pkg}" for pkg in INSTALLED_PACKAGES)
+            if args[:2] == ["dumpsys", "window"]:
+                return 0, f"  mCurrentFocus=Window{{5f3c1e2 u0 {self.package}/{self.package}{self.activity}}}"
+            if args[:1] == ["echo"]:
+                return 0, " ".join(args[1:])
+            return 0, ""
+
+    def _go_home(self):
+        self.screen = 'home'
+        self.package = LAUNCHER_PACKAGE
+        self.activity = ".Launcher"
+        self.entry_text = ""
+        self.failure_banner = False
+
+    def _am_start(self, args):
+        wait = '-W' in args
+        data = package = None
+        for flag, value in zip(args, args[1:]):
+            if flag == '-d':
+                data = value.strip('"\'')
+            elif flag == '-p':
+                package = value
+            elif flag == '-n':
+                package = value.split('/')[0]
+        if self.config.chance(self.config.open_fail_rate):
+            return 0, "Starting: Intent { act=android.intent.action.VIEW }\nError: Activity not started, unable to resolve Intent"
+
+        cold = True
+        lower = (data or "").lower()
+        if lower.startswith("sms:"):
+            target = SMS_PACKAGE
+            self.screen, self.activity = 'sms', ".ui.ConversationActivity"
+            body = urllib.parse.parse_qs(urllib.parse.urlsplit(data).query).get('body', [""])[0]
+            self.entry_text = body
+        elif "chat.whatsapp.com" in lower:
+            target = package or "com.whatsapp"
+            self.screen, self.activity = 'join_group', ".GroupInviteActivity"
+            self.entry_text = ""
+        elif lower:
+            target = package or "com.whatsapp"
+            self.screen, self.activity = 'wa_chat', ".Conversation"
+            text = urllib.parse.parse_qs(urllib.parse.urlsplit(data).query).get('text', [""])[0]
+            self.entry_text = text
+        else:
+            target = package or LAUNCHER_PACKAGE
+            self.screen, self.activity = 'app', ".Main"
+        cold = target not in self.running
+        self.running.add(target)
+        self.package = target
+        self.failure_banner = False
+        self.stats['launches'] += 1
+
+        launch_ms = self.config.random.uniform(*self.config.launch_ms) * (1.0 if cold else 0.4)
+        time.sleep(launch_ms * self.config.time_scale / 1000)
+        out = ["Starting: Intent { act=android.intent.action.VIEW }"]
+        if wait:
+            out += [
+                "Status: ok",
+                f"LaunchState: {'COLD' if cold else 'WARM'}",
+                f"Activity: {target}/{self.activity}",
+                f"TotalTime: {int(launch_ms)}",
+                f"WaitTime: {int(launch_ms) + 5}",
+                "Complete",
+            ]
+        return 0, "\n".join(out)
+
+    def _deliver(self):
+        """Simula el envío del mensaje escrito (con la tasa de fallo configurada)."""
+        if self.config.chance(self.config.send_failure_rate):
+            self.failure_banner = True
+            self.stats['send_failures'] += 1
+        else:
+            self.stats['sent'] += 1
+            self.entry_text = ""
+
+    # --- Jerarquía de UI ---
+    def dump_hierarchy(self):
+        with self.lock:
+            nodes = [self._node("android.widget.FrameLayout", bounds=(0, 0, 1080, 2400))]
+            pkg = self.package
+            if self.screen == 'wa_chat':
+                nodes.append(self._node("android.widget.TextView", text="Contacto", rid=f"{pkg}:id/conversation_contact_name", bounds=(150, 80, 700, 160)))
+                if self.failure_banner:
+                    nodes.append(self._node("android.widget.TextView", text="No se envió", rid=f"{pkg}:id/status", bounds=(600, 2050, 1000, 2100)))
+                nodes.append(self._node("android.widget.EditText", text=self.entry_text, rid=f"{pkg}:id/entry", desc="Mensaje", bounds=(40, 2200, 920, 2320)))
+                if self.entry_text:
+                    nodes.append(self._node("android.widget.ImageButton", rid=f"{pkg}:id/send", desc="Enviar", bounds=(940, 2200, 1060, 2320)))
+                else:
+                    nodes.append(self._node("android.widget.ImageButton", rid=f"{pkg}:id/voice_note_btn", desc="Mensaje de voz", bounds=(940, 2200, 1060, 2320)))
+            elif self.screen == 'join_group':
+                nodes.append(self._node("android.widget.TextView", text="Grupo de prueba", rid=f"{pkg}:id/group_name", bounds=(100, 900, 980, 980)))
+                nodes.append(self._node("android.widget.Button", text="Unirme", rid=f"{pkg}:id/join_group_button", bounds=(300, 1800, 780, 1900)))
+            elif self.screen == 'sms':
+                nodes.append(self._node("android.widget.EditText", text=self.entry_text, rid=f"{pkg}:id/compose_message_text", bounds=(40, 2200, 900, 2320)))
+                nodes.append(self._node("android.widget.ImageView", rid=f"{pkg}:id/send_message_button_icon", desc="Enviar SMS", bounds=(930, 2200, 1060, 2320)))
+            else:
+                nodes.append(self._node("android.widget.TextView", text="Inicio", bounds=(0, 0, 1080, 200)))
+            body = "".join(nodes[1:])
+            return f"<?xml version='1.0' encoding='UTF-8'?><hierarchy rotation=\"0\">{nodes[0][:-2]}>{body}</node></hierarchy>"
+
+    def _node(self, cls, text="", rid="", desc="", bounds=(0, 0, 0, 0)):
+        left, top, right, bottom = bounds
+        return (
+            f"<node index=\"0\" text={quoteattr(text)} resource-id={quoteattr(rid)} class={quoteattr(cls)} "
+            f"package={quoteattr(self.package)} content-desc={quoteattr(desc)} clickable=\"true\" enabled=\"true\" "
+            f"bounds=\"[{left},{top}][{right},{bottom}]\" />"
+        )
+
+    def tap(self, attrs):
+        """Efecto de tocar un nodo de la jerarquía."""
+        with self.lock:
+            rid = attrs.get('resource-id', '')
+            if self.screen == 'join_group' and attrs.get('text') == "Unirme":
+                self.screen, self.activity, self.entry_text = 'wa_chat', ".Conversation", ""
+            elif rid.endswith(':id/send') or rid.endswith('send_message_button_icon'):
+                self._deliver()
+
+
+# --- Objetos uiautomator2 simulados ---
+class SimulatedUiObject:
+    """Equivalente mínimo de u2.UiObject: se resuelve contra la jerarquía en cada uso."""
+
+    def __init__(self, device, selector):
+        self.device = device
+        self.selector = selector
+
+    def _find(self):
+        self.device.rpc()
+        snapshot = UiHierarchySnapshot(self.device.sim.dump_hierarchy())
+        for attrs, bounds in snapshot.nodes:
+            if snapshot._matches(attrs, self.selector):
+                return attrs, bounds
+        return None
+
+    @property
+    def exists(self):
+        return self._find() is not None
+
+    def wait(self, timeout=None):
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            if self.exists:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    @property
+    def info(self):
+        found = self._find()
+        if found is None:
+            raise LookupError(f"UiObjectNotFound: {self.selector}")
+        attrs, bounds = found
+        return {
+            'bounds': bounds, 'text': attrs.get('text', ''), 'contentDescription': attrs.get('content-desc', ''),
+            'resourceName': attrs.get('resource-id', ''), 'className': attrs.get('class', ''),
+        }
+
+    def click(self):
+        found = self._find()
+        if found is None:
+            raise LookupError(f"UiObjectNotFound: {self.selector}")
+        self.device.sim.tap(found[0])
+
+    def set_text(self, text):
+        found = self._find()
+        if found is None:
+            raise LookupError(f"UiObjectNotFound: {self.selector}")
+        with self.device.sim.lock:
+            self.device.sim.entry_text = text
+
+    def get_text(self):
+        return self.info.get('text', '')
+
+
+class SimulatedU2Device:
+    """Equivalente mínimo de u2.Device sobre un SimulatedDevice."""
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    def rpc(self):
+        if not self.sim.online:
+            raise ConnectionError(f"{self.sim.serial} desconectado")
+        self.sim.config.delay(self.sim.config.rpc_latency_ms)
+        with self.sim.lock:
+            self.sim.stats['rpcs'] += 1
+
+    def __call__(self, **selector):
+        return SimulatedUiObject(self, selector)
+
+    @property
+    def info(self):
+        self.rpc()
+        return {'screenOn': True, 'currentPackageName': self.sim.package}
+
+    def dump_hierarchy(self, *args, **kwargs):
+        self.rpc()
+        return self.sim.dump_hierarchy()
+
+    def window_size(self):
+        return 1080, 2400
+
+    def app_current(self):
+        self.rpc()
+        return {'package': self.sim.package, 'activity': self.sim.activity}
+
+
+# --- Reemplazos de AdbShellPool y U2SessionRegistry ---
+class SimulatedAdbPool:
+    """Misma interfaz que AdbShellPool, resuelta contra los dispositivos simulados."""
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.lock = threading.Lock()
+        self.stats = {'commands': 0, 'total_ms': 0.0, 'restarts': 0, 'fallbacks': 0}
+
+    def run(self, serial, command, timeout=10):
+        if isinstance(command, (list, tuple)):
+            command = " ".join(str(c) for c in command)
+        device = self.simulator.devices.get(serial)
+        if device is None:
+            raise OSError(f"device '{serial}' not found")
+        start = time.perf_counter()
+        result = device.shell(command)
+        with self.lock:
+            self.stats['commands'] += 1
+            self.stats['total_ms'] += (time.perf_counter() - start) * 1000
+        return result
+
+    def average_ms(self):
+        with self.lock:
+            return self.stats['total_ms'] / self.stats['commands'] if self.stats['commands'] else 0.0
+
+    def retain(self, serials):
+        pass
+
+    def close_all(self):
+        pass
+
+    def abort_active(self):
+        pass
+
+
+class SimulatedU2Registry:
+    """Misma interfaz que U2SessionRegistry, con un SimulatedU2Device por serial."""
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.stats = {'connects': 0, 'reuses': 0, 'reconnects': 0, 'health_checks': 0}
+        self.devices = {}
+
+    def get(self, serial, unlock=False):
+        sim = self.simulator.devices.get(serial)
+        if sim is None or not sim.online:
+            raise ConnectionError(f"{serial} no disponible")
+        if serial in self.devices:
+            self.stats['reuses'] += 1
+        else:
+            self.stats['connects'] += 1
+            self.devices[serial] = SimulatedU2Device(sim)
+        return self.devices[serial]
+
+    def invalidate(self, serial):
+        self.devices.pop(serial, None)
+
+    def retain(self, serials):
+        for serial in list(self.devices):
+            if serial not in serials:
+                self.devices.pop(serial, None)
+
+    def warm(self, serials, log_func=None):
+        pass
+
+
+# --- Servidor ADB falso (solo 'host:track-devices') ---
+class FakeAdbServer:
+    """
+    Acepta conexiones como el servidor ADB en 127.0.0.1 (puerto libre) y responde a
+    'host:track-devices', enviando la lista completa cada vez que cambia.
+    """
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(5)
+        self.port = self.sock.getsockname()[1]
+        self.clients = []
+        self.lock = threading.Lock()
+        self.running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _payload(self):
+        lines = "".join(f"{s}\t{'device' if d.online else 'offline'}\n" for s, d in self.simulator.devices.items() if d.online)
+        data = lines.encode('utf-8')
+        return b"%04x" % len(data) + data
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                client, _ = self.sock.accept()
+                length = int(client.recv(4), 16)
+                request = b""
+                while len(request) < length:
+                    chunk = client.recv(length - len(request))
+                    if not chunk:
+                        break
+                    request += chunk
+                if request != b"host:track-devices":
+                    client.sendall(b"FAIL0010unknown command")
+                    client.close()
+                    continue
+                client.sendall(b"OKAY" + self._payload())
+                with self.lock:
+                    self.clients.append(client)
+            except (OSError, ValueError):
+                if not self.running:
+                    break
+
+    def notify(self):
+        """Envía la lista actual a los clientes conectados."""
+        payload = self._payload()
+        with self.lock:
+            for client in list(self.clients):
+                try:
+                    client.sendall(payload)
+                except OSError:
+                    self.clients.remove(client)
+
+    def close(self):
+        self.running = False
+        with self.lock:
+            for client in self.clients:
+                try:
+                    client.close()
+                except OSError:
+                    pass
+            self.clients = []
+        self.sock.close()
+
+
+class DeviceSimulator:
+    """Conjunto de N dispositivos simulados que se conecta al motor (Hermes o HeadlessRunner)."""
+
+    def __init__(self, count, config=None):
+        self.config = config or SimConfig()
+        self.devices = {f"SIM{idx:03d}": SimulatedDevice(f"SIM{idx:03d}", self.config) for idx in range(1, count + 1)}
+        self.server = None
+
+    @property
+    def serials(self):
+        return list(self.devices)
+
+    def phone_lines(self):
+        """Líneas de WhatsApp por dispositivo con el formato de detected_phone_lines."""
+        lines = []
+        for serial, device in self.devices.items():
+            lines.append({"device": serial, "type": "WhatsApp", "number": device.numbers["com.whatsapp"], "package": "com.whatsapp"})
+            lines.append({"device": serial, "type": "WhatsApp Business", "number": device.numbers["com.whatsapp.w4b"], "package": "com.whatsapp.w4b"})
+        return lines
+
+    def attach(self, app, track_devices=True):
+        """
+        Reemplaza las sesiones ADB/u2 de 'app' por las simuladas y registra los dispositivos.
+        track_devices necesita la ventana (Hermes._on_tracked_devices); sin ella, usar False.
+        """
+        app.adb_pool = SimulatedAdbPool(self)
+        app.u2_registry = SimulatedU2Registry(self)
+        app.devices = self.serials
+        app.offline_devices = set()
+        if track_devices:
+            self.server = FakeAdbServer(self)
+            app.tracked_online = set(self.serials)
+            app.device_tracker = AdbDeviceTracker(app._on_tracked_devices, port=self.server.port, retry_interval=0.5)
+            app.device_tracker.start()
+
+    def disconnect(self, serial):
+        self.devices[serial].online = False
+        if self.server:
+            self.server.notify()
+
+    def reconnect(self, serial):
+        self.devices[serial].online = True
+        if self.server:
+            self.server.notify()
+
+    def close(self):
+        if self.server:
+            self.server.close()
+
+
+# --- Banco de pruebas de campañas ---
+# Nombre -> (modo de HeadlessRunner, ajustes de EngineConfig)
+BENCHMARK_MODES = {
+    'default': ("tradicional", {}),
+    'traditional_simultaneous': ("simultaneo", {}),
+    'sms': ("sms", {}),
+    'sms_parallel': ("sms_simultaneo", {}),
+    'uno_a_muchos': ("numeros", {'fidelizado_numeros_mode': "Uno a muchos"}),
+    'uno_a_muchos_simultaneous': ("numeros", {'fidelizado_numeros_mode': "Uno a muchos", 'simultaneous_mode': True}),
+    'grupos': ("grupos", {}),
+    'grupos_simultaneous': ("grupos", {'simultaneous_mode': True}),
+}
+
+BENCHMARK_MESSAGES = ["Hola, ¿cómo estás?", "Buen día", "Todo bien por acá"]
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class _BenchmarkRunner(HeadlessRunner):
+    """
+    HeadlessRunner que suma el tiempo de CPU de cada hilo (time.thread_time) al dispositivo
+    que está atendiendo. Se mide en los puntos de entrada por dispositivo del motor, así
+    vale tanto para los modos de un solo hilo como para los de un hilo por teléfono.
+    """
+
+    def __init__(self, config, observer=None, devices=None):
+        super().__init__(config, observer, devices)
+        self.cpu_by_device = {}
+        self._cpu_lock = threading.Lock()
+        self._cpu_local = threading.local()
+
+    def _measured(self, device, fn, *args, **kwargs):
+        # Las entradas se llaman entre sí (p. ej. run_single_task -> send_msg): mide solo la externa
+        if getattr(self._cpu_local, 'active', False):
+            return fn(*args, **kwargs)
+        self._cpu_local.active = True
+        start = time.thread_time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            spent = time.thread_time() - start
+            self._cpu_local.active = False
+            with self._cpu_lock:
+                self.cpu_by_device[device] = self.cpu_by_device.get(device, 0.0) + spent
+
+    def run_single_task(self, device, *args, **kwargs):
+        return self._measured(device, super().run_single_task, device, *args, **kwargs)
+
+    def close_all_apps(self, device):
+        return self._measured(device, super().close_all_apps, device)
+
+    def _send_to_target_with_whatsapp(self, device, *args, **kwargs):
+        return self._measured(device, super()._send_to_target_with_whatsapp, device, *args, **kwargs)
+
+    def _send_simple_whatsapp(self, device, *args, **kwargs):
+        return self._measured(device, super()._send_simple_whatsapp, device, *args, **kwargs)
+
+
+def _benchmark_config(overrides):
+    """Configuración con las esperas configurables en cero, para medir el motor y no las pausas."""
+    settings = dict(delay_min=0, delay_max=0, sms_delay_min=0, sms_delay_max=0,
+                    fidelizado_send_delay_min=0, fidelizado_send_delay_max=0,
+                    wait_after_open=10, pause_sends_count=0, traditional_send_mode="Business",
+                    whatsapp_mode="Ambas", trace_enabled=True)
+    settings.update(overrides)
+    return EngineConfig(**settings)
+
+
+def run_campaign_benchmark(mode='traditional_simultaneous', devices=4, messages=40, config=None, log=print):
+    """
+    Corre un modo de envío con HeadlessRunner (sin ventana) contra 'devices' dispositivos
+    simulados y devuelve un dict con mensajes/minuto, percentiles por fase (ms) y el tiempo
+    de CPU que consumió cada dispositivo.
+    """
+    if mode not in BENCHMARK_MODES:
+        raise ValueError(f"Modo desconocido: {mode} (opciones: {', '.join(BENCHMARK_MODES)})")
+
+    runner_mode, overrides = BENCHMARK_MODES[mode]
+    sim = DeviceSimulator(devices, config)
+    runner = _BenchmarkRunner(_benchmark_config(overrides), observer=EngineObserver())
+    sim.attach(runner, track_devices=False)
+
+    links = ()
+    if runner_mode in ("sms", "sms_simultaneo"):
+        links = [f"sms:+54911{5550000 + i}?body={urllib.parse.quote(f'Mensaje {i}')}" for i in range(messages)]
+    elif runner_mode in ("tradicional", "simultaneo"):
+        links = [f"https://wa.me/54911{5550000 + i}?text={urllib.parse.quote(f'Mensaje {i}')}" for i in range(messages)]
+    elif runner_mode == "grupos":
+        runner.load_fidelizado(groups=[f"https://chat.whatsapp.com/SIM{i:05d}" for i in range(messages)],
+                               messages=BENCHMARK_MESSAGES)
+    else:
+        runner.load_fidelizado(messages=BENCHMARK_MESSAGES, phone_lines=sim.phone_lines())
+
+    try:
+        cpu_start = time.process_time()
+        summary = runner.run(runner_mode, links)
+        cpu = time.process_time() - cpu_start
+    finally:
+        runner.stop()
+        sim.close()
+    wall = summary['duration_s']
+
+    phases = {}
+    for event in runner.tracer.events:
+        phases.setdefault(event['name'], []).append(event['dur'] / 1000)
+    phase_stats = {}
+    for name, values in phases.items():
+        values.sort()
+        phase_stats[name] = {
+            'count': len(values),
+            'p50': _percentile(values, 0.50),
+            'p95': _percentile(values, 0.95),
+            'p99': _percentile(values, 0.99),
+        }
+
+    cpu_by_device = {serial: runner.cpu_by_device.get(serial, 0.0) for serial in sim.serials}
+    attributed = sum(cpu_by_device.values())
+    result = {
+        'mode': mode,
+        'devices': devices,
+        'sent': summary['sent'],
+        'failed': summary['failed'],
+        'wall_s': wall,
+        'messages_per_min': summary['sent'] / wall * 60 if wall else 0.0,
+        'cpu_s': cpu,
+        'cpu_percent': cpu / wall * 100 if wall else 0.0,
+        'cpu_by_device': cpu_by_device,
+        'cpu_device_avg_s': attributed / devices if devices else 0.0,
+        'cpu_device_max_s': max(cpu_by_device.values(), default=0.0),
+        'cpu_unattributed_s': max(0.0, cpu - attributed),
+        'phases': phase_stats,
+    }
+    if log:
+        log(format_benchmark(result))
+    return result
+
+
+def format_benchmark(result):
+    lines = [
+        f"Modo {result['mode']} · {result['devices']} dispositivos simulados",
+        f"  Enviados {result['sent']} / fallidos {result['failed']} en {result['wall_s']:.1f}s "
+        f"→ {result['messages_per_min']:.1f} mensajes/min",
+        f"  CPU {result['cpu_s']:.2f}s ({result['cpu_percent']:.0f}% de un núcleo); por dispositivo "
+        f"promedio {result['cpu_device_avg_s'] * 1000:.0f} ms, máximo {result['cpu_device_max_s'] * 1000:.0f} ms, "
+        f"fuera de los dispositivos {result['cpu_unattributed_s'] * 1000:.0f} ms",
+        "  Fase                       n      p50 ms    p95 ms    p99 ms",
+    ]
+    for name, stats in sorted(result['phases'].items(), key=lambda item: -item[1]['p50'] * item[1]['count']):
+        lines.append(f"  {name:<24} {stats['count']:>5} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas de HERMES con dispositivos simulados")
+    parser.add_argument('--mode', default='traditional_simultaneous', choices=sorted(BENCHMARK_MODES))
+    parser.add_argument('--devices', type=int, default=4)
+    parser.add_argument('--messages', type=int, default=40)
+    parser.add_argument('--time-scale', type=float, default=1.0, help="Multiplicador de latencias (0.1 = 10x más rápido)")
+    parser.add_argument('--send-failure-rate', type=float, default=0.02)
+    parser.add_argument('--adb-fail-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    config = SimConfig(time_scale=args.time_scale, send_failure_rate=args.send_failure_rate,
+                       adb_fail_rate=args.adb_fail_rate, seed=args.seed)
+    run_campaign_benchmark(args.mode, args.devices, args.messages, config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,859 @@
+# -*- coding: utf-8 -*-
+"""
+Lectura de planillas para HΞЯMΞS (sin interfaz gráfica)
+
+Las filas se guardan como tuplas de texto con una sola copia de las cabeceras (SheetRows),
+en lugar de un diccionario por fila. Los Excel se leen con openpyxl en modo read-only:
+las celdas no se construyen en memoria, la lectura informa el avance y se puede cortar.
+
+Benchmarks (generan los archivos de prueba si no existen):
+    python excel_io.py --benchmark 500000
+    python excel_io.py --csv-benchmark 1024 --legacy
+    python excel_io.py --template-benchmark 1000000 --legacy
+    python excel_io.py --export-benchmark 500000 --legacy
+"""
+
+import argparse
+import codecs
+import csv
+import ctypes
+import functools
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+import urllib.parse
+from array import array
+from datetime import datetime
+
+
+# --- Filas compactas ---
+class SheetRow:
+    """Vista de una fila: se usa como el diccionario de antes (row.get(col, ''), row[col])."""
+
+    __slots__ = ('index', 'values')
+
+    def __init__(self, index, values):
+        self.index = index
+        self.values = values
+
+    def get(self, column, default=None):
+        i = self.index.get(column)
+        return default if i is None else self.values[i]
+
+    def __getitem__(self, column):
+        return self.values[self.index[column]]
+
+    def __contains__(self, column):
+        return column in self.index
+
+    def keys(self):
+        return self.index.keys()
+
+    def items(self):
+        return zip(self.index.keys(), self.values)
+
+
+class SheetRows:
+    """
+    Tabla de filas como tuplas. Se recorre, indexa, ordena y mide como la lista de
+    diccionarios que reemplaza; cada fila se entrega como una SheetRow liviana.
+    """
+
+    def __init__(self, columns, rows=None):
+        self.columns = list(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.rows = rows if rows is not None else []
+        self.truncated = False  # True si la lectura se detuvo antes del final
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        index = self.index
+        for values in self.rows:
+            yield SheetRow(index, values)
+
+    def __getitem__(self, i):
+        return SheetRow(self.index, self.rows[i])
+
+    def append(self, values):
+        self.rows.append(tuple(values))
+
+    def sort(self, key, reverse=False):
+        index = self.index
+        self.rows.sort(key=lambda values: key(SheetRow(index, values)), reverse=reverse)
+
+    def column(self, name, default=''):
+        """Valores de una columna sin crear vistas de fila."""
+        i = self.index.get(name)
+        if i is None:
+            return [default] * len(self.rows)
+        return [values[i] for values in self.rows]
+
+
+def cell_text(value):
+    """Convierte el valor de una celda al texto que usa la plantilla de mensajes."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+# --- Lectura de Excel en streaming ---
+def iter_excel_rows(fp, on_progress=None, should_stop=None, progress_every=5000):
+    """
+    Recorre la hoja activa en modo read-only. Entrega primero la tupla de cabeceras válidas
+    (fila 1, no vacías) y después una tupla de textos por cada fila que tenga algún dato.
+
+    on_progress(filas_leidas, filas_estimadas) se llama cada 'progress_every' filas (la
+    estimación sale de la dimensión de la hoja y puede ser None). Si should_stop() devuelve
+    True la lectura se corta y el libro se cierra.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fp, read_only=True, data_only=True)  # data_only: valores de fórmulas
+    try:
+        sh = wb.active
+        rows = sh.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        valid = [(i, str(v).strip()) for i, v in enumerate(header) if v is not None and str(v).strip()]
+        if not valid:
+            raise ValueError("No se encontraron cabeceras válidas en la fila 1.")
+        yield tuple(name for _, name in valid)
+
+        positions = [i for i, _ in valid]
+        estimated = (sh.max_row - 1) if sh.max_row else None
+        for count, r in enumerate(rows, start=1):
+            # En read-only las filas pueden venir más cortas (celdas vacías al final)
+            width = len(r)
+            values = tuple(cell_text(r[i]) if i < width else '' for i in positions)
+            if any(values):
+                yield values
+            if count % progress_every == 0:
+                if on_progress is not None:
+                    on_progress(count, estimated)
+                if should_stop is not None and should_stop():
+                    break
+    finally:
+        wb.close()
+
+
+def read_excel_rows(fp, on_progress=None, should_stop=None, progress_every=5000):
+    """Lee un Excel completo (o hasta que should_stop() lo corte) en una SheetRows."""
+    return _collect_rows(iter_excel_rows, fp, on_progress, should_stop, progress_every)
+
+
+def _collect_rows(iterator, fp, on_progress, should_stop, progress_every):
+    stopped = []
+
+    def stop():
+        if should_stop is not None and should_stop():
+            stopped.append(True)
+            return True
+        return False
+
+    rows = iterator(fp, on_progress, stop, progress_every)
+    table = SheetRows(next(rows))
+    table.rows.extend(rows)
+    table.truncated = bool(stopped)
+    return table
+
+
+# --- Plantillas de mensajes ---
+CURRENCY_COLUMN_MARKERS = ('$ Hist.', '$ Asig.')  # Columnas que se muestran como moneda
+_NON_DIGITS = re.compile(r'\D')
+
+
+def format_currency_value(value):
+    """Formatea un valor numérico como moneda en formato argentino ($###.###,##)."""
+    if value is None:
+        return ''
+
+    try:
+        text = str(value).strip()
+        if not text:
+            return ''
+
+        text = (text
+                .replace('$', '')
+                .replace(' ', '')
+                .replace('\u202f', '')
+                .replace('\u00a0', '')
+                .replace('−', '-')
+                )
+
+        if ',' in text and '.' in text:
+            if text.rfind(',') > text.rfind('.'):
+                text = text.replace('.', '').replace(',', '.')
+            else:
+                text = text.replace(',', '')
+        elif ',' in text:
+            text = text.replace('.', '').replace(',', '.')
+        elif text.count('.') > 1:
+            parts = text.split('.')
+            text = ''.join(parts[:-1]) + '.' + parts[-1]
+
+        amount = float(text)
+        sign = '-' if amount < 0 else ''
+        formatted = f"{abs(amount):,.2f}"
+        formatted = formatted.replace(',', '¤').replace('.', ',').replace('¤', '.')
+        return f"{sign}${formatted}"
+    except Exception:
+        return str(value)
+
+
+@functools.lru_cache(maxsize=65536)
+def cached_currency_value(text):
+    """format_currency_value memorizado por valor crudo (los montos se repiten mucho)."""
+    return format_currency_value(text)
+
+
+class MessageTemplate:
+    """
+    Plantilla con marcadores '{Columna}' compilada una sola vez en segmentos literales y
+    de campo. Solo se reemplazan las columnas indicadas; cualquier otro '{...}' queda como
+    texto. render() arma el mensaje de una fila con un único join.
+    """
+
+    def __init__(self, template, columns):
+        self.template = template
+        self.parts = []   # Literales; los campos quedan como None y se completan al renderizar
+        self.fields = []  # (posición en parts, columna, es_moneda)
+        names = sorted({c for c in columns if c and f"{{{c}}}" in template}, key=len, reverse=True)
+        if not names:
+            self.parts.append(template)
+            return
+        pattern = re.compile('|'.join(re.escape(f"{{{c}}}") for c in names))
+        last = 0
+        for match in pattern.finditer(template):
+            if match.start() > last:
+                self.parts.append(template[last:match.start()])
+            column = match.group(0)[1:-1]
+            self.fields.append((len(self.parts), column, any(m in column for m in CURRENCY_COLUMN_MARKERS)))
+            self.parts.append(None)
+            last = match.end()
+        if last < len(template):
+            self.parts.append(template[last:])
+
+    def render(self, row):
+        """Mensaje para una fila (cualquier objeto con .get: SheetRow o diccionario)."""
+        if not self.fields:
+            return self.template
+        out = self.parts[:]
+        for pos, column, currency in self.fields:
+            value = row.get(column, '')
+            value = '' if value is None else str(value)
+            out[pos] = cached_currency_value(value) if currency else value
+        return ''.join(out)
+
+
+class CampaignLinks:
+    """
+    Campaña compacta: por cada envío guarda el teléfono normalizado (como entero), la fila
+    y la plantilla, en arrays. El link se arma recién cuando un hilo de envío lo pide, así
+    no quedan en memoria cientos de miles de URLs codificadas que repiten el mismo texto.
+    Se usa como la lista de links de antes: len(), índice, slices e iteración.
+    """
+
+    MAX_PACKED_DIGITS = 19  # Lo que entra en un entero sin signo de 64 bits
+
+    def __init__(self, table, templates, sms=False):
+        self.table = table            # SheetRows (o lista de diccionarios) de donde salen los mensajes
+        self.templates = list(templates)
+        self.sms = sms
+        self.numbers = array('Q')     # Dígitos del teléfono como entero
+        self.digit_counts = array('B')  # Cantidad de dígitos (recupera ceros a la izquierda); 0 = ver long_numbers
+        self.row_indexes = array('I')
+        self.template_ids = array('B')
+        self.long_numbers = {}        # Teléfonos con más dígitos de los que entran en 'Q'
+        self._last_message = (-1, -1, '')  # (fila, plantilla, mensaje codificado) del último link armado
+
+    def append(self, row_index, digits, template_id=0):
+        if len(digits) > self.MAX_PACKED_DIGITS:
+            self.long_numbers[len(self.numbers)] = digits
+            self.numbers.append(0)
+            self.digit_counts.append(0)
+        else:
+            self.numbers.append(int(digits))
+            self.digit_counts.append(len(digits))
+        self.row_indexes.append(row_index)
+        self.template_ids.append(template_id)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __bool__(self):
+        return len(self.numbers) > 0
+
+    def __iter__(self):
+        for i in range(len(self.numbers)):
+            yield self.link(i)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.link(j) for j in range(*i.indices(len(self.numbers)))]
+        if i < 0:
+            i += len(self.numbers)
+        if not 0 <= i < len(self.numbers):
+            raise IndexError("índice de link fuera de rango")
+        return self.link(i)
+
+    def digits(self, i):
+        count = self.digit_counts[i]
+        if not count:
+            return self.long_numbers[i]
+        return str(self.numbers[i]).zfill(count)
+
+    def phone(self, i):
+        """Número tal como lo devuelve _get_phone_from_link sobre el link armado."""
+        return self.digits(i) if self.sms else f"549{self.digits(i)}"
+
+    def iter_phones(self):
+        for i in range(len(self.numbers)):
+            yield self.phone(i)
+
+    def encoded_message(self, i):
+        """Mensaje de la fila en URL; los teléfonos consecutivos de una fila reutilizan el mismo."""
+        row_index, template_id = self.row_indexes[i], self.template_ids[i]
+        last_row, last_template, encoded = self._last_message
+        if last_row != row_index or last_template != template_id:
+            message = self.templates[template_id].render(self.table[row_index])
+            encoded = urllib.parse.quote(message, safe='')
+            # Una sola asignación de tupla: seguro si varios hilos de envío leen a la vez
+            self._last_message = (row_index, template_id, encoded)
+        return encoded
+
+    def link(self, i):
+        if self.sms:
+            return f"sms:{self.digits(i)}?body={self.encoded_message(i)}"
+        return f"https://wa.me/549{self.digits(i)}?text={self.encoded_message(i)}"
+
+    def memory_bytes(self):
+        """Memoria propia de la campaña (sin contar la tabla, que ya estaba cargada)."""
+        arrays = (self.numbers, self.digit_counts, self.row_indexes, self.template_ids)
+        return (sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+                + sum(sys.getsizeof(v) for v in self.long_numbers.values()))
+
+    def estimated_url_bytes(self, sample=1000):
+        """Lo que ocuparía la lista de URLs completas, estimado sobre una muestra repartida."""
+        total = len(self.numbers)
+        if not total:
+            return 0
+        step = max(1, total // sample)
+        sizes = [sys.getsizeof(self.link(i)) for i in range(0, total, step)]
+        # Cada URL es un str propio más su puntero en la lista
+        return int(sum(sizes) / len(sizes) * total) + 8 * total
+
+
+def build_message_links(rows, template, phone_columns, sms=False):
+    """
+    Arma la campaña (CampaignLinks) con un envío por teléfono de cada fila, WhatsApp o SMS.
+    Los links no se generan acá: se arman al pedirlos, con el mensaje de la fila codificado
+    una vez y reutilizado para todos sus teléfonos.
+    """
+    compiled = template if isinstance(template, MessageTemplate) else MessageTemplate(template, [])
+    campaign = CampaignLinks(rows, [compiled], sms=sms)
+    append = campaign.append
+    for row_index, row in enumerate(rows):
+        # Todos los números de las columnas de teléfono seleccionadas
+        for column in phone_columns:
+            value = row.get(column)
+            if not value:
+                continue
+            # Soportar números separados por guión (ej. "111-222")
+            for part in str(value).split('-'):
+                digits = _NON_DIGITS.sub('', part)
+                if digits:
+                    append(row_index, digits)
+    return campaign
+
+
+# --- Lectura de CSV en una sola pasada ---
+CSV_DELIMITERS = ';,\t|'
+CSV_SAMPLE_BYTES = 64 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_encoding(sample):
+    """
+    Codificación de un archivo a partir de sus primeros bytes: BOM si lo tiene; si no,
+    UTF-8 cuando la muestra decodifica sin errores; si no, cp1252 (Excel en Windows) o
+    latin-1 si aparecen bytes que cp1252 no define.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # final=False: una secuencia multibyte cortada al final de la muestra no es un error
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def sniff_dialect(text):
+    """Dialecto CSV de una muestra de texto (líneas completas); ';' ',' tab o '|'."""
+    try:
+        return csv.Sniffer().sniff(text, delimiters=CSV_DELIMITERS)
+    except csv.Error:
+        pass
+    # Sin comillas o con muestra ambigua: el separador que aparece la misma cantidad de
+    # veces (y al menos una) en más líneas
+    lines = [line for line in text.splitlines() if line.strip()][:50]
+    best, best_score = ',', 0
+    for delimiter in CSV_DELIMITERS:
+        counts = [line.count(delimiter) for line in lines]
+        if not counts or counts[0] == 0:
+            continue
+        score = sum(1 for c in counts if c == counts[0])
+        if score > best_score:
+            best, best_score = delimiter, score
+
+    class _Dialect(csv.excel):
+        delimiter = best
+    return _Dialect
+
+
+def iter_csv_rows(fp, on_progress=None, should_stop=None, progress_every=5000):
+    """
+    Recorre un CSV con un solo lector: detecta BOM/codificación y dialecto sobre una
+    muestra y después lee fila por fila (memoria acotada). Entrega primero las cabeceras y
+    luego una tupla de textos por fila, del mismo ancho que las cabeceras.
+
+    on_progress(filas_leidas, filas_estimadas) usa los bytes consumidos para estimar el total.
+    """
+    total_bytes = os.path.getsize(fp)
+    with open(fp, 'rb') as raw:
+        sample = raw.read(CSV_SAMPLE_BYTES)
+        encoding = detect_encoding(sample)
+        raw.seek(0)
+        # 'replace' en vez de 'ignore': un byte inválido más adelante se ve como '�' y no se pierde en silencio
+        text = io.TextIOWrapper(raw, encoding=encoding, errors='replace', newline='')
+        sample_text = sample.decode(encoding, errors='replace')
+        if len(sample) == CSV_SAMPLE_BYTES and '\n' in sample_text:
+            sample_text = sample_text[:sample_text.rfind('\n')]  # Solo líneas completas
+        reader = csv.reader(text, sniff_dialect(sample_text))
+
+        header = next(reader, None)
+        if header is None:
+            yield ()
+            return
+        if header and header[0].startswith('\ufeff'):
+            header[0] = header[0][1:]
+        columns = tuple(name.strip() for name in header)
+        yield columns
+
+        width = len(columns)
+        for count, row in enumerate(reader, start=1):
+            if row:
+                if len(row) < width:
+                    row.extend([''] * (width - len(row)))
+                yield tuple(row[:width])
+            if count % progress_every == 0:
+                if on_progress is not None:
+                    position = raw.tell()
+                    on_progress(count, int(count * total_bytes / position) if position else None)
+                if should_stop is not None and should_stop():
+                    break
+
+
+def read_csv_rows(fp, on_progress=None, should_stop=None, progress_every=5000):
+    """Lee un CSV completo (o hasta que should_stop() lo corte) en una SheetRows."""
+    return _collect_rows(iter_csv_rows, fp, on_progress, should_stop, progress_every)
+
+
+# --- Exportación en streaming ---
+EXPORT_WIDTH_SAMPLE_ROWS = 2000  # Filas que se miran antes de fijar el ancho de las columnas
+EXPORT_MAX_WIDTH = 80            # Tope de ancho (las URLs largas no ensanchan la hoja sin fin)
+
+
+def export_rows(path, headers, rows, total=None, sheet_title="Hoja1", on_progress=None,
+                should_stop=None, progress_every=5000):
+    """
+    Escribe 'headers' y las tuplas de 'rows' en un .xlsx (openpyxl write-only) o, si la
+    ruta termina en .csv, en un CSV UTF-8 con ';' que Excel abre directo (mucho más rápido).
+
+    on_progress(filas_escritas, total) se llama cada 'progress_every' filas. Si should_stop()
+    devuelve True se corta, se borra el archivo a medio escribir y se devuelve None; si no,
+    devuelve la cantidad de filas escritas.
+    """
+    writer = _export_csv if path.lower().endswith('.csv') else _export_xlsx
+    stopped = []
+
+    def stop():
+        if should_stop is not None and should_stop():
+            stopped.append(True)
+            return True
+        return False
+
+    try:
+        written = writer(path, headers, iter(rows), total, sheet_title, on_progress, stop, progress_every)
+    except BaseException:
+        _remove_partial(path)
+        raise
+    if stopped:
+        _remove_partial(path)
+        return None
+    return written
+
+
+def _remove_partial(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _export_csv(path, headers, rows, total, sheet_title, on_progress, should_stop, progress_every):
+    written = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+            if written % progress_every == 0:
+                if on_progress is not None:
+                    on_progress(written, total)
+                if should_stop():
+                    break
+    return written
+
+
+def _export_xlsx(path, headers, rows, total, sheet_title, on_progress, should_stop, progress_every):
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title)
+
+    # En write-only las columnas se declaran antes de la primera fila: el ancho sale del
+    # máximo acumulado sobre las cabeceras y un primer tramo de filas, no de recorrer la hoja
+    widths = [len(str(h)) for h in headers]
+    head = []
+    for row in rows:
+        head.append(row)
+        for i, value in enumerate(row[:len(widths)]):
+            length = len(str(value)) if value is not None else 0
+            if length > widths[i]:
+                widths[i] = length
+        if len(head) >= EXPORT_WIDTH_SAMPLE_ROWS:
+            break
+    for i, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = min(width, EXPORT_MAX_WIDTH) + 2
+
+    ws.append(list(headers))
+    written = 0
+    for source in (head, rows):
+        for row in source:
+            ws.append(row)
+            written += 1
+            if written % progress_every == 0:
+                if on_progress is not None:
+                    on_progress(written, total)
+                if should_stop():
+                    wb.close()
+                    return written
+    wb.save(path)
+    return written
+
+
+# --- Benchmark ---
+def peak_rss_mb():
+    """Pico de memoria residente del proceso (MB)."""
+    if sys.platform == 'win32':
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def generate_benchmark_workbook(path, rows):
+    """Genera un .xlsx con el formato de un listado de deudores (write-only, memoria constante)."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Deudores")
+    ws.append(["Nombre", "DNI", "Telefono", "Celular", "$ Asig.", "$ Hist.", "Fecha", "Observaciones"])
+    for i in range(rows):
+        ws.append([f"Cliente {i}", 20000000 + i, f"11{40000000 + i}", f"11{50000000 + i}-11{60000000 + i}",
+                   round(1000 + (i * 37) % 250000 / 3, 2), (i * 53) % 900000, datetime(2024, 1 + i % 12, 1 + i % 28),
+                   "" if i % 3 else "Pago parcial"])
+    wb.save(path)
+
+
+def benchmark_excel_loader(rows=500000, path=None, compare_full=False, log=print):
+    """
+    Mide filas/segundo y pico de memoria del lector en streaming sobre un archivo de 'rows'
+    filas. Con compare_full también mide el modo completo anterior (después, porque el pico
+    de memoria es del proceso).
+    """
+    path = path or os.path.join(tempfile.gettempdir(), f"hermes_bench_{rows}.xlsx")
+    if not os.path.exists(path):
+        log(f"Generando {path} ({rows} filas)...")
+        generate_benchmark_workbook(path, rows)
+
+    result = {'rows': 0, 'file_mb': os.path.getsize(path) / (1024 * 1024)}
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    table = read_excel_rows(path)
+    elapsed = time.perf_counter() - start
+    result.update(rows=len(table), stream_s=elapsed, stream_rows_per_s=len(table) / elapsed if elapsed else 0.0,
+                  stream_peak_rss_mb=peak_rss_mb(), rss_before_mb=rss_before)
+    log(f"Streaming: {len(table)} filas en {elapsed:.1f} s ({result['stream_rows_per_s']:,.0f} filas/s), "
+        f"pico RSS {result['stream_peak_rss_mb']:.0f} MB")
+    del table
+
+    if compare_full:
+        from openpyxl import load_workbook
+        start = time.perf_counter()
+        wb = load_workbook(path, data_only=True)
+        sh = wb.active
+        hdrs = [str(c.value).strip() if c.value is not None else '' for c in sh[1]]
+        data = [{h: cell_text(v) for h, v in zip(hdrs, r) if h} for r in sh.iter_rows(min_row=2, values_only=True)]
+        elapsed = time.perf_counter() - start
+        result.update(full_s=elapsed, full_rows_per_s=len(data) / elapsed if elapsed else 0.0,
+                      full_peak_rss_mb=peak_rss_mb())
+        log(f"Modo completo: {len(data)} filas en {elapsed:.1f} s ({result['full_rows_per_s']:,.0f} filas/s), "
+            f"pico RSS {result['full_peak_rss_mb']:.0f} MB")
+    return result
+
+
+def _legacy_read_csv(fp):
+    """Lector anterior (una pasada completa por codificación probada), solo para comparar."""
+    for enc in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-16']:
+        try:
+            with open(fp, 'r', encoding=enc, errors='ignore') as f:
+                s = f.read(2048)
+                f.seek(0)
+                d = ','
+                for dl in [';', ',', '\t', '|']:
+                    if dl in s:
+                        d = dl
+                        break
+                r = csv.DictReader(f, delimiter=d)
+                data = [{k.strip(): (v if v is not None else '') for k, v in rw.items() if k is not None} for rw in r]
+                return data
+        except Exception:
+            continue
+    return []
+
+
+def generate_benchmark_csv(path, size_mb):
+    """Genera un CSV cp1252 con ';' y acentos (el caso que el lector anterior deformaba)."""
+    target = size_mb * 1024 * 1024
+    with open(path, 'w', encoding='cp1252', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(["Nombre", "DNI", "Telefono", "Celular", "$ Asig.", "Localidad", "Observaciones"])
+        i = 0
+        while f.tell() < target:
+            for _ in range(10000):
+                writer.writerow([f"Muñoz, José {i}", 20000000 + i, f"11{40000000 + i}", f"11{50000000 + i}",
+                                 f"{1000 + (i * 37) % 250000},50", "San Martín", "" if i % 3 else "Pagó \"parcial\""])
+                i += 1
+
+
+def benchmark_csv_reader(size_mb=1024, path=None, legacy=False, log=print):
+    """Compara el lector en una pasada con el anterior sobre un CSV de 'size_mb' MB."""
+    path = path or os.path.join(tempfile.gettempdir(), f"hermes_bench_{size_mb}mb.csv")
+    if not os.path.exists(path):
+        log(f"Generando {path} ({size_mb} MB)...")
+        generate_benchmark_csv(path, size_mb)
+    file_mb = os.path.getsize(path) / (1024 * 1024)
+
+    start = time.perf_counter()
+    table = read_csv_rows(path)
+    elapsed = time.perf_counter() - start
+    result = {'file_mb': file_mb, 'rows': len(table), 'single_pass_s': elapsed,
+              'single_pass_mb_per_s': file_mb / elapsed if elapsed else 0.0,
+              'single_pass_peak_rss_mb': peak_rss_mb(),
+              'accents_ok': bool(len(table)) and table[0].get('Nombre', '').startswith('Muñoz')}
+    log(f"Una pasada: {len(table)} filas en {elapsed:.1f} s ({result['single_pass_mb_per_s']:.1f} MB/s), "
+        f"pico RSS {result['single_pass_peak_rss_mb']:.0f} MB, acentos {'OK' if result['accents_ok'] else 'MAL'}")
+    del table
+
+    if legacy:
+        start = time.perf_counter()
+        data = _legacy_read_csv(path)
+        elapsed = time.perf_counter() - start
+        result.update(legacy_s=elapsed, legacy_mb_per_s=file_mb / elapsed if elapsed else 0.0,
+                      legacy_peak_rss_mb=peak_rss_mb(),
+                      legacy_accents_ok=bool(data) and data[0].get('Nombre', '').startswith('Muñoz'))
+        log(f"Anterior: {len(data)} filas en {elapsed:.1f} s ({result['legacy_mb_per_s']:.1f} MB/s), "
+            f"pico RSS {result['legacy_peak_rss_mb']:.0f} MB, acentos {'OK' if result['legacy_accents_ok'] else 'MAL'}")
+    return result
+
+
+BENCHMARK_TEMPLATE = ("Hola {Nombre}, DNI {DNI}. Su deuda es de {$ Asig.} (histórico {$ Hist.}). "
+                      "Comuníquese al 0800-555-1234 desde {Localidad}.")
+
+
+def _legacy_build_links(rows, columns, template, phone_columns, sms=False):
+    """Armado anterior (reemplazo por columna y codificación por teléfono), solo para comparar."""
+    links = []
+    for row in rows:
+        phone_nums = []
+        for ph_col in phone_columns:
+            ph_val = str(row.get(ph_col, '')) if row.get(ph_col) else ''
+            if ph_val:
+                phone_nums.extend(p.strip() for p in ph_val.split('-') if p.strip())
+        if not phone_nums:
+            continue
+        msg = template
+        for col in columns:
+            pl = f"{{{col}}}"
+            if pl in msg:
+                v = row.get(col, '')
+                v = '' if v is None else str(v)
+                if '$ Hist.' in col or '$ Asig.' in col:
+                    v = format_currency_value(v)
+                msg = msg.replace(pl, v)
+        for phone in phone_nums:
+            digits = re.sub(r'\D', '', phone)
+            if not digits:
+                continue
+            enc_msg = urllib.parse.quote(msg, safe='')
+            links.append(f"sms:{digits}?body={enc_msg}" if sms else f"https://wa.me/549{digits}?text={enc_msg}")
+    return links
+
+
+def generate_benchmark_rows(rows):
+    """Tabla sintética en memoria: montos repetidos y un tercio de filas con dos teléfonos."""
+    columns = ["Nombre", "DNI", "Telefono", "Celular", "$ Asig.", "$ Hist.", "Localidad"]
+    table = SheetRows(columns)
+    for i in range(rows):
+        table.rows.append((f"Muñoz José {i}", str(20000000 + i), f"11{40000000 + i}",
+                           f"11{50000000 + i}-11{60000000 + i}" if i % 3 == 0 else "",
+                           f"{1000 + (i * 37) % 5000},50", f"{2000 + (i * 53) % 5000}.25", "San Martín"))
+    return table
+
+
+def benchmark_message_templates(rows=1000000, legacy=True, log=print):
+    """
+    Mide el armado de links (filas/s) con la plantilla compilada y, opcionalmente, con el
+    anterior; informa además la memoria de la campaña frente a la lista de URLs completas.
+    """
+    log(f"Generando {rows} filas en memoria...")
+    table = generate_benchmark_rows(rows)
+    phones = ["Telefono", "Celular"]
+
+    cached_currency_value.cache_clear()
+    start = time.perf_counter()
+    campaign = build_message_links(table, MessageTemplate(BENCHMARK_TEMPLATE, table.columns), phones)
+    build_s = time.perf_counter() - start
+    links = list(campaign)
+    elapsed = time.perf_counter() - start
+    result = {'rows': rows, 'links': len(links), 'campaign_s': build_s, 'compiled_s': elapsed,
+              'compiled_rows_per_s': rows / elapsed if elapsed else 0.0,
+              'campaign_mb': campaign.memory_bytes() / (1024 * 1024),
+              'urls_mb': (sum(sys.getsizeof(u) for u in links) + 8 * len(links)) / (1024 * 1024)}
+    log(f"Campaña: {len(campaign)} envíos en {build_s:.1f} s, {result['campaign_mb']:.1f} MB "
+        f"(las URLs completas ocupan {result['urls_mb']:.0f} MB)")
+    log(f"Plantilla compilada: {len(links)} links armados en {elapsed:.1f} s ({result['compiled_rows_per_s']:,.0f} filas/s)")
+
+    if legacy:
+        start = time.perf_counter()
+        old_links = _legacy_build_links(table, table.columns, BENCHMARK_TEMPLATE, phones)
+        elapsed = time.perf_counter() - start
+        result.update(legacy_s=elapsed, legacy_rows_per_s=rows / elapsed if elapsed else 0.0,
+                      identical=old_links == links)
+        log(f"Anterior: {len(old_links)} links en {elapsed:.1f} s ({result['legacy_rows_per_s']:,.0f} filas/s), "
+            f"resultado {'idéntico' if result['identical'] else 'DISTINTO'}")
+    return result
+
+
+def _legacy_export_xlsx(path, records):
+    """Exportación anterior (libro completo, celda por celda y anchos al final), solo para comparar."""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws['A1'] = "Numeros"
+    ws['B1'] = "Estado"
+    for index, (number, status) in enumerate(records, start=2):
+        ws[f'A{index}'] = number
+        ws[f'B{index}'] = status
+    for col in ws.columns:
+        max_length = max(len(str(cell.value)) for cell in col)
+        ws.column_dimensions[col[0].column_letter].width = max_length + 2
+    wb.save(path)
+
+
+def benchmark_export(rows=500000, legacy=False, log=print):
+    """Compara la exportación de un reporte de 'rows' filas: write-only, CSV y (opcional) la anterior."""
+    statuses = ("Enviado", "Fallo", "No procesado")
+    records = [(f"54911{40000000 + i}", statuses[i % 3]) for i in range(rows)]
+    base = os.path.join(tempfile.gettempdir(), f"hermes_export_{rows}")
+    result = {'rows': rows}
+    runs = [('xlsx', f"{base}.xlsx", lambda p: export_rows(p, ("Numeros", "Estado"), records, rows)),
+            ('csv', f"{base}.csv", lambda p: export_rows(p, ("Numeros", "Estado"), records, rows))]
+    if legacy:
+        runs.append(('legacy', f"{base}_anterior.xlsx", lambda p: _legacy_export_xlsx(p, records)))
+    for name, path, run in runs:
+        start = time.perf_counter()
+        run(path)
+        elapsed = time.perf_counter() - start
+        result[f'{name}_s'] = elapsed
+        result[f'{name}_rows_per_s'] = rows / elapsed if elapsed else 0.0
+        log(f"{name}: {rows} filas en {elapsed:.1f} s ({result[f'{name}_rows_per_s']:,.0f} filas/s), "
+            f"{os.path.getsize(path) / (1024 * 1024):.1f} MB, pico RSS {peak_rss_mb():.0f} MB")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lectura de planillas de HΞЯMΞS")
+    parser.add_argument('--benchmark', type=int, metavar='FILAS',
+                        help="Benchmark de Excel con un archivo de FILAS filas (p. ej. 500000)")
+    parser.add_argument('--csv-benchmark', type=int, metavar='MB',
+                        help="Benchmark de CSV con un archivo de MB megabytes (p. ej. 1024)")
+    parser.add_argument('--template-benchmark', type=int, metavar='FILAS',
+                        help="Benchmark del armado de mensajes con FILAS filas sintéticas (p. ej. 1000000)")
+    parser.add_argument('--export-benchmark', type=int, metavar='FILAS',
+                        help="Benchmark de exportación de un reporte de FILAS filas (p. ej. 500000)")
+    parser.add_argument('--file', help="Usar este archivo en lugar de generar uno")
+    parser.add_argument('--compare-full', action='store_true', help="Excel: medir también el modo completo anterior")
+    parser.add_argument('--legacy', action='store_true',
+                        help="CSV, plantillas y exportación: medir también la versión anterior")
+    args = parser.parse_args(argv)
+    if args.export_benchmark:
+        benchmark_export(args.export_benchmark, args.legacy)
+    elif args.template_benchmark:
+        benchmark_message_templates(args.template_benchmark, args.legacy)
+    elif args.csv_benchmark:
+        benchmark_csv_reader(args.csv_benchmark, args.file, args.legacy)
+    else:
+        benchmark_excel_loader(args.benchmark or 500000, args.file, args.compare_full)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4740 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de envío de HΞЯMΞS (sin interfaz gráfica)
+
+Contiene la capa de dispositivos (sesiones ADB, conexiones uiautomator2, seguimiento de
+dispositivos), la lógica de envío por WhatsApp/SMS y un ejecutor de consola. No importa
+tkinter: la ventana de Hermes.py lo usa como base y se comunica con él a través de una
+configuración inmutable (EngineConfig) y de un observador (EngineObserver).
+
+Uso desde consola:
+    python hermes_engine.py --adb C:\\adb\\adb.exe --links links.txt --mode tradicional
+    python hermes_engine.py --adb C:\\adb\\adb.exe --mode grupos --groups grupos.txt --messages Grupos.txt --whatsapp Ambas
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import json
+import os
+import queue
+import random
+import re
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+
+def _u2():
+    """
+    Módulo uiautomator2, importado en la primera conexión: arrastra requests, adbutils y
+    PIL, y no hace falta para abrir la interfaz ni para los envíos que solo usan ADB.
+    """
+    import uiautomator2
+    return uiautomator2
+
+
+# --- STARTUPINFO para ocultar la consola de ADB (solo Windows) ---
+def _hidden_startupinfo():
+    """Devuelve un STARTUPINFO que oculta la ventana de consola, o None fuera de Windows."""
+    if not hasattr(subprocess, 'STARTUPINFO'):
+        return None
+    si = subprocess.STARTUPINFO()
+    si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    si.wShowWindow = subprocess.SW_HIDE
+    return si
+
+# --- Cancelación y pausa compartidas por todos los hilos de envío ---
+class CancellationToken:
+    """
+    Estado de detención/pausa del motor de envío basado en una Condition.
+
+    Las esperas (sleep, wait_if_paused) bloquean sin sondear y se despiertan en cuanto
+    se pausa, reanuda o detiene. Al detener se ejecutan los 'aborts' registrados, que
+    cortan operaciones en curso (procesos adb, sesiones de shell).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._paused = False
+        self._aborts = {}
+        self._next_id = 0
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            aborts = list(self._aborts.values())
+        for abort in aborts:
+            try:
+                abort()
+            except Exception:
+                pass
+
+    def pause(self):
+        with self._cond:
+            self._paused = True
+            self._cond.notify_all()
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def reset(self):
+        """Deja el token listo para un nuevo envío (sin detención ni pausa)."""
+        with self._cond:
+            self._stopped = False
+            self._paused = False
+            self._cond.notify_all()
+
+    def wait_if_paused(self):
+        """Bloquea mientras esté en pausa. Devuelve False si se detuvo."""
+        with self._cond:
+            while self._paused and not self._stopped:
+                self._cond.wait()
+            return not self._stopped
+
+    def sleep(self, duration):
+        """
+        Espera 'duration' segundos sin contar el tiempo en pausa. Devuelve False si se
+        detuvo antes de terminar.
+        """
+        remaining = duration
+        with self._cond:
+            while remaining > 0 and not self._stopped:
+                if self._paused:
+                    self._cond.wait()
+                    continue
+                start = time.monotonic()
+                self._cond.wait(remaining)
+                remaining -= time.monotonic() - start
+            return not self._stopped
+
+    def add_abort(self, func):
+        """Registra una función a ejecutar al detener. Devuelve un id para quitarla."""
+        with self._cond:
+            self._next_id += 1
+            handle = self._next_id
+            self._aborts[handle] = func
+            already_stopped = self._stopped
+        if already_stopped:
+            try:
+                func()
+            except Exception:
+                pass
+        return handle
+
+    def remove_abort(self, handle):
+        with self._cond:
+            self._aborts.pop(handle, None)
+
+    @contextlib.contextmanager
+    def abort_on_stop(self, func):
+        """Contexto que ejecuta 'func' si se detiene mientras dura el bloque."""
+        handle = self.add_abort(func)
+        try:
+            yield
+        finally:
+            self.remove_abort(handle)
+
+# --- Trazas de rendimiento por tarea (formato Trace Event de Chrome/Perfetto) ---
+class _NullSpan:
+    """Span vacío que se devuelve cuando el trazado está desactivado."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _TraceSpan:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        args = dict(self.tracer.current_tags())
+        args.update(self.args)
+        if exc_type is not None:
+            args['error'] = exc_type.__name__
+        self.tracer.add_complete(self.name, self.start, end, args)
+        return False
+
+
+class TaskTracer:
+    """
+    Registra spans (fase, inicio, duración, hilo) y los exporta como JSON de Trace Event,
+    que se abre en chrome://tracing o ui.perfetto.dev.
+
+    Desactivado, span() devuelve un objeto vacío compartido: el costo es una comparación.
+    Las etiquetas de contexto (dispositivo, paquete, tarea) son por hilo y se agregan a
+    cada span que se cierre dentro de context().
+    """
+
+    def __init__(self, max_events=500000):
+        self.enabled = False
+        self.max_events = max_events
+        self.events = []
+        self.thread_names = {}
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter()
+
+    def reset(self, enabled):
+        with self.lock:
+            self.enabled = enabled
+            self.events = []
+            self.thread_names = {}
+            self.dropped = 0
+            self.origin = time.perf_counter()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _TraceSpan(self, name, args)
+
+    def current_tags(self):
+        return getattr(self.local, 'tags', {})
+
+    @contextlib.contextmanager
+    def context(self, **tags):
+        """Etiqueta los spans del hilo actual mientras dura el bloque."""
+        if not self.enabled:
+            yield
+            return
+        previous = self.current_tags()
+        merged = dict(previous)
+        merged.update({k: v for k, v in tags.items() if v is not None})
+        self.local.tags = merged
+        try:
+            yield
+        finally:
+            self.local.tags = previous
+
+    def add_complete(self, name, start, end, args):
+        thread = threading.current_thread()
+        event = {
+            'name': name, 'cat': 'hermes', 'ph': 'X',
+            'ts': round((start - self.origin) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': os.getpid(), 'tid': thread.ident, 'args': args,
+        }
+        with self.lock:
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            self.events.append(event)
+            self.thread_names.setdefault(thread.ident, thread.name)
+
+    def export(self, path):
+        """Escribe la traza en 'path'. Devuelve la cantidad de spans exportados."""
+        with self.lock:
+            events = list(self.events)
+            names = dict(self.thread_names)
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+            for tid, name in names.items()
+        ]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+# --- Sesión persistente de 'adb shell' ---
+def _is_complete_shell_command(command):
+    """False si el comando tiene comillas sin cerrar o termina en '\\': el sh remoto esperaría más líneas."""
+    try:
+        shlex.split(command)
+    except ValueError:
+        return False
+    return True
+
+
+class AdbShellSession:
+    """
+    Mantiene abierto un proceso 'adb -s <serial> shell' y ejecuta comandos por stdin.
+
+    Cada comando se envía seguido de un marcador único que imprime su código de salida,
+    así se evita lanzar un adb.exe nuevo (50-150 ms) por cada acción.
+    """
+
+    def __init__(self, adb_path, serial):
+        self.adb_path = adb_path
+        self.serial = serial
+        self.lock = threading.Lock()
+        self.proc = None
+        self.lines = None
+        self._start()
+
+    def _start(self):
+        # '-T' desactiva el PTY: sin eco ni prompt, la salida es la del comando
+        self.proc = subprocess.Popen(
+            [self.adb_path, '-s', self.serial, 'shell', '-T'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            startupinfo=_hidden_startupinfo()
+        )
+        self.lines = queue.Queue()
+        threading.Thread(target=self._reader, args=(self.proc, self.lines), daemon=True).start()
+
+    @staticmethod
+    def _reader(proc, lines):
+        """Hilo lector: pasa cada línea de stdout a la cola (None al cerrarse el proceso)."""
+        try:
+            for raw in iter(proc.stdout.readline, b''):
+                lines.put(raw.decode('utf-8', errors='ignore').rstrip('\r\n'))
+        except Exception:
+            pass
+        lines.put(None)
+
+    def is_alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def run(self, command, timeout=10):
+        """
+        Ejecuta 'command' en la sesión. Devuelve (returncode, salida) con stdout y stderr combinados.
+        Lanza subprocess.TimeoutExpired si no termina a tiempo (la sesión queda cerrada).
+        Lanza OSError si la sesión murió (el llamador decide si reintenta).
+        Lanza ValueError, sin escribir nada, si el comando tiene comillas sin cerrar: el sh
+        remoto quedaría esperando más líneas hasta el timeout.
+        """
+        if not _is_complete_shell_command(command):
+            raise ValueError(f"Comando incompleto para la sesión ADB: {command}")
+        marker = f"__HERMES_{os.urandom(6).hex()}__"
+        # stdin del comando desde /dev/null para que no consuma los comandos siguientes
+        payload = f"( {command} ) </dev/null 2>&1; printf '\\n{marker}:%s\\n' \"$?\"\n"
+        with self.lock:
+            if not self.is_alive():
+                raise OSError("Sesión ADB cerrada")
+            try:
+                self.proc.stdin.write(payload.encode('utf-8'))
+                self.proc.stdin.flush()
+            except (OSError, ValueError) as e:
+                self.close()
+                raise OSError(f"Sesión ADB cerrada: {e}")
+
+            output = []
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.close()
+                    raise subprocess.TimeoutExpired(command, timeout)
+                try:
+                    line = self.lines.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if line is None:
+                    self.close()
+                    raise OSError("Sesión ADB cerrada: " + "\n".join(output).strip())
+                if line.startswith(marker + ":"):
+                    try:
+                        code = int(line.split(":", 1)[1].strip())
+                    except ValueError:
+                        code = 1
+                    # Quitar la línea vacía que agrega el printf antes del marcador
+                    if output and output[-1] == "":
+                        output.pop()
+                    return code, "\n".join(output)
+                output.append(line)
+
+    def close(self):
+        proc = self.proc
+        if proc is None:
+            return
+        try:
+            if proc.poll() is None:
+                proc.stdin.close()
+                proc.kill()
+        except Exception:
+            pass
+
+
+# --- Pool de sesiones ADB por dispositivo ---
+class AdbShellPool:
+    """
+    Pool de sesiones 'adb shell' persistentes por dispositivo.
+
+    Cada dispositivo tiene hasta 'max_per_device' sesiones; una sesión atiende un comando
+    a la vez. Las sesiones muertas se reinician solas en el siguiente pedido. Guarda
+    estadísticas de latencia por comando para comparar contra el adb.exe tradicional.
+    """
+
+    def __init__(self, adb_path_getter, max_per_device=3):
+        self.adb_path_getter = adb_path_getter
+        self.max_per_device = max_per_device
+        self.lock = threading.Condition()
+        self.idle = {}       # serial -> [AdbShellSession libres]
+        self.busy = {}       # serial -> cantidad de sesiones en uso
+        self.active = set()  # Sesiones ejecutando un comando (para abort_active)
+        self.abort_generation = 0
+        self.stats = {'commands': 0, 'total_ms': 0.0, 'restarts': 0, 'fallbacks': 0}
+
+    def _acquire(self, serial, timeout):
+        adb = self.adb_path_getter()
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            while True:
+                idle = self.idle.setdefault(serial, [])
+                while idle:
+                    session = idle.pop()
+                    if session.is_alive() and session.adb_path == adb:
+                        self.busy[serial] = self.busy.get(serial, 0) + 1
+                        return session
+                    session.close()
+                    self.stats['restarts'] += 1
+                if len(idle) + self.busy.get(serial, 0) < self.max_per_device:
+                    self.busy[serial] = self.busy.get(serial, 0) + 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(f"adb -s {serial} shell", timeout)
+                self.lock.wait(remaining)
+        # Crear la sesión fuera del lock (Popen puede tardar)
+        try:
+            return AdbShellSession(adb, serial)
+        except Exception:
+            self._release(serial, None)
+            raise
+
+    def _release(self, serial, session):
+        with self.lock:
+            self.busy[serial] = max(0, self.busy.get(serial, 0) - 1)
+            if session is not None and session.is_alive():
+                self.idle.setdefault(serial, []).append(session)
+            self.lock.notify()
+
+    def run(self, serial, command, timeout=10):
+        """
+        Ejecuta un comando de shell en el dispositivo reutilizando una sesión.
+        Devuelve (returncode, salida). Si la sesión muere a mitad, reintenta una vez con
+        una sesión nueva; si tampoco se puede, lanza OSError para que el llamador use adb.exe.
+        """
+        if isinstance(command, (list, tuple)):
+            # Igual que 'adb shell a b c': los argumentos se unen con espacios
+            command = " ".join(str(c) for c in command)
+        start = time.perf_counter()
+        last_error = None
+        for attempt in range(2):
+            session = self._acquire(serial, timeout)
+            with self.lock:
+                self.active.add(session)
+                generation = self.abort_generation
+            try:
+                result = session.run(command, timeout=timeout)
+            except OSError as e:
+                last_error = e
+                session.close()
+                with self.lock:
+                    self.active.discard(session)
+                    aborted = generation != self.abort_generation
+                    if not aborted:
+                        self.stats['restarts'] += 1
+                self._release(serial, None)
+                if aborted:
+                    raise OSError("Comando ADB cancelado")
+                continue
+            except ValueError as e:
+                # Comando incompleto: la sesión sigue sana; adb.exe de un solo uso falla enseguida
+                # con el error de sintaxis real en lugar de esperar el timeout
+                with self.lock:
+                    self.active.discard(session)
+                    self.stats['fallbacks'] += 1
+                self._release(serial, session)
+                raise OSError(str(e))
+            except subprocess.TimeoutExpired:
+                with self.lock:
+                    self.active.discard(session)
+                self._release(serial, None)
+                raise
+            with self.lock:
+                self.active.discard(session)
+            self._release(serial, session)
+            with self.lock:
+                self.stats['commands'] += 1
+                self.stats['total_ms'] += (time.perf_counter() - start) * 1000
+            return result
+        with self.lock:
+            self.stats['fallbacks'] += 1
+        raise OSError(str(last_error) if last_error else "Sesión ADB no disponible")
+
+    def abort_active(self):
+        """Corta los comandos en curso cerrando sus sesiones (se reabren en el próximo pedido)."""
+        with self.lock:
+            self.abort_generation += 1
+            sessions = list(self.active)
+        for session in sessions:
+            session.close()
+
+    def retain(self, serials):
+        """Cierra las sesiones de dispositivos que ya no están conectados."""
+        keep = set(serials)
+        with self.lock:
+            for serial in list(self.idle.keys()):
+                if serial not in keep:
+                    for session in self.idle.pop(serial):
+                        session.close()
+
+    def close_all(self):
+        with self.lock:
+            for sessions in self.idle.values():
+                for session in sessions:
+                    session.close()
+            self.idle.clear()
+
+    def average_ms(self):
+        with self.lock:
+            if not self.stats['commands']:
+                return 0.0
+            return self.stats['total_ms'] / self.stats['commands']
+
+    @staticmethod
+    def benchmark(adb_path, serial, command="echo ok", iterations=30):
+        """
+        Compara la latencia por comando de adb.exe (un proceso por comando) contra el pool.
+        'adb_path' puede ser un adb falso para medir sin teléfono. Devuelve un dict en ms.
+        """
+        si = _hidden_startupinfo()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            subprocess.run([adb_path, '-s', serial, 'shell', command], capture_output=True, startupinfo=si, timeout=30)
+        spawn_ms = (time.perf_counter() - start) * 1000 / iterations
+
+        pool = AdbShellPool(lambda: adb_path, max_per_device=1)
+        try:
+            pool.run(serial, command, timeout=30)  # Abrir la sesión fuera de la medición
+            start = time.perf_counter()
+            for _ in range(iterations):
+                pool.run(serial, command, timeout=30)
+            pooled_ms = (time.perf_counter() - start) * 1000 / iterations
+        finally:
+            pool.close_all()
+        return {'spawn_ms': spawn_ms, 'pooled_ms': pooled_ms,
+                'speedup': spawn_ms / pooled_ms if pooled_ms else 0.0}
+
+# --- Registro compartido de conexiones uiautomator2 ---
+class U2SessionRegistry:
+    """
+    Conexiones uiautomator2 vivas, una por serial, compartidas entre hilos.
+
+    La conexión se abre una sola vez y se reutiliza en todos los envíos. La salud se
+    verifica de forma perezosa (como mucho cada 'health_interval' segundos) y, si falla,
+    se reconecta. Con unlock=True solo se desbloquea cuando la pantalla está apagada.
+    """
+
+    def __init__(self, connect_func=None, health_interval=30.0):
+        self.connect_func = connect_func or (lambda serial: _u2().connect(serial))
+        self.health_interval = health_interval
+        self.lock = threading.Lock()
+        self.sessions = {}      # serial -> [dispositivo u2, último chequeo OK]
+        self.serial_locks = {}  # serial -> Lock (evita dos handshakes simultáneos)
+        self.stats = {'connects': 0, 'reuses': 0, 'reconnects': 0}
+
+    def _serial_lock(self, serial):
+        with self.lock:
+            return self.serial_locks.setdefault(serial, threading.Lock())
+
+    def get(self, serial, unlock=False):
+        """Devuelve la conexión u2 del dispositivo (conectando si hace falta). Lanza la excepción de u2 si no conecta."""
+        with self._serial_lock(serial):
+            entry = self.sessions.get(serial)
+            now = time.monotonic()
+            if entry is not None:
+                d, last_ok = entry
+                if not unlock and now - last_ok < self.health_interval:
+                    self.stats['reuses'] += 1
+                    return d
+                try:
+                    # Un solo RPC sirve de chequeo de salud y para saber si la pantalla está encendida
+                    info = d.info
+                    if unlock and not info.get('screenOn', True):
+                        d.unlock()
+                    entry[1] = time.monotonic()
+                    self.stats['reuses'] += 1
+                    return d
+                except Exception:
+                    self.sessions.pop(serial, None)
+                    self.stats['reconnects'] += 1
+
+            d = self.connect_func(serial)
+            if unlock:
+                d.unlock()
+            self.sessions[serial] = [d, time.monotonic()]
+            self.stats['connects'] += 1
+            return d
+
+    def invalidate(self, serial):
+        """Descarta la conexión de un dispositivo (se reconecta en el próximo get)."""
+        with self.lock:
+            self.sessions.pop(serial, None)
+
+    def retain(self, serials):
+        """Olvida las conexiones de dispositivos que ya no están conectados."""
+        keep = set(serials)
+        with self.lock:
+            for serial in list(self.sessions.keys()):
+                if serial not in keep:
+                    self.sessions.pop(serial, None)
+
+    def warm(self, serials, log_func=None):
+        """Abre en paralelo las conexiones de todos los dispositivos (en segundo plano)."""
+        def connect(serial):
+            try:
+                self.get(serial)
+            except Exception as e:
+                if log_func:
+                    log_func(f"No se pudo preparar uiautomator2 en {serial}: {e}", 'warning')
+
+        for serial in serials:
+            threading.Thread(target=connect, args=(serial,), daemon=True).start()
+
+# --- Selectores de UI de WhatsApp/SMS (compartidos por los localizadores) ---
+CHAT_FIELD_SELECTORS = [
+    # 1. Por resourceId (el más fiable)
+    dict(resourceId="com.whatsapp:id/entry"),
+    dict(resourceId="com.whatsapp.w4b:id/entry"),
+    # 2. Por className (debe ser un EditText)
+    dict(className="android.widget.EditText"),
+    # 3. Por descripción de accesibilidad (fallback)
+    dict(description="Mensaje"),
+    dict(description="Message"),
+    dict(descriptionMatches="(?i).*mensaje.*"),
+    dict(descriptionMatches="(?i).*message.*"),
+]
+
+SMS_SEND_BUTTON_SELECTORS = [
+    # Google Messages
+    dict(resourceId="com.google.android.apps.messaging:id/send_message_button"),
+    dict(resourceId="com.google.android.apps.messaging:id/send_message_button_icon"),
+    # Samsung Messages
+    dict(resourceId="com.samsung.android.messaging:id/send_button"),
+    # Selectores AMPLIOS (RCS, SMS, Enviar)
+    # Confiamos en el filtro de posición de send_msg para evitar botones de arriba
+    dict(textMatches="(?i).*(sms|enviar|send|rcs).*"),
+    dict(descriptionMatches="(?i).*(sms|enviar|send|rcs).*"),
+    dict(contentDescriptionMatches="(?i).*(sms|enviar|send|rcs).*"),
+    # Selectores específicos de iconos de Google Messages (candado, avión, etc)
+    dict(resourceIdMatches="(?i).*send_message_button.*"),
+    dict(resourceIdMatches="(?i).*send_button.*"),
+]
+
+WA_SEND_BUTTON_SELECTORS = [
+    dict(description="Enviar"),
+    dict(description="Enviar mensaje"),
+    dict(description="Send"),
+    dict(text="Enviar"),
+    dict(text="Enviar mensaje"),
+    dict(text="Send"),
+    dict(resourceId="com.whatsapp:id/send"),
+    dict(resourceId="com.whatsapp.w4b:id/send"),
+    dict(resourceId="com.whatsapp:id/send_button"),
+    dict(resourceId="com.whatsapp.w4b:id/send_button"),
+]
+
+JOIN_GROUP_SELECTORS = [
+    dict(textMatches="(?i)unirme"),
+    dict(textMatches="(?i)unirse"),
+    dict(textMatches="(?i)unir(me)?(\\s+al)?\\s+grupo"),
+    dict(textMatches="(?i)join\\s*(group)?"),
+    dict(textMatches="(?i)acept(ar|ar\\s+invitaci[oó]n)?"),
+    dict(textMatches="(?i)accept"),
+    dict(descriptionMatches="(?i)unirme"),
+    dict(descriptionMatches="(?i)unirse"),
+    dict(descriptionMatches="(?i)join\\s*(group)?"),
+    dict(descriptionMatches="(?i)acept(ar|ar\\s+invitaci[oó]n)?"),
+    dict(descriptionMatches="(?i)accept"),
+]
+
+SEND_FAILURE_SELECTORS = [
+    dict(textMatches="(?i)no se envi[óo]"),
+    dict(descriptionMatches="(?i)no se envi[óo]"),
+    dict(textMatches="(?i)mensaje no enviado"),
+    dict(descriptionMatches="(?i)mensaje no enviado"),
+    dict(textMatches="(?i)reintentar"),
+    dict(descriptionMatches="(?i)reintentar"),
+    dict(resourceIdMatches="(?i).*retry.*"),
+    dict(resourceIdMatches="(?i).*resend.*"),
+]
+
+# --- Captura única de la jerarquía de UI para evaluar selectores localmente ---
+class UiHierarchySnapshot:
+    """
+    Resultado de un solo dump_hierarchy() parseado una vez.
+
+    Permite evaluar muchos selectores de uiautomator2 sin un RPC por selector. Se
+    respeta la semántica de u2: igualdad exacta para text/description/resourceId/className
+    y coincidencia completa (como String.matches de Java) para los *Matches. Solo se
+    considera la primera coincidencia (instancia 0), que es la que usaría ui_device(**selector).
+    """
+
+    ATTRS = {
+        'text': 'text', 'textMatches': 'text',
+        'description': 'content-desc', 'descriptionMatches': 'content-desc',
+        'resourceId': 'resource-id', 'resourceIdMatches': 'resource-id',
+        'className': 'class', 'classNameMatches': 'class',
+        'packageName': 'package', 'packageNameMatches': 'package',
+    }
+    _regex_cache = {}
+
+    def __init__(self, xml_text):
+        self.nodes = []
+        self.height = 0
+        root = ET.fromstring(xml_text.encode('utf-8') if isinstance(xml_text, str) else xml_text)
+        for node in root.iter('node'):
+            bounds = self._parse_bounds(node.get('bounds', ''))
+            self.nodes.append((node.attrib, bounds))
+            if bounds:
+                self.height = max(self.height, bounds['bottom'])
+
+    @staticmethod
+    def _parse_bounds(raw):
+        nums = re.findall(r'-?\d+', raw or '')
+        if len(nums) != 4:
+            return {}
+        left, top, right, bottom = (int(n) for n in nums)
+        return {'left': left, 'top': top, 'right': right, 'bottom': bottom}
+
+    @classmethod
+    def _regex(cls, pattern):
+        compiled = cls._regex_cache.get(pattern)
+        if compiled is None:
+            compiled = re.compile(pattern, re.DOTALL)
+            cls._regex_cache[pattern] = compiled
+        return compiled
+
+    def _matches(self, attrs, selector):
+        for key, value in selector.items():
+            attr = self.ATTRS.get(key)
+            if attr is None:
+                return False  # Selector no soportado por u2: no coincide nunca
+            actual = attrs.get(attr, '')
+            if key.endswith('Matches'):
+                try:
+                    if not self._regex(value).fullmatch(actual):
+                        return False
+                except re.error:
+                    return False
+            elif actual != value:
+                return False
+        return True
+
+    def find(self, selector):
+        """Devuelve los 'bounds' de la primera coincidencia del selector, o None."""
+        node = self.find_node(selector)
+        return node[1] if node is not None else None
+
+    def find_node(self, selector):
+        """Devuelve (atributos, bounds) de la primera coincidencia del selector, o None."""
+        for attrs, bounds in self.nodes:
+            if self._matches(attrs, selector):
+                return attrs, bounds
+        return None
+
+
+# --- Seguimiento de dispositivos en vivo (stream 'host:track-devices' del servidor ADB) ---
+class AdbDeviceTracker:
+    """
+    Mantiene un socket abierto con el servidor ADB local y recibe la lista de dispositivos
+    cada vez que cambia (protocolo 'host:track-devices': longitud en 4 dígitos hex + payload
+    con líneas 'serial\\testado'). Llama a on_change(lista de (serial, estado)) desde su hilo.
+    Si el servidor no responde, reintenta cada 'retry_interval' segundos.
+    """
+
+    def __init__(self, on_change, host='127.0.0.1', port=5037, retry_interval=2.0):
+        self.on_change = on_change
+        self.host = host
+        self.port = port
+        self.retry_interval = retry_interval
+        self.thread = None
+        self.sock = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        if self.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def stop(self):
+        self.stop_event.set()
+        sock = self.sock
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _recv_exact(self, sock, size):
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Servidor ADB cerró la conexión")
+            data += chunk
+        return data
+
+    @staticmethod
+    def parse_devices(payload):
+        """Convierte el payload del stream en [(serial, estado), ...]."""
+        devices = []
+        for line in payload.splitlines():
+            parts = line.strip().split('\t')
+            if len(parts) >= 2 and parts[0]:
+                devices.append((parts[0], parts[1]))
+        return devices
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=5)
+                self.sock = sock
+                request = b"host:track-devices"
+                sock.sendall(b"%04x" % len(request) + request)
+                status = self._recv_exact(sock, 4)
+                if status != b"OKAY":
+                    raise ConnectionError("El servidor ADB rechazó track-devices")
+                sock.settimeout(None)  # El stream solo envía datos cuando algo cambia
+                while not self.stop_event.is_set():
+                    length = int(self._recv_exact(sock, 4), 16)
+                    payload = self._recv_exact(sock, length).decode('utf-8', errors='ignore') if length else ""
+                    try:
+                        self.on_change(self.parse_devices(payload))
+                    except Exception:
+                        pass
+            except (OSError, ValueError, ConnectionError):
+                pass
+            finally:
+                if self.sock is not None:
+                    try:
+                        self.sock.close()
+                    except OSError:
+                        pass
+                    self.sock = None
+            self.stop_event.wait(self.retry_interval)
+
+
+# --- Configuración inmutable de una ejecución ---
+@dataclasses.dataclass(frozen=True)
+class EngineConfig:
+    """
+    Valores de configuración que el motor lee durante un envío. La interfaz toma una
+    instantánea de sus variables Tk al iniciar (en el hilo de la UI) y los hilos de envío
+    solo leen de aquí, sin tocar tkinter.
+    """
+    adb_path: str = ""
+    # Modo tradicional (Excel/CSV)
+    delay_min: int = 3
+    delay_max: int = 5
+    wait_after_open: int = 7
+    wait_after_first_enter: int = 2
+    wait_between_messages: int = 2
+    pause_sends_count: int = 10
+    pause_sends_delay_min: int = 30
+    pause_sends_delay_max: int = 60
+    traditional_send_mode: str = "Business"
+    traditional_simultaneous_mode: bool = False
+    # Modo SMS
+    sms_delay_min: int = 10
+    sms_delay_max: int = 15
+    sms_simultaneous_mode: bool = False
+    sms_enable_call: bool = False
+    sms_call_duration: int = 10
+    # Grupos
+    auto_join_groups: bool = True
+    # Fidelizado
+    fidelizado_send_delay_min: int = 10
+    fidelizado_send_delay_max: int = 15
+    fidelizado_numeros_mode: str = "Uno a uno"
+    simultaneous_mode: bool = False
+    whatsapp_mode: str = "Todas"
+    mixto_variant: int = 1
+    manual_loops: int = 1
+    manual_cycles: int = 1
+    # Llamadas
+    calls_delay_min: int = 5
+    calls_delay_max: int = 10
+    calls_duration: int = 15
+    calls_whatsapp_mode: str = "Business"
+    calls_simultaneous_mode: bool = False
+    # Diagnóstico
+    trace_enabled: bool = False
+
+
+# --- Observador de eventos del motor ---
+class EngineObserver:
+    """
+    Recibe los eventos del motor. Los métodos se llaman desde los hilos de envío: quien
+    los implemente debe pasar a su propio hilo lo que no sea seguro (p. ej. widgets Tk).
+    """
+
+    def on_log(self, message, level='info'):
+        pass
+
+    def on_progress(self, current, total, sent, failed):
+        pass
+
+    def on_finished(self, cancelled):
+        pass
+
+    def on_error(self, title, message):
+        """Error que el usuario debe ver (en la interfaz, un cuadro de diálogo)."""
+        pass
+
+    def on_info(self, title, message):
+        """Aviso al usuario al terminar una tarea (en la interfaz, un cuadro de diálogo)."""
+        pass
+
+
+# --- Motor de envío (lógica compartida por la ventana y el ejecutor de consola) ---
+class SendingEngine:
+    """
+    Estado y lógica de envío independientes de la interfaz. Las subclases llaman a
+    _init_engine() en su constructor y fijan run_config antes de cada ejecución.
+    """
+
+    # Apps que siempre se consideran para cerrar (mensajería, ajustes, etc.)
+    CLOSE_APPS_TARGETS = [
+        "com.whatsapp.w4b",
+        "com.whatsapp",
+        "com.google.android.googlequicksearchbox",
+        "com.google.android.apps.messaging",
+        "com.samsung.android.messaging",
+        "com.android.mms",
+        "com.google.android.contacts",
+        "com.android.settings",
+        "com.android.chrome",
+        "com.google.android.youtube",
+        "com.facebook.katana",
+        "com.instagram.android"
+    ]
+    # Tiempo de validez del inventario de paquetes por dispositivo (segundos)
+    PACKAGE_INVENTORY_TTL = 600
+
+    def _init_engine(self, observer=None):
+        self.observer = observer or EngineObserver()
+        self.run_config = EngineConfig()
+        self.adb_exe = ""
+        self.links = []
+        self.link_retry_map = {}
+        self.devices = []
+        self.report_data = []
+        self.sms_mode_active = False
+        self.manual_mode = False
+        self.fidelizado_mode = None
+        # Entradas de los modos Fidelizado y Llamadas (las carga la interfaz o HeadlessRunner)
+        self.manual_inputs_numbers = []
+        self.manual_inputs_groups = []
+        self.manual_messages_numbers = []
+        self.manual_messages_groups = []
+        self.mensaje_start_index = 0
+        self.manual_loops = 1
+        self.detected_phone_lines = []
+        self.raw_data = []
+        self.calls_selected_columns = []
+        # Sesiones 'adb shell' persistentes por dispositivo (evita un adb.exe por comando)
+        self.adb_pool = AdbShellPool(lambda: self.adb_exe)
+        # Conexiones uiautomator2 compartidas (una por dispositivo)
+        self.u2_registry = U2SessionRegistry()
+        self.offline_devices = set()  # Dispositivos desconectados durante un envío
+        # Métricas del sondeo de UI en _wait_for_chat_ready (RPCs y tiempo por sondeo)
+        self.ui_poll_stats = {'polls': 0, 'rpcs': 0, 'fallback_polls': 0, 'total_ms': 0.0}
+        # Detección de fallo tras enviar: capturas repartidas en un presupuesto fijo de tiempo
+        self.send_failure_budget = 1.0   # Segundos máximos de espera del aviso 'No se envió'
+        self.send_failure_snapshots = 2  # Capturas de la jerarquía dentro de ese presupuesto
+        self.failure_check_stats = {'checks': 0, 'snapshots': 0, 'detected': 0, 'early': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        # Los hilos de los modos simultáneos suman en los mismos contadores
+        self.stats_lock = threading.Lock()
+        # Tiempos reales de apertura ('am start -W') por (dispositivo, paquete)
+        self.launch_stats = {}
+        self.launch_stats_lock = threading.Lock()
+        # Trazas por fase de cada tarea
+        self.tracer = TaskTracer()
+        # Inventario de paquetes por dispositivo para close_all_apps (se invalida al detectar)
+        self.package_inventory = {}
+        self.close_apps_targeted = True  # Solo detener las apps que están corriendo
+        self.force_stop_avg_s = 0.15  # Costo estimado de un 'am force-stop' (se mide en cada limpieza)
+
+        self.is_running = False
+        # Detención/pausa: todas las esperas del motor bloquean sobre este token
+        self.cancel_token = CancellationToken()
+        self.cancel_token.add_abort(self.adb_pool.abort_active)
+        self.is_paused = False
+        self.should_stop = False
+
+        self.total_messages = 0
+        self.sent_count = 0
+        self.failed_count = 0
+        self.current_index = 0
+        self.last_task_time = None  # Tiempo de inicio de la última tarea
+        self.run_error = None  # Excepción que cortó el último envío (ver run_campaign)
+
+    @property
+    def should_stop(self):
+        return self.cancel_token.stopped
+
+    @should_stop.setter
+    def should_stop(self, value):
+        # True detiene (y aborta lo que esté en curso); False prepara un nuevo envío
+        if value:
+            self.cancel_token.stop()
+        else:
+            self.cancel_token.reset()
+
+    @property
+    def is_paused(self):
+        return self.cancel_token.paused
+
+    @is_paused.setter
+    def is_paused(self, value):
+        if value:
+            self.cancel_token.pause()
+        else:
+            self.cancel_token.resume()
+
+    def _reset_run_stats(self):
+        """Deja contadores y métricas en cero para una nueva ejecución."""
+        self.is_running = True
+        self.is_paused = False
+        self.should_stop = False
+        self.sent_count = 0
+        self.failed_count = 0
+        self.current_index = 0
+        self.ui_poll_stats = {'polls': 0, 'rpcs': 0, 'fallback_polls': 0, 'total_ms': 0.0}
+        self.failure_check_stats = {'checks': 0, 'snapshots': 0, 'detected': 0, 'early': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        with self.launch_stats_lock:
+            self.launch_stats = {}
+        self.tracer.reset(enabled=self.run_config.trace_enabled)
+
+    def _count_stats(self, stats, **deltas):
+        """Suma 'deltas' a un dict de métricas compartido entre hilos."""
+        with self.stats_lock:
+            for key, amount in deltas.items():
+                stats[key] += amount
+
+    def _notify_progress(self):
+        """Informa el avance al observador (se llama desde los hilos de envío)."""
+        self.observer.on_progress(self.current_index, self.total_messages, self.sent_count, self.failed_count)
+
+    def log(self, msg, tag='info'):
+        self.observer.on_log(msg, tag)
+
+    def record_fidelizado_activity(self, sender_number, receiver_number):
+        """Registro de actividad Fidelizado; solo la interfaz lo muestra."""
+        pass
+
+    def _current_whatsapp_mode(self):
+        """Filtro de WhatsApp vigente (la interfaz lo redefine para leer su selección fuera de un envío)."""
+        return self.run_config.whatsapp_mode
+
+    def _run_send_mode(self):
+        """Ejecuta el modo de envío elegido según fidelizado_mode, sms_mode_active y run_config."""
+        # Los modos Fidelizado (GRUPOS, NUMEROS, etc.) son sub-modos de WhatsApp.
+        if self.fidelizado_mode == "GRUPOS":
+            if self.run_config.simultaneous_mode:
+                self.run_grupos_simultaneous_thread()
+            else:
+                self.run_grupos_dual_whatsapp_thread() # <-- WHATSAPP
+        elif self.fidelizado_mode == "NUMEROS_MANUAL":
+            if self.run_config.simultaneous_mode:
+                self.run_numeros_manual_simultaneous_thread() # <-- SIMULTÁNEO
+            else:
+                self.run_numeros_manual_thread() # <-- WHATSAPP
+        elif self.fidelizado_mode == "NUMEROS":
+            if self.run_config.fidelizado_numeros_mode == "Uno a uno":
+                self.run_uno_a_uno_thread() # <-- WHATSAPP
+            else: # Uno a muchos
+                if self.run_config.simultaneous_mode:
+                    self.run_uno_a_muchos_simultaneous_thread() # <-- SIMULTÁNEO
+                else:
+                    self.run_uno_a_muchos_thread() # <-- WHATSAPP
+        elif self.fidelizado_mode == "MIXTO":
+            self.run_mixto_dual_whatsapp_thread() # <-- WHATSAPP
+        elif self.sms_mode_active:
+            if self.run_config.sms_simultaneous_mode:
+                self.run_sms_parallel_thread() # <-- SMS SIMULTÁNEO
+            else:
+                self.run_sms_thread() # <-- SMS
+        else:
+            # <-- WHATSAPP (Tradicional)
+            if self.run_config.traditional_simultaneous_mode:
+                self.run_traditional_simultaneous_thread()
+            else:
+                self.run_default_thread()
+
+    def run_campaign(self, target=None, args=(), prepare=True, initial_pause=0):
+        """
+        Ciclo completo de un envío, igual para la ventana y para HeadlessRunner: limpieza de
+        los dispositivos en paralelo, pausa inicial, el modo ('target', o _run_send_mode),
+        resumen o aviso de cancelación, traza y on_finished. Las tareas sueltas (llamadas,
+        unirse a grupos) van con prepare=False: sin limpieza ni resumen de envío.
+        Un error inesperado se informa con on_error y queda en run_error.
+        """
+        self.run_error = None
+        try:
+            if prepare:
+                self.log("INICIANDO ENVÍO", 'success')
+
+                # Limpieza inicial en paralelo para ahorrar tiempo
+                self.log("Preparando dispositivos (limpieza)...", 'info')
+                cleanup_threads = []
+                for dev in self.devices:
+                    if self.should_stop:
+                        break
+                    t = threading.Thread(target=self.close_all_apps, args=(dev,), daemon=True)
+                    cleanup_threads.append(t)
+                    t.start()
+                for t in cleanup_threads:
+                    t.join(timeout=10)
+
+                if not self.should_stop and initial_pause:
+                    self.log(f"Pausa inicial de {initial_pause}s...", 'info')
+                    self._controlled_sleep(initial_pause)
+
+            if not self.should_stop:
+                (target or self._run_send_mode)(*args)
+
+            if self.should_stop:
+                self.log("Cancelado", 'warning')
+            elif prepare:
+                self._log_run_summary()
+        except Exception as e:
+            self.run_error = e
+            self.log(f"Error CRÍTICO en el hilo de envío: {e}", 'error')
+            import traceback
+            print(f"ERROR THREAD ENVIO:\n{traceback.format_exc()}")
+            self.observer.on_error("Error Crítico", f"Ocurrió un error inesperado durante el envío:\n{e}\n\nRevise el log para más detalles.")
+        finally:
+            self.is_running = False
+            if self.tracer.enabled:
+                self._export_trace()
+            self.observer.on_finished(self.should_stop)
+
+    def _trace_export_path(self):
+        """Destino de la traza al terminar un envío; None para no guardarla (la interfaz lo redefine)."""
+        return None
+
+    def _export_trace(self):
+        """Guarda la traza del envío en _trace_export_path(), si hay destino."""
+        path = self._trace_export_path()
+        if not path:
+            return
+        try:
+            count = self.tracer.export(path)
+            extra = f" ({self.tracer.dropped} descartados)" if self.tracer.dropped else ""
+            self.log(f"Traza guardada: {path} · {count} spans{extra}. Abrir en ui.perfetto.dev o chrome://tracing.", 'info')
+        except OSError as e:
+            self.log(f"No se pudo guardar la traza: {e}", 'error')
+
+    def _log_run_summary(self):
+        """Escribe en el log el resumen de un envío completado y sus métricas."""
+        self.log("ENVÍO FINALIZADO", 'success')
+        self.log(f"Resumen: Enviados: {self.sent_count} | Fallidos: {self.failed_count}", 'info')
+        pool_stats = self.adb_pool.stats
+        if pool_stats['commands']:
+            self.log(f"Sesiones ADB: {pool_stats['commands']} comandos, {self.adb_pool.average_ms():.0f} ms promedio, {pool_stats['restarts']} reinicios", 'info')
+        if self.ui_poll_stats['polls']:
+            polls = self.ui_poll_stats['polls']
+            self.log(f"Sondeo de UI: {polls} sondeos, {self.ui_poll_stats['rpcs'] / polls:.1f} RPC/sondeo, {self.ui_poll_stats['total_ms'] / polls:.0f} ms/sondeo", 'info')
+        fc = self.failure_check_stats
+        if fc['checks']:
+            legacy_ms = len(SEND_FAILURE_SELECTORS) * 1000  # Antes: wait(1s) por cada selector
+            self.log(f"Detección de fallo: {fc['checks']} chequeos, {fc['total_ms'] / fc['checks']:.0f} ms/mensaje (máx {fc['max_ms']:.0f} ms, antes hasta {legacy_ms} ms), {fc['detected']} fallos detectados, {fc['early']} confirmados en la primera captura", 'info')
+        u2_stats = self.u2_registry.stats
+        self.log(f"uiautomator2: {u2_stats['connects']} conexiones, {u2_stats['reuses']} reutilizadas, {u2_stats['reconnects']} reconexiones", 'info')
+        self._log_launch_stats()
+
+    def _controlled_sleep(self, duration):
+        """Realiza una espera respetando pausas y cancelaciones."""
+        try:
+            duration = max(0.0, float(duration))
+        except (TypeError, ValueError):
+            duration = 0.0
+        # Bloquea sobre el token: se despierta al instante si se pausa o se detiene
+        with self.tracer.span("sleep", seconds=duration):
+            self.cancel_token.sleep(duration)
+
+    def _run_adb_command(self, args, timeout=10):
+        """Ejecuta un comando ADB y maneja errores comunes."""
+        # --- FIX: Añadir bucle de pausa ---
+        self.cancel_token.wait_if_paused()
+        if self.should_stop:
+            return False # Indicar que la tarea fue cancelada
+        # --- FIN FIX ---
+
+        adb = self.adb_exe
+        full_args = [adb] + args # Construye la lista completa de argumentos
+
+        # Ocultar ventana de consola de ADB
+        startupinfo = _hidden_startupinfo()
+
+        try:
+            # Comandos 'adb -s <serial> shell ...': usar la sesión persistente del dispositivo
+            result = None
+            if len(args) > 3 and args[0] == '-s' and args[2] == 'shell':
+                try:
+                    with self.tracer.span("adb", cmd=" ".join(str(a) for a in args[3:6])):
+                        code, output = self.adb_pool.run(args[1], args[3:], timeout=timeout)
+                    # En la sesión stdout y stderr vienen juntos; la salida sirve como stderr
+                    result = subprocess.CompletedProcess(full_args, code, output, output if code != 0 else "")
+                except OSError:
+                    if self.should_stop:
+                        return False # Comando cortado por la cancelación
+                    result = None # Sesión no disponible: usar adb.exe y obtener su error real
+            if result is None:
+                # Ejecutar SIEMPRE como lista, NUNCA con shell=True si hay rutas
+                result = self._run_cancellable_process(full_args, timeout, startupinfo)
+            if result.returncode != 0 and result.stderr:
+                # Limpiar errores comunes
+                stderr_clean = result.stderr.strip()
+                if "Usage: input" in stderr_clean:
+                    stderr_clean = "Error Uso Input (argumentos inválidos)"
+                elif "NullPointerException" in stderr_clean:
+                    stderr_clean = "NullPointerException (procesando texto)"
+                elif "Killed" in stderr_clean:
+                    stderr_clean = "Proceso Killed (mensaje largo?)"
+                elif "unknown command" in stderr_clean:
+                     stderr_clean = "Comando ADB desconocido"
+                elif "device unauthorized" in stderr_clean:
+                     stderr_clean = "Dispositivo no autorizado (revisa el teléfono)"
+                elif "device not found" in stderr_clean:
+                     stderr_clean = "Dispositivo no encontrado (desconectado?)"
+
+                self.log(f"Error ADB: {stderr_clean}", 'error')
+                return False # Indicar fallo
+            elif result.returncode != 0:
+                 self.log(f"Error ADB (código {result.returncode}, sin stderr)", 'error')
+                 return False # Indicar fallo
+            return True # Indicar éxito
+        except subprocess.TimeoutExpired:
+            self.log("Timeout en comando ADB", 'error')
+            return False
+        except Exception as e:
+            self.log(f"Error inesperado ejecutando ADB: {e}", 'error')
+            return False
+
+    def _run_cancellable_process(self, full_args, timeout, startupinfo=None):
+        """Como subprocess.run(capture_output=True), pero el proceso se mata al cancelar el envío."""
+        proc = subprocess.Popen(full_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                startupinfo=startupinfo, encoding='utf-8', errors='ignore')
+        with self.cancel_token.abort_on_stop(proc.kill), self.tracer.span("adb.exe", cmd=" ".join(str(a) for a in full_args[1:6])):
+            try:
+                stdout, stderr = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                raise
+        return subprocess.CompletedProcess(full_args, proc.returncode, stdout, stderr)
+
+    def _get_current_focus(self, device):
+        """Obtiene la salida de mCurrentFocus para verificar si la app abrió."""
+        try:
+            with self.tracer.span("adb.focus"):
+                return self.adb_pool.run(device, 'dumpsys window | grep mCurrentFocus', timeout=4)[1].strip()
+        except OSError:
+            pass # Sesión no disponible: usar adb.exe
+        except subprocess.TimeoutExpired:
+            return ""
+        try:
+            adb = self.adb_exe
+            # Ejecutamos directamente, adb shell concatena los argumentos
+            cmd = [adb, '-s', device, 'shell', 'dumpsys window | grep mCurrentFocus']
+
+            si = _hidden_startupinfo()
+
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=4,
+                startupinfo=si,
+                encoding='utf-8',
+                errors='ignore'
+            )
+            return result.stdout.strip()
+        except Exception:
+            return ""
+
+    def _start_activity_timed(self, device, am_args, package=None, timeout=20):
+        """
+        Abre una actividad con 'am start -W', que bloquea hasta que la actividad se dibuja
+        e informa cuánto tardó. Registra el tiempo por (dispositivo, paquete).
+
+        Returns:
+            dict con 'ok', 'activity' (componente en primer plano, '' si no se informó),
+            'total_ms' (TotalTime de Android o None) y 'wall_s'; o None si la sesión ADB
+            no está disponible y hay que usar el camino anterior con esperas fijas.
+        """
+        self.cancel_token.wait_if_paused()
+        if self.should_stop:
+            return {'ok': False, 'activity': '', 'total_ms': None, 'wall_s': 0.0}
+
+        start = time.time()
+        try:
+            with self.tracer.span("am_start", package=package):
+                code, output = self.adb_pool.run(device, ['am', 'start', '-W'] + list(am_args), timeout=timeout)
+        except OSError:
+            return None
+        except subprocess.TimeoutExpired:
+            self.log(f"[{device}] Timeout abriendo la actividad.", 'error')
+            return {'ok': False, 'activity': '', 'total_ms': None, 'wall_s': time.time() - start}
+        wall_s = time.time() - start
+
+        fields = {}
+        for line in output.splitlines():
+            key, sep, value = line.partition(':')
+            if sep:
+                fields[key.strip()] = value.strip()
+        ok = code == 0 and 'Error' not in fields and fields.get('Status', 'ok') == 'ok'
+        total_ms = None
+        for key in ('TotalTime', 'WaitTime'):
+            if fields.get(key, '').isdigit():
+                total_ms = int(fields[key])
+                break
+        activity = fields.get('Activity', '')
+
+        if ok:
+            pkg = activity.split('/')[0] if activity else (package or '?')
+            measured_ms = total_ms if total_ms is not None else wall_s * 1000
+            with self.launch_stats_lock:
+                stats = self.launch_stats.setdefault((device, pkg), {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                stats['count'] += 1
+                stats['total_ms'] += measured_ms
+                stats['max_ms'] = max(stats['max_ms'], measured_ms)
+        else:
+            self.log(f"[{device}] 'am start' falló: {fields.get('Error') or output.strip()[:120]}", 'error')
+        return {'ok': ok, 'activity': activity, 'total_ms': total_ms, 'wall_s': wall_s}
+
+    def _log_launch_stats(self):
+        """Resume los tiempos de apertura medidos frente a la 'Espera Abrir' configurada."""
+        with self.launch_stats_lock:
+            items = sorted(self.launch_stats.items())
+        if not items:
+            return
+        configured = self.run_config.wait_after_open
+        self.log(f"Tiempos de apertura (Espera Abrir configurada: {configured}s):", 'info')
+        for (device, pkg), stats in items:
+            avg_s = stats['total_ms'] / stats['count'] / 1000
+            self.log(f"  {device} · {pkg}: {avg_s:.2f}s promedio, máx {stats['max_ms'] / 1000:.2f}s ({stats['count']} aperturas)", 'info')
+
+    def _capture_ui_snapshot(self, ui_device):
+        """Toma un único dump_hierarchy() y lo parsea. Devuelve None si no se pudo."""
+        if ui_device is None:
+            return None
+        try:
+            with self.tracer.span("u2.dump_hierarchy"):
+                return UiHierarchySnapshot(ui_device.dump_hierarchy())
+        except Exception:
+            return None
+
+    def _benchmark_ui_polling(self, ui_device, is_sms=False, iterations=5):
+        """
+        Compara un sondeo con un RPC por selector contra un sondeo con una sola captura
+        de la jerarquía. Devuelve RPCs y ms promedio por sondeo de cada variante.
+        """
+        results = {}
+        for mode in ("selectores", "captura"):
+            rpcs_before = self.ui_poll_stats['rpcs']
+            start = time.perf_counter()
+            for _ in range(iterations):
+                snapshot = None
+                if mode == "captura":
+                    snapshot = self._capture_ui_snapshot(ui_device)
+                    self._count_stats(self.ui_poll_stats, rpcs=1)
+                self._locate_join_group_button(ui_device, wait_timeout=0, snapshot=snapshot)
+                self._locate_chat_field(ui_device, wait_timeout=0, snapshot=snapshot)
+                self._locate_message_send_button(ui_device, is_sms=is_sms, wait_timeout=0, snapshot=snapshot)
+            results[mode] = {
+                'rpcs': (self.ui_poll_stats['rpcs'] - rpcs_before) / iterations,
+                'ms': (time.perf_counter() - start) * 1000 / iterations,
+            }
+        return results
+
+    def _locate_chat_field(self, ui_device, wait_timeout=0.1, snapshot=None):
+        """Busca el campo de texto de la conversación actual de forma eficiente."""
+        if ui_device is None:
+            return None
+
+        for selector in CHAT_FIELD_SELECTORS:
+            try:
+                if snapshot is not None:
+                    # Evaluación local sobre la jerarquía ya capturada (sin RPC)
+                    bounds = snapshot.find(selector)
+                    if bounds is None:
+                        continue
+                    candidate = ui_device(**selector)
+                else:
+                    self._count_stats(self.ui_poll_stats, rpcs=1)
+                    candidate = ui_device(**selector)
+                    if not candidate.wait(timeout=wait_timeout):
+                        continue
+                    info = candidate.info or {}
+                    bounds = info.get('bounds') or {}
+                if not bounds or bounds.get('left') == bounds.get('right'):
+                    continue
+
+                self.log(f"✓ Campo de texto encontrado con selector: {selector}", "info")
+                return candidate
+            except Exception:
+                continue
+
+        return None
+
+    def _locate_message_send_button(self, ui_device, is_sms=False, wait_timeout=2, snapshot=None):
+        """Busca el botón de enviar dentro de la conversación actual."""
+        if ui_device is None:
+            return None
+
+        selectors = SMS_SEND_BUTTON_SELECTORS if is_sms else WA_SEND_BUTTON_SELECTORS
+
+        # Con una captura de la jerarquía basta una pasada: los datos no cambian entre intentos
+        for attempt in range(1 if snapshot is not None else 2):
+            for selector in selectors:
+                # Verificar cancelación/pausa entre cada intento de selector 
+
+                if self.should_stop:
+                    return None
+
+                self.cancel_token.wait_if_paused()
+
+                try:
+                    if snapshot is not None:
+                        bounds = snapshot.find(selector)
+                        if bounds is None:
+                            continue
+                        h = snapshot.height
+                        if bounds and h and bounds.get('top', 0) < (h * 0.3): # Ignorar 30% superior
+                            continue
+                        return ui_device(**selector)
+
+                    self._count_stats(self.ui_poll_stats, rpcs=1)
+                    candidate = ui_device(**selector)
+                    if candidate.exists:
+                        info = candidate.info
+                        bounds = info.get('bounds')
+                        if bounds:
+                            # Filtro estricto de posición (evita botones de arriba)
+                            w_size = ui_device.window_size()
+                            h = w_size[1]
+                            top = bounds.get('top', 0)
+                            if top < (h * 0.3): # Ignorar 30% superior
+                                continue
+                        return candidate
+                except:
+                    continue
+
+        # --- FALLBACK GEOMÉTRICO (DESACTIVADO PARA SMS) ---
+        # El usuario solicitó explícitamente no hacer clicks en falso ni adivinar posiciones.
+        # Si no se encuentra el botón por selector específico, se asume fallo.
+        return None
+
+    def _locate_join_group_button(self, ui_device, wait_timeout=0.2, snapshot=None):
+        """Busca el botón de unirse/aceptar en pantallas de invitación a grupos."""
+        if ui_device is None:
+            return None
+
+        for selector in JOIN_GROUP_SELECTORS:
+            try:
+                if snapshot is not None:
+                    bounds = snapshot.find(selector)
+                    if bounds is None:
+                        continue
+                    candidate = ui_device(**selector)
+                else:
+                    self._count_stats(self.ui_poll_stats, rpcs=1)
+                    candidate = ui_device(**selector)
+                    if not candidate.wait(timeout=wait_timeout):
+                        continue
+                    info = candidate.info or {}
+                    bounds = info.get('bounds') or {}
+                if bounds and bounds.get('left') != bounds.get('right'):
+                    return candidate
+            except Exception:
+                continue
+
+        return None
+
+    def _wait_for_chat_ready(self, ui_device, wait_time, expected_package=None, is_sms=False, allow_group_join_check=False, require_send_button=True):
+        """
+        Espera a que WhatsApp/SMS esté listo para escribir y devuelve los objetos de la UI.
+        Retorna (chat_field, send_button) si tiene éxito, o (None, None) si falla.
+
+        Args:
+            require_send_button: Si es False, permite retornar éxito si se encuentra el chat_field
+                                 aunque no se encuentre el botón de envío (útil para grupos con micrófono).
+        """
+        if ui_device is None:
+            return None, None
+
+        deadline = time.time() + max(0, wait_time)
+        poll_interval = 0.2  # Intervalo de sondeo rápido
+        chat_field = None
+        send_button = None
+        deadline_extended = False  # Flag para asegurar que solo extendemos el tiempo una vez
+        join_attempted = False
+        join_required_detected = False
+
+        while not self.should_stop:
+            # Check for pause
+            self.cancel_token.wait_if_paused()
+
+            if self.should_stop:
+                return None, None
+
+            # Si ya encontramos ambos elementos, el trabajo está hecho.
+            if chat_field and send_button:
+                break
+
+            # Si no requerimos botón de envío y ya tenemos el campo, también terminamos
+            if not require_send_button and chat_field:
+                break
+
+            # Una sola captura de la jerarquía por sondeo; todos los selectores se evalúan sobre ella
+            poll_start = time.perf_counter()
+            snapshot = self._capture_ui_snapshot(ui_device)
+            if snapshot is not None:
+                self._count_stats(self.ui_poll_stats, polls=1, rpcs=1)
+            else:
+                self._count_stats(self.ui_poll_stats, polls=1, fallback_polls=1)
+
+            # Detectar pantallas de invitación a grupos antes de buscar el chat listo
+            if allow_group_join_check and not is_sms:
+                join_button = self._locate_join_group_button(ui_device, wait_timeout=poll_interval, snapshot=snapshot)
+                if join_button:
+                    join_required_detected = True
+                    if not self.run_config.auto_join_groups:
+                        self.log("✗ Se detectó pantalla de unión a grupo. Auto-unirse desactivado.", 'error')
+                        return None, None
+
+                    if not join_attempted:
+                        try:
+                            join_button.click()
+                            join_attempted = True
+                            self.log("✓ Pantalla de unión detectada. Haciendo clic para unirse...", 'info')
+                            deadline += 6  # Dar tiempo extra tras unirse
+                            self._controlled_sleep(0.6)
+                            continue
+                        except Exception as e:
+                            self.log(f"✗ No se pudo hacer clic en 'Unirme/Aceptar': {e}", 'error')
+                            return None, None
+
+            # Buscar el campo de texto si aún no lo tenemos
+            if not chat_field:
+                chat_field = self._locate_chat_field(ui_device, wait_timeout=poll_interval, snapshot=snapshot)
+
+            # Buscar el botón de envío si aún no lo tenemos (solo si se requiere o si queremos intentarlo igual)
+            if not send_button:
+                button = self._locate_message_send_button(
+                    ui_device, is_sms=is_sms, wait_timeout=poll_interval, snapshot=snapshot
+                )
+                if button:
+                    send_button = button
+            self._count_stats(self.ui_poll_stats, total_ms=(time.perf_counter() - poll_start) * 1000)
+
+            # Comprobar si hemos superado el tiempo de espera
+            if time.time() > deadline:
+                # LÓGICA DE ESPERA INTELIGENTE:
+                # Si hemos encontrado solo uno de los dos elementos y aún no hemos extendido
+                # el tiempo, lo extendemos unos segundos más para darle una oportunidad.
+                if (chat_field or send_button) and not deadline_extended:
+                    self.log("✓ Se encontró un elemento del chat, extendiendo la espera 4s...", 'info')
+                    deadline += 4  # Extender por 4 segundos
+                    deadline_extended = True
+                    continue  # Saltar al siguiente ciclo con el nuevo tiempo límite
+
+                # Si no se encontró nada o si ya extendimos el tiempo, nos rendimos.
+                break
+
+            # Si aún no hemos encontrado lo necesario, esperamos un poco
+            if not (chat_field and (send_button or not require_send_button)):
+                self._controlled_sleep(poll_interval)
+
+        # Evaluar el resultado final
+        success_condition = (chat_field and send_button) or (not require_send_button and chat_field)
+
+        if success_condition:
+            msg_extra = " (sin botón envío)" if not send_button else ""
+            self.log(f"✓ Conversación lista{msg_extra}.", 'success')
+            return chat_field, send_button
+
+        # Si falla, registrar el motivo específico
+        if not chat_field and not send_button:
+            if join_required_detected:
+                self.log("✗ Chat no listo: Se detectó pantalla de unión a grupo pero no se completó.", 'error')
+            else:
+                self.log("✗ Chat no listo: No se encontró ni el campo de texto ni el botón de envío.", 'error')
+        elif not chat_field:
+            self.log("✗ Chat no listo: Se encontró el botón de envío, pero no el campo de texto.", 'error')
+        elif require_send_button and not send_button:
+            self.log("✗ Chat no listo: Se encontró el campo de texto, pero no el botón de envío.", 'error')
+
+        return None, None
+
+    def _write_message_with_keyevents(self, device, message, chunk_size=80):
+        """
+        Escribe un mensaje usando input text de ADB en bloques de hasta 'chunk_size' caracteres.
+        Los caracteres que 'input text' no admite (saltos de línea, no ASCII) y los bloques que
+        fallan se escriben carácter por carácter como antes.
+        Retorna True si tuvo éxito, False si falló.
+        """
+        try:
+            if self.should_stop:
+                return False
+            
+            self.cancel_token.wait_if_paused()
+            if self.should_stop:
+                return False
+
+            start = time.perf_counter()
+            for batchable, chunk in self._split_input_chunks(message, chunk_size):
+                if self.should_stop:
+                    return False
+                
+                self.cancel_token.wait_if_paused()
+                if self.should_stop:
+                    return False
+
+                if batchable:
+                    # Un solo 'input text' por bloque, entre comillas simples para el shell del teléfono
+                    quoted = "'" + chunk.replace(' ', '%s').replace("'", "'\\''") + "'"
+                    if self._run_adb_command(['-s', device, 'shell', 'input', 'text', quoted], timeout=10):
+                        continue
+                    self.log(f"Bloque de texto falló, reintentando carácter por carácter ({len(chunk)} caracteres)...", "warning")
+
+                # Escribir carácter por carácter
+                for char in chunk:
+                    if self.should_stop:
+                        return False
+                    
+                    # Enviar el carácter
+                    text_args = ['-s', device, 'shell', 'input', 'text', self._escape_input_char(char)]
+
+                    if not self._run_adb_command(text_args, timeout=5):
+                        # Si falla un carácter, intentar continuar
+                        self.log(f"Advertencia: fallo al escribir '{char}'", "warning")
+
+            elapsed = time.perf_counter() - start
+            if message and elapsed > 0:
+                self.log(f"Texto escrito: {len(message)} caracteres en {elapsed:.1f}s ({len(message) / elapsed:.0f} car/s)", 'info')
+            return True
+
+        except Exception as e:
+            self.log(f"Error al escribir mensaje: {e}", 'error')
+            return False
+
+    @staticmethod
+    def _escape_input_char(char):
+        """Escapa un carácter individual para 'input text'."""
+        if char == ' ':
+            return '%s'
+        if char in ['\\', '"', "'", '$', '`', '!', '&', '|', ';', '<', '>', 
+                    '(', ')', '[', ']', '{', '}', '*', '?', '#', '~']:
+            return f'\\{char}'
+        return char
+
+    @staticmethod
+    def _split_input_chunks(message, chunk_size=80):
+        """
+        Divide el mensaje en bloques (batchable, texto). Son 'batchable' los tramos de ASCII
+        imprimible; el resto (saltos de línea, acentos, emojis) queda en bloques aparte.
+        Un '%' nunca queda seguido de 's' en el mismo bloque (input text lo tomaría como espacio).
+        """
+        chunks = []
+        current = []
+        current_batchable = None
+        for idx, char in enumerate(message):
+            batchable = 32 <= ord(char) < 127
+            if current and (batchable != current_batchable or len(current) >= chunk_size):
+                chunks.append((current_batchable, "".join(current)))
+                current = []
+            current.append(char)
+            current_batchable = batchable
+            if batchable and char == '%' and message[idx + 1:idx + 2] == 's':
+                chunks.append((True, "".join(current)))
+                current = []
+        if current:
+            chunks.append((current_batchable, "".join(current)))
+        return chunks
+
+    def send_msg(
+        self,
+        device,
+        link,
+        i,
+        total,
+        message_to_send=None,
+        whatsapp_package="com.whatsapp.w4b",
+        ui_device=None,
+        primary_index=None,
+    ):
+        """Ejecuta los comandos para enviar un único mensaje."""
+        is_group = bool(message_to_send)
+        try:
+            # Asegurar pantalla encendida (Wakeup no apaga si ya está encendido). No hace falta
+            # una espera fija: la apertura con 'am start -W' bloquea hasta que la app se dibuja.
+            with self.tracer.span("wake"):
+                self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_WAKEUP'], timeout=5)
+
+            if not ui_device and not self.sms_mode_active:
+                self.log("✗ Error crítico: la conexión de uiautomator2 no está disponible.", "error")
+                return False
+
+            attempt_links = [link]
+            if primary_index is not None:
+                alternates = self.link_retry_map.get(primary_index, [])
+                if alternates:
+                    attempt_links.extend(alternates)
+
+            total_attempts = len(attempt_links)
+
+            def describe_link(current_link, is_group_flag):
+                lower_link = current_link.lower()
+                if is_group_flag and not lower_link.startswith("https://wa.me/"):
+                    return f"Grupo ({current_link[:40]}...)"
+                if lower_link.startswith("sms:"):
+                    return current_link.split("sms:", 1)[1].split('?')[0]
+                if 'wa.me/' in current_link:
+                    return current_link.split('wa.me/')[1].split('?')[0]
+                return current_link[:50]
+
+            def attempt_send(current_link, attempt_idx, is_group_flag):
+                local_is_sms = current_link.lower().startswith("sms:")
+                num_display = describe_link(current_link, is_group_flag)
+                intento = "Principal" if attempt_idx == 0 else f"Alternativo {attempt_idx}"
+                log_prefix = f"({i}/{total}) → {num_display} [en {device}] ({intento})"
+
+                # --- MODO SMS OPTIMIZADO ---
+                if local_is_sms:
+                    # 1. (Se omite KEYCODE_WAKEUP para evitar interacciones extra en el menú)
+                    # El dispositivo ya fue limpiado por close_all_apps().
+
+                    # 2. Inyectar URL con RETRY (Fix "Pantalla en blanco/Launcher")
+                    open_args_generic = [
+                        '-s', device, 'shell', 'am', 'start',
+                        '-a', 'android.intent.action.VIEW',
+                        '-f', '0x14000000', # FLAG_ACTIVITY_NEW_TASK | FLAG_ACTIVITY_CLEAR_TOP
+                        '-d', f'"{current_link}"'
+                    ]
+
+                    sms_injection_success = False
+                    open_started = time.time()
+                    for retry_idx in range(3):
+                        if self.should_stop: return False, False
+
+                        if retry_idx > 0:
+                            self.log(f"Reintentando inyección SMS ({retry_idx+1}/3)...", 'warning')
+                            # En reintentos, probamos despertar pantalla
+                            self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_WAKEUP'], timeout=2)
+
+                        open_started = time.time()
+                        launch = self._start_activity_timed(device, open_args_generic[4:], timeout=15)
+                        if launch is None:
+                            # Sin sesión persistente: apertura clásica y espera fija antes de mirar el foco
+                            if not self._run_adb_command(open_args_generic, timeout=15):
+                                self.log(f"{log_prefix} ✗ Error al ejecutar comando de apertura SMS.", 'error')
+                            self._controlled_sleep(2.0)
+                            focus = self._get_current_focus(device).lower()
+                        else:
+                            if not launch['ok']:
+                                self.log(f"{log_prefix} ✗ Error al ejecutar comando de apertura SMS.", 'error')
+                            # 'am start -W' ya esperó a que se dibuje; usa la actividad que informó
+                            focus = launch['activity'].lower() or self._get_current_focus(device).lower()
+
+                        # Verificar foco
+                        # Si contiene "launcher", "home" o está vacía, asumimos fallo
+                        if not focus or "launcher" in focus or "home" in focus or "recents" in focus:
+                            self.log(f"Detectado foco en Launcher/Home ({focus[:50]}...). La app no abrió.", 'warning')
+                            continue # Reintentar loop
+
+                        # Si llegamos aquí, NO estamos en el launcher (asumimos éxito)
+                        sms_injection_success = True
+                        break
+                    
+                    if not sms_injection_success:
+                        self.log(f"{log_prefix} ✗ Fallo: El dispositivo se quedó en el Launcher tras 3 intentos.", 'error')
+                        return False, False
+
+                    # 3. Esperar tiempo de estabilización (configurado por usuario)
+                    try:
+                        user_wait = max(1.0, float(self.run_config.wait_after_first_enter))
+                    except:
+                        user_wait = 2.0
+
+                    # Restamos lo que ya tardó la apertura (medida), si queda algo
+                    remaining_wait = max(0.0, user_wait - (time.time() - open_started))
+
+                    if remaining_wait > 0:
+                         self.log(f"Esperando {remaining_wait:.1f}s extra...", 'info')
+                         self._controlled_sleep(remaining_wait)
+
+                    if self.should_stop: return False, False
+
+                    # 4. Enviar vía ENTER (KEYCODE_66) - UNA VEZ
+                    self.log(f"Enviando vía ENTER (KEYCODE_66)...", 'info')
+
+                    try:
+                        cmd_enter = ['-s', device, 'shell', 'input', 'keyevent', '66']
+                        self._run_adb_command(cmd_enter, timeout=5)
+                        # Sin segundo enter, sin esperas adicionales innecesarias
+
+                        self.log(f"✓ {log_prefix} :: SMS Enviado (Enter)", 'success')
+                        return True, False
+                    except Exception as e:
+                        self.log(f"Fallo al enviar con Enter: {e}", 'error')
+                        return False, False
+
+                # --- MODO WHATSAPP (Lógica original) ---
+                open_args = ['-s', device, 'shell', 'am', 'start', '-a', 'android.intent.action.VIEW', '-d', f'"{current_link}"']
+                if whatsapp_package:
+                    open_args.extend(['-p', whatsapp_package])
+                launch = self._start_activity_timed(device, open_args[4:], package=whatsapp_package, timeout=20)
+                if launch is None:
+                    opened = self._run_adb_command(open_args, timeout=20)
+                else:
+                    opened = launch['ok']
+                if not opened:
+                    self.log(log_prefix, 'error')
+                    self.log(f"  └─ Motivo: No se pudo abrir el chat.", 'error')
+                    return False, False
+
+                active_package = whatsapp_package
+
+                wait_time = max(0, int(self.run_config.wait_after_open))
+                if is_group_flag and "chat.whatsapp.com" in current_link.lower():
+                    wait_time += 5
+
+                # Para grupos (o cuando vamos a escribir texto), el botón de envío puede ser un micrófono al inicio.
+                # No requerimos estrictamente el botón de envío (avión) hasta después de escribir.
+                require_send_btn = not is_group_flag
+
+                with self.tracer.span("wait_chat_ready"):
+                    chat_field, send_button = self._wait_for_chat_ready(
+                        ui_device,
+                        wait_time,
+                        expected_package=active_package,
+                        is_sms=False,
+                        allow_group_join_check=is_group,
+                        require_send_button=require_send_btn
+                    )
+
+                if not chat_field or (require_send_btn and not send_button):
+                    self.log(log_prefix, 'error')
+                    self.log(f"  └─ Motivo: El chat no estuvo listo para enviar (timeout).", 'error')
+                    return False, False
+                if self.should_stop:
+                    return False, False
+
+                msg_to_send = message_to_send
+                if not msg_to_send and not is_group_flag:
+                    try:
+                        if 'text=' in current_link:
+                            msg_to_send = urllib.parse.unquote(current_link.split('text=')[1])
+                    except Exception:
+                        msg_to_send = None
+
+                try:
+                    needs_text_input = is_group_flag
+                    if needs_text_input and msg_to_send is not None:
+                        # --- Lógica robusta anti-audio (Modo Grupo) ---
+
+                        # 1. Descartar el botón encontrado anteriormente (Microfono)
+                        send_button = None
+
+                        # 2. Asegurar el foco
+                        try:
+                            chat_field.click()
+                            self._controlled_sleep(0.3)
+                        except Exception as e:
+                            self.log(f"Advertencia: no se pudo hacer clic en el campo: {e}", "warning")
+
+                        # 3. Ciclo de intento de escritura y verificación
+                        text_verified = False
+
+                        # Intento 1: set_text
+                        try:
+                            with self.tracer.span("write_message", method="set_text"):
+                                chat_field.set_text(msg_to_send)
+                            self._controlled_sleep(0.8) # Esperar a que la UI reaccione
+
+                            # Verificación
+                            curr_text = chat_field.get_text()
+                            if curr_text and len(curr_text.strip()) > 0:
+                                text_verified = True
+                        except Exception:
+                            pass
+
+                        # Intento 2: keyevents (si falló el 1)
+                        if not text_verified:
+                            self.log("Texto no detectado tras set_text. Reintentando con pulsaciones...", "warning")
+                            # Asegurar foco nuevamente
+                            try: chat_field.click()
+                            except: pass
+
+                            with self.tracer.span("write_message", method="keyevents"):
+                                self._write_message_with_keyevents(device, msg_to_send)
+                            self._controlled_sleep(1.0)
+
+                            # Verificación final
+                            try:
+                                curr_text = chat_field.get_text()
+                                if curr_text and len(curr_text.strip()) > 0:
+                                    text_verified = True
+                            except:
+                                pass
+
+                        # 4. PUNTO CRÍTICO: Si no hay texto, ABORTAR
+                        if not text_verified:
+                            self.log(log_prefix, 'error')
+                            self.log(f"  └─ Motivo: No se pudo escribir el mensaje en el campo. Se aborta para evitar enviar audio.", 'error')
+                            return False, False
+
+                        # 5. Buscar el botón de enviar (Avión)
+                        # Reintentar varias veces porque el cambio de icono puede tardar
+                        found_send = False
+                        for _ in range(3):
+                            new_send_btn = self._locate_message_send_button(
+                                ui_device, is_sms=False, wait_timeout=1,
+                                snapshot=self._capture_ui_snapshot(ui_device)
+                            )
+                            if new_send_btn:
+                                # Validación extra: Chequear descripción si es posible para evitar micrófono
+                                try:
+                                    desc = (new_send_btn.info.get('contentDescription') or "").lower()
+                                    # Si dice "grabar" o "voice", es peligroso.
+                                    if "grabar" in desc or "voice" in desc or "voz" in desc:
+                                        self.log("Botón detectado como Micrófono. Esperando...", "warning")
+                                        self._controlled_sleep(0.5)
+                                        continue
+                                except:
+                                    pass
+
+                                send_button = new_send_btn
+                                found_send = True
+                                break
+                            self._controlled_sleep(0.5)
+
+                        if not found_send:
+                            self.log(log_prefix, 'error')
+                            self.log("  └─ Motivo: No se encontró el botón de enviar (Avión) tras escribir.", 'error')
+                            return False, False
+
+                    # Usar el send_button (ya sea el original o el re-localizado)
+                    if send_button:
+                        with self.tracer.span("click_send"):
+                            send_button.click()
+                    else:
+                        self.log(log_prefix, 'error')
+                        self.log(f"  └─ Motivo: No se pudo hacer clic (botón de enviar perdido).", 'error')
+                        return False, False
+
+                    self._controlled_sleep(1.0)
+
+                    with self.tracer.span("detect_failure"):
+                        send_failed = self._detect_send_failure(ui_device, sent_text=msg_to_send)
+                    if send_failed:
+                        self.log(log_prefix, 'error')
+                        self.log(f"  └─ Motivo: WhatsApp reportó un fallo de envío (mensaje 'No se envió').", 'error')
+                        return False, True
+
+                    self.log(log_prefix, 'success')
+                    self._controlled_sleep(0.6)
+                    return True, False
+
+                except Exception as e:
+                    self.log(log_prefix, 'error')
+                    self.log(f"  └─ Motivo: Error inesperado ({e}).", 'error')
+                    return False, False
+
+            for attempt_idx, current_link in enumerate(attempt_links):
+                if self.should_stop:
+                    return False
+
+                if attempt_idx > 0:
+                    self.log("Intentando con un número alternativo...", 'warning')
+                    self.close_all_apps(device)
+                    if self.should_stop:
+                        return False
+
+                success, should_retry = attempt_send(current_link, attempt_idx, is_group)
+                if success:
+                    return True
+
+                if should_retry and attempt_idx < total_attempts - 1:
+                    continue
+
+                if should_retry and attempt_idx == total_attempts - 1:
+                    self.log("✗ No se pudo enviar el mensaje tras agotar los números disponibles.", 'error')
+                return False
+
+            return False
+
+        except Exception as e:
+            self.log(f"✗ Error crítico en la lógica de envío: {e}", 'error')
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def _detect_send_failure(self, ui_device, budget=None, snapshots=None, sent_text=None):
+        """
+        Verifica si aparece el mensaje de error de WhatsApp/SMS indicando que no se envió.
+
+        En lugar de esperar hasta 1s por cada selector, toma unas pocas capturas de la
+        jerarquía repartidas en 'budget' segundos y evalúa todos los patrones contra cada
+        una. Si una captura sin aviso de error muestra el campo de texto ya sin 'sent_text'
+        (WhatsApp lo vacía al enviar), el envío se da por bueno sin esperar el resto.
+        """
+        budget = self.send_failure_budget if budget is None else budget
+        count = max(1, self.send_failure_snapshots if snapshots is None else snapshots)
+        interval = budget / (count - 1) if count > 1 else 0
+        start = time.perf_counter()
+        detected = False
+        cleared = False
+
+        for attempt in range(count):
+            if attempt and interval:
+                self._controlled_sleep(interval)
+            if self.should_stop:
+                break
+            snapshot = self._capture_ui_snapshot(ui_device)
+            self._count_stats(self.failure_check_stats, snapshots=1)
+            if snapshot is not None:
+                detected = any(snapshot.find(selector) is not None for selector in SEND_FAILURE_SELECTORS)
+                if not detected and self._chat_field_cleared(snapshot, sent_text):
+                    cleared = True
+                    break
+            else:
+                # Sin captura: consulta directa, sin esperas por selector
+                for selector in SEND_FAILURE_SELECTORS:
+                    try:
+                        if ui_device(**selector).exists:
+                            detected = True
+                            break
+                    except Exception:
+                        continue
+            if detected:
+                break
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self.stats_lock:
+            stats = self.failure_check_stats
+            stats['checks'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            if detected:
+                stats['detected'] += 1
+            if cleared:
+                stats['early'] += 1
+        return detected
+
+    @staticmethod
+    def _chat_field_cleared(snapshot, sent_text):
+        """True si el campo de texto de la captura ya no contiene el mensaje enviado."""
+        if not sent_text or not sent_text.strip():
+            return False
+        for selector in CHAT_FIELD_SELECTORS:
+            node = snapshot.find_node(selector)
+            if node is not None:
+                # Con la primera línea alcanza: el campo puede mostrar el texto recortado
+                return sent_text.strip().splitlines()[0][:30] not in node[0].get('text', '')
+        return False
+
+    def run_single_task(self, device, link, message_to_send, task_index, whatsapp_package="com.whatsapp.w4b", link_index=None, activity_info=None, skip_delay=False, requeue_offline=False):
+        """Ejecuta una tarea de envío dentro de un span de traza etiquetado con dispositivo, paquete y tarea."""
+        with self.tracer.context(device=device, package=whatsapp_package, task=task_index), self.tracer.span("tarea"):
+            return self._run_single_task(
+                device, link, message_to_send, task_index, whatsapp_package=whatsapp_package,
+                link_index=link_index, activity_info=activity_info, skip_delay=skip_delay,
+                requeue_offline=requeue_offline
+            )
+
+    def _run_single_task(self, device, link, message_to_send, task_index, whatsapp_package="com.whatsapp.w4b", link_index=None, activity_info=None, skip_delay=False, requeue_offline=False):
+        """
+        Ejecuta una única tarea de envío (abrir link, enviar, esperar), gestionando la conexión de uiautomator2.
+        Args:
+            skip_delay (bool): Si es True, omite el retardo posterior al envío (útil para modo simultáneo).
+            requeue_offline (bool): Si el dispositivo está (o queda) desconectado, devuelve None sin contar
+                el fallo para que el llamador reencole el link en otro dispositivo.
+        """
+        # Dispositivo desconectado (aviso del tracker): no gastar timeouts de ADB/uiautomator2
+        if device in self.offline_devices:
+            if requeue_offline:
+                return None
+            self._record_offline_failure(device, link, task_index)
+            return False
+
+        ui_device = None
+        # --- MODIFICACIÓN: Siempre intentar conectar uiautomator2 (EXCEPTO EN SMS) ---
+        if not self.sms_mode_active:
+            try:
+                with self.tracer.span("u2.connect"):
+                    ui_device = self.u2_registry.get(device, unlock=True)
+            except Exception as e:
+                self.log(f"No se pudo conectar uiautomator2 a {device}: {e}", "warning")
+                # En este nuevo enfoque, un fallo aquí debería ser crítico.
+                return False
+
+        # Bucle de pausa
+        self.cancel_token.wait_if_paused()
+        if self.should_stop: return False
+
+        self.current_index = task_index
+        self._notify_progress()
+
+        # En modo fidelizado ya se realiza una limpieza general antes de arrancar el hilo.
+        # Evitamos cerrar las apps en cada mensaje para reducir el tiempo extra entre envíos
+        # y que el intervalo se acerque más al configurado por el usuario.
+        if not self.manual_mode:
+            with self.tracer.span("close_all_apps"):
+                self.close_all_apps(device)
+
+        if self.should_stop:
+            return False
+
+        send_start = time.time()
+        # Enviar mensaje, pasando el objeto ui_device
+        with self.tracer.span("send_msg"):
+            success = self.send_msg(
+                device,
+                link,
+                task_index,
+                self.total_messages,
+                message_to_send,
+                whatsapp_package,
+                ui_device,
+                primary_index=link_index,
+            )
+
+        if not success and requeue_offline and device in self.offline_devices:
+            self.log(f"[{device}] Se desconectó durante el envío {task_index}.", 'warning')
+            return None
+        
+        # --- Importante: Actualizar contadores y reporte DESPUÉS de send_msg ---
+        phone_number = self._get_phone_from_link(link)
+        if phone_number:
+            status = "Enviado" if success else "Fallo"
+            self.report_data.append({'number': phone_number, 'status': status})
+
+        if success:
+            self.sent_count += 1
+
+            # --- Lógica de Llamada (Solo Modo SMS) ---
+            if self.sms_mode_active and self.run_config.sms_enable_call:
+                try:
+                    # Extraer número de sms:NUMBER?body=...
+                    number_part = link.split(':')[1]
+                    if '?' in number_part:
+                        number = number_part.split('?')[0]
+                    else:
+                        number = number_part
+
+                    if number:
+                        self.log(f"[{device}] SMS enviado. Esperando 3s antes de llamar...", 'info')
+                        self._controlled_sleep(3.0) # Espera controlada para respetar pausas
+                        
+                        if self.should_stop: return False
+                        
+                        self.log(f"[{device}] Iniciando llamada a {number}...", 'info')
+                        self._perform_call(device, number, self.run_config.sms_call_duration)
+                except Exception as e:
+                    self.log(f"[{device}] Error al intentar realizar llamada: {e}", 'error')
+
+            if activity_info and self.fidelizado_mode == "NUMEROS":
+                sender = activity_info.get('from')
+                receiver = activity_info.get('to')
+                self.record_fidelizado_activity(sender, receiver)
+        else:
+            self.failed_count += 1
+
+        # Actualizar UI (contadores y barra de progreso)
+        self._notify_progress()
+        # --- Fin actualización contadores ---
+
+        # Espera entre mensajes (solo si no es la última tarea y no se omite)
+        if task_index < self.total_messages and not self.should_stop and not skip_delay:
+            send_elapsed = time.time() - send_start
+            if self.manual_mode:
+                # FIX: Usar las nuevas variables de retardo de envío
+                target_delay = random.uniform(self.run_config.fidelizado_send_delay_min, self.run_config.fidelizado_send_delay_max)
+            elif self.sms_mode_active:
+                target_delay = random.uniform(self.run_config.sms_delay_min, self.run_config.sms_delay_max)
+            else:
+                target_delay = random.uniform(self.run_config.delay_min, self.run_config.delay_max)
+
+            if not skip_delay:
+                remaining_delay = max(0, target_delay - send_elapsed)
+                self.log(
+                    f"Esperando {remaining_delay:.1f}s (objetivo {target_delay:.1f}s, envío tomó {send_elapsed:.1f}s)"
+                    f"... (Post-tarea {task_index})",
+                    'info'
+                )
+                with self.tracer.span("espera_entre_mensajes", seconds=round(remaining_delay, 2)):
+                    self._controlled_sleep(remaining_delay)
+        
+        return success
+
+    def close_all_apps(self, device):
+        """Intenta cerrar todas las aplicaciones de terceros y las apps clave en el dispositivo."""
+        self.log(f"Cerrando todas las apps en {device}...", 'info')
+        
+        try:
+            adb = self.adb_exe
+            si = _hidden_startupinfo()
+            
+            all_to_close, from_cache, query_s = self._get_closeable_packages(device)
+            saved_s = query_s if from_cache else 0.0
+
+            # 2. Modo dirigido: solo detener las apps que están corriendo
+            to_close = all_to_close
+            if self.close_apps_targeted:
+                running = self._get_running_packages(device)
+                if running is not None:
+                    to_close = [pkg for pkg in all_to_close if pkg in running]
+            
+            # 3. Ejecutar force-stop de todas en un solo comando de shell
+            batched = False
+            if to_close:
+                stop_start = time.perf_counter()
+                try:
+                    self.adb_pool.run(device, "; ".join(f"am force-stop {pkg}" for pkg in to_close), timeout=30)
+                    batched = True
+                    per_stop = (time.perf_counter() - stop_start) / len(to_close)
+                    self.force_stop_avg_s = per_stop
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            if not batched:
+                for package in to_close:
+                    # Usamos shell am force-stop directamente para más velocidad aquí
+                    subprocess.Popen([adb, '-s', device, 'shell', 'am', 'force-stop', package],
+                                     startupinfo=si, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            saved_s += (len(all_to_close) - len(to_close)) * self.force_stop_avg_s
+            
+            # 4. Volver a la pantalla de inicio (Home)
+            time.sleep(0.2)
+            try:
+                self.adb_pool.run(device, 'input keyevent KEYCODE_HOME', timeout=3)
+            except OSError:
+                subprocess.run([adb, '-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_HOME'],
+                              startupinfo=si, capture_output=True, timeout=3)
+            
+            self.log(f"✓ {device}: Apps cerradas ({len(to_close)} de {len(all_to_close)}, ~{saved_s:.1f}s ahorrados).", 'success')
+            
+        except Exception as e:
+            self.log(f"Error al cerrar apps en {device}: {e}", 'error')
+
+    def invalidate_package_inventory(self, device=None):
+        """Descarta el inventario de paquetes cacheado (de un dispositivo o de todos)."""
+        if device is None:
+            self.package_inventory.clear()
+        else:
+            self.package_inventory.pop(device, None)
+
+    def _get_closeable_packages(self, device):
+        """
+        Devuelve (paquetes, desde_cache, segundos_de_consulta) con las apps de terceros más los objetivos fijos.
+        El resultado de 'pm list packages -3' se cachea por dispositivo durante PACKAGE_INVENTORY_TTL.
+        """
+        cached = self.package_inventory.get(device)
+        if cached and time.monotonic() - cached['time'] < self.PACKAGE_INVENTORY_TTL:
+            return cached['packages'], True, cached['query_s']
+
+        # 1. Obtener lista de apps de terceros (-3)
+        # Esto captura cualquier app instalada por el usuario o fabricante que no sea del sistema "core"
+        query_start = time.perf_counter()
+        try:
+            code, packages_out = self.adb_pool.run(device, 'pm list packages -3', timeout=5)
+        except OSError:
+            res = subprocess.run([self.adb_exe, '-s', device, 'shell', 'pm', 'list', 'packages', '-3'], 
+                               capture_output=True, text=True, startupinfo=_hidden_startupinfo(), timeout=5)
+            code, packages_out = res.returncode, res.stdout
+        query_s = time.perf_counter() - query_start
+
+        third_party_packages = []
+        if code == 0:
+            for line in packages_out.strip().split('\n'):
+                if line.startswith('package:'):
+                    pkg = line.replace('package:', '').strip()
+                    # Evitar cerrar el servidor de scrcpy si está corriendo (aunque suele reiniciarse solo)
+                    # y el agente de uiautomator2, para no romper la conexión compartida
+                    if "scrcpy" not in pkg.lower() and "uiautomator" not in pkg.lower():
+                        third_party_packages.append(pkg)
+
+        # Combinar y eliminar duplicados
+        packages = sorted(set(third_party_packages + self.CLOSE_APPS_TARGETS))
+        if code == 0:
+            self.package_inventory[device] = {'packages': packages, 'time': time.monotonic(), 'query_s': query_s}
+        return packages, False, query_s
+
+    def _get_running_packages(self, device):
+        """Devuelve el set de paquetes con proceso vivo (según 'ps'), o None si no se pudo obtener."""
+        try:
+            code, out = self.adb_pool.run(device, 'ps -A -o NAME 2>/dev/null || ps', timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if code != 0 or not out.strip():
+            return None
+        running = set()
+        for line in out.split('\n'):
+            parts = line.split()
+            if parts:
+                # Procesos secundarios se llaman 'paquete:servicio'
+                running.add(parts[-1].split(':')[0])
+        return running
+
+    def _get_phone_from_link(self, link):
+        """Extrae un número de teléfono de un link wa.me o sms:."""
+        if not isinstance(link, str):
+            return None
+        try:
+            clean_link = link.strip()
+            if "wa.me/" in clean_link:
+                return clean_link.split("wa.me/")[1].split("?")[0]
+            elif clean_link.lower().startswith("sms:"):
+                return clean_link.split(":")[1].split("?")[0]
+        except (IndexError, AttributeError):
+            pass
+        return None
+
+    def _next_online_device(self, idx):
+        """Devuelve (dispositivo, siguiente índice) en la rotación, saltando los desconectados."""
+        n = len(self.devices)
+        for _ in range(n):
+            device = self.devices[idx % n]
+            idx = (idx + 1) % n
+            if device not in self.offline_devices:
+                return device, idx
+        return None, idx
+
+    def _record_offline_failure(self, device, link, task_index):
+        """Cuenta como fallo un envío que no pudo hacerse por falta de dispositivo conectado."""
+        self.log(f"[{device or '-'}] Sin dispositivo conectado: envío {task_index} marcado como fallo.", 'error')
+        phone_number = self._get_phone_from_link(link)
+        if phone_number:
+            self.report_data.append({'number': phone_number, 'status': "Fallo"})
+        self.failed_count += 1
+        self._notify_progress()
+
+    def _run_round_robin_task(self, idx, link, task_index, whatsapp_package):
+        """
+        Envía un link por el siguiente dispositivo conectado de la rotación. Si el dispositivo
+        se desconecta durante el envío, el mismo link se reintenta en otro.
+        Returns:
+            int: índice de rotación para el próximo envío.
+        """
+        while not self.should_stop:
+            device, idx = self._next_online_device(idx)
+            if device is None:
+                self._record_offline_failure(None, link, task_index)
+                break
+            result = self.run_single_task(
+                device, link, None, task_index, whatsapp_package=whatsapp_package,
+                link_index=task_index - 1, requeue_offline=True
+            )
+            if result is not None:
+                break
+            self.log(f"Reencolando envío {task_index} en otro dispositivo...", 'warning')
+        return idx
+
+    def run_default_thread(self):
+        """
+        Lógica de envío tradicional (Excel/CSV) con soporte para Simple/Doble/Triple.
+        """
+        if not self.links:
+            self.log("Error: No hay links para enviar (modo tradicional)", 'error')
+            return
+        
+        mode = self.run_config.traditional_send_mode
+        self.log(f"Modo de envío: {mode}", 'info')
+        
+        if mode == "Business":
+            self._run_simple_mode()
+        elif mode == "Normal":
+            # Reutiliza _run_simple_mode pero cambiando el paquete de WA
+            self._run_simple_mode(whatsapp_package="com.whatsapp")
+        elif mode == "Business/Normal":
+            self._run_doble_mode()
+        elif mode == "Business/Normal 1/Normal 2":
+            self._run_triple_mode()
+
+    def _run_simple_mode(self, whatsapp_package="com.whatsapp.w4b"):
+        """Modo Simple: 1 URL por teléfono, usando el paquete de WhatsApp especificado."""
+        log_msg = "Ejecutando Modo Business..." if whatsapp_package == "com.whatsapp.w4b" else "Ejecutando Modo Normal..."
+        self.log(log_msg, 'info')
+        idx = 0  # Índice del dispositivo a usar
+        
+        for i, link in enumerate(self.links):
+            if self.should_stop:
+                self.log("Cancelado en bucle", 'warning')
+                break
+
+            # Check for pause before running the task
+            self._maybe_pause_sending(i)
+
+            # Ejecutar tarea con el paquete de WA especificado (saltando dispositivos desconectados)
+            idx = self._run_round_robin_task(idx, link, i + 1, whatsapp_package)
+
+    def _run_doble_mode(self):
+        """Modo Doble: Rota secuencialmente entre dispositivos y cuentas Business/Normal."""
+        self.log("Ejecutando Modo Doble (Rotación Correcta)...", 'info')
+
+        # 1. Crear la lista de todas las combinaciones de envío
+        envio_combinations = []
+        for device in self.devices:
+            envio_combinations.append({"device": device, "wa_name": "Business", "wa_package": "com.whatsapp.w4b"})
+            envio_combinations.append({"device": device, "wa_name": "Normal", "wa_package": "com.whatsapp"})
+
+        num_combinations = len(envio_combinations)
+        if num_combinations == 0:
+            self.log("Error: No hay dispositivos para el modo Doble.", "error")
+            return
+
+        # 2. Iterar una vez sobre los links, rotando las combinaciones
+        for i, link in enumerate(self.links):
+            if self.should_stop:
+                self.log("Cancelado en bucle", 'warning')
+                break
+            
+            self.last_task_time = time.time()
+
+            # Check for pause before running the task
+            self._maybe_pause_sending(i)
+
+            # Seleccionar la combinación de envío (dispositivo + cuenta)
+            combination = envio_combinations[i % num_combinations]
+            device = combination["device"]
+            wa_name = combination["wa_name"]
+            wa_package = combination["wa_package"]
+
+            self.log(f"[{device}] Enviando con {wa_name}", 'info')
+            self.run_single_task(device, link, None, i + 1, whatsapp_package=wa_package, link_index=i)
+
+    def _run_triple_mode(self):
+        """Modo Triple: Rota secuencialmente entre dispositivos y las 3 cuentas."""
+        self.log("Ejecutando Modo Triple (Rotación Correcta)...", 'info')
+        is_normal_account_2 = {dev_id: False for dev_id in self.devices}
+
+        # 1. Crear la lista de todas las combinaciones de envío
+        envio_combinations = []
+        for device in self.devices:
+            envio_combinations.append({"device": device, "wa_name": "Business", "wa_package": "com.whatsapp.w4b", "needs_switch": False})
+            envio_combinations.append({"device": device, "wa_name": "Normal (Cuenta 1)", "wa_package": "com.whatsapp", "needs_switch": False})
+            envio_combinations.append({"device": device, "wa_name": "Normal (Cuenta 2)", "wa_package": "com.whatsapp", "needs_switch": True})
+
+        num_combinations = len(envio_combinations)
+        if num_combinations == 0:
+            self.log("Error: No hay dispositivos para el modo Triple.", "error")
+            return
+
+        # 2. Iterar una vez sobre los links, rotando las combinaciones
+        for i, link in enumerate(self.links):
+            if self.should_stop:
+                self.log("Cancelado en bucle", 'warning')
+                break
+
+            self.last_task_time = time.time()
+
+            # Check for pause before running the task
+            self._maybe_pause_sending(i)
+
+            # Seleccionar la combinación de envío (dispositivo + cuenta)
+            combination = envio_combinations[i % num_combinations]
+            device = combination["device"]
+            wa_name = combination["wa_name"]
+            wa_package = combination["wa_package"]
+            needs_switch_to_acc2 = combination["needs_switch"]
+            
+            # Gestionar cambio de cuenta si es necesario
+            if "Normal" in wa_name:
+                currently_is_acc2 = is_normal_account_2.get(device, False)
+                if needs_switch_to_acc2 and not currently_is_acc2:
+                    self.log(f"Cambiando a Cuenta 2 en {device}...", 'info')
+                    self._switch_whatsapp_account(device)
+                    self._controlled_sleep(4)
+                    is_normal_account_2[device] = True
+                elif not needs_switch_to_acc2 and currently_is_acc2:
+                    self.log(f"Restaurando a Cuenta 1 en {device}...", 'info')
+                    self._switch_whatsapp_account(device)
+                    self._controlled_sleep(4)
+                    is_normal_account_2[device] = False
+
+            if self.should_stop: break
+
+            self.log(f"[{device}] Enviando con {wa_name}", 'info')
+            self.run_single_task(device, link, None, i + 1, whatsapp_package=wa_package, link_index=i)
+
+        # Dejar todas las cuentas Normal en el estado inicial (Cuenta 1)
+        self.log("Finalizando y restaurando cuentas a estado inicial...", 'info')
+        for dev, is_acc2 in is_normal_account_2.items():
+            if is_acc2:
+                self.log(f"Restaurando a Cuenta 1 en {dev}...", 'info')
+                self._switch_whatsapp_account(dev)
+                self._controlled_sleep(4)
+
+    def run_traditional_simultaneous_thread(self):
+        """
+        Lógica de envío SIMULTÁNEO para el modo Tradicional (Excel).
+        Un hilo por dispositivo toma links de una cola compartida y aplica su propio
+        delay, según el modo seleccionado (Business, Normal, Business/Normal).
+        """
+        if not self.links:
+            self.log("Error: No hay links para enviar.", 'error')
+            return
+
+        mode = self.run_config.traditional_send_mode
+        self.log(f"Modo Tradicional Simultáneo iniciado ({mode})", 'info')
+
+        # Definir fases según el modo
+        phases = []
+        if mode == "Business":
+            phases = [("Business", "com.whatsapp.w4b")]
+        elif mode == "Normal":
+            phases = [("Normal", "com.whatsapp")]
+        elif mode == "Business/Normal":
+            phases = [("Business", "com.whatsapp.w4b"), ("Normal", "com.whatsapp")]
+        else: # Business/Normal 1/Normal 2 u otros fallbacks
+            self.log(f"Advertencia: Modo '{mode}' simplificado a Business/Normal en simultáneo.", 'warning')
+            phases = [("Business", "com.whatsapp.w4b"), ("Normal", "com.whatsapp")]
+
+        total_links = len(self.links)
+        num_devices = len(self.devices)
+        if num_devices == 0:
+            self.log("Error: No hay dispositivos para enviar.", 'error')
+            return
+
+        # Cola compartida: cada dispositivo toma el siguiente link apenas queda libre,
+        # así un teléfono lento no frena a los demás (antes se esperaba a toda la tanda).
+        pending = queue.Queue()
+        for idx in range(total_links):
+            pending.put(idx)
+
+        usage = {device: {'sent': 0, 'busy': 0.0} for device in self.devices}
+        run_start = time.time()
+
+        def device_worker(device):
+            while not self.should_stop:
+                if device in self.offline_devices:
+                    self.log(f"[{device}] Desconectado: deja de tomar envíos de la cola.", 'warning')
+                    break
+                try:
+                    idx = pending.get_nowait()
+                except queue.Empty:
+                    break
+
+                # Como en el esquema por tandas, cada teléfono alterna entre las apps de las
+                # fases con cada envío propio (no según el bloque del link en la cola)
+                phase_pkg = phases[usage[device]['sent'] % len(phases)][1]
+
+                task_start = time.time()
+                result = self.run_single_task(
+                    device, self.links[idx], None, idx + 1,
+                    whatsapp_package=phase_pkg, link_index=idx, skip_delay=True,
+                    requeue_offline=True
+                )
+                usage[device]['busy'] += time.time() - task_start
+                if result is None:
+                    # Se desconectó: el link vuelve a la cola para otro dispositivo
+                    pending.put(idx)
+                    continue
+                usage[device]['sent'] += 1
+
+                # Delay propio de cada dispositivo (si quedan links)
+                if not pending.empty() and not self.should_stop:
+                    delay = random.uniform(self.run_config.delay_min, self.run_config.delay_max)
+                    self.log(f"⏳ [{device}] Esperando {delay:.1f}s antes del siguiente envío...", 'info')
+                    self._controlled_sleep(delay)
+
+        self.log(f"\n>>> {num_devices} dispositivo(s) tomando {total_links} envíos de una cola compartida <<<", 'info')
+        workers = [threading.Thread(target=device_worker, args=(device,), daemon=True) for device in self.devices]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+
+        # Links que quedaron en la cola porque todos los dispositivos se desconectaron
+        while not self.should_stop:
+            try:
+                idx = pending.get_nowait()
+            except queue.Empty:
+                break
+            self._record_offline_failure(None, self.links[idx], idx + 1)
+
+        # Uso por dispositivo: tiempo ocupado enviando vs. tiempo total del modo
+        wall = max(0.001, time.time() - run_start)
+        for device, stats in usage.items():
+            per_min = stats['sent'] / wall * 60
+            self.log(f"  {device}: {stats['sent']} envíos, ocupado {stats['busy'] / wall * 100:.0f}%, {per_min:.1f} envíos/min", 'info')
+
+        self.log(f"\nModo Tradicional Simultáneo finalizado", 'success')
+
+    def run_sms_thread(self):
+        """Lógica de envío para el SMS."""
+        if not self.links:
+            self.log("Error: No hay enlaces SMS para enviar.", 'error')
+            return
+
+        self.log("Ejecutando SMS...", 'info')
+        idx = 0
+
+        for i, link in enumerate(self.links):
+            if self.should_stop:
+                self.log("Cancelado en SMS", 'warning')
+                break
+
+            idx = self._run_round_robin_task(idx, link, i + 1, None)
+
+    def run_sms_parallel_thread(self):
+        """Lógica de envío SIMULTÁNEO para el SMS."""
+        if not self.links:
+            self.log("Error: No hay enlaces SMS para enviar.", 'error')
+            return
+
+        num_devices = len(self.devices)
+        total_links = len(self.links)
+        self.log(f"Ejecutando SMS en modo SIMULTÁNEO ({num_devices} dispositivos)...", 'info')
+
+        # Process in batches
+        for i in range(0, total_links, num_devices):
+            # Check for pause
+            self.cancel_token.wait_if_paused()
+
+            if self.should_stop:
+                self.log("Cancelado en SMS Simultáneo", 'warning')
+                break
+
+            batch_links = self.links[i : i + num_devices]
+            threads = []
+
+            self.log(f"--- [BATCH SIMULTÁNEO] Iniciando {len(batch_links)} envíos en paralelo ---", 'success')
+
+            for j, link in enumerate(batch_links):
+                # Ensure we have enough devices (cycle if fewer devices than batch size - unlikely here as batch size is len(devices))
+                device = self.devices[j % num_devices]
+                # Task index logic: global index
+                task_idx = i + j + 1
+
+                # Create thread
+                t = threading.Thread(
+                    target=self.run_single_task,
+                    args=(device, link, None, task_idx),
+                    kwargs={
+                        'whatsapp_package': None,
+                        'link_index': i+j,
+                        'skip_delay': True # NEW ARGUMENT: Skip individual delay
+                    }
+                )
+                threads.append(t)
+                t.start()
+
+            # Wait for all threads in this batch to finish
+            for t in threads:
+                t.join()
+
+            if self.should_stop: break
+
+            # Global delay between batches (if not finished)
+            if i + num_devices < total_links:
+                delay = random.uniform(self.run_config.sms_delay_min, self.run_config.sms_delay_max)
+                self.log(f"⏳ Esperando {delay:.1f}s antes del siguiente lote simultáneo...", 'info')
+                self._controlled_sleep(delay)
+
+    def _maybe_pause_sending(self, task_index):
+        """Checks if a pause is needed based on the task index and configured settings."""
+        pause_count = self.run_config.pause_sends_count
+        if pause_count <= 0:
+            return
+
+        # Check if the current task index is a multiple of the pause count
+        if task_index > 0 and task_index % pause_count == 0:
+            delay_min = self.run_config.pause_sends_delay_min
+            delay_max = self.run_config.pause_sends_delay_max
+            pause_duration = random.uniform(delay_min, delay_max)
+
+            self.log(f"Pausa programada alcanzada. Esperando {pause_duration:.1f} segundos...", 'info')
+            self._controlled_sleep(pause_duration)
+
+    def _switch_whatsapp_account(self, device):
+        """
+        Cambia de cuenta en WhatsApp Normal.
+        
+        Args:
+            device: ID del dispositivo
+        """
+        self.log(f"[{device}] Cambiando de cuenta en WhatsApp Normal...", 'info')
+        
+        # 1) Cerrar todo
+        close_commands = [
+            ['-s', device, 'shell', 'am', 'force-stop', 'com.android.settings'],
+            ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp'],
+            ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp.w4b']
+        ]
+        for cmd in close_commands:
+            self._run_adb_command(cmd, timeout=3)
+        
+        # 2) Abrir WhatsApp y cambiar de cuenta
+        self._run_adb_command(['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main'], timeout=10)
+        self._controlled_sleep(3)  # Esperar a que abra
+        
+        # Navegar al menú de cambio de cuenta
+        for _ in range(2):
+            self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_DPAD_UP'], timeout=3)
+            self._controlled_sleep(0.2)
+        
+        self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_DPAD_RIGHT'], timeout=3)
+        self._controlled_sleep(0.2)
+        self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENTER'], timeout=3)
+        self._controlled_sleep(0.2)
+        
+        for _ in range(7):
+            self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_TAB'], timeout=3)
+            self._controlled_sleep(0.05)  # Más rápido: 0.05s entre TABs
+        
+        self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENTER'], timeout=3)
+        
+        # Esperar 3 segundos con WhatsApp abierto para que carguen los mensajes
+        self.log(f"[{device}] Esperando 3s para que carguen los mensajes...", 'info')
+        self._controlled_sleep(3)
+        
+        # 3) Cerrar todo nuevamente
+        for cmd in close_commands:
+            self._run_adb_command(cmd, timeout=3)
+        
+        self.log(f"[{device}] Cambio de cuenta completado", 'success')
+
+    def _perform_call(self, device, number, duration):
+        """Realiza una llamada telefónica normal, espera y cuelga."""
+        if self.should_stop: return
+
+        try:
+            # 1. Iniciar llamada
+            cmd_call = ['-s', device, 'shell', 'am', 'start', '-a', 'android.intent.action.CALL', '-d', f'tel:{number}']
+            self._run_adb_command(cmd_call, timeout=10)
+
+            # 2. Esperar duración configurada
+            self.log(f"[{device}] Llamada en curso ({duration}s)...", 'info')
+            self._controlled_sleep(duration)
+
+            if self.should_stop: return
+
+            # 3. Colgar
+            self.log(f"[{device}] Colgando...", 'info')
+            self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENDCALL'], timeout=5)
+
+        except Exception as e:
+            self.log(f"[{device}] Excepción en _perform_call: {e}", 'error')
+
+
+    def run_calls_thread(self):
+        """Hilo principal para la lógica de llamadas."""
+        try:
+            self.log("🚀 INICIANDO LLAMADAS MASIVAS", 'info')
+
+            # Generar lista de tareas
+            tasks = []
+            for row in self.raw_data:
+                for col in self.calls_selected_columns:
+                    val = str(row.get(col, '')).strip()
+                    if val:
+                        # Usar regex para dividir por guiones (todos los tipos), comas, punto y coma, saltos de línea
+                        nums = [n.strip() for n in re.split(r'[-–—,\n;]', val) if n.strip()]
+                        for n in nums:
+                            # Clean number
+                            clean_n = ''.join(filter(str.isdigit, n))
+                            if clean_n:
+                                tasks.append(clean_n)
+
+            self.total_messages = len(tasks)
+            self._notify_progress()
+            self.log(f"Total números a llamar: {len(tasks)}", 'info')
+
+            wa_mode = self.run_config.calls_whatsapp_mode # Business, Normal, Ambos
+            simultaneous = self.run_config.calls_simultaneous_mode
+            delay_min = self.run_config.calls_delay_min
+            delay_max = self.run_config.calls_delay_max
+            duration = self.run_config.calls_duration
+
+            # Definir estrategia de apps
+            # Si es "Ambos", alternamos. Si no, fijo.
+            # Alternancia: Business -> Normal -> Business ...
+
+            def get_app_sequence():
+                if wa_mode == "Business": return [("com.whatsapp.w4b", "Business")]
+                if wa_mode == "Normal": return [("com.whatsapp", "Normal")]
+                if wa_mode == "Ambos": return [("com.whatsapp.w4b", "Business"), ("com.whatsapp", "Normal")]
+                return [("com.whatsapp.w4b", "Business")]
+
+            app_seq = get_app_sequence()
+
+            # Estado de rotación por dispositivo
+            device_app_idx = {d: 0 for d in self.devices}
+
+            def process_call(device_id, phone_number, task_idx):
+                if self.should_stop: return False
+
+                # 0. Cerrar ambos WhatsApps para asegurar estado limpio
+                # El usuario solicitó: "cada vez que se envie y al empezar el primer, que cierres ambos whatsapp"
+                self.log(f"[{device_id}] Cerrando WhatsApps antes de la tarea...", 'info')
+                self._run_adb_command(['-s', device_id, 'shell', 'am', 'force-stop', 'com.whatsapp'])
+                self._run_adb_command(['-s', device_id, 'shell', 'am', 'force-stop', 'com.whatsapp.w4b'])
+                self._controlled_sleep(1)
+
+                # Seleccionar App
+                seq_idx = device_app_idx[device_id]
+                pkg, app_name = app_seq[seq_idx % len(app_seq)]
+                device_app_idx[device_id] += 1 # Rotar para la próxima
+
+                self.current_index = task_idx
+                self._notify_progress()
+
+                log_prefix = f"({task_idx}/{len(tasks)}) 📞 {phone_number} [{device_id}] ({app_name})"
+                self.log(f"Llamando a {phone_number}...", 'info')
+
+                # 1. Abrir Home de WhatsApp (No abrir chat directo con link, sino la app)
+                # Usamos el launch normal
+                open_args = ['-s', device_id, 'shell', 'monkey', '-p', pkg, '-c', 'android.intent.category.LAUNCHER', '1']
+                if not self._run_adb_command(open_args, timeout=10):
+                    self.log(f"{log_prefix} ✗ Fallo al abrir WhatsApp", 'error')
+                    self.failed_count += 1
+                    return
+
+                # 2. Esperar Home
+                self._controlled_sleep(3)
+
+                # 3. Ejecutar flujo de llamada (Nuevo)
+                if self._perform_whatsapp_call_action(device_id, duration, phone_number=phone_number, package_name=pkg):
+                    self.log(f"{log_prefix} ✓ Llamada finalizada", 'success')
+                    self.sent_count += 1
+                else:
+                    self.log(f"{log_prefix} ✗ No se pudo realizar la llamada (¿Sin WhatsApp?)", 'error')
+                    self.failed_count += 1
+
+                # 4. Delay entre llamadas
+                wait = random.uniform(delay_min, delay_max)
+                self.log(f"Pausa de {wait:.1f}s...", 'info')
+                self._controlled_sleep(wait)
+
+            if simultaneous and len(self.devices) > 1:
+                # Modo paralelo
+                import concurrent.futures
+
+                # Dividir tareas para round-robin
+                num_devs = len(self.devices)
+
+                # Ejecutar en lotes del tamaño de devices
+                for i in range(0, len(tasks), num_devs):
+                    if self.should_stop: break
+                    self.cancel_token.wait_if_paused()
+
+                    batch = tasks[i : i + num_devs]
+
+                    with concurrent.futures.ThreadPoolExecutor(max_workers=num_devs) as executor:
+                        futures = []
+                        for b_idx, phone in enumerate(batch):
+                            dev = self.devices[b_idx % num_devs]
+                            t_idx = i + b_idx + 1
+                            futures.append(executor.submit(process_call, dev, phone, t_idx))
+
+                        # Esperar lote
+                        concurrent.futures.wait(futures)
+            else:
+                # Modo secuencial (1 dispositivo o 1 por 1)
+                dev_idx = 0
+                for i, phone in enumerate(tasks):
+                    if self.should_stop: break
+                    self.cancel_token.wait_if_paused()
+
+                    dev = self.devices[dev_idx]
+                    dev_idx = (dev_idx + 1) % len(self.devices) # Round robin simple
+
+                    process_call(dev, phone, i + 1)
+
+        except Exception as e:
+            self.log(f"Error en hilo de llamadas: {e}", 'error')
+        finally:
+            self.log("Finalizando proceso de llamadas...", 'info')
+
+    def _perform_whatsapp_call_action(self, device, duration, phone_number=None, package_name="com.whatsapp"):
+        """
+        NUEVA LÓGICA DE LLAMADA:
+        1. Click en el 1er chat (fijado).
+        2. Escribir número y enviar.
+        3. Click en el mensaje enviado.
+        4. Esperar popup 'Llamar en Whatsapp'.
+        5. Click en esa opción.
+        6. Esperar y colgar.
+        """
+        try:
+            d = self.u2_registry.get(device)
+
+            # 1. Click en el primer chat de la lista (asumimos que ya estamos en la Home de WA)
+            # Intentar encontrar el primer item de la lista de conversaciones
+            self.log(f"[{device}] Buscando primer chat (fijado)...", 'info')
+
+            # Estrategia 1: Por ID de la fila de conversación
+            row_selector = d(resourceId=f"{package_name}:id/conversations_row_contact_name")
+
+            chat_clicked = False
+            if row_selector.exists:
+                # Click en el primero (índice 0)
+                try:
+                    row_selector[0].click()
+                    chat_clicked = True
+                except:
+                    pass
+
+            if not chat_clicked:
+                # Estrategia 2: Click por coordenadas relativas (arriba de la lista)
+                # Asumiendo una resolución estándar, el primer chat suele estar en el top 20-30%
+                self.log(f"[{device}] Usando click relativo para primer chat...", 'warning')
+                w, h = d.window_size()
+                d.click(w // 2, int(h * 0.25)) # Click en el cuarto superior central
+                chat_clicked = True
+
+            self._controlled_sleep(2) # Esperar a que abra el chat
+
+            # 2. Escribir número y enviar
+            self.log(f"[{device}] Enviando número {phone_number}...", 'info')
+
+            # Buscar campo de texto (usando helper existente)
+            chat_field = self._locate_chat_field(d, wait_timeout=5)
+
+            if not chat_field:
+                self.log(f"[{device}] No se encontró campo de texto.", 'error')
+                return False
+
+            try:
+                # 1. Escribir primero para que aparezca el botón de enviar
+                chat_field.click()
+                self._controlled_sleep(0.5)
+                chat_field.set_text(phone_number)
+                self._controlled_sleep(1.0) # Esperar a que el UI actualice y muestre el botón enviar
+
+                # 2. Buscar botón de enviar AHORA (estrictamente el avión, evitando 'Reenviar')
+                send_selectors = [
+                    dict(resourceId=f"{package_name}:id/send"),
+                    dict(contentDescription="Enviar"),
+                    dict(description="Enviar"),
+                    dict(resourceId=f"{package_name}:id/send_button")
+                ]
+
+                send_btn = None
+                for sel in send_selectors:
+                    btn = d(**sel)
+                    if btn.exists:
+                        send_btn = btn
+                        break
+
+                if send_btn:
+                    send_btn.click()
+                else:
+                    self.log(f"[{device}] Botón enviar no encontrado, intentando Enter...", 'warning')
+                    self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENTER'])
+
+                self._controlled_sleep(1.5) # Esperar a que se envíe y aparezca la burbuja
+            except Exception as e:
+                self.log(f"[{device}] Error al enviar número: {e}", 'error')
+                return False
+
+            # 3. Click en el mensaje enviado (el último)
+            self.log(f"[{device}] Buscando mensaje enviado...", 'info')
+
+            # Buscar el último mensaje que contenga el número
+            # Los mensajes suelen tener id 'message_text'
+            msg_selector = d(resourceId=f"{package_name}:id/message_text", text=phone_number)
+
+            if not msg_selector.exists:
+                # Intentar buscar por texto contiene (por si hay formato)
+                msg_selector = d(resourceId=f"{package_name}:id/message_text", textContains=phone_number[-4:]) # Últimos 4 dígitos
+
+            if msg_selector.exists:
+                # Hacer click en la última instancia encontrada (la más reciente)
+                try:
+                    count = msg_selector.count
+                    if count > 0:
+                        msg_selector[count - 1].click()
+                    else:
+                        msg_selector.click()
+                except Exception as e:
+                    self.log(f"[{device}] Error al clickear mensaje: {e}", 'error')
+                    return False
+            else:
+                self.log(f"[{device}] No se encontró la burbuja del mensaje con el número.", 'error')
+                return False
+
+            self._controlled_sleep(1.5) # Esperar al popup
+
+            # 4. Esperar popup 'Llamar en Whatsapp' y 5. Clickear
+            self.log(f"[{device}] Buscando opción 'Llamar en Whatsapp'...", 'info')
+
+            popup_options = [
+                "Llamar en WhatsApp",
+                "Llamar en Whatsapp",
+                "Call on WhatsApp",
+                "Llamada de voz"
+            ]
+
+            call_option_clicked = False
+            for opt in popup_options:
+                btn = d(text=opt)
+                if btn.exists:
+                    btn.click()
+                    call_option_clicked = True
+                    self.log(f"[{device}] Opción '{opt}' encontrada y clickeada.", 'success')
+                    break
+
+            if not call_option_clicked:
+                # Intentar búsqueda laxa
+                btn = d(textContains="Llamar")
+                if btn.exists:
+                     # Verificar que no sea "Llamar" de llamada normal (GSM) si se distingue
+                     # Pero el usuario dijo "Llamar en Whatsapp", así que priorizamos eso.
+                     # Si sale solo "Llamar", podría ser GSM.
+                     # Busquemos especificamente el texto que dijo el usuario.
+                     pass
+
+                self.log(f"[{device}] No se encontró la opción de llamada de WhatsApp. ¿Tiene WhatsApp este número?", 'warning')
+                # Cerrar el popup (click fuera o back)
+                d.press("back")
+                return False
+
+            # 6. Esperar y colgar
+            self.log(f"[{device}] Llamada iniciada. Esperando {duration}s...", 'info')
+
+            # Esperar duración
+            elapsed = 0
+            while elapsed < duration:
+                if self.should_stop: break
+                self._controlled_sleep(1)
+                elapsed += 1
+
+            # Colgar (Botón rojo)
+            self.log(f"[{device}] Colgando...", 'info')
+
+            # Buscar botón de colgar (rojo)
+            # IDs comunes: footer_end_call_btn, end_call_btn
+            end_btn_selectors = [
+                dict(resourceId=f"{package_name}:id/footer_end_call_btn"),
+                dict(resourceId="com.whatsapp:id/footer_end_call_btn"),
+                dict(resourceId="com.whatsapp.w4b:id/footer_end_call_btn"),
+                dict(descriptionMatches="(?i)fin.*llamada|cortar|end call|colgar"),
+                dict(resourceIdMatches="(?i).*end_call.*")
+            ]
+
+            end_clicked = False
+            for sel in end_btn_selectors:
+                btn = d(**sel)
+                if btn.exists:
+                    btn.click()
+                    end_clicked = True
+                    break
+
+            if not end_clicked:
+                # Fallback: ADB keycode endcall
+                self.log(f"[{device}] Usando KEYCODE_ENDCALL para colgar...", 'info')
+                self._run_adb_command(['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENDCALL'])
+
+            # Volver al inicio (Home de la app)
+            self._controlled_sleep(1)
+            # Presionar back un par de veces para salir del chat y volver a la lista
+            d.press("back")
+            self._controlled_sleep(0.5)
+            d.press("back")
+
+            return True
+
+        except Exception as e:
+            self.log(f"[{device}] Error en _perform_whatsapp_call_action: {e}", 'error')
+            return False
+
+    def run_numeros_manual_thread(self):
+        """Lógica de envío para MODO NÚMEROS - MANUAL."""
+        self.log("Iniciando MODO NÚMEROS (Manual)...", 'info')
+
+        active_devices = self._get_filtered_devices()
+        if not active_devices:
+            self.log("No hay dispositivos que cumplan con el filtro.", "error")
+            return
+
+        num_devices = len(active_devices)
+        num_bucles = self.run_config.manual_loops
+        task_counter = 0
+        mensaje_index = self.mensaje_start_index
+        total_mensajes_lib = len(self.manual_messages_numbers)
+        whatsapp_apps = self._get_whatsapp_apps_to_use()
+
+        for bucle_num in range(num_bucles):
+            if self.should_stop: break
+            self.log(f"\n--- BUCLE {bucle_num + 1}/{num_bucles} ---", 'info')
+
+            for num_idx, numero in enumerate(self.manual_inputs_numbers):
+                if self.should_stop: break
+
+                device = active_devices[num_idx % num_devices]
+
+                for wa_idx, (wa_name, wa_package) in enumerate(whatsapp_apps):
+                    if self.should_stop: break
+                    task_counter += 1
+                    mensaje = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
+                    link = f"https://wa.me/549{numero}?text={urllib.parse.quote(mensaje, safe='')}"
+
+                    self.run_single_task(device, link, None, task_counter, whatsapp_package=wa_package)
+
+    def run_numeros_manual_simultaneous_thread(self):
+        """
+        Lógica de envío SIMULTÁNEO para MODO NÚMEROS - MANUAL.
+        Para cada número destino:
+          1. Todos los Business envían a ese número SIMULTÁNEAMENTE
+          2. Todos los Normal envían a ese número SIMULTÁNEAMENTE
+        Luego se pasa al siguiente número.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        self.log("Iniciando MODO NÚMEROS MANUAL - SIMULTÁNEO...", 'info')
+
+        active_devices = self._get_filtered_devices()
+        if not active_devices:
+            self.log("No hay dispositivos que cumplan con el filtro.", "error")
+            return
+
+        num_devices = len(active_devices)
+        num_bucles = self.run_config.manual_loops
+        total_numeros = len(self.manual_inputs_numbers)
+        
+        self.log(f"Dispositivos: {num_devices}, Números: {total_numeros}", 'info')
+
+        task_counter = [0]
+        mensaje_index = [self.mensaje_start_index]
+        total_mensajes_lib = len(self.manual_messages_numbers)
+        whatsapp_apps = self._get_whatsapp_apps_to_use()
+
+        def execute_send(device, wa_package, numero, task_idx):
+            """Ejecuta un envío SIMPLIFICADO en un thread del pool."""
+            mensaje = self.manual_messages_numbers[mensaje_index[0] % total_mensajes_lib]
+            mensaje_index[0] += 1
+            link = f"https://wa.me/549{numero}?text={urllib.parse.quote(mensaje, safe='')}"
+            
+            # Usar la función simplificada: solo abre el link y hace clic en enviar
+            success = self._send_simple_whatsapp(device, link, wa_package)
+            
+            # Actualizar contadores
+            if success:
+                self.sent_count += 1
+            else:
+                self.failed_count += 1
+            self.current_index = task_idx
+            self._notify_progress()
+            
+            return success
+
+        for bucle_num in range(num_bucles):
+            if self.should_stop: break
+            self.log(f"\n--- BUCLE {bucle_num + 1}/{num_bucles} (SIMULTÁNEO) ---", 'success')
+
+            for num_idx, numero in enumerate(self.manual_inputs_numbers):
+                self.cancel_token.wait_if_paused()
+                
+                if self.should_stop: break
+                
+                self.log(f"\n>>> Número {num_idx + 1}/{total_numeros}: {numero} <<<", 'info')
+
+                # Para cada tipo de WhatsApp (primero Business, luego Normal según config)
+                for wa_name, wa_package in whatsapp_apps:
+                    if self.should_stop: break
+                    
+                    self.log(f"[{wa_name}] Enviando desde {num_devices} dispositivos SIMULTÁNEAMENTE...", 'info')
+                    
+                    # Usar ThreadPoolExecutor para enviar desde TODOS los dispositivos a la vez
+                    with ThreadPoolExecutor(max_workers=num_devices) as executor:
+                        futures = []
+                        for device in active_devices:
+                            task_counter[0] += 1
+                            future = executor.submit(
+                                execute_send,
+                                device,
+                                wa_package,
+                                numero,
+                                task_counter[0]
+                            )
+                            futures.append(future)
+                        
+                        # Esperar a que todos terminen
+                        for future in as_completed(futures):
+                            try:
+                                future.result()
+                            except Exception as e:
+                                self.log(f"Error en thread: {e}", 'error')
+                    
+                    if self.should_stop: break
+                    self.log(f"[{wa_name}] Lote completado", 'success')
+                    
+                    # Delay entre tipos de WhatsApp (Business -> Normal)
+                    if wa_package != whatsapp_apps[-1][1]:  # Si no es el último tipo
+                        delay = random.uniform(2, 4)
+                        self.log(f"⏳ Esperando {delay:.1f}s...", 'info')
+                        self._controlled_sleep(delay)
+                
+                if self.should_stop: break
+                
+                # Delay entre números
+                if num_idx < total_numeros - 1:
+                    delay = random.uniform(self.run_config.fidelizado_send_delay_min, self.run_config.fidelizado_send_delay_max)
+                    self.log(f"⏳ Esperando {delay:.1f}s antes del siguiente número...", 'info')
+                    self._controlled_sleep(delay)
+            
+            if self.should_stop: break
+            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+
+        self.log(f"\nModo Números Manual SIMULTÁNEO finalizado", 'success')
+    
+    def _get_filtered_devices(self, silent=False):
+        """
+        Filtra self.devices según el tipo de WhatsApp seleccionado.
+        Devuelve una lista de series de dispositivos a utilizar.
+        """
+        # Durante un envío se usa la instantánea; desde la UI, la selección actual
+        whatsapp_mode = self._current_whatsapp_mode()
+
+        if whatsapp_mode == "Ambas":
+            if not silent:
+                self.log("Modo 'Ambas' seleccionado, usando todos los dispositivos.", 'info')
+            return self.devices
+
+        def _log(msg, level='info'):
+            if not silent:
+                self.log(msg, level)
+
+        if not self.detected_phone_lines:
+            inferred_lines = self._infer_lines_from_installed_apps(log_errors=not silent)
+            if inferred_lines:
+                allowed_serials = {line['device'] for line in inferred_lines if line['type'] == ("WhatsApp" if whatsapp_mode == "Normal" else "WhatsApp Business")}
+                filtered_devices = [device for device in self.devices if device in allowed_serials]
+                if filtered_devices:
+                    _log("No se detectaron números, se usarán las apps instaladas para filtrar dispositivos.", 'info')
+                    return filtered_devices
+
+            _log("No se han detectado líneas de WhatsApp. No se puede filtrar. Usando todos los dispositivos.", 'warning')
+            return self.devices
+
+        target_type = "WhatsApp" if whatsapp_mode == "Normal" else "WhatsApp Business"
+
+        allowed_serials = {line['device'] for line in self.detected_phone_lines if line['type'] == target_type}
+
+        filtered_devices = [device for device in self.devices if device in allowed_serials]
+
+        _log(f"Filtrando por '{whatsapp_mode}'. Dispositivos a usar: {len(filtered_devices)} de {len(self.devices)}", 'info')
+
+        return filtered_devices
+
+    def _get_whatsapp_apps_to_use(self):
+        """
+        Retorna una lista de tuplas (nombre, package) según la selección del usuario.
+        Opciones: Business, Normal, Ambas (Business + Normal), Todas (Business + Normal + Normal con cambio de cuenta)
+        """
+        wa_mode = self.run_config.whatsapp_mode
+        
+        if wa_mode == "Normal":
+            return [("Normal", "com.whatsapp")]
+        elif wa_mode == "Business":
+            return [("Business", "com.whatsapp.w4b")]
+        elif wa_mode == "Ambas":
+            return [("Business", "com.whatsapp.w4b"), ("Normal", "com.whatsapp")]
+        else:  # "Todas"
+            # Business + Normal (cuenta 1) + Normal (cuenta 2 después de cambio automático)
+            return [("Business", "com.whatsapp.w4b"), ("Normal", "com.whatsapp"), ("Normal", "com.whatsapp")]
+    
+    
+    def _send_to_target_with_whatsapp(self, device, target_link, wa_name, wa_package, mensaje, task_counter):
+        """
+        Envía un mensaje a un target, gestionando la conexión de uiautomator2 y usando el método de envío unificado.
+        """
+        # Conectar con uiautomator2 al inicio de la tarea
+        ui_device = None
+        try:
+            ui_device = self.u2_registry.get(device, unlock=True)
+        except Exception as e:
+            self.log(f"No se pudo conectar uiautomator2 a {device}: {e}", "warning")
+            ui_device = None
+
+        # Llamar a send_msg, que ahora contiene toda la lógica de envío y fallback
+        success = self.send_msg(device, target_link, task_counter, self.total_messages, message_to_send=mensaje, whatsapp_package=wa_package, ui_device=ui_device)
+        
+        if success:
+            self.sent_count += 1
+        else:
+            self.failed_count += 1
+        self._notify_progress()
+        
+        # Si es Normal y el modo es "Todas", ejecutar el cambio de cuenta DESPUÉS de enviar
+        # IMPORTANTE: Si se envió audio, restablecer el contador para que la siguiente cuenta no lo envíe
+        # a menos que le toque aleatoriamente.
+        if wa_name == "Normal" and self.run_config.whatsapp_mode == "Todas":
+            self.log(f"[{device}] Cerrando WhatsApp Normal después de enviar...", 'info')
+            close_cmd = ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp']
+            self._run_adb_command(close_cmd, timeout=5)
+            self._controlled_sleep(1)
+            
+            self.log(f"[{device}] Reabriendo WhatsApp Normal...", 'info')
+            open_cmd = ['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main']
+            self._run_adb_command(open_cmd, timeout=5)
+            self._controlled_sleep(3)  # Esperar 3 segundos para que WhatsApp se abra completamente
+            
+            self.log(f"[{device}] Cambiando de cuenta...", 'info')
+            self._switch_account_for_device(device, delay=0.2)
+            self._controlled_sleep(4)
+            
+            self.log(f"[{device}] Cerrando WhatsApp Normal después de cambiar cuenta...", 'info')
+            close_cmd = ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp']
+            self._run_adb_command(close_cmd, timeout=5)
+            self._controlled_sleep(1)
+            
+            self.log(f"[{device}] Reabriendo WhatsApp Normal con nueva cuenta...", 'info')
+            open_cmd = ['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main']
+            self._run_adb_command(open_cmd, timeout=5)
+            self._controlled_sleep(2)
+
+            # Resetear pending audio para la nueva cuenta si no está habilitado globalmente
+            # o si la lógica de 'una cuenta a la vez' estaba causando repeticiones
+        
+        return True
+    
+    def run_mixto_dual_whatsapp_thread(self):
+        """
+        Lógica de envío para MODO MIXTO con 3 variantes.
+        Variante 1: G1→N1→G2→N2 (alternar 1 a 1)
+        Variante 2: G1→G2→N1→G3→G4→N2 (2 grupos por número)
+        Variante 3: G1→G2→G3→N1→G4→G5→G6→N2 (3 grupos por número)
+        
+        Los grupos y números se repiten en bucle si hay menos de los necesarios.
+        Todas las líneas (dispositivos) siguen la misma secuencia.
+        """
+        # --- FILTRADO DE DISPOSITIVOS ---
+        active_devices = self._get_filtered_devices()
+        if not active_devices:
+            self.log("No hay dispositivos que cumplan con el filtro seleccionado.", "error")
+            self.observer.on_error("Error", "No se encontraron dispositivos que cumplan con el filtro de WhatsApp seleccionado.")
+            return
+        # --- FIN FILTRADO ---
+
+        num_devices = len(active_devices)
+        num_grupos = len(self.manual_inputs_groups)
+        num_numeros = len(self.manual_inputs_numbers)
+        num_bucles = self.manual_loops
+        variant = self.run_config.mixto_variant
+        
+        if len(self.manual_messages_numbers) < 1:
+            self.log("Error: Modo Mixto requiere al menos 1 mensaje cargado.", "error")
+            self.observer.on_error("Error", "Debes cargar al menos 1 archivo de mensajes para el modo mixto.")
+            return
+        
+        # Usar índice de inicio aleatorio
+        mensaje_index = self.mensaje_start_index
+        total_mensajes = len(self.manual_messages_numbers)
+        task_counter = 0
+        whatsapp_apps = self._get_whatsapp_apps_to_use()
+        
+        variant_names = {1: "1:1", 2: "2:1", 3: "3:1"}
+        self.log(f"Modo Mixto (Variante {variant} - {variant_names[variant]}): {num_bucles} ciclo(s), {num_grupos} grupo(s), {num_numeros} número(s), {num_devices} dispositivo(s)", 'info')
+        self.log(f"WhatsApp: {self.run_config.whatsapp_mode}", 'info')
+        self.log(f"Total de envíos: {self.total_messages}", 'info')
+        
+        for ciclo in range(num_bucles):
+            if self.should_stop: break
+            self.log(f"\n--- CICLO {ciclo + 1}/{num_bucles} ---", 'info')
+            
+            # Crear lista de targets según la variante
+            targets = []
+            
+            if variant == 1:
+                # Variante 1: G1→N1→G2→N2 (alternar 1 a 1)
+                max_len = max(num_grupos, num_numeros)
+                for i in range(max_len):
+                    grupo_idx = i % num_grupos
+                    numero_idx = i % num_numeros
+                    targets.append(('grupo', grupo_idx, self.manual_inputs_groups[grupo_idx]))
+                    targets.append(('numero', numero_idx, self.manual_inputs_numbers[numero_idx]))
+                    
+            elif variant == 2:
+                # Variante 2: G1→G2→N1→G3→G4→N2 (2 grupos por número)
+                grupo_idx = 0
+                for num_idx in range(num_numeros):
+                    # Añadir 2 grupos
+                    for _ in range(2):
+                        targets.append(('grupo', grupo_idx % num_grupos, self.manual_inputs_groups[grupo_idx % num_grupos]))
+                        grupo_idx += 1
+                    # Añadir 1 número
+                    targets.append(('numero', num_idx, self.manual_inputs_numbers[num_idx]))
+                # Si sobran grupos, continuar añadiendo en bucle
+                if grupo_idx < num_grupos:
+                    remaining = num_grupos - grupo_idx
+                    for _ in range(remaining):
+                        targets.append(('grupo', grupo_idx % num_grupos, self.manual_inputs_groups[grupo_idx % num_grupos]))
+                        grupo_idx += 1
+                        
+            elif variant == 3:
+                # Variante 3: G1→G2→G3→N1→G4→G5→G6→N2 (3 grupos por número)
+                grupo_idx = 0
+                for num_idx in range(num_numeros):
+                    # Añadir 3 grupos
+                    for _ in range(3):
+                        targets.append(('grupo', grupo_idx % num_grupos, self.manual_inputs_groups[grupo_idx % num_grupos]))
+                        grupo_idx += 1
+                    # Añadir 1 número
+                    targets.append(('numero', num_idx, self.manual_inputs_numbers[num_idx]))
+                # Si sobran grupos, continuar añadiendo en bucle
+                if grupo_idx < num_grupos:
+                    remaining = num_grupos - grupo_idx
+                    for _ in range(remaining):
+                        targets.append(('grupo', grupo_idx % num_grupos, self.manual_inputs_groups[grupo_idx % num_grupos]))
+                        grupo_idx += 1
+            
+            # Procesar cada target en la secuencia
+            for target_type, target_idx, target_value in targets:
+                if self.should_stop: break
+                
+                tipo_str = "Grupo" if target_type == 'grupo' else "Número"
+                if target_type == 'grupo':
+                    self.log(f"\n=== GRUPO {target_idx + 1}/{num_grupos}: {target_value[:50]}... ===", 'info')
+                else:
+                    self.log(f"\n=== NÚMERO {target_idx + 1}/{num_numeros}: +549{target_value} ===", 'info')
+                
+                # Por cada dispositivo (todas las líneas procesan la misma secuencia)
+                for device in self.devices:
+                    if self.should_stop: break
+                    
+                    # Por cada WhatsApp (Normal, Business, o Ambos)
+                    for wa_idx, (wa_name, wa_package) in enumerate(whatsapp_apps):
+                        if self.should_stop: break
+                        
+                        task_counter += 1
+                        self.current_index = task_counter
+                        self._notify_progress()
+                        
+                        # Obtener mensaje rotativo
+                        mensaje = self.manual_messages_numbers[mensaje_index % total_mensajes]
+                        mensaje_index += 1
+                        
+                        # Construir link según tipo
+                        if target_type == 'grupo':
+                            target_link = target_value
+                        else:
+                            target_link = f"https://wa.me/549{target_value}"
+                        
+                        # Enviar usando la función auxiliar
+                        success = self._send_to_target_with_whatsapp(
+                            device, target_link, wa_name, wa_package, mensaje, task_counter
+                        )
+                        
+                        # Pausa entre WhatsApps si hay más de uno y es Business (primero)
+                        if success and len(whatsapp_apps) > 1 and wa_idx == 0:
+                            wait_between = self.run_config.wait_between_messages
+                            if wait_between > 0:
+                                self.log(f"Esperando {wait_between}s antes del siguiente WhatsApp...", 'info')
+                                self._controlled_sleep(wait_between)
+                        
+                        self._controlled_sleep(0.5)  # Pequeña pausa entre envíos
+                
+                if self.should_stop: break
+                self.log(f"\n=== {tipo_str} {target_idx + 1} completado ===", 'success')
+            
+            if self.should_stop: break
+            self.log(f"\n--- CICLO {ciclo + 1} completado ---", 'success')
+        
+        self.log(f"\nModo Mixto (Variante {variant}) finalizado", 'success')
+
+    def run_uno_a_uno_thread(self):
+        """
+        Lógica de envío para MODO NÚMEROS - UNO A UNO.
+        Las líneas detectadas se emparejan aleatoriamente y conversan entre sí.
+        Se repite según la configuración de Bucles y Ciclos.
+        """
+        self.log("Iniciando MODO NÚMEROS (Uno a uno)...", 'info')
+        if len(self.detected_phone_lines) < 2:
+            self.log("Se necesitan al menos 2 líneas de WhatsApp para este modo.", 'error')
+            self.observer.on_error("Error", "Se necesitan al menos 2 líneas de WhatsApp detectadas para el modo 'Uno a uno'.")
+            return
+
+        lines = self.detected_phone_lines.copy()
+        num_lines = len(lines)
+        num_bucles = self.run_config.manual_loops
+        num_ciclos = self.run_config.manual_cycles # NUEVO
+        
+        task_counter = 0
+        mensaje_index = self.mensaje_start_index
+        total_mensajes_lib = len(self.manual_messages_numbers)
+
+        # Bucle externo para los Bucles
+        for bucle_num in range(num_bucles):
+            if self.should_stop: break
+            self.log(f"\n--- INICIANDO BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+
+            # Bucle interno para los Ciclos
+            for ciclo_num in range(num_ciclos):
+                if self.should_stop: break
+                self.log(f"\n--- Ciclo {ciclo_num + 1}/{num_ciclos} (dentro del Bucle {bucle_num + 1}) ---", 'info')
+
+                random.shuffle(lines)
+
+                # Manejar número impar de líneas
+                excluded = None
+                current_lines = lines.copy()
+                if num_lines % 2 != 0:
+                    excluded = current_lines.pop()
+                    self.log(f"Número impar de líneas. {excluded['number']} quedará fuera de este ciclo.", 'warning')
+
+                # Crear parejas
+                pairs = []
+                for i in range(0, len(current_lines), 2):
+                    pairs.append((current_lines[i], current_lines[i+1]))
+
+                self.log(f"Se formaron {len(pairs)} parejas para este ciclo.", 'info')
+
+                for i, (line_a, line_b) in enumerate(pairs):
+                    if self.should_stop: break
+                    self.log(f"\n=== Pareja {i+1}/{len(pairs)}: {line_a['number']} <-> {line_b['number']} ===", 'info')
+
+                    # Conversación de ida y vuelta
+                    # A -> B
+                    task_counter += 1
+                    mensaje_ida = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
+                    link_ida = f"https://wa.me/{line_b['number'].replace('+', '')}?text={urllib.parse.quote(mensaje_ida, safe='')}"
+                    self.run_single_task(
+                        line_a['device'],
+                        link_ida,
+                        None,
+                        task_counter,
+                        whatsapp_package=line_a['package'],
+                        activity_info={'from': line_a['number'], 'to': line_b['number']}
+                    )
+                    if self.should_stop: break
+
+                    # B -> A
+                    task_counter += 1
+                    mensaje_vuelta = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
+                    link_vuelta = f"https://wa.me/{line_a['number'].replace('+', '')}?text={urllib.parse.quote(mensaje_vuelta, safe='')}"
+                    self.run_single_task(
+                        line_b['device'],
+                        link_vuelta,
+                        None,
+                        task_counter,
+                        whatsapp_package=line_b['package'],
+                        activity_info={'from': line_b['number'], 'to': line_a['number']}
+                    )
+
+            if self.should_stop: break
+            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+
+    def run_uno_a_muchos_thread(self):
+        """
+        Lógica de envío para MODO NÚMEROS - UNO A MUCHOS.
+        Cada línea detectada conversa con todas las demás, una sola vez por par.
+        """
+        self.log("Iniciando MODO NÚMEROS (Uno a muchos)...", 'info')
+        if len(self.detected_phone_lines) < 2:
+            self.log("Se necesitan al menos 2 líneas de WhatsApp para este modo.", 'error')
+            self.observer.on_error("Error", "Se necesitan al menos 2 líneas de WhatsApp detectadas para el modo 'Uno a muchos'.")
+            return
+
+        lines = self.detected_phone_lines.copy()
+        num_lines = len(lines)
+        num_bucles = self.run_config.manual_loops
+
+        task_counter = 0
+        mensaje_index = self.mensaje_start_index
+        total_mensajes_lib = len(self.manual_messages_numbers)
+
+        for bucle_num in range(num_bucles):
+            if self.should_stop: break
+            self.log(f"\n--- BUCLE {bucle_num + 1}/{num_bucles} ---", 'info')
+
+            # Crear todas las parejas únicas
+            pairs = []
+            for i in range(num_lines):
+                for j in range(i + 1, num_lines):
+                    pairs.append((lines[i], lines[j]))
+
+            self.log(f"Se formaron {len(pairs)} parejas únicas para este bucle.", 'info')
+
+            for i, (line_a, line_b) in enumerate(pairs):
+                if self.should_stop: break
+                self.log(f"\n=== Conversación {i+1}/{len(pairs)}: {line_a['number']} <-> {line_b['number']} ===", 'info')
+
+                # Conversación de ida y vuelta
+                # A -> B
+                task_counter += 1
+                mensaje_ida = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
+                link_ida = f"https://wa.me/{line_b['number'].replace('+', '')}?text={urllib.parse.quote(mensaje_ida, safe='')}"
+                self.run_single_task(
+                    line_a['device'],
+                    link_ida,
+                    None,
+                    task_counter,
+                    whatsapp_package=line_a['package'],
+                    activity_info={'from': line_a['number'], 'to': line_b['number']}
+                )
+                if self.should_stop: break
+
+                # B -> A
+                task_counter += 1
+                mensaje_vuelta = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]; mensaje_index += 1
+                link_vuelta = f"https://wa.me/{line_a['number'].replace('+', '')}?text={urllib.parse.quote(mensaje_vuelta, safe='')}"
+                self.run_single_task(
+                    line_b['device'],
+                    link_vuelta,
+                    None,
+                    task_counter,
+                    whatsapp_package=line_b['package'],
+                    activity_info={'from': line_b['number'], 'to': line_a['number']}
+                )
+    
+    def run_uno_a_muchos_simultaneous_thread(self):
+        """
+        Lógica de envío SIMULTÁNEO para MODO NÚMEROS - UNO A MUCHOS.
+        Usa un único ThreadPoolExecutor (un hilo por teléfono físico) durante todo el modo;
+        las líneas de un mismo teléfono envían en serie.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        self.log("Iniciando MODO NÚMEROS (Uno a muchos) - SIMULTÁNEO...", 'info')
+        if len(self.detected_phone_lines) < 2:
+            self.log("Se necesitan al menos 2 líneas de WhatsApp para este modo.", 'error')
+            self.observer.on_error("Error", "Se necesitan al menos 2 líneas de WhatsApp detectadas.")
+            return
+
+        lines = self.detected_phone_lines.copy()
+        num_lines = len(lines)
+        num_bucles = self.run_config.manual_loops
+        
+        # Obtener la cantidad de dispositivos físicos únicos
+        unique_devices = list(set(line['device'] for line in lines))
+        num_devices_phys = len(unique_devices)
+        self.log(f"Dispositivos físicos únicos: {num_devices_phys}", 'info')
+
+        # Separar líneas por tipo de WhatsApp
+        business_lines = [line for line in lines if line.get('type') == 'WhatsApp Business']
+        normal_lines = [line for line in lines if line.get('type') == 'WhatsApp']
+        
+        self.log(f"Líneas detectadas: {len(business_lines)} Business, {len(normal_lines)} Normal", 'info')
+
+        task_counter = [0]  # Usar lista para mutabilidad en closure
+        mensaje_index = [self.mensaje_start_index]
+        total_mensajes_lib = len(self.manual_messages_numbers)
+        mensaje_lock = threading.Lock()
+        latency_stats = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+
+        def execute_send(sender_device, sender_package, sender_number, target_number, task_idx):
+            """Función que ejecuta un envío. Corre en un thread del pool."""
+            with mensaje_lock:
+                mensaje = self.manual_messages_numbers[mensaje_index[0] % total_mensajes_lib]
+                mensaje_index[0] += 1
+            
+            link = f"https://wa.me/{target_number.replace('+', '')}?text={urllib.parse.quote(mensaje, safe='')}"
+            activity_info = {'from': sender_number, 'to': target_number}
+            
+            self.run_single_task(
+                sender_device, 
+                link, 
+                None, 
+                task_idx, 
+                whatsapp_package=sender_package, 
+                activity_info=activity_info, 
+                skip_delay=True
+            )
+            return True
+
+        def execute_device_batch(device_sends, submitted_at):
+            """Ejecuta en orden los envíos de un mismo teléfono físico (nunca dos a la vez en el mismo equipo)."""
+            latency_ms = (time.perf_counter() - submitted_at) * 1000
+            with mensaje_lock:
+                latency_stats['count'] += 1
+                latency_stats['total_ms'] += latency_ms
+                latency_stats['max_ms'] = max(latency_stats['max_ms'], latency_ms)
+            for send_args in device_sends:
+                if self.should_stop:
+                    break
+                execute_send(*send_args)
+
+        def run_phase(executor, senders, target_number):
+            """Envía desde todas las líneas 'senders' al destino, en paralelo por dispositivo físico."""
+            by_device = {}
+            for sender in senders:
+                task_counter[0] += 1
+                by_device.setdefault(sender['device'], []).append(
+                    (sender['device'], sender['package'], sender['number'], target_number, task_counter[0])
+                )
+
+            futures = [executor.submit(execute_device_batch, sends, time.perf_counter()) for sends in by_device.values()]
+
+            # Esperar a que todos terminen
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self.log(f"Error en thread: {e}", 'error')
+
+        # Un único pool para todo el modo, con un hilo por teléfono físico
+        executor = ThreadPoolExecutor(max_workers=max(1, num_devices_phys))
+        try:
+            for bucle_num in range(num_bucles):
+                if self.should_stop: break
+                self.log(f"\n--- BUCLE {bucle_num + 1}/{num_bucles} (SIMULTÁNEO) ---", 'success')
+
+                for target_idx, target_line in enumerate(lines):
+                    self.cancel_token.wait_if_paused()
+                    
+                    if self.should_stop: break
+                    
+                    self.log(f"\n>>> Destino {target_idx + 1}/{num_lines}: {target_line['number']} <<<", 'info')
+                    
+                    # --- PASO 1: Todos los Business envían a este destino ---
+                    business_senders = [line for line in business_lines if line['number'] != target_line['number']]
+                    if business_senders:
+                        self.log(f"[BUSINESS] Enviando {len(business_senders)} mensajes SIMULTÁNEAMENTE...", 'info')
+                        run_phase(executor, business_senders, target_line['number'])
+                        
+                        if self.should_stop: break
+                        self.log(f"[BUSINESS] Completado", 'success')
+                        
+                        # Pequeño delay entre Business y Normal
+                        normal_senders = [line for line in normal_lines if line['number'] != target_line['number']]
+                        if normal_senders:
+                            delay = random.uniform(2, 4)
+                            self.log(f"⏳ Esperando {delay:.1f}s antes de Normal...", 'info')
+                            self._controlled_sleep(delay)
+                    
+                    if self.should_stop: break
+                    
+                    # --- PASO 2: Todos los Normal envían a este destino ---
+                    normal_senders = [line for line in normal_lines if line['number'] != target_line['number']]
+                    if normal_senders:
+                        self.log(f"[NORMAL] Enviando {len(normal_senders)} mensajes SIMULTÁNEAMENTE...", 'info')
+                        run_phase(executor, normal_senders, target_line['number'])
+                        
+                        if self.should_stop: break
+                        self.log(f"[NORMAL] Completado", 'success')
+                    
+                    if self.should_stop: break
+                    self.log(f">>> Destino {target_idx + 1}/{num_lines} finalizado", 'success')
+                    
+                    # Delay entre destinos
+                    if target_idx < num_lines - 1:
+                        delay = random.uniform(self.run_config.fidelizado_send_delay_min, self.run_config.fidelizado_send_delay_max)
+                        self.log(f"⏳ Esperando {delay:.1f}s antes del siguiente destino...", 'info')
+                        self._controlled_sleep(delay)
+                
+                if self.should_stop: break
+                self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+        finally:
+            executor.shutdown(wait=True)
+
+        if latency_stats['count']:
+            avg_ms = latency_stats['total_ms'] / latency_stats['count']
+            self.log(f"Latencia envío→inicio: {avg_ms:.1f} ms promedio, {latency_stats['max_ms']:.1f} ms máx ({latency_stats['count']} lotes)", 'info')
+
+        self.log(f"\nModo Números (Uno a muchos) SIMULTÁNEO finalizado", 'success')
+
+    def run_numeros_manual_thread(self):
+        """
+        Lógica de envío para MODO NÚMEROS MANUAL.
+        Envía mensajes a los números cargados manualmente en la caja de texto.
+        Todos los teléfonos (primero Business, luego Normal) hablan al primer número,
+        luego hacen la pausa correspondiente y siguen con el número 2.
+        
+        LÓGICA SIMPLIFICADA:
+        1. Abrir link wa.me con mensaje incluido
+        2. Esperar que cargue el chat
+        3. Hacer clic en botón enviar
+        """
+        self.log("Iniciando MODO NÚMEROS MANUAL...", 'info')
+        
+        numeros = self.manual_inputs_numbers
+        if not numeros:
+            self.log("Error: No hay números cargados.", 'error')
+            self.observer.on_error("Error", "No hay números cargados.")
+            return
+        
+        if not self.manual_messages_numbers:
+            self.log("Error: No hay mensajes cargados.", 'error')
+            self.observer.on_error("Error", "No hay mensajes cargados.")
+            return
+        
+        # Obtener dispositivos filtrados
+        active_devices = self._get_filtered_devices()
+        if not active_devices:
+            self.log("No hay dispositivos que cumplan con el filtro seleccionado.", "error")
+            self.observer.on_error("Error", "No se encontraron dispositivos que cumplan con el filtro de WhatsApp seleccionado.")
+            return
+        
+        num_numeros = len(numeros)
+        num_bucles = self.run_config.manual_loops
+        mensaje_index = self.mensaje_start_index
+        total_mensajes_lib = len(self.manual_messages_numbers)
+        task_counter = 0
+        
+        # Construir lista de workers en el orden correcto (Business primero, luego Normal)
+        workers = self._get_ordered_workers(active_devices)
+        num_workers = len(workers)
+        
+        self.log(f"Modo Números Manual: {num_bucles} bucle(s), {num_numeros} números, {num_workers} workers", 'info')
+        
+        # --- Bucle principal ---
+        for bucle_num in range(num_bucles):
+            if self.should_stop: break
+            self.log(f"\n--- INICIANDO BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+            
+            # Por cada número
+            for idx_numero, numero in enumerate(numeros):
+                if self.should_stop: break
+                
+                # Normalizar el número
+                clean_numero = ''.join(filter(str.isdigit, numero))
+                if not clean_numero:
+                    self.log(f"Número inválido ignorado: {numero}", 'warning')
+                    continue
+                
+                self.log(f"\n=== NÚMERO {idx_numero + 1}/{num_numeros}: {clean_numero} ===", 'info')
+                
+                # Por cada worker (todos los teléfonos, Business primero luego Normal)
+                for worker_idx, (device, wa_name, wa_package) in enumerate(workers):
+                    if self.should_stop: break
+                    
+                    # Verificar pausa
+                    self.cancel_token.wait_if_paused()
+                    if self.should_stop: break
+                    
+                    task_counter += 1
+                    self.current_index = task_counter
+                    self._notify_progress()
+                    
+                    # Obtener mensaje rotativo
+                    mensaje = self.manual_messages_numbers[mensaje_index % total_mensajes_lib]
+                    mensaje_index += 1
+                    
+                    # Construir link de WhatsApp (el mensaje va incluido en el link)
+                    if len(clean_numero) == 10:  # Número local argentino
+                        wa_link = f"https://wa.me/549{clean_numero}?text={urllib.parse.quote(mensaje, safe='')}"
+                    else:
+                        wa_link = f"https://wa.me/{clean_numero}?text={urllib.parse.quote(mensaje, safe='')}"
+                    
+                    self.log(f"[{device}] ({wa_name}) -> {clean_numero}", 'info')
+                    
+                    # === ENVÍO SIMPLIFICADO ===
+                    success = self._send_simple_whatsapp(device, wa_link, wa_package)
+                    
+                    if success:
+                        self.sent_count += 1
+                        self.log(f"[{device}] ({wa_name}) -> {clean_numero} ✓", 'success')
+                    else:
+                        self.failed_count += 1
+                        self.log(f"[{device}] ({wa_name}) -> {clean_numero} ✗", 'error')
+                    
+                    self._notify_progress()
+                
+                # Pausa entre números (solo si no es el último número)
+                if idx_numero < num_numeros - 1 and not self.should_stop:
+                    delay = random.uniform(self.run_config.fidelizado_send_delay_min, self.run_config.fidelizado_send_delay_max)
+                    self.log(f"⏳ Esperando {delay:.1f}s antes del siguiente número...", 'info')
+                    self._controlled_sleep(delay)
+            
+            if self.should_stop: break
+            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+        
+        self.log(f"\nModo Números Manual finalizado", 'success')
+
+    def _send_simple_whatsapp(self, device, wa_link, wa_package):
+        """
+        Envío simplificado de WhatsApp:
+        1. Abrir el link (ya tiene el mensaje incluido)
+        2. Esperar que cargue el chat
+        3. Hacer clic en el botón enviar
+        
+        SIN verificación de texto, SIN reintentos complejos, SIN toques extra.
+        """
+        try:
+            # 1. Conectar uiautomator2
+            try:
+                ui_device = self.u2_registry.get(device, unlock=True)
+            except Exception as e:
+                self.log(f"[{device}] No se pudo conectar: {e}", 'error')
+                return False
+            
+            # 2. Abrir el link de WhatsApp
+            open_args = ['-s', device, 'shell', 'am', 'start', '-a', 'android.intent.action.VIEW', 
+                        '-d', f'"{wa_link}"', '-p', wa_package]
+            
+            if not self._run_adb_command(open_args, timeout=15):
+                self.log(f"[{device}] No se pudo abrir el chat", 'error')
+                return False
+            
+            # 3. Esperar que cargue el chat (tiempo configurable)
+            wait_time = max(3, int(self.run_config.wait_after_open))
+            self._controlled_sleep(wait_time)
+            
+            if self.should_stop:
+                return False
+            
+            # 4. Buscar el botón de enviar (el mensaje ya está pre-cargado en el link)
+            send_button = self._locate_message_send_button(ui_device, is_sms=False, wait_timeout=3)
+            
+            if not send_button:
+                self.log(f"[{device}] No se encontró el botón de enviar", 'error')
+                return False
+            
+            # 5. Hacer clic en enviar
+            try:
+                send_button.click()
+                self._controlled_sleep(1.0)  # Pequeña pausa para que se envíe
+                return True
+            except Exception as e:
+                self.log(f"[{device}] Error al hacer clic en enviar: {e}", 'error')
+                return False
+            
+        except Exception as e:
+            self.log(f"[{device}] Error en envío: {e}", 'error')
+            return False
+
+    
+    def _get_ordered_workers(self, active_devices):
+        """
+        Genera la lista de 'workers' (Device, Name, Package) en el orden solicitado:
+        1. Todos los dispositivos en Business (si aplica)
+        2. Todos los dispositivos en Normal (si aplica)
+        """
+        workers = []
+        mode = self.run_config.whatsapp_mode
+
+        # Primero Business
+        if mode in ["Business", "Ambas", "Todas"]:
+            for device in active_devices:
+                workers.append((device, "WhatsApp Business", "com.whatsapp.w4b"))
+
+        # Luego Normal
+        if mode in ["Normal", "Ambas", "Todas"]:
+            for device in active_devices:
+                workers.append((device, "WhatsApp Normal", "com.whatsapp"))
+
+        return workers
+
+    def run_grupos_simultaneous_thread(self):
+        """
+        Lógica de envío SIMULTÁNEO para MODO GRUPOS.
+        Asigna grupos a workers y ejecuta en tandas paralelas respetando los dispositivos físicos.
+        """
+        # --- FILTRADO DE DISPOSITIVOS ---
+        active_devices = self._get_filtered_devices()
+        if not active_devices:
+            self.log("No hay dispositivos que cumplan con el filtro seleccionado.", "error")
+            self.observer.on_error("Error", "No se encontraron dispositivos que cumplan con el filtro de WhatsApp seleccionado.")
+            return
+
+        num_devices_phys = len(active_devices)
+        grupos = self.manual_inputs_groups
+        num_grupos = len(grupos)
+        num_bucles = self.run_config.manual_loops
+
+        if len(self.manual_messages_groups) < 1:
+            self.log("Error: Modo Grupos requiere al menos 1 mensaje cargado.", "error")
+            self.observer.on_error("Error", "Debes cargar al menos 1 archivo de mensajes.")
+            return
+
+        # Construir lista de workers
+        workers = self._get_ordered_workers(active_devices)
+        num_workers = len(workers)
+
+        self.log(f"Modo Grupos Simultáneo: {num_bucles} bucle(s), {num_grupos} grupos, {num_workers} workers", 'info')
+
+        # Indices
+        mensaje_index = self.mensaje_start_index
+        total_mensajes_lib = len(self.manual_messages_groups)
+        task_counter = 0
+
+        # --- Bucle principal ---
+        for bucle_num in range(num_bucles):
+            if self.should_stop: break
+            self.log(f"\n--- INICIANDO BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+
+            # Crear lista de tareas (Grupo, Worker)
+            tasks = []
+            for i, grupo in enumerate(grupos):
+                # Aplicar rotación basada en el número de bucle para evitar repetición
+                worker_idx = (i + bucle_num) % num_workers
+                worker = workers[worker_idx]
+                tasks.append((grupo, worker))
+
+            # Procesar en tandas de tamaño = num_devices_phys
+            # Como workers alterna dispositivos, tomar N tareas debería usar N dispositivos distintos (idealmente)
+            batch_size = num_devices_phys
+
+            for i in range(0, len(tasks), batch_size):
+                if self.should_stop: break
+
+                batch_tasks = tasks[i : i + batch_size]
+                self.log(f"\n>>> Iniciando Tanda {i // batch_size + 1} ({len(batch_tasks)} tareas) <<<", 'info')
+
+                threads = []
+                for grupo_link, (device, wa_name, wa_package) in batch_tasks:
+                    if self.should_stop: break
+                    task_counter += 1
+
+                    # Mensaje rotativo
+                    mensaje = self.manual_messages_groups[mensaje_index % total_mensajes_lib]
+                    mensaje_index += 1
+
+                    def worker_func(dev, link, msg, t_idx, pkg, w_name):
+                        self.log(f"[{dev}] -> Grupo {link.split('/')[-1][:10]} ({w_name})", 'info')
+                        self.run_single_task(dev, link, msg, t_idx, whatsapp_package=pkg, skip_delay=True)
+
+                        # Forzar cierre (Ctrl+8 style) tras el envío en este modo
+                        self.log(f"[{dev}] Cerrando apps (Ctrl+8)...", 'info')
+                        self.close_all_apps(dev)
+
+                        # Lógica cambio cuenta "Todas"
+                        if w_name == "WhatsApp Normal" and self.run_config.whatsapp_mode == "Todas":
+                             self._switch_account_for_device(dev, delay=0.2)
+
+                    t = threading.Thread(target=worker_func, args=(device, grupo_link, mensaje, task_counter, wa_package, wa_name))
+                    threads.append(t)
+                    t.start()
+
+                for t in threads:
+                    t.join()
+
+                if self.should_stop: break
+                self.log(f">>> Tanda finalizada", 'success')
+
+                # Delay entre tandas
+                if i + batch_size < len(tasks):
+                    delay = random.uniform(self.run_config.fidelizado_send_delay_min, self.run_config.fidelizado_send_delay_max)
+                    self.log(f"⏳ Esperando {delay:.1f}s...", 'info')
+                    self._controlled_sleep(delay)
+
+            if self.should_stop: break
+            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+
+        self.log(f"\nModo Grupos Simultáneo finalizado", 'success')
+
+    def run_grupos_dual_whatsapp_thread(self):
+        """
+        Lógica de envío para MODO GRUPOS (Secuencial).
+        Asigna grupos 1-a-1 a workers (Dispositivo + App) en orden round-robin.
+        """
+        # --- FILTRADO DE DISPOSITIVOS ---
+        active_devices = self._get_filtered_devices()
+        if not active_devices:
+            self.log("No hay dispositivos que cumplan con el filtro seleccionado.", "error")
+            self.observer.on_error("Error", "No se encontraron dispositivos que cumplan con el filtro de WhatsApp seleccionado.")
+            return
+        # --- FIN FILTRADO ---
+
+        num_devices = len(active_devices)
+        grupos = self.manual_inputs_groups
+        num_grupos = len(grupos)
+        num_bucles = self.run_config.manual_loops
+
+        if len(self.manual_messages_groups) < 1:
+            self.log("Error: Modo Grupos requiere al menos 1 mensaje cargado.", "error")
+            self.observer.on_error("Error", "Debes cargar al menos 1 archivo de mensajes.")
+            return
+
+        # Construir lista de workers
+        workers = self._get_ordered_workers(active_devices)
+        num_workers = len(workers)
+
+        self.log(f"Modo Grupos Secuencial: {num_bucles} bucle(s), {num_grupos} grupos, {num_workers} workers ({num_devices} dispositivos)", 'info')
+        self.log(f"Orden de asignación: {[f'{d}-{n}' for d,n,p in workers]}", 'info')
+
+        # Indices
+        mensaje_index = self.mensaje_start_index
+        total_mensajes_lib = len(self.manual_messages_groups)
+        task_counter = 0
+
+        # --- Bucle principal ---
+        for bucle_num in range(num_bucles):
+            if self.should_stop: break
+            self.log(f"\n--- INICIANDO BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+
+            # Iterar grupos y asignar round-robin
+            for idx_grupo, grupo_link in enumerate(grupos):
+                if self.should_stop: break
+
+                # Determinar worker con rotación basada en bucle
+                worker_idx = (idx_grupo + bucle_num) % num_workers
+                worker = workers[worker_idx]
+                device, wa_name, wa_package = worker
+
+                grupo_display = grupo_link.split('chat.whatsapp.com/')[-1][:10] if 'chat.whatsapp.com' in grupo_link else str(idx_grupo+1)
+                self.log(f"\n=== GRUPO {idx_grupo + 1}/{num_grupos} -> {device} ({wa_name}) ===", 'info')
+
+                task_counter += 1
+
+                # Obtener mensaje rotativo
+                mensaje = self.manual_messages_groups[mensaje_index % total_mensajes_lib]
+                mensaje_index += 1
+
+                # Ejecutar envío
+                success = self.run_single_task(
+                    device, grupo_link, mensaje, task_counter, whatsapp_package=wa_package
+                )
+
+                # Lógica de cambio de cuenta para el modo "TODAS" (Solo si es Normal)
+                if wa_name == "WhatsApp Normal" and self.run_config.whatsapp_mode == "Todas":
+                    self.log(f"[{device}] Cerrando WhatsApp Normal después de enviar...", 'info')
+                    self._run_adb_command(['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp'], timeout=5)
+                    self._controlled_sleep(1)
+
+                    self.log(f"[{device}] Reabriendo WhatsApp Normal...", 'info')
+                    self._run_adb_command(['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main'], timeout=5)
+                    self._controlled_sleep(3)
+
+                    self.log(f"[{device}] Cambiando de cuenta...", 'info')
+                    self._switch_account_for_device(device, delay=0.2)
+                    self._controlled_sleep(4)
+
+                    self.log(f"[{device}] Cerrando WhatsApp Normal después de cambiar cuenta...", 'info')
+                    self._run_adb_command(['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp'], timeout=5)
+                    self._controlled_sleep(1)
+
+                    self.log(f"[{device}] Reabriendo WhatsApp Normal con nueva cuenta...", 'info')
+                    self._run_adb_command(['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main'], timeout=5)
+                    self._controlled_sleep(2)
+
+            if self.should_stop: break
+            self.log(f"\n--- FIN BUCLE {bucle_num + 1}/{num_bucles} ---", 'success')
+
+        self.log(f"\nModo Grupos finalizado", 'success')
+
+    def run_unirse_grupos(self, grupos):
+        """
+        Función para unirse automáticamente a grupos.
+        NUEVA LÓGICA CON THREADING (EJECUCIÓN PARALELA):
+        Por cada grupo:
+          - TODOS los dispositivos se unen SIMULTÁNEAMENTE según la selección de WhatsApp
+        Proceso:
+          - Presiona DPAD_DOWN 3 veces (con pausas de 2s)
+          - Presiona ENTER
+          - Presiona BACK para salir
+        """
+        num_devices = len(self.devices)
+        num_grupos = len(grupos)
+
+        # Obtener qué WhatsApp usar
+        wa_mode = self.run_config.whatsapp_mode
+
+        # Determinar cuántas uniones totales habrá
+        if wa_mode == "Todas":
+            total_uniones = num_grupos * num_devices * 3
+        elif wa_mode == "Ambas":
+            total_uniones = num_grupos * num_devices * 2
+        else:
+            total_uniones = num_grupos * num_devices
+
+        self.log(f"\n=== UNIRSE A GRUPOS (MODO PARALELO) ===", 'info')
+        self.log(f"Grupos: {num_grupos}", 'info')
+        self.log(f"Dispositivos: {num_devices}", 'info')
+        self.log(f"WhatsApp: {wa_mode}", 'info')
+        self.log(f"Total de uniones: {total_uniones}", 'info')
+
+        total = num_grupos * num_devices * 2
+
+        # Función auxiliar para unirse a un grupo en un dispositivo
+        def unirse_a_grupo_device(device, grupo_link, whatsapp_package, whatsapp_name):
+            """Ejecuta el proceso completo de unión para un dispositivo."""
+            try:
+                if self.should_stop:
+                    return False
+
+                # Verificar pausa
+                self.cancel_token.wait_if_paused()
+                if self.should_stop:
+                    return False
+
+                self.log(f"[{device}] Uniéndose por {whatsapp_name}...", 'info')
+
+                # Abrir grupo
+                open_args = ['-s', device, 'shell', 'am', 'start', '-a', 'android.intent.action.VIEW',
+                            '-d', grupo_link, '-p', whatsapp_package]
+
+                if not self._run_adb_command(open_args, timeout=20):
+                    self.log(f"[{device}] Fallo al abrir grupo en {whatsapp_name}", "error")
+                    return False
+
+                # Esperar 1 segundo (reducido de 2 para acelerar)
+                self._controlled_sleep(1)
+
+                if self.should_stop:
+                    return False
+
+                # Presionar DPAD_DOWN 3 veces
+                for i in range(3):
+                    if self.should_stop:
+                        return False
+                    down_args = ['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_DPAD_DOWN']
+                    self._run_adb_command(down_args, timeout=5)
+                    self._controlled_sleep(1) # Reducido de 2s
+
+                if self.should_stop:
+                    return False
+
+                # Presionar ENTER
+                enter_args = ['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_ENTER']
+                self._run_adb_command(enter_args, timeout=10)
+
+                # Esperar 1 segundo (reducido de 2s)
+                self._controlled_sleep(1)
+
+                # Presionar BACK para salir del grupo
+                back_args = ['-s', device, 'shell', 'input', 'keyevent', 'KEYCODE_BACK']
+                self._run_adb_command(back_args, timeout=10)
+                self.log(f"[{device}] Presionando BACK para salir...", 'info')
+
+                # Esperar 0.5 segundos final (reducido de 1s)
+                self._controlled_sleep(0.5)
+
+                self.log(f"[{device}] Unido a grupo por {whatsapp_name}", 'success')
+                return True
+
+            except Exception as e:
+                self.log(f"[{device}] Error en unión: {e}", 'error')
+                return False
+        
+        # Por cada grupo
+        for idx_grupo, grupo_link in enumerate(grupos):
+            if self.should_stop:
+                break
+            
+            grupo_display = grupo_link[:50] + "..." if len(grupo_link) > 50 else grupo_link
+            self.log(f"\n--- GRUPO {idx_grupo + 1}/{num_grupos}: {grupo_display} ---", 'info')
+            
+            # ===== FASE 1: WHATSAPP BUSINESS (si corresponde) =====
+            if wa_mode == "Business" or wa_mode == "Ambas" or wa_mode == "Todas":
+                fase_num = 1 if (wa_mode == "Ambas" or wa_mode == "Todas") else 0
+                if fase_num == 1:
+                    self.log(f"\n>>> FASE 1: Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Business...", 'info')
+                else:
+                    self.log(f"\n>>> Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Business...", 'info')
+                
+                threads_business = []
+                for device in self.devices:
+                    if self.should_stop:
+                        break
+                    thread = threading.Thread(
+                        target=unirse_a_grupo_device,
+                        args=(device, grupo_link, 'com.whatsapp.w4b', 'WhatsApp Business'),
+                        daemon=True
+                    )
+                    threads_business.append(thread)
+                    thread.start()
+
+                # Esperar a que TODOS los threads de Business terminen
+                for thread in threads_business:
+                    thread.join()
+
+                if fase_num == 1:
+                    self.log(f"\n>>> FASE 1 completada: Todos unidos por WhatsApp Business", 'success')
+                else:
+                    self.log(f"\n>>> Completado: Todos unidos por WhatsApp Business", 'success')
+                
+                if self.should_stop:
+                    break
+            
+            # ===== FASE 2: WHATSAPP NORMAL (si corresponde) =====
+            if wa_mode == "Normal" or wa_mode == "Ambas" or wa_mode == "Todas":
+                fase_num = 2 if (wa_mode == "Ambas" or wa_mode == "Todas") else 0
+                if fase_num == 2:
+                    self.log(f"\n>>> FASE 2: Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Normal...", 'info')
+                else:
+                    self.log(f"\n>>> Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Normal...", 'info')
+
+                threads_normal = []
+                for device in self.devices:
+                    if self.should_stop:
+                        break
+                    thread = threading.Thread(
+                        target=unirse_a_grupo_device,
+                        args=(device, grupo_link, 'com.whatsapp', 'WhatsApp Normal'),
+                        daemon=True
+                    )
+                    threads_normal.append(thread)
+                    thread.start()
+
+                # Esperar a que TODOS los threads de Normal terminen
+                for thread in threads_normal:
+                    thread.join()
+
+                if fase_num == 2:
+                    self.log(f"\n>>> FASE 2 completada: Todos unidos por WhatsApp Normal", 'success')
+                else:
+                    self.log(f"\n>>> Completado: Todos unidos por WhatsApp Normal", 'success')
+
+                # Si el modo es "Todas", cambiar de cuenta DESPUÉS de unirse con Normal
+                if wa_mode == "Todas":
+                    self.log(f"\n>>> Cambiando de cuenta en todos los dispositivos...", 'info')
+
+                    for device in self.devices:
+                        if self.should_stop:
+                            break
+
+                        self.log(f"[{device}] Cerrando WhatsApp Normal...", 'info')
+                        close_cmd = ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp']
+                        self._run_adb_command(close_cmd, timeout=5)
+                        self._controlled_sleep(1)
+
+                        self.log(f"[{device}] Reabriendo WhatsApp Normal...", 'info')
+                        open_cmd = ['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main']
+                        self._run_adb_command(open_cmd, timeout=5)
+                        self._controlled_sleep(3)  # Esperar 3 segundos para que WhatsApp se abra completamente
+
+                        self.log(f"[{device}] Cambiando de cuenta...", 'info')
+                        self._switch_account_for_device(device)
+                        self._controlled_sleep(1)
+
+                        self.log(f"[{device}] Cerrando WhatsApp Normal después de cambiar cuenta...", 'info')
+                        close_cmd = ['-s', device, 'shell', 'am', 'force-stop', 'com.whatsapp']
+                        self._run_adb_command(close_cmd, timeout=5)
+                        self._controlled_sleep(1)
+
+                        self.log(f"[{device}] Reabriendo WhatsApp Normal con nueva cuenta...", 'info')
+                        open_cmd = ['-s', device, 'shell', 'am', 'start', '-n', 'com.whatsapp/.Main']
+                        self._run_adb_command(open_cmd, timeout=5)
+                        self._controlled_sleep(2)
+
+                    if self.should_stop:
+                        break
+            
+            # ===== FASE 3: WHATSAPP NORMAL 2 (si corresponde) =====
+            if wa_mode == "Todas":
+                self.log(f"\n>>> FASE 3: Todos los dispositivos uniéndose SIMULTÁNEAMENTE por WhatsApp Normal (cuenta 2)...", 'info')
+
+                threads_normal2 = []
+                for device in self.devices:
+                    if self.should_stop:
+                        break
+                    thread = threading.Thread(
+                        target=unirse_a_grupo_device,
+                        args=(device, grupo_link, 'com.whatsapp', 'WhatsApp Normal (cuenta 2)'),
+                        daemon=True
+                    )
+                    threads_normal2.append(thread)
+                    thread.start()
+
+                # Esperar a que TODOS los threads de Normal 2 terminen
+                for thread in threads_normal2:
+                    thread.join()
+
+                self.log(f"\n>>> FASE 3 completada: Todos unidos por WhatsApp Normal (cuenta 2)", 'success')
+            
+            self.log(f"\n=== GRUPO {idx_grupo + 1} completado ===", 'success')
+        
+        self.log(f"\n=== PROCESO DE UNIÓN A GRUPOS FINALIZADO ===", 'success')
+        self.observer.on_info("Éxito", f"Proceso completado.\n\nSe unieron a {num_grupos} grupo(s) con {num_devices} dispositivo(s).")
+    
+
+
+    
+
+    def run_bucle_blast_thread_V2(self):
+        """
+        Lógica de envío NUEVA (Modo Bucles G/N Blast V2).
+        Definición de 1 Bucle: Recorrer TODA la lista de G y N.
+        Repetir esto N veces.
+        """
+        num_devices = len(self.devices)
+        num_bucles = self.manual_loops
+        
+        # Crear copias de las listas de tareas
+        group_targets = list(self.manual_inputs_groups)
+        number_targets = list(self.manual_inputs_numbers)
+        group_messages = list(self.manual_messages_groups)
+        number_messages = list(self.manual_messages_numbers)
+
+        # Índices para rotación de mensajes
+        g_msg_idx = 0
+        n_msg_idx = 0
+        
+        # Contador global de tareas (1-based)
+        task_counter = 0
+
+        if not group_targets or not number_targets or not group_messages or not number_messages:
+            self.log("Error: Modo Bucles Blast requiere Grupos, Números y sus respectivos Mensajes.", "error")
+            return
+            
+        # Longitud del "sub-bucle" (la lista de targets más larga)
+        max_len = max(len(group_targets), len(number_targets))
+
+        # --- Funciones helper para rotar mensajes ---
+        def get_next_g_msg():
+            nonlocal g_msg_idx
+            msg = group_messages[g_msg_idx % len(group_messages)]
+            g_msg_idx += 1
+            return msg
+
+        def get_next_n_msg():
+            nonlocal n_msg_idx
+            msg = number_messages[n_msg_idx % len(number_messages)]
+            n_msg_idx += 1
+            return msg
+        # --- Fin helpers ---
+
+        # --- Bucle Principal (N Repeticiones) ---
+        for b in range(num_bucles):
+            if self.should_stop: break
+            rep_num = b + 1
+            self.log(f"--- Iniciando REPETICIÓN {rep_num} / {num_bucles} ---", 'info')
+
+            # --- Bucle Interno (Recorrer todos los targets) ---
+            for i in range(max_len):
+                if self.should_stop: break
+                
+                # --- Etapa 1: Blast de Grupo ---
+                # Target rotativo
+                current_group_target = group_targets[i % len(group_targets)]
+                self.log(f"Repetición {rep_num}, Etapa {i+1}.1: Todos a GRUPO {current_group_target[:40]}...", 'info')
+                
+                for device in self.devices:
+                    if self.should_stop: break
+                    task_counter += 1
+                    msg_g = get_next_g_msg() # Mensaje rotativo
+                    self.run_single_task(device, current_group_target, msg_g, task_counter)
+                
+                if self.should_stop: break # Check entre etapas
+
+                # --- Etapa 2: Blast de Número ---
+                # Target rotativo
+                current_number_target = number_targets[i % len(number_targets)]
+                self.log(f"Repetición {rep_num}, Etapa {i+1}.2: Todos a NÚMERO {current_number_target}", 'info')
+                
+                for device in self.devices:
+                    if self.should_stop: break
+                    task_counter += 1
+                    msg_n = get_next_n_msg() # Mensaje rotativo
+                    wa_link = f"https://wa.me/549{current_number_target}?text={urllib.parse.quote(msg_n, safe='')}"
+                    self.run_single_task(device, wa_link, None, task_counter) # None pork el msg va en el link
+            
+            if self.should_stop: break # Check al final del bucle interno
+
+            self.log(f"--- Fin REPETICIÓN {rep_num} ---", 'info')
+
+    def _switch_account_for_device(self, device, delay=0.1):
+        """Cambia de cuenta en WhatsApp Normal para un dispositivo específico.
+        
+        Args:
+            device: ID del dispositivo
+            delay: Tiempo de espera entre comandos (default 0.1s para cambio automático rápido)
+        """
+        adb_exe = self.adb_exe
+        if not adb_exe or not os.path.exists(adb_exe):
+            self.log(f"Error: No se encontró ADB para cambiar cuenta en {device}", 'error')
+            return False
+        
+        try:
+            commands = [
+                "shell am start -n com.whatsapp/.Main",
+                "shell input keyevent KEYCODE_DPAD_UP",
+                "shell input keyevent KEYCODE_DPAD_UP",
+                "shell input keyevent KEYCODE_DPAD_RIGHT",
+                "shell input keyevent KEYCODE_ENTER",
+                "shell input keyevent KEYCODE_TAB",
+                "shell input keyevent KEYCODE_TAB",
+                "shell input keyevent KEYCODE_TAB",
+                "shell input keyevent KEYCODE_TAB",
+                "shell input keyevent KEYCODE_TAB",
+                "shell input keyevent KEYCODE_TAB",
+                "shell input keyevent KEYCODE_TAB",
+                "shell input keyevent KEYCODE_ENTER"
+            ]
+            
+            for cmd in commands:
+                full_cmd = f'"{adb_exe}" -s {device} {cmd}'
+                subprocess.run(full_cmd, shell=True, capture_output=True, text=True, timeout=5)
+                time.sleep(delay)  # Tiempo configurable según el contexto
+            
+            self.log(f"✓ Cuenta cambiada en {device}", 'success')
+            return True
+            
+        except subprocess.TimeoutExpired:
+            self.log(f"✗ Timeout al cambiar cuenta en {device}", 'error')
+            return False
+        except Exception as e:
+            self.log(f"✗ Error al cambiar cuenta en {device}: {str(e)}", 'error')
+            return False
+
+    def _infer_lines_from_installed_apps(self, log_errors=True):
+        """Inferir líneas disponibles solo revisando paquetes instalados cuando no hay números detectados."""
+        inferred = []
+        adb_binary = self.adb_exe
+
+        if not adb_binary or not os.path.exists(adb_binary):
+            return inferred
+
+        for device_serial in self.devices:
+            try:
+                result = subprocess.run(
+                    [adb_binary, '-s', device_serial, 'shell', 'pm', 'list', 'packages'],
+                    capture_output=True,
+                    text=True,
+                    timeout=8,
+                    encoding='utf-8',
+                    errors='ignore'
+                )
+                if result.returncode != 0:
+                    if log_errors:
+                        self.log(f"No se pudo listar paquetes en {device_serial}.", 'warning')
+                    continue
+
+                packages = {line.split(':', 1)[1] for line in result.stdout.splitlines() if line.startswith('package:')}
+
+                if 'com.whatsapp' in packages:
+                    inferred.append({"device": device_serial, "type": "WhatsApp", "number": "(sin detectar)", "package": "com.whatsapp"})
+                if 'com.whatsapp.w4b' in packages:
+                    inferred.append({"device": device_serial, "type": "WhatsApp Business", "number": "(sin detectar)", "package": "com.whatsapp.w4b"})
+
+            except Exception as e:
+                if log_errors:
+                    self.log(f"Error al inferir apps instaladas en {device_serial}: {e}", 'warning')
+
+        return inferred
+
+
+# --- Ejecutor sin interfaz ---
+class HeadlessRunner(SendingEngine):
+    """
+    Ejecuta los modos de envío sin tkinter: los de links ya generados (tradicional y SMS),
+    los Fidelizado, las llamadas y la unión a grupos. Útil para servidores, pruebas con
+    dispositivos simulados y automatizaciones desde otros scripts.
+    """
+
+    MODES = ("tradicional", "simultaneo", "sms", "sms_simultaneo")
+    # Modos Fidelizado; la variante (simultáneo, uno a uno/muchos, apps, bucles) sale de run_config
+    FIDELIZADO_MODES = {"grupos": "GRUPOS", "numeros_manual": "NUMEROS_MANUAL", "numeros": "NUMEROS", "mixto": "MIXTO"}
+    TASK_MODES = ("llamadas", "unirse_grupos")
+    ALL_MODES = MODES + tuple(FIDELIZADO_MODES) + TASK_MODES
+
+    def __init__(self, config, observer=None, devices=None):
+        self._init_engine(observer=observer)
+        self.run_config = config
+        self.adb_exe = config.adb_path
+        self.manual_loops = config.manual_loops
+        self.trace_path = None  # JSON donde guardar la traza al terminar (con trace_enabled)
+        if devices:
+            self.devices = list(devices)
+
+    def detect_devices(self):
+        """Lista los dispositivos en estado 'device' con 'adb devices'."""
+        try:
+            result = subprocess.run([self.adb_exe, 'devices'], capture_output=True, text=True,
+                                    timeout=15, startupinfo=_hidden_startupinfo())
+        except (OSError, subprocess.TimeoutExpired) as e:
+            self.log(f"No se pudo ejecutar ADB: {e}", 'error')
+            return []
+        self.devices = [parts[0] for parts in (line.split('\t') for line in result.stdout.splitlines()[1:])
+                        if len(parts) == 2 and parts[1].strip() == 'device']
+        return self.devices
+
+    def load_fidelizado(self, numbers=(), groups=(), messages=(), group_messages=None, phone_lines=(), message_start=0):
+        """
+        Entradas de los modos Fidelizado, como las carga la ventana: números sin prefijo, links
+        de grupo, mensajes (uno por envío, en rotación) y las líneas de WhatsApp de cada
+        dispositivo ({"device", "type", "number", "package"}) para 'Uno a uno/muchos'.
+        """
+        self.manual_inputs_numbers = list(numbers)
+        self.manual_inputs_groups = list(groups)
+        self.manual_messages_numbers = list(messages)
+        self.manual_messages_groups = list(messages if group_messages is None else group_messages)
+        self.detected_phone_lines = list(phone_lines)
+        self.mensaje_start_index = message_start
+
+    def load_calls(self, rows, phone_columns):
+        """Filas (SheetRows o diccionarios) y columnas de teléfono para el modo Llamadas."""
+        self.raw_data = rows
+        self.calls_selected_columns = list(phone_columns)
+
+    def run(self, mode, links=()):
+        """Corre un envío completo y devuelve el resumen; bloquea hasta terminar o cancelar."""
+        if mode not in self.ALL_MODES:
+            raise ValueError(f"Modo desconocido: {mode}")
+        if not self.devices and not self.detect_devices():
+            raise RuntimeError("No hay dispositivos conectados")
+        if mode in self.MODES and not links:
+            raise ValueError(f"El modo {mode} necesita links")
+
+        self.links = list(links)
+        self.total_messages = len(self.links)
+        self.link_retry_map = {}
+        self.report_data = []
+        self.sms_mode_active = mode.startswith("sms")
+        self.fidelizado_mode = self.FIDELIZADO_MODES.get(mode)
+        self._reset_run_stats()
+
+        # 'tradicional' y 'sms' siguen a run_config (como la ventana); 'simultaneo' y
+        # 'sms_simultaneo' fuerzan la variante simultánea
+        target, args = None, ()
+        if mode == "simultaneo":
+            target = self.run_traditional_simultaneous_thread
+        elif mode == "sms_simultaneo":
+            target = self.run_sms_parallel_thread
+        elif mode == "llamadas":
+            target = self.run_calls_thread
+        elif mode == "unirse_grupos":
+            target, args = self.run_unirse_grupos, (self.manual_inputs_groups,)
+
+        started = time.monotonic()
+        try:
+            self.run_campaign(target, args, prepare=mode not in self.TASK_MODES)
+        finally:
+            self.adb_pool.close_all()
+        return {
+            'mode': mode,
+            'total': self.total_messages,
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'cancelled': self.should_stop,
+            'error': str(self.run_error) if self.run_error else None,
+            'duration_s': time.monotonic() - started,
+        }
+
+    def stop(self):
+        """Cancela el envío en curso (seguro desde cualquier hilo)."""
+        self.should_stop = True
+
+    def _trace_export_path(self):
+        return self.trace_path
+
+
+class ConsoleObserver(EngineObserver):
+    """Escribe el log y el avance del motor en la consola."""
+
+    def on_log(self, message, level='info'):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {level.upper():7} {message}", flush=True)
+
+    def on_progress(self, current, total, sent, failed):
+        print(f"  Progreso: {current}/{total or '?'} · enviados {sent} · fallidos {failed}", flush=True)
+
+    def on_finished(self, cancelled):
+        print("Envío cancelado." if cancelled else "Envío terminado.", flush=True)
+
+    def on_error(self, title, message):
+        print(f"{title}: {message}", file=sys.stderr, flush=True)
+
+    def on_info(self, title, message):
+        print(f"{title}: {message}", flush=True)
+
+
+def _read_links(path):
+    with open(path, encoding='utf-8-sig') as fh:
+        return [line.strip() for line in fh if line.strip() and not line.lstrip().startswith('#')]
+
+
+def _read_phone_lines(path):
+    """Líneas 'serial;Business|Normal;número' (una por app con sesión en cada dispositivo)."""
+    lines = []
+    for entry in _read_links(path):
+        device, kind, number = [part.strip() for part in entry.split(';', 2)]
+        business = kind.lower().startswith('b')
+        lines.append({"device": device, "type": "WhatsApp Business" if business else "WhatsApp",
+                      "number": number, "package": "com.whatsapp.w4b" if business else "com.whatsapp"})
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Envío de HΞЯMΞS sin interfaz")
+    parser.add_argument('--adb', required=True, help="Ruta de adb.exe")
+    parser.add_argument('--mode', choices=HeadlessRunner.ALL_MODES, default="tradicional")
+    parser.add_argument('--devices', nargs='*', help="Seriales a usar (por defecto, todos los conectados)")
+    parser.add_argument('--links', help="Tradicional/SMS: archivo de texto con un link por línea")
+    parser.add_argument('--send-mode', default="Business",
+                        choices=["Business", "Normal", "Business/Normal", "Business/Normal 1/Normal 2"])
+    parser.add_argument('--delay', type=int, nargs=2, metavar=('MIN', 'MAX'), default=(3, 5),
+                        help="Espera entre mensajes (segundos)")
+    parser.add_argument('--wait-open', type=int, default=7, help="Espera tras abrir el chat (segundos)")
+    # Fidelizado
+    parser.add_argument('--numbers', help="Fidelizado: un número por línea (sin 549)")
+    parser.add_argument('--groups', help="Fidelizado/unirse_grupos: un link de grupo por línea")
+    parser.add_argument('--messages', help="Fidelizado: un mensaje por línea (se usan en rotación)")
+    parser.add_argument('--phone-lines', help="Modo numeros: líneas 'serial;Business|Normal;número'")
+    parser.add_argument('--whatsapp', default="Todas", choices=["Business", "Normal", "Ambas", "Todas"],
+                        help="Fidelizado: apps de WhatsApp a usar")
+    parser.add_argument('--numeros-mode', default="Uno a uno", choices=["Uno a uno", "Uno a muchos"])
+    parser.add_argument('--mixto-variant', type=int, default=1, choices=[1, 2, 3])
+    parser.add_argument('--loops', type=int, default=1, help="Fidelizado: bucles/ciclos")
+    parser.add_argument('--simultaneous', action='store_true',
+                        help="Usar la variante simultánea del modo (tradicional, sms, Fidelizado, llamadas)")
+    # Llamadas
+    parser.add_argument('--sheet', help="Llamadas: Excel/CSV con los números")
+    parser.add_argument('--phone-columns', nargs='*', default=["Telefono", "Celular"],
+                        help="Llamadas: columnas de teléfono de la planilla")
+    parser.add_argument('--call-duration', type=int, default=15, help="Llamadas: duración (segundos)")
+    parser.add_argument('--trace', metavar='ARCHIVO', help="Guardar la traza de rendimiento en este JSON")
+    args = parser.parse_args(argv)
+
+    config = EngineConfig(
+        adb_path=args.adb,
+        delay_min=args.delay[0], delay_max=args.delay[1],
+        sms_delay_min=args.delay[0], sms_delay_max=args.delay[1],
+        fidelizado_send_delay_min=args.delay[0], fidelizado_send_delay_max=args.delay[1],
+        calls_delay_min=args.delay[0], calls_delay_max=args.delay[1],
+        calls_duration=args.call_duration,
+        wait_after_open=args.wait_open,
+        traditional_send_mode=args.send_mode,
+        whatsapp_mode=args.whatsapp,
+        fidelizado_numeros_mode=args.numeros_mode,
+        mixto_variant=args.mixto_variant,
+        manual_loops=args.loops,
+        simultaneous_mode=args.simultaneous,
+        sms_simultaneous_mode=args.simultaneous,
+        traditional_simultaneous_mode=args.simultaneous,
+        calls_simultaneous_mode=args.simultaneous,
+        trace_enabled=bool(args.trace),
+    )
+    runner = HeadlessRunner(config, ConsoleObserver(), devices=args.devices)
+    runner.trace_path = args.trace
+    try:
+        links = _read_links(args.links) if args.links else []
+        runner.load_fidelizado(
+            numbers=_read_links(args.numbers) if args.numbers else (),
+            groups=_read_links(args.groups) if args.groups else (),
+            messages=_read_links(args.messages) if args.messages else (),
+            phone_lines=_read_phone_lines(args.phone_lines) if args.phone_lines else (),
+        )
+        if args.sheet:
+            from excel_io import read_csv_rows, read_excel_rows
+            reader = read_csv_rows if args.sheet.lower().endswith('.csv') else read_excel_rows
+            runner.load_calls(reader(args.sheet), args.phone_columns)
+        summary = runner.run(args.mode, links)
+    except KeyboardInterrupt:
+        runner.stop()
+        return 130
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Enviados {summary['sent']} / {summary['total']} · fallidos {summary['failed']} · {summary['duration_s']:.1f} s")
+    return 1 if summary['error'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())